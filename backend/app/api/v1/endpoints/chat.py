@@ -12,6 +12,7 @@ from fastapi import APIRouter, HTTPException, status, Query
 from fastapi.responses import StreamingResponse, JSONResponse
 
 from app.core.logging_config import get_logger
+from app.core.serialization import sse_event
 from app.models.chat import (
     ChatRequest,
     ChatResponse,
@@ -55,14 +56,14 @@ async def chat_stream(request: ChatRequest):
                     persona=request.persona
                 ):
                     # Format as Server-Sent Events
-                    yield f"data: {json.dumps({'content': chunk})}\n\n"
+                    yield sse_event({'content': chunk})
                 
                 # Send end-of-stream marker
-                yield f"data: {json.dumps({'done': True})}\n\n"
+                yield sse_event({'done': True})
                 
             except Exception as e:
                 logger.error(f"Error in stream generation: {str(e)}")
-                yield f"data: {json.dumps({'error': str(e)})}\n\n"
+                yield sse_event({'error': str(e)})
         
         return StreamingResponse(
             generate_stream(),
@@ -987,6 +988,9 @@ async def chat_stream_with_thread(thread_id: str = Query(...), prompt: str = Que
         if not thread:
             raise HTTPException(status_code=404, detail="Thread not found")
         
+        # get_thread returns a snapshot, so remember whether this is the first exchange
+        is_first_exchange = not thread.messages
+        
         # Add user message to thread
         await chat_thread_service.add_message(thread_id, MessageRole.user, prompt)
         
@@ -997,6 +1001,7 @@ async def chat_stream_with_thread(thread_id: str = Query(...), prompt: str = Que
                 "role": msg.role.value,
                 "content": msg.content
             })
+        messages.append({"role": MessageRole.user.value, "content": prompt})
         
         # Create async generator for streaming
         async def generate_stream():
@@ -1009,24 +1014,24 @@ async def chat_stream_with_thread(thread_id: str = Query(...), prompt: str = Que
                 ):
                     full_response += chunk
                     # Format as Server-Sent Events
-                    yield f"data: {json.dumps({'content': chunk})}\n\n"
+                    yield sse_event({'content': chunk})
                 
                 # Save AI response to thread
                 if full_response:
                     await chat_thread_service.add_message(thread_id, MessageRole.assistant, full_response)
                     
                     # Generate title if this is the first exchange
-                    if len(thread.messages) <= 2 and (not thread.title or thread.title == "New Chat"):
+                    if is_first_exchange and (not thread.title or thread.title == "New Chat"):
                         title = await chat_thread_service.generate_thread_title(prompt, full_response)
                         await chat_thread_service.update_thread_title(thread_id, title)
-                        yield f"data: {json.dumps({'title_updated': title})}\n\n"
+                        yield sse_event({'title_updated': title})
                 
                 # Send end-of-stream marker
-                yield f"data: {json.dumps({'done': True})}\n\n"
+                yield sse_event({'done': True})
                 
             except Exception as e:
                 logger.error(f"Error in stream generation: {str(e)}")
-                yield f"data: {json.dumps({'error': str(e)})}\n\n"
+                yield sse_event({'error': str(e)})
         
         return StreamingResponse(
             generate_stream(),
@@ -1,9 +1,12 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query
 from typing import List, Optional
 
+from app.core.pagination import InvalidCursorError
 from app.models.chat_thread import (
     ChatThread,
+    ChatMessagesPage,
     ChatThreadResponse,
+    ChatThreadSearchResult,
     ChatThreadsListResponse,
     CreateChatThreadRequest,
     AddMessageRequest,
@@ -12,22 +15,22 @@ from app.models.chat_thread import (
     GenerateTitleRequest,
     MessageRole
 )
-from app.services.chat_thread_service import ChatThreadService
+from app.services.chat_thread_service import BaseChatThreadService, create_chat_thread_service
 
 router = APIRouter()
 
-# Initialize single shared instance
-chat_thread_service = ChatThreadService()
+# Initialize single shared instance; thread metadata is loaded by the startup task
+chat_thread_service = create_chat_thread_service(load=False)
 
 # Dependency to get chat thread service
-def get_chat_thread_service() -> ChatThreadService:
+def get_chat_thread_service() -> BaseChatThreadService:
     return chat_thread_service
 
 
 @router.post("/threads", response_model=ChatThreadResponse)
 async def create_chat_thread(
     request: CreateChatThreadRequest,
-    service: ChatThreadService = Depends(get_chat_thread_service)
+    service: BaseChatThreadService = Depends(get_chat_thread_service)
 ):
     """Create a new chat thread"""
     thread = await service.create_thread(title=request.title, user_id=request.user_id)
@@ -37,28 +40,40 @@ async def create_chat_thread(
 @router.get("/threads", response_model=ChatThreadsListResponse)
 async def get_chat_threads(
     user_id: Optional[str] = None,
-    limit: int = 50,
-    offset: int = 0,
-    service: ChatThreadService = Depends(get_chat_thread_service)
+    limit: int = Query(50, ge=1, le=200),
+    offset: int = Query(0, ge=0),
+    cursor: Optional[str] = None,
+    service: BaseChatThreadService = Depends(get_chat_thread_service)
 ):
-    """Get all chat threads with pagination for a specific user"""
-    return await service.get_all_threads(user_id=user_id, limit=limit, offset=offset)
+    """Get chat threads for a specific user, most recent first; pass next_cursor back as cursor for the next page"""
+    try:
+        return await service.get_all_threads(user_id=user_id, limit=limit, offset=offset, cursor=cursor)
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 
 @router.get("/threads/recent", response_model=List[ChatThreadResponse])
 async def get_recent_threads(
     user_id: Optional[str] = None,
     limit: int = 10,
-    service: ChatThreadService = Depends(get_chat_thread_service)
+    service: BaseChatThreadService = Depends(get_chat_thread_service)
 ):
     """Get recent chat threads for sidebar for a specific user"""
     return await service.get_recent_threads(user_id=user_id, limit=limit)
 
 
+@router.get("/stats")
+async def get_chat_thread_stats(
+    service: BaseChatThreadService = Depends(get_chat_thread_service)
+):
+    """Get message residency and eviction counters"""
+    return service.get_residency_stats()
+
+
 @router.get("/threads/{thread_id}", response_model=ChatThread)
 async def get_chat_thread(
     thread_id: str,
-    service: ChatThreadService = Depends(get_chat_thread_service)
+    service: BaseChatThreadService = Depends(get_chat_thread_service)
 ):
     """Get a specific chat thread with all messages"""
     thread = await service.get_thread(thread_id)
@@ -67,11 +82,43 @@ async def get_chat_thread(
     return thread
 
 
+@router.get("/threads/{thread_id}/metadata", response_model=ChatThreadResponse)
+async def get_chat_thread_metadata(
+    thread_id: str,
+    service: BaseChatThreadService = Depends(get_chat_thread_service)
+):
+    """Get a chat thread's title, timestamps and message count without its messages"""
+    thread = await service.get_thread_metadata(thread_id)
+    if not thread:
+        raise HTTPException(status_code=404, detail="Chat thread not found")
+    return thread
+
+
+@router.get("/threads/{thread_id}/messages", response_model=ChatMessagesPage)
+async def get_chat_thread_messages(
+    thread_id: str,
+    before: Optional[str] = None,
+    after: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+    service: BaseChatThreadService = Depends(get_chat_thread_service)
+):
+    """Get a page of messages, oldest first: the newest by default, or those before/after a cursor"""
+    if before and after:
+        raise HTTPException(status_code=400, detail="Pass either before or after, not both")
+    try:
+        page = await service.get_messages_page(thread_id, before=before, after=after, limit=limit)
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not page:
+        raise HTTPException(status_code=404, detail="Chat thread not found")
+    return page
+
+
 @router.post("/threads/{thread_id}/messages")
 async def add_message_to_thread(
     thread_id: str,
     request: AddMessageRequest,
-    service: ChatThreadService = Depends(get_chat_thread_service)
+    service: BaseChatThreadService = Depends(get_chat_thread_service)
 ):
     """Add a message to a chat thread"""
     message = await service.add_message(thread_id, request.role, request.content)
@@ -84,7 +131,7 @@ async def add_message_to_thread(
 async def update_thread_title(
     thread_id: str,
     request: UpdateChatTitleRequest,
-    service: ChatThreadService = Depends(get_chat_thread_service)
+    service: BaseChatThreadService = Depends(get_chat_thread_service)
 ):
     """Update the title of a chat thread"""
     success = await service.update_thread_title(thread_id, request.title)
@@ -96,7 +143,7 @@ async def update_thread_title(
 @router.delete("/threads/{thread_id}")
 async def delete_chat_thread(
     thread_id: str,
-    service: ChatThreadService = Depends(get_chat_thread_service)
+    service: BaseChatThreadService = Depends(get_chat_thread_service)
 ):
     """Delete (deactivate) a chat thread"""
     success = await service.delete_thread(thread_id)
@@ -105,11 +152,11 @@ async def delete_chat_thread(
     return {"message": "Chat thread deleted successfully"}
 
 
-@router.post("/threads/search", response_model=List[ChatThreadResponse])
+@router.post("/threads/search", response_model=List[ChatThreadSearchResult])
 async def search_chat_threads(
     request: SearchChatsRequest,
     user_id: Optional[str] = None,
-    service: ChatThreadService = Depends(get_chat_thread_service)
+    service: BaseChatThreadService = Depends(get_chat_thread_service)
 ):
     """Search chat threads by content for a specific user"""
     return await service.search_threads(request.query, user_id=user_id, limit=request.limit)
@@ -118,7 +165,7 @@ async def search_chat_threads(
 @router.post("/threads/generate-title")
 async def generate_thread_title(
     request: GenerateTitleRequest,
-    service: ChatThreadService = Depends(get_chat_thread_service)
+    service: BaseChatThreadService = Depends(get_chat_thread_service)
 ):
     """Generate an AI-based title for a chat thread"""
     title = await service.generate_thread_title(request.first_message, request.ai_response)
@@ -5,18 +5,24 @@ Survey management endpoints
 import json
 import logging
 from datetime import datetime
-from typing import List
-from fastapi import APIRouter, HTTPException, status, Request
-from fastapi.responses import JSONResponse
+from typing import List, Optional
+from fastapi import APIRouter, HTTPException, status, Request, Query, UploadFile, File, Header
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.exceptions import RequestValidationError
 
+from app.core.ids import keyed_id, new_id
+from app.core.pagination import InvalidCursorError
 from app.models.survey import (
     Survey,
     CreateSurveyRequest,
     PublishSurveyRequest,
     SubmitSurveyResponseRequest,
-    SurveyResponse
+    SurveyResponse,
+    ResponseImportReport
 )
+from app.services.metric_formulas import MetricFormulaError, compile_formula
+from app.services.response_export import EXPORT_FORMATS, EXPORT_MEDIA_TYPES, parquet_available
+from app.services.response_import import FORMATS, detect_format
 from app.services.websocket_manager import websocket_manager
 from app.services.survey_service import survey_service
 
@@ -72,7 +78,9 @@ async def publish_survey(request: PublishSurveyRequest):
         # Update survey status
         survey.status = "published"
         survey.published_at = datetime.now()
-        survey.configuration.target_audience = request.target_audience
+        survey.configuration = survey.configuration.model_copy(
+            update={"target_audience": request.target_audience}
+        )
         
         # Save updated survey
         await survey_service.update_survey(survey_id, survey)
@@ -129,28 +137,20 @@ async def publish_survey(request: PublishSurveyRequest):
 
 
 @router.get("/list")
-async def list_surveys():
-    """Get all surveys"""
+async def list_surveys(
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500),
+    created_by: Optional[str] = None
+):
+    """Get surveys, newest first, one page at a time"""
     try:
-        # Use persistent storage to list surveys
-        surveys = await survey_service.list_surveys()
-        
-        surveys_list = []
-        for survey in surveys:
-            responses = await survey_service.get_responses_for_survey(survey.id)
-            surveys_list.append({
-                "id": survey.id,
-                "name": survey.name,
-                "status": survey.status,
-                "created_by": survey.created_by,
-                "created_at": survey.created_at.isoformat(),
-                "question_count": len(survey.questions),
-                "response_count": len(responses),
-                "target_audience": survey.configuration.target_audience if survey.configuration else []
-            })
+        # Summaries carry maintained response counts, so no responses are read here
+        page = await survey_service.list_survey_summaries(created_by=created_by, cursor=cursor, limit=limit)
         
-        return {"surveys": surveys_list}
+        return {"surveys": page.items, "next_cursor": page.next_cursor}
         
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except Exception as e:
         logger.error(f"Error listing surveys: {e}")
         raise HTTPException(
@@ -159,6 +159,12 @@ async def list_surveys():
         )
 
 
+@router.get("/stats")
+async def get_survey_cache_stats():
+    """Get parsed-survey cache counters"""
+    return survey_service.get_cache_stats()
+
+
 @router.get("/{survey_id}")
 async def get_survey(survey_id: str):
     """Get a specific survey by ID"""
@@ -183,8 +189,15 @@ async def get_survey(survey_id: str):
 
 
 @router.post("/submit-response")
-async def submit_survey_response(request: SubmitSurveyResponseRequest):
-    """Submit a response to a survey"""
+async def submit_survey_response(
+    request: SubmitSurveyResponseRequest,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
+):
+    """
+    Submit a response to a survey. Retries sending the same Idempotency-Key
+    header, and repeat submissions to a survey configured with one response
+    per user, return the original response ID with ``duplicate`` set.
+    """
     try:
         survey_id = request.survey_id
         
@@ -196,7 +209,11 @@ async def submit_survey_response(request: SubmitSurveyResponseRequest):
                 detail="Survey not found"
             )
         
-        response_id = f"response_{datetime.now().timestamp()}"
+        if idempotency_key:
+            # Every retry maps to the same ID, so the stored response is found by ID
+            response_id = keyed_id("response", survey_id, request.user_id, "idempotency", idempotency_key)
+        else:
+            response_id = new_id("response")
         survey_response = SurveyResponse(
             id=response_id,
             survey_id=survey_id,
@@ -206,14 +223,20 @@ async def submit_survey_response(request: SubmitSurveyResponseRequest):
         )
         
         # Use persistent storage for responses
-        await survey_service.add_survey_response(survey_response)
+        response_id, created = await survey_service.submit_response(
+            survey_response, one_per_user=survey.configuration.one_response_per_user
+        )
         
-        logger.info(f"Received survey response {response_id} for survey {survey_id} from user {request.user_id}")
+        if created:
+            logger.info(f"Received survey response {response_id} for survey {survey_id} from user {request.user_id}")
+        else:
+            logger.info(f"Duplicate submission for survey {survey_id} from user {request.user_id}, kept {response_id}")
         
         return {
             "success": True,
             "response_id": response_id,
-            "survey_id": survey_id
+            "survey_id": survey_id,
+            "duplicate": not created
         }
         
     except HTTPException:
@@ -226,9 +249,144 @@ async def submit_survey_response(request: SubmitSurveyResponseRequest):
         )
 
 
+@router.post("/{survey_id}/responses/import", response_model=ResponseImportReport)
+async def import_survey_responses(
+    survey_id: str,
+    file: UploadFile = File(...),
+    format: Optional[str] = Query(None, description="csv or ndjson; detected from the file name by default"),
+    batch_size: int = Query(5000, ge=1, le=50000)
+):
+    """Bulk-import responses from a CSV or NDJSON upload and report accepted, rejected and duplicate rows"""
+    fmt = format or detect_format(file.filename, file.content_type)
+    if fmt not in FORMATS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unsupported upload format; expected one of {', '.join(FORMATS)}"
+        )
+    
+    try:
+        report = await survey_service.import_responses(survey_id, file.file, fmt, batch_size=batch_size)
+    except Exception as e:
+        logger.error(f"Error importing responses for survey {survey_id}: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to import survey responses: {str(e)}"
+        )
+    finally:
+        await file.close()
+    
+    if report is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Survey not found"
+        )
+    return report
+
+
+@router.get("/{survey_id}/responses/export")
+async def export_survey_responses(
+    survey_id: str,
+    format: str = Query("csv", description="csv, ndjson or parquet"),
+    chunk_size: int = Query(1000, ge=1, le=50000)
+):
+    """Stream every response to a survey as CSV, NDJSON or Parquet, one chunk of responses at a time"""
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unsupported export format; expected one of {', '.join(EXPORT_FORMATS)}"
+        )
+    if format == "parquet" and not parquet_available():
+        raise HTTPException(
+            status_code=status.HTTP_501_NOT_IMPLEMENTED,
+            detail="Parquet export requires pyarrow on the server"
+        )
+    
+    body = await survey_service.export_responses(survey_id, format, chunk_size=chunk_size)
+    if body is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Survey not found"
+        )
+    
+    # A plain generator, so Starlette pulls each chunk in a worker thread
+    return StreamingResponse(
+        body,
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{survey_id}-responses.{format}"'}
+    )
+
+
+@router.get("/{survey_id}/aggregates")
+async def get_survey_aggregates(survey_id: str):
+    """Get per-question answer counts and numeric summaries for a survey"""
+    aggregates = await survey_service.aggregate_responses(survey_id)
+    if not aggregates:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Survey not found"
+        )
+    return aggregates
+
+
+@router.get("/{survey_id}/stats")
+async def get_survey_stats(survey_id: str):
+    """Get a survey's response count and per-question answer distributions, averages and completion rates"""
+    stats = await survey_service.get_survey_stats(survey_id)
+    if not stats:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Survey not found"
+        )
+    return stats
+
+
+@router.get("/{survey_id}/metrics")
+async def get_survey_metrics(
+    survey_id: str,
+    formula: Optional[List[str]] = Query(None, description="Evaluate these formulas instead of the survey's metrics")
+):
+    """
+    Get a survey's metric values, overall and per BY segment. The survey's
+    own metrics are read from running totals; ad-hoc formulas are evaluated
+    over all responses.
+    """
+    if formula:
+        formulas = [{"name": f, "formula": f} for f in formula]
+        try:
+            for metric in formulas:
+                compile_formula(metric["formula"])
+        except MetricFormulaError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+        metrics = await survey_service.evaluate_metrics(survey_id, formulas)
+    else:
+        metrics = await survey_service.get_metric_values(survey_id)
+    if metrics is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Survey not found"
+        )
+    return {"survey_id": survey_id, "metrics": metrics}
+
+
+@router.post("/{survey_id}/metrics/recompute")
+async def recompute_survey_metrics(survey_id: str):
+    """Rebuild a survey's running metric totals from its responses and report any that had drifted"""
+    result = await survey_service.recompute_metrics(survey_id)
+    if result is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Survey not found"
+        )
+    return {"survey_id": survey_id, **result}
+
+
 @router.get("/{survey_id}/responses")
-async def get_survey_responses(survey_id: str):
-    """Get all responses for a survey"""
+async def get_survey_responses(
+    survey_id: str,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000)
+):
+    """Get responses for a survey in the order they were stored, one page at a time"""
     try:
         # Check if survey exists using persistent storage
         survey = await survey_service.get_survey(survey_id)
@@ -238,11 +396,11 @@ async def get_survey_responses(survey_id: str):
                 detail="Survey not found"
             )
         
-        # Get responses from persistent storage
-        responses = await survey_service.get_responses_for_survey(survey_id)
+        # Get one page of responses from persistent storage
+        page = await survey_service.get_responses_page(survey_id, cursor=cursor, limit=limit)
         response_list = []
         
-        for response in responses:
+        for response in page.items:
             response_list.append({
                 "id": response.id,
                 "user_id": response.user_id,
@@ -252,12 +410,15 @@ async def get_survey_responses(survey_id: str):
         
         return {
             "survey_id": survey_id,
-            "response_count": len(response_list),
-            "responses": response_list
+            "response_count": await survey_service.count_responses(survey_id),
+            "responses": response_list,
+            "next_cursor": page.next_cursor
         }
         
     except HTTPException:
         raise
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except Exception as e:
         logger.error(f"Error getting survey responses: {e}")
         raise HTTPException(
@@ -44,7 +44,7 @@ async def websocket_endpoint(websocket: WebSocket, user_id: str):
 
 @router.get("/ws/status")
 async def websocket_status():
-    """Get WebSocket connection status"""
+    """Get WebSocket connection status for this worker"""
     connected_users = websocket_manager.get_connected_users()
     total_connections = websocket_manager.get_connection_count()
     
@@ -69,10 +69,10 @@ async def notify_survey_completion(notification: SurveyCompletionNotification):
             "message": f"🎉 {notification.completed_by_name} completed your survey '{notification.survey_name}'"
         }
         
-        # Send notification to survey creator
-        success = await websocket_manager.send_personal_message(
+        # Send notification to survey creator, wherever they are connected
+        success = await websocket_manager.notify(
             notification_data,
-            notification.creator_id
+            [notification.creator_id]
         )
         
         if success:
@@ -81,6 +81,12 @@ async def notify_survey_completion(notification: SurveyCompletionNotification):
                 "success": True,
                 "message": "Notification sent successfully"
             })
+        elif websocket_manager.bus is not None:
+            # The creator may be connected to another worker, which delivers it from the bus
+            return JSONResponse({
+                "success": True,
+                "message": "Notification relayed to other workers"
+            })
         else:
             logger.warning(f"Creator {notification.creator_id} not connected, notification not delivered")
             return JSONResponse({
@@ -45,8 +45,29 @@ class Settings(BaseSettings):
             ])
         return hosts
     
-    # Database settings (for future use)
+    # Database settings
     database_url: str = Field(default="sqlite:///./enculture.db", env="DATABASE_URL")
+    # Storage backend for chat threads and surveys: "json" (files in data/) or "sqlite"
+    storage_backend: str = Field(default="json", env="STORAGE_BACKEND")
+    # Directory for the JSON backend's files
+    data_dir: str = Field(default="data", env="DATA_DIR")
+    # Approximate memory budget for chat messages kept resident by the JSON backend
+    chat_message_cache_bytes: int = Field(default=64 * 1024 * 1024, env="CHAT_MESSAGE_CACHE_BYTES")
+    # Seconds the JSON backend waits to coalesce writes before flushing to disk
+    persistence_flush_delay: float = Field(default=0.2, env="PERSISTENCE_FLUSH_DELAY")
+    # Days without activity before the JSON backend moves a thread's messages to the cold tier (0 disables)
+    chat_archive_after_days: int = Field(default=30, env="CHAT_ARCHIVE_AFTER_DAYS")
+    # Seconds between cold-tier sweeps of the JSON backend
+    chat_archive_sweep_interval: float = Field(default=3600.0, env="CHAT_ARCHIVE_SWEEP_INTERVAL")
+    # Worker processes serving the app (read by gunicorn too); more than one requires the sqlite backend
+    web_concurrency: int = Field(default=1, env="WEB_CONCURRENCY")
+    # Seconds between checks for notifications published by other workers
+    notification_poll_interval: float = Field(default=0.25, env="NOTIFICATION_POLL_INTERVAL")
+    
+    @property
+    def multi_worker(self) -> bool:
+        """Whether state must be shared with other worker processes"""
+        return self.web_concurrency > 1
     
     class Config:
         env_file = ".env"
@@ -0,0 +1,97 @@
+"""
+SQLite database helpers shared by the SQLite storage backends
+"""
+
+import asyncio
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Callable, TypeVar
+
+T = TypeVar("T")
+
+SQLITE_URL_PREFIX = "sqlite:///"
+
+
+def sqlite_path_from_url(database_url: str) -> Path:
+    """Resolve a ``sqlite:///path`` database URL to a filesystem path."""
+    if not database_url.startswith(SQLITE_URL_PREFIX):
+        raise ValueError(f"Unsupported database URL: {database_url}")
+    return Path(database_url[len(SQLITE_URL_PREFIX):])
+
+
+class SQLiteDatabase:
+    """
+    A single SQLite connection in WAL mode, used from async code.
+
+    sqlite3 is blocking, so every call runs in a worker thread via
+    ``asyncio.to_thread``. A lock serializes access to the connection;
+    WAL mode lets readers in other processes proceed while a write is
+    in progress.
+
+    A connection must not be used across ``fork()``, so a process that
+    inherits this object (a worker forked from a preloading server) opens
+    its own connection on first use.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+        self._conn = self._connect()
+
+    def _check_process(self) -> None:
+        if self._pid != os.getpid():
+            # The parent's connection is abandoned, not closed, so its locks stay the parent's
+            self._pid = os.getpid()
+            self._lock = threading.Lock()
+            self._conn = self._connect()
+
+    def _connect(self) -> sqlite3.Connection:
+        # isolation_level=None leaves transaction control to write()
+        conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        conn.execute("PRAGMA busy_timeout=5000")
+        return conn
+
+    def executescript(self, script: str) -> None:
+        """Run a schema script (CREATE TABLE / CREATE INDEX statements)."""
+        self._check_process()
+        with self._lock:
+            self._conn.executescript(script)
+
+    def read_sync(self, fn: Callable[[sqlite3.Connection], T]) -> T:
+        """Run ``fn`` against the connection outside of a transaction."""
+        self._check_process()
+        with self._lock:
+            return fn(self._conn)
+
+    def write_sync(self, fn: Callable[[sqlite3.Connection], T]) -> T:
+        """Run ``fn`` inside a single ``BEGIN IMMEDIATE`` transaction."""
+        self._check_process()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = fn(self._conn)
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+            return result
+
+    async def read(self, fn: Callable[[sqlite3.Connection], T]) -> T:
+        """Run a read query in a worker thread."""
+        return await asyncio.to_thread(self.read_sync, fn)
+
+    async def write(self, fn: Callable[[sqlite3.Connection], T]) -> T:
+        """Run a write transaction in a worker thread."""
+        return await asyncio.to_thread(self.write_sync, fn)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,114 @@
+"""
+Time-sortable unique IDs.
+
+IDs are ULIDs: a 48-bit millisecond timestamp followed by 80 random bits,
+written as 26 characters of Crockford base32, so sorting IDs as strings
+sorts them by creation time. Within one process, IDs generated in the same
+millisecond increment the random part instead of drawing a new one, so
+they stay strictly increasing; the random part is redrawn after a fork so
+worker processes never continue the same sequence.
+"""
+
+import hashlib
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Optional
+
+ALPHABET = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+ULID_LENGTH = 26
+
+_RANDOM_BITS = 80
+_RANDOM_MAX = (1 << _RANDOM_BITS) - 1
+_TIME_MAX = (1 << 48) - 1
+_DECODE = {char: value for value, char in enumerate(ALPHABET)}
+# Two base32 digits per 10-bit group halves the per-character work of encoding
+_PAIRS = [a + b for a in ALPHABET for b in ALPHABET]
+
+_lock = threading.Lock()
+_last_ms = -1
+_last_random = 0
+
+
+def _reset_after_fork() -> None:
+    global _lock, _last_ms, _last_random
+    _lock = threading.Lock()
+    _last_ms = -1
+    _last_random = 0
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def _encode(value: int) -> str:
+    pairs = _PAIRS
+    return "".join([pairs[(value >> shift) & 0x3FF] for shift in range(120, -1, -10)])
+
+
+def new_ulid() -> str:
+    """A new ULID, greater than every ULID this process generated before"""
+    global _last_ms, _last_random
+    with _lock:
+        now_ms = time.time_ns() // 1_000_000
+        if now_ms > _last_ms:
+            _last_ms = now_ms
+            _last_random = int.from_bytes(os.urandom(10), "big")
+        elif _last_random < _RANDOM_MAX:
+            # Same millisecond, or the clock stepped back: keep counting from the last ID
+            _last_random += 1
+        else:
+            _last_ms += 1
+            _last_random = int.from_bytes(os.urandom(10), "big")
+        if _last_ms > _TIME_MAX:
+            raise OverflowError("ULID timestamp out of range")
+        return _encode((_last_ms << _RANDOM_BITS) | _last_random)
+
+
+def new_id(prefix: str) -> str:
+    """Prefixed ULID such as ``survey_01J9...``; the prefix does not affect ordering among same-kind IDs"""
+    return f"{prefix}_{new_ulid()}"
+
+
+def ulid_to_bytes(value: str) -> Optional[bytes]:
+    """16-byte form of a canonical (upper-case) ULID, or None if it would not round-trip"""
+    if len(value) != ULID_LENGTH or value[0] > "7":
+        return None
+    number = 0
+    try:
+        for char in value:
+            number = number * 32 + _DECODE[char]
+    except KeyError:
+        return None
+    return number.to_bytes(16, "big")
+
+
+def ulid_from_bytes(raw: bytes) -> str:
+    """ULID string for the 16 bytes produced by ``ulid_to_bytes``"""
+    return _encode(int.from_bytes(raw, "big"))
+
+
+def keyed_id(prefix: str, *parts: str) -> str:
+    """
+    Deterministic ID derived from a natural key, such as a client's
+    idempotency key: storing the same thing twice yields the same ID, so
+    a duplicate is found by an ID lookup. These IDs are not time-sortable.
+    """
+    seed = "/".join(parts)
+    return f"{prefix}_{hashlib.sha1(seed.encode()).hexdigest()[:32]}"
+
+
+def ulid_datetime(value: str) -> Optional[datetime]:
+    """Naive-UTC creation time of an ID ending in a ULID, or None for any other ID"""
+    ulid = value[-ULID_LENGTH:].upper()
+    if len(ulid) != ULID_LENGTH or len(value) > ULID_LENGTH and value[-ULID_LENGTH - 1] != "_":
+        return None
+    try:
+        timestamp_ms = 0
+        for char in ulid[:10]:
+            timestamp_ms = timestamp_ms * 32 + _DECODE[char]
+    except KeyError:
+        return None
+    if ulid[0] > "7":
+        return None
+    return datetime.fromtimestamp(timestamp_ms / 1000, tz=timezone.utc).replace(tzinfo=None)
@@ -0,0 +1,70 @@
+"""
+Opaque keyset cursors for list endpoints.
+
+A cursor encodes the sort key, (timestamp, id), of the last item on a page.
+The next page starts strictly after that key rather than at an offset, so
+inserts between requests never shift items across pages and fetching a deep
+page costs the same as fetching the first.
+
+Append-only stores page by position instead: a position cursor holds where
+the next page starts in storage order, so a page is read by seeking there
+whatever order the items' timestamps are in.
+"""
+
+import base64
+import binascii
+from datetime import datetime
+from typing import Any, Generic, List, NamedTuple, Optional, Tuple, TypeVar
+
+from app.core.serialization import dumps, loads
+
+T = TypeVar("T")
+
+CursorKey = Tuple[datetime, str]
+
+
+class InvalidCursorError(ValueError):
+    """Raised when a client sends a cursor this server did not issue"""
+
+
+class Page(NamedTuple, Generic[T]):
+    items: List[T]
+    next_cursor: Optional[str]
+
+
+def encode_cursor(timestamp: datetime, item_id: str) -> str:
+    """Opaque, URL-safe cursor for the item with sort key (timestamp, item_id)"""
+    raw = dumps([timestamp.isoformat(), item_id])
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str) -> CursorKey:
+    """Sort key of a cursor produced by encode_cursor"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        timestamp, item_id = loads(raw)
+        return datetime.fromisoformat(timestamp), str(item_id)
+    except (binascii.Error, ValueError, TypeError) as e:
+        raise InvalidCursorError(f"Invalid cursor: {cursor!r}") from e
+
+
+def encode_position_cursor(position: int) -> str:
+    """Opaque, URL-safe cursor for the storage position the next page starts at"""
+    return base64.urlsafe_b64encode(dumps([position])).rstrip(b"=").decode()
+
+
+def decode_position_cursor(cursor: str) -> int:
+    """Storage position of a cursor produced by encode_position_cursor"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        (position,) = loads(raw)
+    except (binascii.Error, ValueError, TypeError) as e:
+        raise InvalidCursorError(f"Invalid cursor: {cursor!r}") from e
+    if not isinstance(position, int) or isinstance(position, bool) or position < 0:
+        raise InvalidCursorError(f"Invalid cursor: {cursor!r}")
+    return position
+
+
+def as_datetime(value: Any) -> datetime:
+    """Stored timestamps are datetimes in memory and ISO strings once reloaded from JSON"""
+    return value if isinstance(value, datetime) else datetime.fromisoformat(value)
@@ -0,0 +1,33 @@
+"""
+Exclusive ownership of a data directory by one process.
+
+The JSON backend keeps authoritative state in memory, so two processes
+serving the same files silently overwrite each other's writes. Whichever
+launcher started them, only the first can hold the ``flock`` on the
+directory's lock file; the others see it held and refuse to start.
+"""
+
+from pathlib import Path
+from typing import BinaryIO, Optional
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - depends on the platform
+    fcntl = None
+
+
+def acquire_process_lock(path: Path) -> Optional[BinaryIO]:
+    """
+    Take an exclusive, non-blocking ``flock`` on ``path``; returns the open
+    file that holds it until closed, or None if another process holds it
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    lock_file = open(path, "a+b")
+    if fcntl is None:
+        return lock_file
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        lock_file.close()
+        return None
+    return lock_file
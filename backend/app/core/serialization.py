@@ -0,0 +1,66 @@
+"""
+JSON serialization for persistence, SSE frames and WebSocket payloads.
+
+Uses orjson when it is installed and the stdlib encoder otherwise. Output is
+always compact UTF-8. datetimes, dates, enums and Pydantic models are encoded
+directly; anything else falls back to ``str()``, matching the ``default=str``
+the JSON file services used before.
+"""
+
+import json
+from datetime import date, datetime, time
+from enum import Enum
+from typing import Any
+
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
+
+BACKEND = "orjson" if orjson is not None else "json"
+
+
+def _default(obj: Any) -> Any:
+    if isinstance(obj, BaseModel):
+        return obj.model_dump(mode="json")
+    if isinstance(obj, (datetime, date, time)):
+        return obj.isoformat()
+    if isinstance(obj, Enum):
+        return obj.value
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    return str(obj)
+
+
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS
+
+    def dumps(obj: Any) -> bytes:
+        """Encode ``obj`` as compact JSON bytes"""
+        return orjson.dumps(obj, default=_default, option=_ORJSON_OPTIONS)
+
+    def loads(data: Any) -> Any:
+        """Decode JSON from bytes or str"""
+        return orjson.loads(data)
+else:  # pragma: no cover - depends on the environment
+    _encoder = json.JSONEncoder(separators=(",", ":"), ensure_ascii=False, default=_default)
+
+    def dumps(obj: Any) -> bytes:
+        """Encode ``obj`` as compact JSON bytes"""
+        return _encoder.encode(obj).encode()
+
+    def loads(data: Any) -> Any:
+        """Decode JSON from bytes or str"""
+        return json.loads(data)
+
+
+def dumps_str(obj: Any) -> str:
+    """Encode ``obj`` as compact JSON text, for text frames and TEXT columns"""
+    return dumps(obj).decode()
+
+
+def sse_event(payload: Any) -> str:
+    """Format ``payload`` as a Server-Sent Events data frame"""
+    return f"data: {dumps_str(payload)}\n\n"
@@ -61,9 +61,23 @@ class ChatThreadResponse(BaseModel):
         )
 
 
+class ChatThreadSearchResult(ChatThreadResponse):
+    score: float = 0.0
+    snippet: Optional[str] = None  # HTML-escaped excerpt with matches wrapped in <mark>
+
+
+class ChatMessagesPage(BaseModel):
+    thread_id: str
+    message_count: int
+    messages: List[ChatMessage]  # oldest first
+    prev_cursor: Optional[str] = None  # pass as ?before= to load older messages
+    next_cursor: Optional[str] = None  # pass as ?after= to load newer messages
+
+
 class ChatThreadsListResponse(BaseModel):
     threads: List[ChatThreadResponse]
     total: int
+    next_cursor: Optional[str] = None  # pass back as ?cursor= for the next page
 
 
 class SearchChatsRequest(BaseModel):
@@ -24,6 +24,8 @@ class SurveyConfiguration(BaseModel):
     release_date: Optional[datetime] = None
     deadline: Optional[datetime] = None
     anonymous: bool = True
+    # Repeat submissions by the same user return their first response instead of adding another
+    one_response_per_user: bool = False
 
 
 class SurveyBranding(BaseModel):
@@ -84,3 +86,16 @@ class SurveyNotification(BaseModel):
     survey: Survey
     message: str
     timestamp: datetime
+
+
+class ResponseImportReport(BaseModel):
+    survey_id: str
+    format: str  # csv or ndjson
+    rows: int = 0
+    accepted: int = 0
+    rejected: int = 0
+    duplicates: int = 0
+    batches: int = 0
+    errors: List[Dict[str, Any]] = []  # First rejected rows: {"row": n, "error": "..."}
+    elapsed_seconds: float = 0.0
+    rows_per_second: float = 0.0
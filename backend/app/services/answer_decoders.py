@@ -0,0 +1,114 @@
+"""
+Answer options compiled into lookup tables: option labels to integer codes and numeric values
+"""
+
+from functools import lru_cache
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from app.models.survey import SurveyQuestion
+from app.services.response_columns import COLUMN_KINDS, NUMERIC, parse_number
+
+
+def normalize_label(label: str) -> str:
+    return " ".join(label.split()).casefold()
+
+
+class AnswerDecoder:
+    """
+    One question's options compiled for encoding answers.
+
+    Each option's code is its position in ``options`` and its value is its
+    leading number, NaN if it has none. An answer matches an option by exact
+    label, then ignoring case and spacing, and on numeric scales also by
+    value, so 4, "4" and "4 - agree" all decode to "4 - Agree".
+    """
+
+    __slots__ = ("options", "values", "numeric", "_codes", "_by_value")
+
+    def __init__(self, options: Iterable[str], numeric: bool = False):
+        self.options: Tuple[str, ...] = tuple(options)
+        self.values: Tuple[float, ...] = tuple(parse_number(option) for option in self.options)
+        self.numeric = numeric
+        codes: Dict[str, int] = {}
+        for code, option in enumerate(self.options):
+            codes.setdefault(option, code)
+        for code, option in enumerate(self.options):
+            codes.setdefault(normalize_label(option), code)
+        self._codes = codes
+        self._by_value: Dict[float, int] = {}
+        if numeric:
+            for code, value in enumerate(self.values):
+                if value == value:
+                    self._by_value.setdefault(value, code)
+
+    def code(self, answer: Any) -> int:
+        """Code of the option an answer matches, or -1"""
+        if isinstance(answer, str):
+            code = self._codes.get(answer)
+            if code is None:
+                code = self._codes.get(normalize_label(answer))
+            if code is not None:
+                return code
+        if self.numeric and not isinstance(answer, bool):
+            return self._by_value.get(parse_number(answer), -1)
+        return -1
+
+    def label(self, answer: Any) -> str:
+        """The option an answer matches, or the answer itself as text"""
+        code = self.code(answer)
+        if code >= 0:
+            return self.options[code]
+        return answer if isinstance(answer, str) else str(answer)
+
+    def value(self, answer: Any) -> float:
+        """Numeric value of an answer: its option's value, or its own leading number"""
+        if isinstance(answer, str):
+            code = self._codes.get(answer)
+            if code is None:
+                code = self._codes.get(normalize_label(answer))
+            if code is not None and self.values[code] == self.values[code]:
+                return self.values[code]
+        return parse_number(answer)
+
+
+Decoders = Dict[str, AnswerDecoder]
+
+
+def question_decoders(questions: Iterable[SurveyQuestion]) -> Decoders:
+    """Decoders for the questions that have options, by question ID; compiled once per set of questions"""
+    return _compile(tuple((q.id, q.response_type, tuple(q.options)) for q in questions if q.options))
+
+
+def compiled_for(decoders: Decoders, questions: Iterable[SurveyQuestion]) -> bool:
+    """Whether ``decoders`` hold exactly the options of ``questions``"""
+    compiled = 0
+    for q in questions:
+        if q.options:
+            decoder = decoders.get(q.id)
+            numeric = COLUMN_KINDS.get(q.response_type) == NUMERIC
+            if decoder is None or decoder.options != tuple(q.options) or decoder.numeric != numeric:
+                return False
+            compiled += 1
+    return compiled == len(decoders)
+
+
+@lru_cache(maxsize=256)
+def _compile(questions: Tuple[Tuple[str, str, Tuple[str, ...]], ...]) -> Decoders:
+    return {
+        question_id: AnswerDecoder(options, numeric=COLUMN_KINDS.get(response_type) == NUMERIC)
+        for question_id, response_type, options in questions
+    }
+
+
+def decode_label(decoder: Optional[AnswerDecoder], answer: Any) -> str:
+    """Dictionary label of a choice answer: the option it matches, or the answer as text"""
+    if decoder is not None:
+        return decoder.label(answer)
+    return answer if isinstance(answer, str) else str(answer)
+
+
+def decode_number(decoder: Optional[AnswerDecoder], answer: Any) -> float:
+    """Numeric value of an answer, through its question's options when it has any"""
+    if decoder is not None:
+        return decoder.value(answer)
+    return parse_number(answer)
@@ -0,0 +1,391 @@
+"""
+Storage primitives for chat threads: thread metadata records, the compact
+per-thread message log and the message residency cache
+"""
+
+import hashlib
+import re
+import sys
+import uuid
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from app.core.ids import ulid_from_bytes, ulid_to_bytes
+from app.models.chat_thread import ChatThread, ChatMessage, ChatThreadResponse, MessageRole
+
+SAFE_FILENAME_RE = re.compile(r"[A-Za-z0-9_-][A-Za-z0-9_.-]{0,127}")
+
+# Roles are stored as one-byte codes into this table
+ROLES = tuple(MessageRole)
+ROLE_CODES = {role: code for code, role in enumerate(ROLES)}
+ROLE_VALUES = tuple(role.value for role in ROLES)
+
+EPOCH = datetime(1970, 1, 1)
+MICROSECOND = timedelta(microseconds=1)
+UUID_BYTES = 16
+NO_UUID = bytes(UUID_BYTES)
+# Codes for how a message's 16 id bytes are written out
+ID_UUID = 0
+ID_ULID = 1
+
+# Fixed columns per message: binary id, id kind, role code, timestamp and the list slot for content
+MESSAGE_FIXED_BYTES = UUID_BYTES + 1 + 1 + 8 + 8
+# Dict entry plus the str object for an id that is neither a canonical UUID nor a ULID
+TEXT_ID_OVERHEAD_BYTES = 100
+
+
+def messages_filename(thread_id: str) -> str:
+    """File name for a thread's messages, hashing IDs that are not filesystem-safe"""
+    if SAFE_FILENAME_RE.fullmatch(thread_id):
+        return f"{thread_id}.json"
+    return f"{hashlib.sha1(thread_id.encode()).hexdigest()}.json"
+
+
+def to_epoch_micros(value: datetime) -> int:
+    """Naive-UTC datetime (or aware datetime) to integer microseconds since the epoch"""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return (value - EPOCH) // MICROSECOND
+
+
+def from_epoch_micros(value: int) -> datetime:
+    return EPOCH + timedelta(microseconds=value)
+
+
+def _uuid_bytes(message_id: str) -> Optional[bytes]:
+    """16-byte form of a canonical UUID string, or None if it would not round-trip"""
+    if len(message_id) != 36:
+        return None
+    try:
+        parsed = uuid.UUID(message_id)
+    except ValueError:
+        return None
+    return parsed.bytes if str(parsed) == message_id else None
+
+
+class MessageLog:
+    """
+    Columnar message storage for one thread.
+
+    IDs are kept as 16 raw bytes when they are ULIDs or canonical UUID strings
+    (others, like imported ``msg-001-1`` IDs, go to a side table), roles as one-byte
+    codes and timestamps as integer microseconds since the epoch. Content is
+    the only per-message Python object. ``ChatMessage`` models are built only
+    when a response needs them.
+
+    Messages are kept in timestamp order, which ``locate`` relies on:
+    out-of-order input is sorted on load and ``append`` refuses a message
+    older than the newest one.
+    """
+
+    __slots__ = ("_ids", "_id_kinds", "_text_ids", "_roles", "_timestamps", "contents", "nbytes")
+
+    def __init__(self):
+        self._ids = bytearray()
+        self._id_kinds = array("B")
+        self._text_ids: Dict[int, str] = {}
+        self._roles = array("B")
+        self._timestamps = array("q")
+        self.contents: List[str] = []
+        self.nbytes = 0
+
+    def __len__(self) -> int:
+        return len(self.contents)
+
+    @classmethod
+    def from_dicts(cls, items: Iterable[Dict[str, Any]]) -> "MessageLog":
+        """Build a log from the file storage format"""
+        return cls._from_rows(
+            (item["id"], item["role"], item["content"], datetime.fromisoformat(item["timestamp"]))
+            for item in items
+        )
+
+    @classmethod
+    def from_messages(cls, messages: Iterable[ChatMessage]) -> "MessageLog":
+        return cls._from_rows((m.id, m.role, m.content, m.timestamp) for m in messages)
+
+    @classmethod
+    def _from_rows(cls, rows: Iterable[Tuple[str, MessageRole, str, datetime]]) -> "MessageLog":
+        """Build a log from (id, role, content, timestamp) rows, sorting them if they are out of time order"""
+        rows = [(to_epoch_micros(timestamp), message_id, role, content) for message_id, role, content, timestamp in rows]
+        if any(earlier[0] > later[0] for earlier, later in zip(rows, rows[1:])):
+            # Stable, so messages sharing a timestamp keep their stored order
+            rows.sort(key=lambda row: row[0])
+        log = cls()
+        for micros, message_id, role, content in rows:
+            log._append(message_id, role, content, micros)
+        return log
+
+    def append(self, message_id: str, role: MessageRole, content: str, timestamp: datetime) -> int:
+        """Append one message and return the number of bytes it added"""
+        micros = to_epoch_micros(timestamp)
+        if self._timestamps and micros < self._timestamps[-1]:
+            raise ValueError(f"Message {message_id} is older than the newest message in the log")
+        return self._append(message_id, role, content, micros)
+
+    def _append(self, message_id: str, role: MessageRole, content: str, micros: int) -> int:
+        index = len(self.contents)
+        size = MESSAGE_FIXED_BYTES + sys.getsizeof(content)
+        kind = ID_ULID
+        raw = ulid_to_bytes(message_id)
+        if raw is None:
+            kind = ID_UUID
+            raw = _uuid_bytes(message_id)
+        if raw is None:
+            raw = NO_UUID
+            self._text_ids[index] = message_id
+            size += TEXT_ID_OVERHEAD_BYTES + len(message_id)
+        self._ids += raw
+        self._id_kinds.append(kind)
+        # MessageRole is a str enum, so plain role strings hit the same codes
+        self._roles.append(ROLE_CODES[role])
+        self._timestamps.append(micros)
+        self.contents.append(content)
+        self.nbytes += size
+        return size
+
+    def message_id(self, index: int) -> str:
+        return next(self._rows(index, index + 1))[0]
+
+    def role(self, index: int) -> MessageRole:
+        return ROLES[self._roles[index]]
+
+    def timestamp(self, index: int) -> datetime:
+        return from_epoch_micros(self._timestamps[index])
+
+    def next_timestamp(self, now: datetime) -> datetime:
+        """``now``, or the newest message's timestamp if the clock has stepped back since it was written"""
+        if self._timestamps and to_epoch_micros(now) < self._timestamps[-1]:
+            return from_epoch_micros(self._timestamps[-1])
+        return now
+
+    def _rows(self, start: int = 0, stop: Optional[int] = None):
+        """Decode (id, role code, content, timestamp) tuples for messages ``start:stop``"""
+        start, stop, _ = slice(start, stop).indices(len(self.contents))
+        # One hex() call for the whole range is much cheaper than a uuid.UUID per message
+        hex_ids = self._ids[start * UUID_BYTES:stop * UUID_BYTES].hex()
+        text_ids = self._text_ids
+        id_kinds = self._id_kinds
+        for offset, index in enumerate(range(start, stop)):
+            message_id = text_ids.get(index)
+            if message_id is None and id_kinds[index] == ID_ULID:
+                message_id = ulid_from_bytes(self._ids[index * UUID_BYTES:(index + 1) * UUID_BYTES])
+            elif message_id is None:
+                h = hex_ids[offset * 32:offset * 32 + 32]
+                message_id = f"{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}"
+            yield (
+                message_id,
+                self._roles[index],
+                self.contents[index],
+                EPOCH + timedelta(microseconds=self._timestamps[index]),
+            )
+
+    def locate(self, timestamp: datetime, message_id: str) -> Tuple[int, int]:
+        """
+        Slice bounds of the message keyed (timestamp, message_id). If it is
+        gone, the bounds span every message sharing its timestamp, so
+        ``[:start]`` and ``[stop:]`` still exclude the cursor position.
+        """
+        # The timestamp column is sorted (see the class docstring)
+        micros = to_epoch_micros(timestamp)
+        lo = bisect_left(self._timestamps, micros)
+        hi = bisect_right(self._timestamps, micros, lo=lo)
+        for index in range(lo, hi):
+            if self.message_id(index) == message_id:
+                return index, index + 1
+        return lo, hi
+
+    def to_messages(self, start: int = 0, stop: Optional[int] = None) -> List[ChatMessage]:
+        """API models for messages ``start:stop``"""
+        # Columns are already valid, so skip Pydantic validation
+        return [
+            ChatMessage.model_construct(id=message_id, role=ROLES[role], content=content, timestamp=timestamp)
+            for message_id, role, content, timestamp in self._rows(start, stop)
+        ]
+
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        """Messages in the file storage format"""
+        return [
+            {"id": message_id, "role": ROLE_VALUES[role], "content": content, "timestamp": timestamp.isoformat()}
+            for message_id, role, content, timestamp in self._rows()
+        ]
+
+
+class ThreadRecord:
+    """Thread metadata held in memory for every thread; messages live in MessageCache"""
+
+    __slots__ = ("id", "title", "user_id", "created_at", "updated_at", "is_active", "message_count")
+
+    def __init__(
+        self,
+        id: str,
+        title: Optional[str],
+        user_id: Optional[str],
+        created_at: datetime,
+        updated_at: datetime,
+        is_active: bool = True,
+        message_count: int = 0,
+    ):
+        self.id = id
+        self.title = title
+        self.user_id = user_id
+        self.created_at = created_at
+        self.updated_at = updated_at
+        self.is_active = is_active
+        self.message_count = message_count
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ThreadRecord":
+        return cls(
+            id=data["id"],
+            title=data.get("title"),
+            user_id=data.get("user_id"),
+            created_at=datetime.fromisoformat(data["created_at"]),
+            updated_at=datetime.fromisoformat(data["updated_at"]),
+            is_active=data.get("is_active", True),
+            message_count=data.get("message_count", len(data.get("messages", []))),
+        )
+
+    @classmethod
+    def from_row(cls, row: Tuple) -> "ThreadRecord":
+        """Rebuild a record from ``to_row`` output, as stored in startup snapshots"""
+        updated_at, thread_id, title, user_id, created_at, is_active, message_count = row
+        return cls(
+            thread_id, title, user_id,
+            datetime.fromisoformat(created_at), datetime.fromisoformat(updated_at),
+            is_active, message_count
+        )
+
+    def to_row(self) -> Tuple:
+        """Plain tuple of the record's fields, leading with its recency sort key"""
+        return (
+            self.updated_at.isoformat(), self.id, self.title, self.user_id,
+            self.created_at.isoformat(), self.is_active, self.message_count
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "title": self.title,
+            "user_id": self.user_id,
+            "created_at": self.created_at.isoformat(),
+            "updated_at": self.updated_at.isoformat(),
+            "is_active": self.is_active,
+            "message_count": self.message_count,
+        }
+
+    def to_response(self) -> ChatThreadResponse:
+        return ChatThreadResponse(
+            id=self.id,
+            title=self.title,
+            created_at=self.created_at,
+            updated_at=self.updated_at,
+            message_count=self.message_count,
+            is_active=self.is_active,
+        )
+
+    def to_thread(self, messages: List[ChatMessage]) -> ChatThread:
+        return ChatThread(
+            id=self.id,
+            title=self.title,
+            user_id=self.user_id,
+            created_at=self.created_at,
+            updated_at=self.updated_at,
+            messages=list(messages),
+            is_active=self.is_active,
+        )
+
+
+class MessageCache:
+    """
+    LRU of per-thread message logs, bounded by an approximate byte budget.
+
+    Misses call ``loader(thread_id)``. ``can_evict(thread_id)`` lets the
+    owner protect entries whose latest state has not been written to disk
+    yet; those stay resident past the budget until they are flushed.
+    """
+
+    def __init__(
+        self,
+        budget_bytes: int,
+        loader: Callable[[str], MessageLog],
+        can_evict: Callable[[str], bool] = lambda thread_id: True,
+    ):
+        self.budget_bytes = budget_bytes
+        self._loader = loader
+        self._can_evict = can_evict
+        self._entries: "OrderedDict[str, MessageLog]" = OrderedDict()
+        self._sizes: Dict[str, int] = {}
+        self.resident_bytes = 0
+
+        self.hits = 0
+        self.loads = 0
+        self.evictions = 0
+
+    def __contains__(self, thread_id: str) -> bool:
+        return thread_id in self._entries
+
+    def get(self, thread_id: str) -> MessageLog:
+        """Messages of a thread, loading them if they are not resident"""
+        messages = self._entries.get(thread_id)
+        if messages is not None:
+            self.hits += 1
+            self._entries.move_to_end(thread_id)
+            # Entries that were pinned while unflushed may be evictable by now
+            self.evict()
+            return messages
+
+        self.loads += 1
+        messages = self._loader(thread_id)
+        self.put(thread_id, messages)
+        return messages
+
+    def peek(self, thread_id: str) -> Optional[MessageLog]:
+        """Resident messages of a thread, without loading or touching recency"""
+        return self._entries.get(thread_id)
+
+    def put(self, thread_id: str, messages: MessageLog) -> None:
+        self.discard(thread_id)
+        size = messages.nbytes
+        self._entries[thread_id] = messages
+        self._sizes[thread_id] = size
+        self.resident_bytes += size
+        self.evict()
+
+    def append(self, thread_id: str, message_id: str, role: MessageRole, content: str, timestamp: datetime) -> MessageLog:
+        messages = self.get(thread_id)
+        size = messages.append(message_id, role, content, timestamp)
+        self._sizes[thread_id] += size
+        self.resident_bytes += size
+        self.evict()
+        return messages
+
+    def discard(self, thread_id: str) -> None:
+        if thread_id in self._entries:
+            del self._entries[thread_id]
+            self.resident_bytes -= self._sizes.pop(thread_id)
+
+    def evict(self) -> None:
+        """Evict least recently used threads until under budget, keeping the newest"""
+        if self.resident_bytes <= self.budget_bytes:
+            return
+        for thread_id in list(self._entries)[:-1]:
+            if self.resident_bytes <= self.budget_bytes:
+                break
+            if not self._can_evict(thread_id):
+                continue
+            self.discard(thread_id)
+            self.evictions += 1
+
+    def get_stats(self) -> Dict[str, int]:
+        return {
+            "resident_threads": len(self._entries),
+            "resident_bytes": self.resident_bytes,
+            "budget_bytes": self.budget_bytes,
+            "hits": self.hits,
+            "loads": self.loads,
+            "evictions": self.evictions,
+        }
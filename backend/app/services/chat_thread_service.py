@@ -1,236 +1,691 @@
-import json
 import asyncio
-import uuid
-from datetime import datetime
+import gc
+from abc import ABC, abstractmethod
+import threading
+from datetime import datetime, timedelta
 from pathlib import Path
-from typing import List, Optional, Dict
+from typing import Any, Iterable, Iterator, List, Optional, Dict, Tuple
 from openai import OpenAI
 
 from app.models.chat_thread import (
     ChatThread, 
     ChatMessage, 
     MessageRole,
+    ChatMessagesPage,
     ChatThreadResponse,
+    ChatThreadSearchResult,
     ChatThreadsListResponse
 )
 from app.core.config import get_settings
+from app.core.ids import new_ulid
+from app.core.pagination import decode_cursor, encode_cursor
+from app.core.serialization import dumps, loads
+from app.services.chat_storage import MessageCache, MessageLog, ThreadRecord, messages_filename
+from app.services.cold_storage import ColdThreadStore
+from app.services.recency_index import RecencyIndex
+from app.services.search_index import SearchIndex, make_snippet
+from app.services.snapshot import read_snapshot, source_stamp, write_snapshot
+from app.services.write_behind import atomic_write, write_behind_flusher
 
 
-class ChatThreadService:
+class BaseChatThreadService(ABC):
+    """
+    Operations every chat thread backend provides.
+
+    ChatThreadService keeps threads in JSON files and SQLiteChatThreadService
+    in SQLite; neither inherits the other's state. Title generation and the
+    archive sweep loop are shared, everything else is per backend.
+    """
+
     def __init__(self):
         self.settings = get_settings()
-        self.data_dir = Path("data")
-        self.threads_file = self.data_dir / "chat_threads.json"
-        self.data_dir.mkdir(exist_ok=True)
         
         # Initialize OpenAI client for title generation
         self.openai_client = OpenAI(api_key=self.settings.openai_api_key)
+
+    @abstractmethod
+    def load(self):
+        """Load whatever the backend keeps resident; safe to call from any thread"""
+
+    @abstractmethod
+    def rebuild_search_index(self):
+        """Build the search index from storage; run off the event loop at startup"""
+
+    @abstractmethod
+    def export_threads(self) -> Iterator[ChatThread]:
+        """Every thread with its messages, active or not"""
+
+    @abstractmethod
+    def write_snapshot(self) -> bool:
+        """Write a startup snapshot; returns whether one was written"""
+
+    @abstractmethod
+    async def compact(self) -> bool:
+        """Rewrite storage without archived threads; returns whether anything changed"""
+
+    @abstractmethod
+    def get_residency_stats(self) -> Dict[str, Any]:
+        """Counters for what is resident in memory and what is archived"""
+
+    @abstractmethod
+    async def archive_cold_threads(self, now: Optional[datetime] = None) -> int:
+        """Move deleted and dormant threads off the hot path; returns how many moved"""
+
+    @abstractmethod
+    async def create_thread(self, title: Optional[str] = None, user_id: Optional[str] = None) -> ChatThread:
+        """Create a new chat thread for a specific user"""
+
+    @abstractmethod
+    async def get_thread(self, thread_id: str) -> Optional[ChatThread]:
+        """Get a specific chat thread with its messages"""
+
+    @abstractmethod
+    async def get_thread_metadata(self, thread_id: str) -> Optional[ChatThreadResponse]:
+        """Get a chat thread's metadata without loading its messages"""
+
+    @abstractmethod
+    async def get_messages_page(
+        self,
+        thread_id: str,
+        before: Optional[str] = None,
+        after: Optional[str] = None,
+        limit: int = 50
+    ) -> Optional[ChatMessagesPage]:
+        """Get up to ``limit`` messages of a thread, oldest first"""
+
+    @abstractmethod
+    async def get_all_threads(
+        self,
+        user_id: Optional[str] = None,
+        limit: int = 50,
+        offset: int = 0,
+        cursor: Optional[str] = None
+    ) -> ChatThreadsListResponse:
+        """Get all chat threads for a specific user, sorted by most recent"""
+
+    @abstractmethod
+    async def get_recent_threads(self, user_id: Optional[str] = None, limit: int = 10) -> List[ChatThreadResponse]:
+        """Get the most recent chat threads for a specific user"""
+
+    @abstractmethod
+    async def add_message(self, thread_id: str, role: MessageRole, content: str) -> Optional[ChatMessage]:
+        """Add a message to a chat thread"""
+
+    @abstractmethod
+    async def delete_thread(self, thread_id: str) -> bool:
+        """Soft delete a chat thread"""
+
+    @abstractmethod
+    async def update_thread_title(self, thread_id: str, title: str) -> bool:
+        """Update thread title"""
+
+    @abstractmethod
+    async def search_threads(self, query: str, user_id: Optional[str] = None, limit: int = 20) -> List[ChatThreadSearchResult]:
+        """Search chat threads by content for a specific user, best matches first"""
+
+    async def run_archive_sweeper(self, interval: Optional[float] = None):
+        """Run archive_cold_threads every ``interval`` seconds until cancelled"""
+        interval = interval or self.settings.chat_archive_sweep_interval
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                archived = await self.archive_cold_threads()
+                if archived:
+                    print(f"Archived {archived} chat threads to cold storage")
+                    await self.compact()
+            except Exception as e:
+                print(f"Error archiving chat threads: {e}")
+
+    async def generate_thread_title(self, first_message: str, ai_response: str) -> str:
+        """Generate a concise title for the chat thread based on the first exchange"""
+        try:
+            # Use the synchronous client in executor for async compatibility
+            def call_openai():
+                response = self.openai_client.responses.create(
+                    model=self.settings.openai_model,
+                    input=f"User: {first_message}\n\nAI: {ai_response[:200]}...",
+                    instructions="""Generate a concise 3-5 word title for this chat conversation. 
+                    The title should capture the main topic or question being discussed.
+                    Be specific and descriptive but brief.
+                    Examples: "Culture Survey Creation", "Team Engagement Analysis", "Onboarding Feedback Discussion"
+                    Return only the title, no quotes or additional text."""
+                )
+                return response.output_text.strip()
+
+            title = await asyncio.get_event_loop().run_in_executor(None, call_openai)
+            
+            # Clean up the title (remove quotes if present)
+            title = title.strip('"\'')
+            
+            # Ensure it's not too long
+            if len(title) > 50:
+                title = title[:47] + "..."
+            
+            return title
+            
+        except Exception as e:
+            print(f"Error generating title: {e}")
+            # Fallback to a simple title based on first message
+            words = first_message.split()[:3]
+            return " ".join(words).title() or "New Chat"
+
+
+class ChatThreadService(BaseChatThreadService):
+    def __init__(self, data_dir: Optional[Path] = None, load: bool = True):
+        super().__init__()
+        self.data_dir = data_dir or Path(self.settings.data_dir)
+        self.threads_file = self.data_dir / "chat_threads.json"
+        # Validation-free copy of the thread metadata, written at shutdown and after compaction
+        self.snapshot_file = self.data_dir / "chat_threads.snapshot"
+        self.messages_dir = self.data_dir / "chat_messages"
+        self.messages_dir.mkdir(parents=True, exist_ok=True)
         
-        # In-memory storage (will be persisted to file)
-        self._threads: Dict[str, ChatThread] = {}
-        self._load_threads()
+        # Thread metadata is loaded eagerly; messages are loaded on demand
+        # into an LRU bounded by chat_message_cache_bytes
+        self._threads: Dict[str, ThreadRecord] = {}
+        self._messages = MessageCache(
+            self.settings.chat_message_cache_bytes,
+            loader=self._read_messages,
+            can_evict=lambda thread_id: not write_behind_flusher.is_pending(self._messages_file(thread_id))
+        )
+        # Active threads ordered by updated_at, kept current by every mutation
+        self._recency = RecencyIndex()
+        # Per-user inverted index over titles and message content, built from
+        # storage by rebuild_search_index at startup and kept current by every mutation
+        self._search_index = SearchIndex()
+        # Soft-deleted threads, and the messages of dormant ones, are archived
+        # here by archive_cold_threads and restored transparently on access
+        self._cold = ColdThreadStore(self.data_dir / "chat_archive")
+        # Restores in flight, so concurrent requests for a thread share one
+        self._restoring: Dict[str, asyncio.Future] = {}
+        self.archived = 0
+        self.restored = 0
+        self.last_sweep_at: Optional[datetime] = None
+        # With load=False the metadata is read by load(), e.g. from a startup task
+        self._loaded = False
+        self._load_lock = threading.Lock()
+        self.loaded_from_snapshot = False
+        if load:
+            self.load()
+
+    def load(self):
+        """Load thread metadata if not loaded yet; safe to call from any thread"""
+        if self._loaded:
+            return
+        with self._load_lock:
+            if not self._loaded:
+                # Every record is long-lived, so collector passes during the bulk load are wasted work
+                collecting = gc.isenabled()
+                gc.disable()
+                try:
+                    self._load_threads()
+                finally:
+                    if collecting:
+                        gc.enable()
+                self._loaded = True
+
+    def _ensure_loaded(self):
+        if not self._loaded:
+            self.load()
 
     def _load_threads(self):
-        """Load chat threads from file storage"""
+        """Load chat thread metadata from the snapshot if it is current, else from file storage"""
+        rows = read_snapshot(self.snapshot_file, self.threads_file)
+        if rows is not None:
+            from_row = ThreadRecord.from_row
+            self._threads = {row[1]: from_row(row) for row in rows}
+            self.loaded_from_snapshot = True
+        else:
+            self._load_threads_file()
+        self._recency.build(
+            (thread.id, thread.user_id, thread.updated_at)
+            for thread in self._threads.values() if thread.is_active
+        )
+
+    def _load_threads_file(self):
+        """Load chat thread metadata from chat_threads.json"""
+        legacy_messages: Dict[str, List[dict]] = {}
         if self.threads_file.exists():
             try:
-                with open(self.threads_file, 'r') as f:
-                    data = json.load(f)
-                    for thread_data in data.values():
-                        # Convert datetime strings back to datetime objects
-                        thread_data['created_at'] = datetime.fromisoformat(thread_data['created_at'])
-                        thread_data['updated_at'] = datetime.fromisoformat(thread_data['updated_at'])
-                        
-                        # Convert message timestamps
-                        for msg in thread_data.get('messages', []):
-                            msg['timestamp'] = datetime.fromisoformat(msg['timestamp'])
-                        
-                        thread = ChatThread(**thread_data)
-                        self._threads[thread.id] = thread
+                data = loads(self.threads_file.read_bytes())
+                for thread_data in data.values():
+                    thread = ThreadRecord.from_dict(thread_data)
+                    self._threads[thread.id] = thread
+                    # Older files embed every message in chat_threads.json
+                    if 'messages' in thread_data:
+                        legacy_messages[thread.id] = thread_data['messages']
             except Exception as e:
                 print(f"Error loading threads: {e}")
                 self._threads = {}
+                legacy_messages = {}
 
-    def _save_threads(self):
-        """Save chat threads to file storage"""
+        if legacy_messages:
+            self._split_legacy_messages(legacy_messages)
+
+    def _split_legacy_messages(self, legacy_messages: Dict[str, List[dict]]):
+        """Move messages embedded in chat_threads.json into per-thread files"""
+        # One-time migration: written synchronously so lazy loads can rely on the files
+        for thread_id, messages in legacy_messages.items():
+            atomic_write(self._messages_file(thread_id), dumps(messages))
+        self._save_threads()
+
+    def _messages_file(self, thread_id: str) -> Path:
+        return self.messages_dir / messages_filename(thread_id)
+
+    def _read_messages(self, thread_id: str) -> MessageLog:
+        """Load one thread's messages from its file"""
+        path = self._messages_file(thread_id)
+        if not path.exists():
+            # Archived messages are restored by _restore before they are asked for
+            return MessageLog()
         try:
-            data = {}
-            for thread_id, thread in self._threads.items():
-                thread_dict = thread.dict()
-                # Convert datetime objects to strings for JSON serialization
-                thread_dict['created_at'] = thread.created_at.isoformat()
-                thread_dict['updated_at'] = thread.updated_at.isoformat()
-                
-                # Convert message timestamps
-                for msg in thread_dict.get('messages', []):
-                    msg['timestamp'] = datetime.fromisoformat(msg['timestamp']).isoformat() if isinstance(msg['timestamp'], str) else msg['timestamp'].isoformat()
-                
-                data[thread_id] = thread_dict
-            
-            with open(self.threads_file, 'w') as f:
-                json.dump(data, f, indent=2)
+            return MessageLog.from_dicts(loads(path.read_bytes()))
         except Exception as e:
-            print(f"Error saving threads: {e}")
+            print(f"Error loading messages for thread {thread_id}: {e}")
+            return MessageLog()
+
+    def _save_messages(self, thread_id: str, messages: MessageLog):
+        """Mark one thread's messages dirty; the write-behind flusher persists them"""
+        write_behind_flusher.mark_dirty(
+            self._messages_file(thread_id),
+            lambda: dumps(messages.to_dicts())
+        )
+
+    async def _thread_messages(self, thread_id: str) -> MessageLog:
+        """Messages of a thread, served from the LRU, loaded from disk or restored from the cold tier"""
+        if self._messages.peek(thread_id) is None and thread_id in self._cold:
+            await self._restore(thread_id)
+        return self._messages.get(thread_id)
+
+    def _stored_messages(self, thread_id: str) -> List[dict]:
+        """A thread's messages in file format from whichever tier holds them, without caching or restoring"""
+        path = self._messages_file(thread_id)
+        if path.exists():
+            return loads(path.read_bytes())
+        record = self._cold.read(thread_id)
+        return record["messages"] if record else []
+
+    async def _get_thread_record(self, thread_id: str) -> Optional[ThreadRecord]:
+        """Thread metadata, restoring an archived thread into the hot set if needed"""
+        if thread_id not in self._threads and thread_id in self._cold:
+            await self._restore(thread_id)
+        return self._threads.get(thread_id)
+
+    def _message_contents(self, thread_id: str) -> Iterable[str]:
+        """Message content for indexing and snippets, without caching or restoring the thread"""
+        messages = self._messages.peek(thread_id)
+        if messages is not None:
+            return messages.contents
+        return [m['content'] for m in self._stored_messages(thread_id)]
+
+    def export_threads(self) -> Iterator[ChatThread]:
+        """Every thread with its messages, hot or archived, without caching or restoring anything"""
+        self._ensure_loaded()
+        for thread in list(self._threads.values()):
+            messages = self._messages.peek(thread.id)
+            if messages is None:
+                messages = MessageLog.from_dicts(self._stored_messages(thread.id))
+            yield thread.to_thread(messages.to_messages())
+        for thread_id in self._cold.thread_ids():
+            if thread_id not in self._threads:
+                record = self._cold.read(thread_id)
+                if record is None:
+                    continue  # restored since the listing
+                thread = ThreadRecord.from_dict(record["thread"])
+                yield thread.to_thread(MessageLog.from_dicts(record["messages"]).to_messages())
+
+    def _unarchive(self, thread_id: str) -> Optional[Tuple[dict, MessageLog]]:
+        """
+        Move a thread's messages from the cold tier back to its hot file;
+        decompresses and fsyncs, so it runs in a worker thread
+        """
+        record = self._cold.read(thread_id)
+        if record is None:
+            return None
+        # The hot file is written before the cold entry goes, so a crash never loses the thread
+        atomic_write(self._messages_file(thread_id), dumps(record["messages"]))
+        self._cold.remove([thread_id])
+        return record["thread"], MessageLog.from_dicts(record["messages"])
+
+    async def _restore(self, thread_id: str):
+        """Bring an archived thread, or a dormant thread's messages, back into the hot set"""
+        restoring = self._restoring.get(thread_id)
+        if restoring is None:
+            restoring = asyncio.ensure_future(asyncio.to_thread(self._unarchive, thread_id))
+            self._restoring[thread_id] = restoring
+            restoring.add_done_callback(lambda done: self._finish_restore(thread_id, done))
+        # A cancelled request must not abandon a restore whose hot file is already written
+        await asyncio.shield(restoring)
+
+    def _finish_restore(self, thread_id: str, restoring: asyncio.Future):
+        """Install restored state on the event loop, whether or not the requester is still waiting"""
+        del self._restoring[thread_id]
+        if restoring.cancelled() or restoring.exception() is not None:
+            return
+        restored = restoring.result()
+        if restored is None:
+            return
+        data, messages = restored
+        if thread_id not in self._threads:
+            thread = ThreadRecord.from_dict(data)
+            self._threads[thread_id] = thread
+            self._index_thread(thread)
+            self._save_threads()
+        self._messages.put(thread_id, messages)
+        self.restored += 1
+
+    async def archive_cold_threads(self, now: Optional[datetime] = None) -> int:
+        """
+        Move soft-deleted threads to the cold tier, and the messages of threads
+        untouched for chat_archive_after_days. Dormant threads keep their
+        metadata hot so they still list and rank normally.
+        """
+        self._ensure_loaded()
+        now = now or datetime.utcnow()
+        after_days = self.settings.chat_archive_after_days
+        cutoff = now - timedelta(days=after_days) if after_days > 0 else None
+        
+        candidates: Dict[str, dict] = {}
+        for thread in self._threads.values():
+            dormant = cutoff is not None and thread.updated_at < cutoff
+            if thread.is_active and not dormant:
+                continue
+            messages_file = self._messages_file(thread.id)
+            if write_behind_flusher.is_pending(messages_file) or thread.id in self._restoring:
+                continue
+            if thread.is_active and thread.id in self._cold and not messages_file.exists():
+                continue  # messages already cold
+            candidates[thread.id] = thread.to_dict()
+        if not candidates:
+            self.last_sweep_at = now
+            return 0
+        
+        def write_segment():
+            records = {
+                thread_id: {"thread": data, "messages": self._stored_messages(thread_id)}
+                for thread_id, data in candidates.items()
+            }
+            return self._cold.write(records)
+        
+        locations = await asyncio.to_thread(write_segment)
+        
+        # Keep only threads that did not change while the segment was written
+        unchanged = {
+            thread_id: location for thread_id, location in locations.items()
+            if thread_id in self._threads
+            and self._threads[thread_id].to_dict() == candidates[thread_id]
+            and not write_behind_flusher.is_pending(self._messages_file(thread_id))
+        }
+        self._cold.commit(unchanged)
+        
+        for thread_id in unchanged:
+            self._messages.discard(thread_id)
+            self._messages_file(thread_id).unlink(missing_ok=True)
+            if not self._threads[thread_id].is_active:
+                del self._threads[thread_id]
+                self._recency.remove(thread_id)
+                self._search_index.remove_document(thread_id)
+        if any(thread_id not in self._threads for thread_id in unchanged):
+            self._save_threads()
+        
+        self.archived += len(unchanged)
+        self.last_sweep_at = now
+        return len(unchanged)
+
+    def rebuild_search_index(self):
+        """Rebuild the search index from storage; reads every message file, so run it off the event loop"""
+        self._ensure_loaded()
+        self._search_index.clear()
+        for thread in self._threads.values():
+            if thread.is_active:
+                self._search_index.add_document(
+                    thread.id, thread.user_id, thread.title, self._message_contents(thread.id)
+                )
+
+    def _index_thread(self, thread: ThreadRecord):
+        """Update the recency index after a thread changes"""
+        if thread.is_active:
+            self._recency.upsert(thread.id, thread.user_id, thread.updated_at)
+        else:
+            self._recency.remove(thread.id)
+
+    def _save_threads(self):
+        """Mark chat thread metadata dirty; the write-behind flusher persists it"""
+        write_behind_flusher.mark_dirty(self.threads_file, self._encode_threads)
+
+    def _encode_threads(self) -> bytes:
+        """Serialize all chat thread metadata to the file storage format"""
+        data = {thread_id: thread.to_dict() for thread_id, thread in self._threads.items()}
+        return dumps(data)
+
+    def _snapshot_rows(self) -> List[tuple]:
+        """Thread rows in recency order, so the index sort on load is linear"""
+        threads = sorted(self._threads.values(), key=lambda thread: (thread.updated_at, thread.id))
+        return [thread.to_row() for thread in threads]
+
+    def write_snapshot(self) -> bool:
+        """
+        Write the startup snapshot of the current thread metadata. Skipped
+        while chat_threads.json has unflushed changes, since the snapshot is
+        tied to the file version it was taken from.
+        """
+        if not self._loaded or write_behind_flusher.is_pending(self.threads_file):
+            return False
+        stamp = source_stamp(self.threads_file)
+        if stamp is None:
+            return False
+        write_snapshot(self.snapshot_file, stamp, self._snapshot_rows())
+        return True
+
+    async def compact(self) -> bool:
+        """Flush pending thread writes and refresh the startup snapshot"""
+        if not self._loaded:
+            return False
+        await write_behind_flusher.flush_async()
+        if write_behind_flusher.is_pending(self.threads_file):
+            return False
+        # Rows are taken on the loop, so no mutation interleaves; only the write is offloaded
+        stamp = source_stamp(self.threads_file)
+        if stamp is None:
+            return False
+        rows = self._snapshot_rows()
+        await asyncio.to_thread(write_snapshot, self.snapshot_file, stamp, rows)
+        return True
+
+    def get_residency_stats(self) -> Dict[str, Any]:
+        """Message residency, eviction and hot/cold tier counters"""
+        self._ensure_loaded()
+        hot_files = list(self.messages_dir.glob("*.json"))
+        return {
+            "threads": len(self._threads),
+            **self._messages.get_stats(),
+            "hot_message_files": len(hot_files),
+            "hot_bytes": sum(f.stat().st_size for f in hot_files)
+                + (self.threads_file.stat().st_size if self.threads_file.exists() else 0),
+            **self._cold.get_stats(),
+            "archived": self.archived,
+            "restored": self.restored,
+            "last_sweep_at": self.last_sweep_at.isoformat() if self.last_sweep_at else None
+        }
 
     async def create_thread(self, title: Optional[str] = None, user_id: Optional[str] = None) -> ChatThread:
         """Create a new chat thread for a specific user"""
-        thread_id = str(uuid.uuid4())
-        thread = ChatThread(
+        self._ensure_loaded()
+        thread_id = new_ulid()
+        now = datetime.utcnow()
+        thread = ThreadRecord(
             id=thread_id,
             title=title or "New Chat",
             user_id=user_id,
-            created_at=datetime.utcnow(),
-            updated_at=datetime.utcnow(),
-            messages=[],
+            created_at=now,
+            updated_at=now,
             is_active=True
         )
         
         self._threads[thread_id] = thread
+        self._messages.put(thread_id, MessageLog())
+        self._index_thread(thread)
+        self._search_index.add_document(thread.id, thread.user_id, thread.title)
         self._save_threads()
-        return thread
+        return thread.to_thread([])
 
     async def get_thread(self, thread_id: str) -> Optional[ChatThread]:
-        """Get a specific chat thread"""
-        return self._threads.get(thread_id)
+        """Get a specific chat thread with its messages"""
+        self._ensure_loaded()
+        thread = await self._get_thread_record(thread_id)
+        if not thread:
+            return None
+        return thread.to_thread((await self._thread_messages(thread_id)).to_messages())
 
-    async def get_all_threads(self, user_id: Optional[str] = None, limit: int = 50, offset: int = 0) -> ChatThreadsListResponse:
-        """Get all chat threads for a specific user, sorted by most recent"""
-        active_threads = [t for t in self._threads.values() if t.is_active]
-        
-        # Filter by user_id if provided
-        if user_id:
-            active_threads = [t for t in active_threads if t.user_id == user_id]
-        
-        sorted_threads = sorted(active_threads, key=lambda x: x.updated_at, reverse=True)
+    async def get_thread_metadata(self, thread_id: str) -> Optional[ChatThreadResponse]:
+        """Get a chat thread's metadata without loading its messages"""
+        self._ensure_loaded()
+        thread = await self._get_thread_record(thread_id)
+        return thread.to_response() if thread else None
+
+    async def get_messages_page(
+        self,
+        thread_id: str,
+        before: Optional[str] = None,
+        after: Optional[str] = None,
+        limit: int = 50
+    ) -> Optional[ChatMessagesPage]:
+        """
+        Get up to ``limit`` messages of a thread, oldest first: the newest
+        messages by default, or those just before/after a message cursor
+        """
+        self._ensure_loaded()
+        thread = await self._get_thread_record(thread_id)
+        if not thread:
+            return None
         
-        # Apply pagination
-        paginated_threads = sorted_threads[offset:offset + limit]
+        log = await self._thread_messages(thread_id)
+        if after:
+            start = log.locate(*decode_cursor(after))[1]
+            stop = min(start + limit, len(log))
+        else:
+            stop = log.locate(*decode_cursor(before))[0] if before else len(log)
+            start = max(stop - limit, 0)
         
-        thread_responses = [ChatThreadResponse.from_thread(t) for t in paginated_threads]
+        messages = log.to_messages(start, stop)
+        return ChatMessagesPage(
+            thread_id=thread_id,
+            message_count=len(log),
+            messages=messages,
+            prev_cursor=encode_cursor(messages[0].timestamp, messages[0].id) if messages and start > 0 else None,
+            next_cursor=encode_cursor(messages[-1].timestamp, messages[-1].id) if messages and stop < len(log) else None
+        )
+
+    async def get_all_threads(
+        self,
+        user_id: Optional[str] = None,
+        limit: int = 50,
+        offset: int = 0,
+        cursor: Optional[str] = None
+    ) -> ChatThreadsListResponse:
+        """Get all chat threads for a specific user, sorted by most recent"""
+        self._ensure_loaded()
+        before = decode_cursor(cursor) if cursor else None
+        # One extra key tells whether another page follows
+        keys = self._recency.page_keys(user_id, before=before, offset=0 if before else offset, limit=limit + 1)
+        page = keys[:limit]
+        thread_responses = [self._threads[thread_id].to_response() for _, thread_id in page]
         
         return ChatThreadsListResponse(
             threads=thread_responses,
-            total=len(active_threads)
+            total=self._recency.count(user_id),
+            next_cursor=encode_cursor(*page[-1]) if page and len(keys) > limit else None
         )
 
     async def add_message(self, thread_id: str, role: MessageRole, content: str) -> Optional[ChatMessage]:
         """Add a message to a chat thread"""
-        thread = self._threads.get(thread_id)
+        self._ensure_loaded()
+        thread = await self._get_thread_record(thread_id)
         if not thread:
             return None
         
         message = ChatMessage(
-            id=str(uuid.uuid4()),
+            id=new_ulid(),
             role=role,
             content=content,
-            timestamp=datetime.utcnow()
+            timestamp=(await self._thread_messages(thread_id)).next_timestamp(datetime.utcnow())
         )
         
-        thread.messages.append(message)
+        messages = self._messages.append(thread_id, message.id, message.role, message.content, message.timestamp)
+        thread.message_count = len(messages)
         thread.updated_at = datetime.utcnow()
+        self._index_thread(thread)
+        self._search_index.add_text(thread.id, content)
         
+        self._save_messages(thread_id, messages)
         self._save_threads()
         return message
 
     async def delete_thread(self, thread_id: str) -> bool:
         """Soft delete a chat thread"""
-        thread = self._threads.get(thread_id)
+        self._ensure_loaded()
+        thread = await self._get_thread_record(thread_id)
         if not thread:
             return False
         
         thread.is_active = False
         thread.updated_at = datetime.utcnow()
+        self._index_thread(thread)
+        self._search_index.remove_document(thread.id)
         self._save_threads()
         return True
 
     async def update_thread_title(self, thread_id: str, title: str) -> bool:
         """Update thread title"""
-        thread = self._threads.get(thread_id)
+        self._ensure_loaded()
+        thread = await self._get_thread_record(thread_id)
         if not thread:
             return False
         
         thread.title = title
         thread.updated_at = datetime.utcnow()
+        self._index_thread(thread)
+        self._search_index.set_title(thread.id, title)
         self._save_threads()
         return True
 
-    async def search_threads(self, query: str, user_id: Optional[str] = None, limit: int = 20) -> List[ChatThreadResponse]:
-        """Search chat threads by content for a specific user"""
+    async def search_threads(self, query: str, user_id: Optional[str] = None, limit: int = 20) -> List[ChatThreadSearchResult]:
+        """Search chat threads by content for a specific user, best matches first"""
+        self._ensure_loaded()
         if not query.strip():
             return []
         
-        query_lower = query.lower()
-        matching_threads = []
-        
-        for thread in self._threads.values():
-            if not thread.is_active:
-                continue
-                
-            # Filter by user_id if provided
-            if user_id and thread.user_id != user_id:
-                continue
-                
-            # Search in title
-            if thread.title and query_lower in thread.title.lower():
-                matching_threads.append(thread)
-                continue
-            
-            # Search in message content
-            for message in thread.messages:
-                if query_lower in message.content.lower():
-                    matching_threads.append(thread)
-                    break
-        
-        # Sort by most recent
-        matching_threads.sort(key=lambda x: x.updated_at, reverse=True)
-        
-        # Apply limit
-        limited_threads = matching_threads[:limit]
-        
-        return [ChatThreadResponse.from_thread(t) for t in limited_threads]
+        results = []
+        for thread_id, score in self._search_index.search(query, user_id=user_id, limit=limit):
+            thread = self._threads[thread_id]
+            results.append(ChatThreadSearchResult(
+                **thread.to_response().model_dump(),
+                score=score,
+                snippet=self._snippet(thread, query)
+            ))
+        return results
 
-    async def generate_thread_title(self, first_message: str, ai_response: str) -> str:
-        """Generate a concise title for the chat thread based on the first exchange"""
-        try:
-            # Use the synchronous client in executor for async compatibility
-            def call_openai():
-                response = self.openai_client.responses.create(
-                    model=self.settings.openai_model,
-                    input=f"User: {first_message}\n\nAI: {ai_response[:200]}...",
-                    instructions="""Generate a concise 3-5 word title for this chat conversation. 
-                    The title should capture the main topic or question being discussed.
-                    Be specific and descriptive but brief.
-                    Examples: "Culture Survey Creation", "Team Engagement Analysis", "Onboarding Feedback Discussion"
-                    Return only the title, no quotes or additional text."""
-                )
-                return response.output_text.strip()
-
-            title = await asyncio.get_event_loop().run_in_executor(None, call_openai)
-            
-            # Clean up the title (remove quotes if present)
-            title = title.strip('"\'')
-            
-            # Ensure it's not too long
-            if len(title) > 50:
-                title = title[:47] + "..."
-            
-            return title
-            
-        except Exception as e:
-            print(f"Error generating title: {e}")
-            # Fallback to a simple title based on first message
-            words = first_message.split()[:3]
-            return " ".join(words).title() or "New Chat"
+    def _snippet(self, thread: ThreadRecord, query: str) -> Optional[str]:
+        """Highlighted excerpt from the title or the first matching message"""
+        snippet = make_snippet(thread.title or "", query)
+        if snippet:
+            return snippet
+        for content in self._message_contents(thread.id):
+            snippet = make_snippet(content, query)
+            if snippet:
+                return snippet
+        return None
 
     async def get_recent_threads(self, user_id: Optional[str] = None, limit: int = 10) -> List[ChatThreadResponse]:
         """Get the most recent chat threads for a specific user"""
-        active_threads = [t for t in self._threads.values() if t.is_active]
-        
-        # Filter by user_id if provided
-        if user_id:
-            active_threads = [t for t in active_threads if t.user_id == user_id]
-        
-        sorted_threads = sorted(active_threads, key=lambda x: x.updated_at, reverse=True)
-        recent_threads = sorted_threads[:limit]
-        
-        return [ChatThreadResponse.from_thread(t) for t in recent_threads]
+        self._ensure_loaded()
+        thread_ids = self._recency.page(user_id, limit=limit)
+        return [self._threads[t].to_response() for t in thread_ids]
+
+
+def create_chat_thread_service(load: bool = True) -> BaseChatThreadService:
+    """Create the chat thread service for the configured storage backend"""
+    if get_settings().storage_backend == "sqlite":
+        from app.services.sqlite_chat_thread_service import SQLiteChatThreadService
+        return SQLiteChatThreadService()
+    return ChatThreadService(load=load)
@@ -0,0 +1,130 @@
+"""
+Compressed cold tier for archived chat threads
+"""
+
+import gzip
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+from app.core.serialization import dumps, loads
+from app.services.write_behind import atomic_write
+
+SEGMENT_PREFIX = "segment-"
+SEGMENT_SUFFIX = ".ndjson.gz"
+
+
+class ColdThreadStore:
+    """
+    Archived threads kept in append-only, gzip-compressed segment files.
+
+    Each archived thread is one JSON line compressed as its own gzip member,
+    so a segment can be read whole with ``gzip.open`` but a single thread can
+    also be fetched by seeking to its member. ``manifest.json`` maps thread
+    IDs to (segment, offset, length). Segments roll over at
+    ``segment_bytes`` and are deleted once no manifest entry points into
+    them.
+
+    ``write`` only appends and fsyncs; entries become visible through
+    ``commit``, so a caller can write from a worker thread and decide on the
+    event loop which of the written records to keep. Manifest changes are
+    serialized, so ``remove`` may also run in a worker thread.
+    """
+
+    def __init__(self, directory: Path, segment_bytes: int = 16 * 1024 * 1024):
+        self.directory = directory
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.manifest_file = directory / "manifest.json"
+        self.segment_bytes = segment_bytes
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._write_lock = threading.Lock()
+        self._manifest_lock = threading.Lock()
+        if self.manifest_file.exists():
+            self._entries = loads(self.manifest_file.read_bytes())
+
+    def __contains__(self, thread_id: str) -> bool:
+        return thread_id in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def thread_ids(self) -> List[str]:
+        return list(self._entries)
+
+    def _segments(self) -> List[Path]:
+        return sorted(self.directory.glob(f"{SEGMENT_PREFIX}*{SEGMENT_SUFFIX}"))
+
+    def _next_segment(self) -> Path:
+        segments = self._segments()
+        if segments and segments[-1].stat().st_size < self.segment_bytes:
+            return segments[-1]
+        number = int(segments[-1].name[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)]) + 1 if segments else 1
+        return self.directory / f"{SEGMENT_PREFIX}{number:06d}{SEGMENT_SUFFIX}"
+
+    def write(self, records: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        """Append records to the current segment with one fsync; returns their locations"""
+        if not records:
+            return {}
+        with self._write_lock:
+            segment = self._next_segment()
+            locations = {}
+            with open(segment, "ab") as f:
+                offset = f.tell()
+                for thread_id, record in records.items():
+                    member = gzip.compress(dumps(record) + b"\n", mtime=0)
+                    f.write(member)
+                    locations[thread_id] = {"segment": segment.name, "offset": offset, "length": len(member)}
+                    offset += len(member)
+                f.flush()
+                os.fsync(f.fileno())
+            return locations
+
+    def commit(self, locations: Dict[str, Dict[str, Any]]) -> None:
+        """Point the manifest at written records and persist it"""
+        if not locations:
+            return
+        with self._manifest_lock:
+            self._entries.update(locations)
+            self._save_manifest()
+            self._drop_dead_segments()
+
+    def read(self, thread_id: str) -> Optional[Dict[str, Any]]:
+        """The archived record for a thread, or None if it is not archived"""
+        entry = self._entries.get(thread_id)
+        if entry is None:
+            return None
+        with open(self.directory / entry["segment"], "rb") as f:
+            f.seek(entry["offset"])
+            return loads(gzip.decompress(f.read(entry["length"])))
+
+    def remove(self, thread_ids: Iterable[str]) -> None:
+        """Drop threads from the manifest and delete segments nothing points into"""
+        with self._manifest_lock:
+            removed = [t for t in thread_ids if self._entries.pop(t, None) is not None]
+            if not removed:
+                return
+            self._save_manifest()
+            self._drop_dead_segments()
+
+    def _drop_dead_segments(self) -> None:
+        live = {entry["segment"] for entry in self._entries.values()}
+        with self._write_lock:
+            # Keep the newest segment as the append target even when it is empty of live entries
+            for segment in self._segments()[:-1]:
+                if segment.name not in live:
+                    segment.unlink(missing_ok=True)
+
+    def _save_manifest(self) -> None:
+        atomic_write(self.manifest_file, dumps(self._entries))
+
+    def get_stats(self) -> Dict[str, int]:
+        segments = self._segments()
+        with self._manifest_lock:
+            live_bytes = sum(entry["length"] for entry in self._entries.values())
+        return {
+            "cold_threads": len(self._entries),
+            "cold_segments": len(segments),
+            "cold_bytes": sum(s.stat().st_size for s in segments),
+            "cold_live_bytes": live_bytes,
+        }
@@ -0,0 +1,988 @@
+"""
+Metric formulas: parsing, compilation and vectorized evaluation over response columns
+
+A formula is an expression over aggregates of per-response values, with an
+optional filter and segmentation::
+
+    AVG(q1, q2, q3)
+    COUNT(engagement_score >= 4) / COUNT(total_responses) * 100 BY Department
+    PERCENT(q1 == 'Very Satisfied') WHERE q5 = 'Yes' BY Work Arrangement
+
+Inside AVG, SUM, COUNT and PERCENT, names refer to questions or classifiers
+and are evaluated a whole column at a time: every row-level value is a
+float vector with NaN where the respondent gave no answer, and comparisons
+and AND/OR/NOT give 1.0, 0.0 or NaN. Outside the aggregates, only numbers,
+arithmetic and parentheses are allowed, evaluated once per segment.
+
+Every aggregate reduces to three per-segment numbers: the sum and count of
+present values, and the number of rows. AVG is sum/count, SUM is the sum,
+COUNT of a condition counts rows where it holds and COUNT of a value counts
+rows where it is present, PERCENT of a condition is the share of rows where
+it holds among rows where it is defined. ``total_responses`` (or ``*``)
+counts every row. Names with spaces are written in backticks inside
+expressions; after BY they are separated by commas and need no quoting.
+
+Parsing and compilation depend only on the formula text and are cached;
+names are bound to columns when a plan is evaluated against a survey.
+Evaluation produces per-segment totals that add up across batches of
+responses, so MetricAggregates can keep them current as responses arrive.
+"""
+
+import math
+import re
+import threading
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+from app.models.survey import Survey
+from app.services.answer_decoders import Decoders, decode_label, decode_number, question_decoders
+from app.services.response_columns import (
+    CATEGORY, COLUMN_KINDS, MULTI, NUMERIC, SUBMITTED_AT, SurveyColumns, infer_kind, parse_number
+)
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - depends on the environment
+    np = None
+
+AGGREGATES = ("AVG", "SUM", "COUNT", "PERCENT")
+KEYWORDS = {"BY", "WHERE", "AND", "OR", "NOT"}
+ALL_ROWS = {"total_responses", "*"}
+COMPARISONS = {"==": "==", "=": "==", "!=": "!=", "<>": "!=", ">=": ">=", "<=": "<=", ">": ">", "<": "<"}
+CONDITION_OPS = set(COMPARISONS.values()) | {"AND", "OR"}
+
+_TOKEN = re.compile(r"""
+    \s*(?:
+        (?P<number>\d+(?:\.\d+)?|\.\d+)
+      | (?P<string>'[^']*'|"[^"]*")
+      | `(?P<quoted>[^`]+)`
+      | (?P<name>[A-Za-z_][A-Za-z0-9_.]*)
+      | (?P<op>==|!=|<>|>=|<=|[=<>+\-*/(),%])
+    )""", re.VERBOSE)
+
+
+class MetricFormulaError(ValueError):
+    """Raised for a formula that cannot be parsed, or that refers to something the survey does not have"""
+
+
+# --- Syntax tree ---------------------------------------------------------------------------
+
+class Number(NamedTuple):
+    value: float
+
+
+class String(NamedTuple):
+    value: str
+
+
+class Name(NamedTuple):
+    name: str
+
+
+class Unary(NamedTuple):
+    op: str
+    operand: Any
+
+
+class Binary(NamedTuple):
+    op: str
+    left: Any
+    right: Any
+
+
+class Call(NamedTuple):
+    func: str
+    args: Tuple[Any, ...]
+
+
+class Formula(NamedTuple):
+    expression: Any
+    where: Optional[Any]
+    by: Tuple[str, ...]
+
+
+class Token(NamedTuple):
+    kind: str
+    value: str
+    start: int
+
+
+def tokenize(text: str) -> List[Token]:
+    tokens = []
+    position = 0
+    length = len(text.rstrip())
+    while position < length:
+        match = _TOKEN.match(text, position)
+        if not match or match.end() == position:
+            raise MetricFormulaError(f"Unexpected character {text[position:].strip()[:1]!r} at {position}")
+        kind = match.lastgroup
+        value = match.group(kind)
+        start = match.start(kind)
+        if kind == "name" and value.upper() in KEYWORDS:
+            kind, value = "keyword", value.upper()
+        elif kind == "quoted":
+            kind = "name"
+        elif kind == "string":
+            value = value[1:-1]
+        tokens.append(Token(kind, value, start))
+        position = match.end()
+    return tokens
+
+
+class _Parser:
+    """Recursive-descent parser over one formula's tokens"""
+
+    def __init__(self, text: str, tokens: List[Token]):
+        self.text = text
+        self.tokens = tokens
+        self.position = 0
+
+    def peek(self) -> Optional[Token]:
+        return self.tokens[self.position] if self.position < len(self.tokens) else None
+
+    def accept(self, kind: str, *values: str) -> Optional[Token]:
+        token = self.peek()
+        if token and token.kind == kind and (not values or token.value in values):
+            self.position += 1
+            return token
+        return None
+
+    def expect(self, kind: str, value: str) -> Token:
+        token = self.accept(kind, value)
+        if token is None:
+            found = self.peek()
+            raise MetricFormulaError(f"Expected {value!r} but found {found.value if found else 'end of formula'!r}")
+        return token
+
+    def formula(self) -> Formula:
+        expression = self.disjunction()
+        where = self.disjunction() if self.accept("keyword", "WHERE") else None
+        by: Tuple[str, ...] = ()
+        token = self.accept("keyword", "BY")
+        if token:
+            # Segment names run to the next comma, so they may contain spaces
+            rest = self.text[token.start + len(token.value):]
+            by = tuple(part.strip().strip("`") for part in rest.split(","))
+            if not all(by):
+                raise MetricFormulaError("Empty segment name after BY")
+            self.position = len(self.tokens)
+        if self.peek() is not None:
+            raise MetricFormulaError(f"Unexpected {self.peek().value!r} at {self.peek().start}")
+        return Formula(expression, where, by)
+
+    def disjunction(self):
+        node = self.conjunction()
+        while self.accept("keyword", "OR"):
+            node = Binary("OR", node, self.conjunction())
+        return node
+
+    def conjunction(self):
+        node = self.negation()
+        while self.accept("keyword", "AND"):
+            node = Binary("AND", node, self.negation())
+        return node
+
+    def negation(self):
+        if self.accept("keyword", "NOT"):
+            return Unary("NOT", self.negation())
+        return self.comparison()
+
+    def comparison(self):
+        node = self.additive()
+        token = self.accept("op", *COMPARISONS)
+        if token:
+            node = Binary(COMPARISONS[token.value], node, self.additive())
+        return node
+
+    def additive(self):
+        node = self.term()
+        while True:
+            token = self.accept("op", "+", "-")
+            if not token:
+                return node
+            node = Binary(token.value, node, self.term())
+
+    def term(self):
+        node = self.unary()
+        while True:
+            token = self.accept("op", "*", "/")
+            if not token:
+                return node
+            node = Binary(token.value, node, self.unary())
+
+    def unary(self):
+        if self.accept("op", "-"):
+            return Unary("-", self.unary())
+        return self.primary()
+
+    def primary(self):
+        token = self.peek()
+        if token is None:
+            raise MetricFormulaError("Formula ends unexpectedly")
+        self.position += 1
+        if token.kind == "number":
+            node = Number(float(token.value))
+            # "50%" reads as 50
+            self.accept("op", "%")
+            return node
+        if token.kind == "string":
+            return String(token.value)
+        if token.kind == "op" and token.value == "*":
+            return Name("*")
+        if token.kind == "op" and token.value == "(":
+            node = self.disjunction()
+            self.expect("op", ")")
+            return node
+        if token.kind == "name":
+            if token.value.upper() in AGGREGATES and self.accept("op", "("):
+                args = []
+                if not self.accept("op", ")"):
+                    args.append(self.disjunction())
+                    while self.accept("op", ","):
+                        args.append(self.disjunction())
+                    self.expect("op", ")")
+                return Call(token.value.upper(), tuple(args))
+            return Name(token.value)
+        raise MetricFormulaError(f"Unexpected {token.value!r} at {token.start}")
+
+
+def parse_formula(text: str) -> Formula:
+    """Syntax tree of a formula"""
+    if not text or not text.strip():
+        raise MetricFormulaError("Empty formula")
+    return _Parser(text, tokenize(text)).formula()
+
+
+# --- Vector operations: numpy arrays when available, lists of floats otherwise ---------------
+
+Vector = Union[List[float], Any]
+
+
+def _full(rows: int, value: float) -> Vector:
+    return np.full(rows, value, dtype="d") if np is not None else [value] * rows
+
+
+def _lookup(codes, table: List[float]) -> Vector:
+    """Map dictionary codes to values, NaN for missing codes"""
+    if np is not None:
+        extended = np.asarray(table + [math.nan], dtype="d")
+        return extended[np.where(codes >= 0, codes, len(table))]
+    return [table[code] if code >= 0 else math.nan for code in codes]
+
+
+def _multi_rows(columns: SurveyColumns, name: str, code: Optional[int]) -> Vector:
+    """Per row of a multi-select column: whether it includes ``code`` or, for None, how many options it has; NaN if unanswered"""
+    offsets = columns.offsets(name)
+    codes = columns.codes(name)
+    if np is not None:
+        starts = np.concatenate(([0], offsets[:-1])) if len(offsets) else offsets
+        sizes = (offsets - starts).astype("d")
+        if code is None:
+            values = sizes
+        else:
+            hits = np.zeros(len(codes) + 1, dtype="d")
+            hits[1:] = np.cumsum(codes == code)
+            values = hits[offsets] - hits[starts]
+        return np.where(sizes > 0, np.minimum(values, 1.0) if code is not None else values, math.nan)
+    result = []
+    start = 0
+    for end in offsets:
+        if end == start:
+            result.append(math.nan)
+        elif code is None:
+            result.append(float(end - start))
+        else:
+            result.append(1.0 if code in codes[start:end] else 0.0)
+        start = end
+    return result
+
+
+_COMPARE = {
+    "==": lambda a, b: a == b,
+    "!=": lambda a, b: a != b,
+    ">=": lambda a, b: a >= b,
+    "<=": lambda a, b: a <= b,
+    ">": lambda a, b: a > b,
+    "<": lambda a, b: a < b,
+}
+
+
+def _compare(op: str, left: Vector, right: Vector) -> Vector:
+    compare = _COMPARE[op]
+    if np is not None:
+        missing = np.isnan(left) | np.isnan(right)
+        return np.where(missing, math.nan, compare(left, right).astype("d"))
+    return [math.nan if a != a or b != b else float(compare(a, b)) for a, b in zip(left, right)]
+
+
+def _divide(a: float, b: float) -> float:
+    return a / b if b else math.nan
+
+
+_ARITHMETIC = {
+    "+": lambda a, b: a + b,
+    "-": lambda a, b: a - b,
+    "*": lambda a, b: a * b,
+}
+
+
+def _arithmetic(op: str, left: Vector, right: Vector) -> Vector:
+    if np is not None:
+        if op == "/":
+            with np.errstate(divide="ignore", invalid="ignore"):
+                return np.where(right != 0, left / np.where(right != 0, right, 1.0), math.nan)
+        return _ARITHMETIC[op](left, right)
+    operation = _divide if op == "/" else _ARITHMETIC[op]
+    return [operation(a, b) for a, b in zip(left, right)]
+
+
+def _logical(op: str, left: Vector, right: Optional[Vector] = None) -> Vector:
+    """Three-valued AND/OR/NOT over 1.0/0.0/NaN vectors"""
+    if np is not None:
+        if op == "NOT":
+            return np.where(np.isnan(left), math.nan, (left == 0).astype("d"))
+        missing = np.isnan(left) | np.isnan(right)
+        truth = (left != 0) & (right != 0) if op == "AND" else (left != 0) | (right != 0)
+        return np.where(missing, math.nan, truth.astype("d"))
+    if op == "NOT":
+        return [math.nan if a != a else float(a == 0) for a in left]
+    combine = (lambda a, b: a != 0 and b != 0) if op == "AND" else (lambda a, b: a != 0 or b != 0)
+    return [math.nan if a != a or b != b else float(combine(a, b)) for a, b in zip(left, right)]
+
+
+def _negate(values: Vector) -> Vector:
+    return -values if np is not None else [-v for v in values]
+
+
+class SegmentStats(NamedTuple):
+    """Per-segment sum and count of present values, and rows"""
+    sums: List[float]
+    counts: List[int]
+    rows: List[int]
+
+
+def _segment_stats(values: Vector, segments, included, size: int) -> SegmentStats:
+    """Reduce a row vector per segment; ``segments`` holds each row's segment index, ``included`` the rows that count"""
+    if np is not None:
+        present = included & ~np.isnan(values)
+        sums = np.bincount(segments[present], weights=values[present], minlength=size)
+        counts = np.bincount(segments[present], minlength=size)
+        rows = np.bincount(segments[included], minlength=size)
+        return SegmentStats(sums.tolist(), counts.tolist(), rows.tolist())
+    sums = [0.0] * size
+    counts = [0] * size
+    rows = [0] * size
+    for value, segment, keep in zip(values, segments, included):
+        if keep:
+            rows[segment] += 1
+            if value == value:
+                sums[segment] += value
+                counts[segment] += 1
+    return SegmentStats(sums, counts, rows)
+
+
+# --- Binding names to a survey's columns -----------------------------------------------------
+
+def _normalize(name: str) -> str:
+    return re.sub(r"[\s_]+", " ", name).strip().casefold()
+
+
+class _Bindings:
+    """Resolves formula names to column names of one survey and evaluates row-level nodes"""
+
+    def __init__(self, survey: Survey, columns: SurveyColumns):
+        self.columns = columns
+        self.rows = columns.rows
+        known = [q.id for q in survey.questions] + [c.get("name", "") for c in survey.classifiers]
+        known += [name for name in columns.question_ids() if name not in known]
+        self.names = {_normalize(name): name for name in reversed(known) if name}
+        # "q3" may mean the third question when question IDs are something else
+        self.positions = {f"q{i}": q.id for i, q in enumerate(survey.questions, 1)}
+
+    def resolve(self, name: str) -> str:
+        if name in self.names.values():
+            return name
+        resolved = self.names.get(_normalize(name)) or self.positions.get(name.lower())
+        if resolved is None:
+            raise MetricFormulaError(f"Unknown question or classifier {name!r}")
+        return resolved
+
+    def kind(self, name: str) -> Optional[str]:
+        return self.columns.kind(self.resolve(name))
+
+    def numeric(self, name: str) -> Vector:
+        """A column as numbers: scale answers as-is, choice labels by their leading number"""
+        if name in ALL_ROWS:
+            return _full(self.rows, 1.0)
+        column = self.resolve(name)
+        kind = self.columns.kind(column)
+        if kind is None:
+            # Known but unanswered so far
+            return _full(self.rows, math.nan)
+        if kind == NUMERIC:
+            values = self.columns.numeric(column)
+            return values if np is not None else list(values)
+        if kind == CATEGORY:
+            table = [parse_number(label) for label in self.columns.dictionary(column)]
+            return _lookup(self.columns.codes(column), table)
+        return _multi_rows(self.columns, column, None)
+
+    def present(self, name: str) -> Vector:
+        """1.0 where a column is answered, NaN where not, whatever its labels"""
+        if name in ALL_ROWS:
+            return _full(self.rows, 1.0)
+        column = self.resolve(name)
+        kind = self.columns.kind(column)
+        if kind == CATEGORY:
+            return _lookup(self.columns.codes(column), [1.0] * len(self.columns.dictionary(column)))
+        if kind == MULTI:
+            return _compare(">", self.numeric(column), _full(self.rows, 0.0))
+        return self.numeric(name)
+
+    def matches(self, name: str, op: str, literal: str) -> Vector:
+        """Rows whose answer equals (or, for multi-select, includes) a label"""
+        column = self.resolve(name)
+        kind = self.columns.kind(column)
+        if kind is None:
+            return _full(self.rows, math.nan)
+        if kind == NUMERIC:
+            number = parse_number(literal)
+            if number != number:
+                raise MetricFormulaError(f"{name!r} is numeric and cannot be compared with {literal!r}")
+            return _compare(op, self.numeric(name), _full(self.rows, number))
+        if op not in ("==", "!="):
+            return _compare(op, self.numeric(name), _full(self.rows, parse_number(literal)))
+        labels = {_normalize(label): code for code, label in enumerate(self.columns.dictionary(column))}
+        code = labels.get(_normalize(literal), -2)
+        if kind == MULTI:
+            values = _multi_rows(self.columns, column, code)
+        else:
+            table = [0.0] * len(self.columns.dictionary(column))
+            if code >= 0:
+                table[code] = 1.0
+            values = _lookup(self.columns.codes(column), table)
+        return _logical("NOT", values) if op == "!=" else values
+
+    def segment_keys(self, name: str) -> Tuple[Any, List[Any]]:
+        """A BY column as per-row integer keys (-1 when unanswered) and the label of each key"""
+        column = self.resolve(name)
+        kind = self.columns.kind(column)
+        if kind == CATEGORY:
+            return self.columns.codes(column), list(self.columns.dictionary(column))
+        if kind == NUMERIC:
+            values = self.numeric(column)
+            if np is not None:
+                values = np.asarray(values, dtype="d")
+                present = ~np.isnan(values)
+                labels, inverse = np.unique(values[present], return_inverse=True)
+                keys = np.full(len(values), -1, dtype="q")
+                keys[present] = inverse
+                labels = labels.tolist()
+            else:
+                labels = sorted({v for v in values if v == v})
+                index = {value: i for i, value in enumerate(labels)}
+                keys = [index[v] if v == v else -1 for v in values]
+            return keys, [int(v) if v.is_integer() else v for v in labels]
+        if kind is None:
+            return _as_int_vector([-1] * self.rows), []
+        raise MetricFormulaError(f"Cannot segment by multi-select question {name!r}")
+
+
+def _as_int_vector(values: List[int]):
+    return np.asarray(values, dtype="q") if np is not None else values
+
+
+# --- Compilation -----------------------------------------------------------------------------
+
+RowFn = Callable[[_Bindings], Vector]
+ValueFn = Callable[[List[SegmentStats], int], Optional[float]]
+
+
+class MetricPlan(NamedTuple):
+    """A compiled formula: row vectors to reduce, and how to combine the reductions per segment"""
+    formula: str
+    aggregates: Tuple[Tuple[str, Tuple[RowFn, ...], Tuple[bool, ...]], ...]
+    value: ValueFn
+    where: Optional[RowFn]
+    by: Tuple[str, ...]
+
+
+def _is_condition(node) -> bool:
+    return (isinstance(node, Binary) and node.op in CONDITION_OPS) or (
+        isinstance(node, Unary) and node.op == "NOT"
+    )
+
+
+def _compile_row(node) -> RowFn:
+    """Row-level expression to a function of the bindings returning a float vector"""
+    if isinstance(node, Number):
+        return lambda env: _full(env.rows, node.value)
+    if isinstance(node, Name):
+        return lambda env: env.numeric(node.name)
+    if isinstance(node, String):
+        raise MetricFormulaError(f"Text {node.value!r} can only be compared with a question")
+    if isinstance(node, Call):
+        raise MetricFormulaError(f"{node.func} cannot be nested inside another aggregate")
+    if isinstance(node, Unary):
+        operand = _compile_row(node.operand)
+        if node.op == "NOT":
+            return lambda env: _logical("NOT", operand(env))
+        return lambda env: _negate(operand(env))
+    if node.op in ("AND", "OR"):
+        left, right = _compile_row(node.left), _compile_row(node.right)
+        return lambda env: _logical(node.op, left(env), right(env))
+    if node.op in COMPARISONS.values():
+        if isinstance(node.right, String) and isinstance(node.left, Name):
+            return lambda env: env.matches(node.left.name, node.op, node.right.value)
+        if isinstance(node.left, String) and isinstance(node.right, Name):
+            flipped = {">=": "<=", "<=": ">=", ">": "<", "<": ">"}.get(node.op, node.op)
+            return lambda env: env.matches(node.right.name, flipped, node.left.value)
+        left, right = _compile_row(node.left), _compile_row(node.right)
+        return lambda env: _compare(node.op, left(env), right(env))
+    left, right = _compile_row(node.left), _compile_row(node.right)
+    return lambda env: _arithmetic(node.op, left(env), right(env))
+
+
+def _reduce(func: str, stats: Sequence[SegmentStats], conditions: Sequence[bool], segment: int) -> Optional[float]:
+    total = sum(s.sums[segment] for s in stats)
+    present = sum(s.counts[segment] for s in stats)
+    rows = stats[0].rows[segment]
+    if func == "SUM":
+        return total
+    if func == "AVG":
+        return total / present if present else None
+    if func == "COUNT":
+        return float(sum(s.sums[segment] if c else s.counts[segment] for s, c in zip(stats, conditions)))
+    # PERCENT
+    if conditions[0]:
+        return 100.0 * total / present if present else None
+    return 100.0 * present / rows if rows else None
+
+
+def compile_formula(text: str) -> MetricPlan:
+    """Compile a formula into an evaluation plan; plans are cached by formula text"""
+    return _compile_cached(text.strip())
+
+
+@lru_cache(maxsize=512)
+def _compile_cached(text: str) -> MetricPlan:
+    formula = parse_formula(text)
+    aggregates: List[Tuple[str, Tuple[RowFn, ...], Tuple[bool, ...]]] = []
+
+    def compile_value(node) -> ValueFn:
+        if isinstance(node, Number):
+            return lambda stats, segment: node.value
+        if isinstance(node, Call):
+            args = node.args or (Name("*"),)
+            if node.func == "PERCENT" and len(args) != 1:
+                raise MetricFormulaError("PERCENT takes one condition")
+            index = len(aggregates)
+            conditions = tuple(_is_condition(arg) for arg in args)
+            if node.func in ("COUNT", "PERCENT"):
+                # Counting a question counts its answers, even when they are not numbers
+                row_fns = tuple(
+                    (lambda env, name=arg.name: env.present(name)) if isinstance(arg, Name) else _compile_row(arg)
+                    for arg in args
+                )
+            else:
+                row_fns = tuple(_compile_row(arg) for arg in args)
+            aggregates.append((node.func, row_fns, conditions))
+            func = node.func
+            return lambda stats, segment: _reduce(func, stats[index], conditions, segment)
+        if isinstance(node, Unary) and node.op == "-":
+            operand = compile_value(node.operand)
+
+            def negate(stats, segment):
+                value = operand(stats, segment)
+                return None if value is None else -value
+            return negate
+        if isinstance(node, Binary) and node.op in ("+", "-", "*", "/"):
+            left, right = compile_value(node.left), compile_value(node.right)
+            operation = _ARITHMETIC.get(node.op)
+
+            def combine(stats, segment):
+                a, b = left(stats, segment), right(stats, segment)
+                if a is None or b is None:
+                    return None
+                if operation is None:
+                    return a / b if b else None
+                return operation(a, b)
+            return combine
+        if isinstance(node, Name):
+            raise MetricFormulaError(f"{node.name!r} must be inside AVG, SUM, COUNT or PERCENT")
+        raise MetricFormulaError("Conditions must be inside AVG, SUM, COUNT or PERCENT, or after WHERE")
+
+    value = compile_value(formula.expression)
+    where = _compile_row(formula.where) if formula.where is not None else None
+    return MetricPlan(text, tuple(aggregates), value, where, formula.by)
+
+
+# --- Evaluation ------------------------------------------------------------------------------
+
+# Per-segment totals of a plan: [rows, sum, count, sum, count, ...], a sum and count per aggregate argument
+Totals = List[float]
+# A segment's sort key (dictionary codes for choice columns, values for numeric ones) and its labels
+SegmentKey = Tuple[Any, ...]
+
+
+def _segments(env: _Bindings, by: Tuple[str, ...]):
+    """Each row's segment index (-1 when a BY column is unanswered), and the key and labels of each segment"""
+    if not by:
+        return _as_int_vector([0] * env.rows), [()], [()]
+    keyed = [env.segment_keys(name) for name in by]
+    if np is not None:
+        combined = np.zeros(env.rows, dtype="q")
+        missing = np.zeros(env.rows, dtype=bool)
+        for keys, labels in keyed:
+            keys = np.asarray(keys, dtype="q")
+            missing |= keys < 0
+            combined = combined * max(len(labels), 1) + np.maximum(keys, 0)
+        used, segments = np.unique(np.where(missing, -1, combined), return_inverse=True)
+        offset = 1 if len(used) and used[0] == -1 else 0
+        segments = segments.astype("q") - offset
+        used = used[offset:].tolist()
+    else:
+        rows = [tuple(row) for row in zip(*(keys for keys, _ in keyed))]
+        used = sorted({row for row in rows if min(row) >= 0})
+        index = {row: i for i, row in enumerate(used)}
+        segments = [index.get(row, -1) for row in rows]
+    keys = []
+    labels = []
+    for key in used:
+        if not isinstance(key, tuple):
+            # Unpack the mixed-radix key built above
+            parts = []
+            for _, names in reversed(keyed):
+                key, code = divmod(key, max(len(names), 1))
+                parts.append(code)
+            key = tuple(reversed(parts))
+        label = tuple(names[code] for code, (_, names) in zip(key, keyed))
+        # Choice labels sort by dictionary code, numeric labels by value; both are stable as rows are added
+        keys.append(tuple(code if isinstance(name, str) else name for code, name in zip(key, label)))
+        labels.append(label)
+    return segments, keys, labels
+
+
+def _plan_totals(plan: MetricPlan, env: _Bindings) -> Tuple[Tuple[str, ...], Totals, Dict[SegmentKey, Tuple[tuple, Totals]]]:
+    """
+    The resolved BY columns, overall totals and per-segment totals of a plan
+    over the bound columns: a SurveyColumns, or any batch of rows with the
+    same read interface. Totals of disjoint batches add up to the totals of
+    the rows they cover.
+    """
+    by = tuple(env.resolve(name) for name in plan.by)
+    vectors = [row_fn(env) for _, row_fns, _ in plan.aggregates for row_fn in row_fns]
+    where = plan.where(env) if plan.where else None
+
+    def run(segments, size: int) -> List[Totals]:
+        if np is not None:
+            included = segments >= 0
+            if where is not None:
+                included &= np.nan_to_num(where) != 0
+            segments = np.where(included, segments, 0)
+        else:
+            included = [s >= 0 for s in segments]
+            if where is not None:
+                included = [keep and w == w and w != 0 for keep, w in zip(included, where)]
+        stats = [_segment_stats(v, segments, included, size) for v in vectors]
+        rows = stats[0].rows if stats else _segment_stats(_full(env.rows, 1.0), segments, included, size).rows
+        totals = []
+        for segment in range(size):
+            entry = [float(rows[segment])]
+            for s in stats:
+                entry += (float(s.sums[segment]), float(s.counts[segment]))
+            totals.append(entry)
+        return totals
+
+    overall = run(_as_int_vector([0] * env.rows), 1)[0]
+    per_segment: Dict[SegmentKey, Tuple[tuple, Totals]] = {}
+    if by:
+        segments, keys, labels = _segments(env, by)
+        for key, label, totals in zip(keys, labels, run(segments, len(keys))):
+            if totals[0]:
+                per_segment[key] = (label, totals)
+    return by, overall, per_segment
+
+
+def _value(plan: MetricPlan, totals: Totals) -> Optional[float]:
+    """A plan's value from one segment's totals"""
+    stats = []
+    position = 1
+    for _, row_fns, _ in plan.aggregates:
+        group = []
+        for _ in row_fns:
+            group.append(SegmentStats([totals[position]], [totals[position + 1]], [totals[0]]))
+            position += 2
+        stats.append(group)
+    value = plan.value(stats, 0)
+    return None if value is None or value != value or math.isinf(value) else value
+
+
+def plan_result(plan: MetricPlan, by: Tuple[str, ...], overall: Totals, segments: Dict[SegmentKey, Tuple[tuple, Totals]]) -> Dict[str, Any]:
+    """Overall and per-segment values of a plan from its totals"""
+    result: Dict[str, Any] = {"value": _value(plan, overall), "responses": int(overall[0])}
+    if by:
+        result["segments"] = [
+            {"segment": dict(zip(by, label)), "value": _value(plan, totals), "responses": int(totals[0])}
+            for _, (label, totals) in sorted(segments.items())
+        ]
+    return result
+
+
+def evaluate_plan(plan: MetricPlan, survey: Survey, columns: SurveyColumns) -> Dict[str, Any]:
+    """Overall and per-segment values of a compiled formula over a survey's response columns"""
+    return plan_result(plan, *_plan_totals(plan, _Bindings(survey, columns)))
+
+
+def evaluate_metrics(survey: Survey, columns: SurveyColumns, formulas: Optional[List[Dict[str, Any]]] = None) -> List[Dict[str, Any]]:
+    """
+    Evaluate metric definitions (dicts with ``name`` and ``formula``, the
+    survey's own metrics by default). A formula that fails to compile or
+    bind reports its error instead of failing the others.
+    """
+    metrics = survey.metrics if formulas is None else formulas
+    env = _Bindings(survey, columns)
+    results = []
+    for metric in metrics:
+        formula = metric.get("formula")
+        if not formula:
+            continue
+        entry: Dict[str, Any] = {"name": metric.get("name"), "formula": formula}
+        try:
+            plan = compile_formula(formula)
+            entry.update(plan_result(plan, *_plan_totals(plan, env)))
+        except MetricFormulaError as e:
+            entry["error"] = str(e)
+        results.append(entry)
+    return results
+
+
+# --- Running totals ----------------------------------------------------------------------------
+
+class RecordColumns:
+    """
+    A batch of response records with the read interface of SurveyColumns.
+
+    Column kinds and choice dictionaries are shared with the caller and
+    extended in place, and answers are decoded the way SurveyColumns.extend
+    decodes them, so codes and segment keys agree across batches and with
+    the stored columns.
+    """
+
+    def __init__(
+        self,
+        records: List[Dict[str, Any]],
+        kinds: Dict[str, str],
+        dictionaries: Dict[str, Dict[str, int]],
+        question_types: Dict[str, str],
+        decoders: Decoders,
+    ):
+        self.rows = len(records)
+        self._kinds = kinds
+        self._dictionaries = dictionaries
+        self._decoders = decoders
+        answers: Dict[str, List[Tuple[int, Any]]] = {}
+        for row, record in enumerate(records):
+            for name, value in (record.get("responses") or {}).items():
+                if value is None or value == "" or value == [] or name == SUBMITTED_AT:
+                    continue
+                if name not in kinds:
+                    response_type = question_types.get(name)
+                    kind = COLUMN_KINDS[response_type] if response_type in COLUMN_KINDS else infer_kind(value)
+                    if kind is None:
+                        continue
+                    kinds[name] = kind
+                    if kind != NUMERIC:
+                        decoder = decoders.get(name)
+                        options = dict.fromkeys(decoder.options) if decoder is not None else {}
+                        dictionaries[name] = {label: code for code, label in enumerate(options)}
+                answers.setdefault(name, []).append((row, value))
+        self._numeric: Dict[str, Any] = {}
+        self._codes: Dict[str, Any] = {}
+        self._offsets: Dict[str, Any] = {}
+        for name, kind in kinds.items():
+            self._build(name, kind, answers.get(name, []))
+
+    def _code(self, name: str, value: Any) -> int:
+        codes = self._dictionaries[name]
+        key = decode_label(self._decoders.get(name), value)
+        code = codes.get(key)
+        if code is None:
+            code = codes[key] = len(codes)
+        return code
+
+    def _build(self, name: str, kind: str, answers: List[Tuple[int, Any]]) -> None:
+        if kind == NUMERIC:
+            decoder = self._decoders.get(name)
+            values = [math.nan] * self.rows
+            for row, value in answers:
+                values[row] = decode_number(decoder, value)
+            self._numeric[name] = np.asarray(values, dtype="d") if np is not None else values
+        elif kind == CATEGORY:
+            codes = [-1] * self.rows
+            for row, value in answers:
+                codes[row] = self._code(name, value)
+            self._codes[name] = _as_int_vector(codes)
+        else:
+            selected: List[List[int]] = [[] for _ in range(self.rows)]
+            for row, value in answers:
+                selected[row] = [self._code(name, v) for v in (value if isinstance(value, list) else [value])]
+            offsets = []
+            codes = []
+            for row_codes in selected:
+                codes += row_codes
+                offsets.append(len(codes))
+            self._codes[name] = _as_int_vector(codes)
+            self._offsets[name] = _as_int_vector(offsets)
+
+    def kind(self, name: str) -> Optional[str]:
+        return self._kinds.get(name)
+
+    def dictionary(self, name: str) -> List[str]:
+        return list(self._dictionaries[name])
+
+    def question_ids(self) -> List[str]:
+        return list(self._kinds)
+
+    def numeric(self, name: str):
+        return self._numeric[name]
+
+    def codes(self, name: str):
+        return self._codes[name]
+
+    def offsets(self, name: str):
+        return self._offsets[name]
+
+
+def metric_signature(survey: Survey) -> Tuple[Any, ...]:
+    """What running totals depend on: the metric formulas, the names they can bind to and the answer options"""
+    return (
+        tuple((metric.get("name"), metric.get("formula")) for metric in survey.metrics),
+        tuple((q.id, q.response_type, tuple(q.options or ())) for q in survey.questions),
+        tuple(c.get("name") for c in survey.classifiers),
+    )
+
+
+class MetricAggregates:
+    """
+    Running totals of one survey's metric formulas.
+
+    Every aggregate reduces to a sum and a count per segment, which add up
+    across batches of responses: ``fold`` adds new responses in time
+    proportional to the batch, and ``values`` reads current metric values
+    in time proportional to the number of segments, without touching any
+    response. ``from_columns`` computes the totals from scratch, for
+    backfill and to verify the running ones.
+
+    ``rows`` and ``position`` record how much of the response source the
+    totals cover; callers hold ``lock`` while folding or reading.
+    """
+
+    def __init__(self, survey: Survey, decoders: Optional[Decoders] = None):
+        self.survey = survey
+        self.signature = metric_signature(survey)
+        self.question_types = {q.id: q.response_type for q in survey.questions}
+        self.decoders = decoders if decoders is not None else question_decoders(survey.questions)
+        self.lock = threading.Lock()
+        self.rows = 0
+        self.position = 0
+        # Set when a formula that failed to bind might bind now; the totals must be rebuilt
+        self.stale = False
+        self.kinds: Dict[str, str] = {}
+        self.dictionaries: Dict[str, Dict[str, int]] = {}
+        self.plans: Dict[str, MetricPlan] = {}
+        self.totals: Dict[str, Tuple[Tuple[str, ...], Totals, Dict[SegmentKey, Tuple[tuple, Totals]]]] = {}
+        self.errors: Dict[str, str] = {}
+        for metric in survey.metrics:
+            formula = metric.get("formula")
+            if formula and formula not in self.plans and formula not in self.errors:
+                try:
+                    self.plans[formula] = compile_formula(formula)
+                except MetricFormulaError as e:
+                    self.errors[formula] = str(e)
+
+    @classmethod
+    def from_columns(cls, survey: Survey, columns: SurveyColumns, decoders: Optional[Decoders] = None) -> "MetricAggregates":
+        """Totals over every row of ``columns``, encoded with ``decoders``; the caller holds ``columns.locked()``"""
+        state = cls(survey, decoders)
+        for name in columns.question_ids():
+            kind = columns.kind(name)
+            state.kinds[name] = kind
+            if kind != NUMERIC:
+                state.dictionaries[name] = {label: code for code, label in enumerate(columns.dictionary(name))}
+        env = _Bindings(survey, columns)
+        for formula, plan in list(state.plans.items()):
+            try:
+                state.totals[formula] = _plan_totals(plan, env)
+            except MetricFormulaError as e:
+                state.errors[formula] = str(e)
+                del state.plans[formula]
+        state.rows = columns.rows
+        state.position = columns.position
+        return state
+
+    def fold(self, records: List[Dict[str, Any]], position: Any) -> None:
+        """Add responses that follow the ones already covered, ending at source ``position``"""
+        names = len(self.kinds)
+        batch = RecordColumns(records, self.kinds, self.dictionaries, self.question_types, self.decoders)
+        env = _Bindings(self.survey, batch)
+        for formula, plan in list(self.plans.items()):
+            try:
+                _, overall, segments = _plan_totals(plan, env)
+            except MetricFormulaError as e:
+                # Such as a BY column whose first answers show it is multi-select
+                self.errors[formula] = str(e)
+                del self.plans[formula], self.totals[formula]
+                continue
+            _, running, running_segments = self.totals[formula]
+            _add(running, overall)
+            for key, (label, totals) in segments.items():
+                entry = running_segments.get(key)
+                if entry is None:
+                    running_segments[key] = (label, totals)
+                else:
+                    _add(entry[1], totals)
+        if self.errors and len(self.kinds) > names:
+            self.stale = True
+        self.rows += len(records)
+        self.position = position
+
+    def values(self) -> List[Dict[str, Any]]:
+        """Current values of the survey's metrics, shaped like ``evaluate_metrics``"""
+        results = []
+        for metric in self.survey.metrics:
+            formula = metric.get("formula")
+            if not formula:
+                continue
+            entry: Dict[str, Any] = {"name": metric.get("name"), "formula": formula}
+            if formula in self.errors:
+                entry["error"] = self.errors[formula]
+            else:
+                entry.update(plan_result(self.plans[formula], *self.totals[formula]))
+            results.append(entry)
+        return results
+
+
+def _add(running: Totals, totals: Totals) -> None:
+    for i, value in enumerate(totals):
+        running[i] += value
+
+
+def metric_drift(running: List[Dict[str, Any]], recomputed: List[Dict[str, Any]], tolerance: float = 1e-9) -> List[str]:
+    """Names of metrics whose running values differ from a full recompute"""
+    def close(a: Optional[float], b: Optional[float]) -> bool:
+        return a == b or (a is not None and b is not None and math.isclose(a, b, rel_tol=tolerance, abs_tol=tolerance))
+
+    drifted = []
+    for before, after in zip(running, recomputed):
+        same = before.get("error") == after.get("error") and before.get("responses") == after.get("responses")
+        same = same and close(before.get("value"), after.get("value"))
+        segments = before.get("segments") or []
+        expected = after.get("segments") or []
+        same = same and len(segments) == len(expected) and all(
+            a["segment"] == b["segment"] and a["responses"] == b["responses"] and close(a["value"], b["value"])
+            for a, b in zip(segments, expected)
+        )
+        if not same:
+            drifted.append(after.get("name") or after["formula"])
+    return drifted
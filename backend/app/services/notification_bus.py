@@ -0,0 +1,100 @@
+"""
+Cross-process relay for WebSocket notifications
+"""
+
+import asyncio
+import logging
+import sqlite3
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from app.core.database import SQLiteDatabase
+from app.core.serialization import dumps_str, loads
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS notifications (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    origin TEXT NOT NULL,
+    user_ids TEXT,
+    message TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+"""
+
+Notification = Tuple[Dict[str, Any], Optional[List[str]]]
+Deliver = Callable[[Dict[str, Any], Optional[List[str]]], Awaitable[int]]
+
+
+class NotificationBus:
+    """
+    Notifications shared by every worker process through a SQLite table.
+
+    A WebSocket is held by exactly one worker, so a notification published
+    in one worker is also written here; every other worker polls the table
+    and delivers it to the users connected to it. Rows older than
+    ``retention_seconds`` are pruned by publishers. ``user_ids`` of None
+    means every connected user.
+
+    Create the bus after the worker has forked: ``origin`` identifies this
+    process so it skips its own notifications.
+    """
+
+    def __init__(self, database: SQLiteDatabase, retention_seconds: float = 300.0):
+        self.db = database
+        self.db.executescript(SCHEMA)
+        self.origin = uuid.uuid4().hex
+        self.retention_seconds = retention_seconds
+        self.published = 0
+        self.relayed = 0
+        self._last_id = self.db.read_sync(
+            lambda conn: conn.execute("SELECT COALESCE(MAX(id), 0) FROM notifications").fetchone()[0]
+        )
+
+    async def publish(self, message: Dict[str, Any], user_ids: Optional[List[str]] = None) -> None:
+        """Make a notification available to the other workers"""
+        now = time.time()
+
+        def insert(conn: sqlite3.Connection) -> None:
+            conn.execute(
+                "INSERT INTO notifications (origin, user_ids, message, created_at) VALUES (?, ?, ?, ?)",
+                (self.origin, dumps_str(user_ids) if user_ids is not None else None, dumps_str(message), now)
+            )
+            conn.execute("DELETE FROM notifications WHERE created_at < ?", (now - self.retention_seconds,))
+
+        await self.db.write(insert)
+        self.published += 1
+
+    def _poll_sync(self) -> List[Notification]:
+        rows = self.db.read_sync(
+            lambda conn: conn.execute(
+                "SELECT id, origin, user_ids, message FROM notifications WHERE id > ? ORDER BY id",
+                (self._last_id,)
+            ).fetchall()
+        )
+        if rows:
+            self._last_id = rows[-1]["id"]
+        return [
+            (loads(row["message"]), loads(row["user_ids"]) if row["user_ids"] is not None else None)
+            for row in rows
+            if row["origin"] != self.origin
+        ]
+
+    async def poll(self) -> List[Notification]:
+        """Notifications other workers published since the last poll"""
+        return await asyncio.to_thread(self._poll_sync)
+
+    async def run(self, deliver: Deliver, interval: float) -> None:
+        """Deliver other workers' notifications to this worker's connections until cancelled"""
+        while True:
+            try:
+                for message, user_ids in await self.poll():
+                    await deliver(message, user_ids)
+                    self.relayed += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error relaying notifications: {e}")
+            await asyncio.sleep(interval)
@@ -0,0 +1,148 @@
+"""
+Per-question statistics over response columns
+"""
+
+import math
+import statistics
+from collections import Counter
+from typing import Any, Dict, List, Tuple
+
+from app.models.survey import Survey, SurveyQuestion
+from app.services.response_columns import (
+    CATEGORY, MULTI, NUMERIC, SurveyColumns, count_codes, count_nonempty_rows, parse_number
+)
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - depends on the environment
+    np = None
+
+# Numeric questions whose answers are points on a scale, so their distribution is worth reporting
+SCALE_TYPES = {"scale", "rating", "nps"}
+# Net Promoter Score bands on a 0-10 scale
+PROMOTER_MIN = 9
+DETRACTOR_MAX = 6
+
+
+def is_nps_scale(question: SurveyQuestion) -> bool:
+    """Whether a question is answered on a 0-10 scale: an NPS question, or options numbered 0 to 10"""
+    if question.response_type == "nps":
+        return True
+    numbers = [n for n in (parse_number(option) for option in question.options or []) if n == n]
+    return bool(numbers) and min(numbers) == 0 and max(numbers) == 10
+
+
+def question_signature(survey: Survey) -> Tuple[Any, ...]:
+    """What per-question statistics depend on besides the responses"""
+    return tuple((q.id, q.question, q.response_type, tuple(q.options or ())) for q in survey.questions)
+
+
+def _number_label(value: float) -> str:
+    return str(int(value)) if value.is_integer() else str(value)
+
+
+def _scale_counts(question: SurveyQuestion, values: List[float], counts: List[int]) -> Dict[str, int]:
+    """Answers per scale point, labelled with the matching option where there is one"""
+    labels = {}
+    for option in question.options or []:
+        number = parse_number(option)
+        if number == number:
+            labels.setdefault(number, option)
+    result = {label: 0 for label in labels.values()}
+    for value, count in zip(values, counts):
+        result[labels.get(value, _number_label(value))] = count
+    return result
+
+
+def _numeric_stats(question: SurveyQuestion, values) -> Dict[str, Any]:
+    """Mean, median, population standard deviation and range; the distribution and NPS for scales"""
+    if np is not None:
+        present = values[~np.isnan(values)]
+        count = int(present.size)
+    else:
+        present = [v for v in values if v == v]
+        count = len(present)
+    if not count:
+        stats: Dict[str, Any] = {"mean": None, "median": None, "stddev": None, "min": None, "max": None}
+    elif np is not None:
+        stats = {
+            "mean": float(present.sum()) / count,
+            "median": float(np.median(present)),
+            "stddev": float(present.std()),
+            "min": float(present.min()),
+            "max": float(present.max()),
+        }
+    else:
+        stats = {
+            "mean": math.fsum(present) / count,
+            "median": float(statistics.median(present)),
+            "stddev": statistics.pstdev(present),
+            "min": min(present),
+            "max": max(present),
+        }
+
+    if question.response_type in SCALE_TYPES or question.options:
+        if np is not None:
+            points, counts = np.unique(present, return_counts=True)
+            points, counts = points.tolist(), counts.tolist()
+        else:
+            counted = sorted(Counter(present).items())
+            points, counts = [p for p, _ in counted], [c for _, c in counted]
+        stats["counts"] = _scale_counts(question, points, counts)
+
+    if is_nps_scale(question):
+        if np is not None:
+            promoters = int(np.count_nonzero(present >= PROMOTER_MIN))
+            detractors = int(np.count_nonzero(present <= DETRACTOR_MAX))
+        else:
+            promoters = sum(1 for v in present if v >= PROMOTER_MIN)
+            detractors = sum(1 for v in present if v <= DETRACTOR_MAX)
+        stats["nps"] = {
+            "score": 100.0 * (promoters - detractors) / count if count else None,
+            "promoters": promoters,
+            "passives": count - promoters - detractors,
+            "detractors": detractors,
+        }
+    return {"answered": count, **stats}
+
+
+def _option_counts(question: SurveyQuestion, dictionary: List[str], counts: List[int]) -> Dict[str, int]:
+    """Answers per option, the question's options first and then anything else respondents gave"""
+    result = {option: 0 for option in question.options or []}
+    for label, count in zip(dictionary, counts):
+        result[label] = result.get(label, 0) + count
+    return result
+
+
+def _question_stats(question: SurveyQuestion, columns: SurveyColumns) -> Dict[str, Any]:
+    stats: Dict[str, Any] = {"question": question.question, "response_type": question.response_type}
+    kind = columns.kind(question.id)
+    if kind == NUMERIC:
+        stats.update(_numeric_stats(question, columns.numeric(question.id)))
+    elif kind in (CATEGORY, MULTI):
+        dictionary = columns.dictionary(question.id)
+        counts = count_codes(columns.codes(question.id), len(dictionary))
+        if kind == CATEGORY:
+            stats["answered"] = sum(counts)
+        else:
+            stats["answered"] = count_nonempty_rows(columns.offsets(question.id))
+            stats["selections"] = sum(counts)
+        stats["counts"] = _option_counts(question, dictionary, counts)
+    else:
+        # Free text, or not answered yet
+        stats["answered"] = columns.unstored_answers(question.id)
+        if question.options:
+            stats["counts"] = {option: 0 for option in question.options}
+    stats["completion_rate"] = stats["answered"] / columns.rows if columns.rows else None
+    return stats
+
+
+def question_stats(survey: Survey, columns: SurveyColumns) -> Dict[str, Dict[str, Any]]:
+    """
+    Statistics for every question of a survey, by question ID: how many
+    responses answered it and the completion rate, answer counts per option,
+    and for numeric questions the mean, median, standard deviation and, on
+    0-10 scales, the Net Promoter Score. Each question's column is read once.
+    """
+    return {question.id: _question_stats(question, columns) for question in survey.questions}
+
@@ -0,0 +1,102 @@
+"""
+Per-user recency index of active chat threads
+"""
+
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sortedcontainers import SortedList
+
+IndexKey = Tuple[datetime, str]
+
+
+class RecencyIndex:
+    """
+    Active thread IDs kept sorted by (updated_at, thread_id), per user and
+    across all users.
+
+    Each ``SortedList`` is ordered oldest first, so an update is an
+    O(log n) remove and add rather than a shift of every later entry.
+    Pages are read backwards from the end, so listing the newest ``k``
+    threads after ``offset`` costs O(log n + k) instead of a filter and
+    full sort of every thread.
+    """
+
+    def __init__(self):
+        self._by_user: Dict[str, SortedList] = {}
+        self._all = SortedList()
+        # thread_id -> (user_id, indexed key), to find the old position on update
+        self._entries: Dict[str, Tuple[Optional[str], IndexKey]] = {}
+
+    def __len__(self) -> int:
+        return len(self._all)
+
+    def __contains__(self, thread_id: str) -> bool:
+        return thread_id in self._entries
+
+    def build(self, entries: Iterable[Tuple[str, Optional[str], datetime]]) -> None:
+        """Replace the index with (thread_id, user_id, updated_at) entries, sorting once"""
+        everything: List[IndexKey] = []
+        by_user: Dict[str, List[IndexKey]] = {}
+        self._entries = {}
+        for thread_id, user_id, updated_at in entries:
+            key = (updated_at, thread_id)
+            everything.append(key)
+            if user_id:
+                by_user.setdefault(user_id, []).append(key)
+            self._entries[thread_id] = (user_id, key)
+        # Linear when the entries already come in recency order, as snapshots store them
+        self._all = SortedList(everything)
+        self._by_user = {user_id: SortedList(keys) for user_id, keys in by_user.items()}
+
+    def upsert(self, thread_id: str, user_id: Optional[str], updated_at: datetime) -> None:
+        """Insert a thread, or move it to its new updated_at position"""
+        self.remove(thread_id)
+        key = (updated_at, thread_id)
+        self._all.add(key)
+        if user_id:
+            self._by_user.setdefault(user_id, SortedList()).add(key)
+        self._entries[thread_id] = (user_id, key)
+
+    def remove(self, thread_id: str) -> None:
+        """Drop a thread from the index, if present"""
+        entry = self._entries.pop(thread_id, None)
+        if entry is None:
+            return
+        user_id, key = entry
+        self._all.discard(key)
+        if user_id:
+            keys = self._by_user[user_id]
+            keys.discard(key)
+            if not keys:
+                del self._by_user[user_id]
+
+    def count(self, user_id: Optional[str] = None) -> int:
+        """Number of active threads for a user, or for everyone"""
+        return len(self._keys_for(user_id))
+
+    def page(self, user_id: Optional[str] = None, offset: int = 0, limit: int = 50) -> List[str]:
+        """Thread IDs, most recently updated first"""
+        return [thread_id for _, thread_id in self.page_keys(user_id, offset=offset, limit=limit)]
+
+    def page_keys(
+        self,
+        user_id: Optional[str] = None,
+        before: Optional[IndexKey] = None,
+        offset: int = 0,
+        limit: int = 50,
+    ) -> List[IndexKey]:
+        """(updated_at, thread_id) keys, most recently updated first, starting below ``before``"""
+        keys = self._keys_for(user_id)
+        end = len(keys) if before is None else keys.bisect_left(before)
+        end = max(end - max(offset, 0), 0)
+        start = max(end - max(limit, 0), 0)
+        return list(keys.islice(start, end, reverse=True))
+
+    def _keys_for(self, user_id: Optional[str]) -> SortedList:
+        if user_id:
+            return self._by_user.get(user_id, _EMPTY)
+        return self._all
+
+
+_EMPTY = SortedList()
@@ -0,0 +1,485 @@
+"""
+Columnar, memory-mapped survey responses for analytics
+"""
+
+import math
+import mmap
+import re
+import shutil
+import threading
+from array import array
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from app.core.pagination import as_datetime
+from app.core.serialization import dumps, loads
+from app.services.chat_storage import to_epoch_micros
+from app.services.response_segments import storage_key
+from app.services.write_behind import atomic_write
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - depends on the environment
+    np = None
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - depends on the platform
+    fcntl = None
+
+NUMERIC = "numeric"
+CATEGORY = "category"
+MULTI = "multi"
+TIMESTAMP = "timestamp"
+
+# Files per column kind and their array typecodes
+TYPECODES = {
+    NUMERIC: {"values": "d"},
+    CATEGORY: {"codes": "i"},
+    MULTI: {"offsets": "q", "codes": "i"},
+    TIMESTAMP: {"values": "q"},
+}
+# The file holding one entry per row
+PRIMARY = {NUMERIC: "values", CATEGORY: "codes", MULTI: "offsets", TIMESTAMP: "values"}
+
+# response_type -> column kind; free text is not stored, anything unknown is inferred from its first answer
+COLUMN_KINDS = {
+    "scale": NUMERIC,
+    "rating": NUMERIC,
+    "number": NUMERIC,
+    "numeric": NUMERIC,
+    "nps": NUMERIC,
+    "multiple_choice": CATEGORY,
+    "yes_no": CATEGORY,
+    "dropdown": CATEGORY,
+    "multiple_select": MULTI,
+    "text": None,
+}
+
+# Bumped when columns.json gains fields or answers are encoded differently; older columns are rebuilt
+FORMAT = 3
+
+MISSING_CODE = -1
+MISSING = {NUMERIC: math.nan, CATEGORY: MISSING_CODE}
+SUBMITTED_AT = "submitted_at"
+
+_LEADING_NUMBER = re.compile(r"\s*[-+]?\d+(?:\.\d+)?")
+
+
+def parse_number(value: Any) -> float:
+    """Numeric value of an answer: numbers as-is, labels like "4 - Agree" by their leading number"""
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        match = _LEADING_NUMBER.match(value)
+        if match:
+            return float(match.group())
+    return math.nan
+
+
+def _empty(typecode: str):
+    return np.empty(0, dtype=typecode) if np is not None else memoryview(array(typecode))
+
+
+def _new_meta() -> Dict[str, Any]:
+    return {"format": FORMAT, "rows": 0, "position": 0, "columns": {}, "unstored": {}}
+
+
+def infer_kind(value: Any) -> Optional[str]:
+    if isinstance(value, (int, float)):
+        return NUMERIC
+    if isinstance(value, list):
+        return MULTI
+    if isinstance(value, str):
+        return CATEGORY
+    return None
+
+
+class SurveyColumns:
+    """
+    One survey's responses as typed column files.
+
+    Numeric and scale answers are float64 with NaN for missing, choice
+    answers are int32 codes into a per-column dictionary (-1 for missing),
+    and multi-select answers are int32 codes with an int64 end offset per
+    row. ``submitted_at`` is int64 epoch microseconds. Files are plain
+    arrays, appended by ``extend`` and memory-mapped for reads, so
+    aggregating a column touches no per-row Python objects when numpy is
+    installed and only transient floats or ints when it is not.
+
+    ``columns.json`` holds the row count, the source position already
+    consumed, each column's kind and dictionary, and how many answers each
+    question not stored as a column (free text) has had. It is replaced
+    after the column files are appended, so bytes past ``rows`` left by a
+    crash are truncated on open.
+
+    Readers and writers hold ``locked()``, which also takes an exclusive
+    ``flock`` on a sibling lock file and picks up columns another worker
+    process has appended or reset since this one last looked. Opening
+    takes the same ``flock``, since it may truncate or reset the files.
+    """
+
+    def __init__(self, directory: Path):
+        self.directory = directory
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.meta_file = directory / "columns.json"
+        self.lock_file = directory.with_name(f"{directory.name}.lock")
+        self.lock = threading.Lock()
+        self.meta: Dict[str, Any] = _new_meta()
+        self._codes: Dict[str, Dict[str, int]] = {}
+        self._maps: Dict[str, Any] = {}
+        with self._flock():
+            self._stamp = self._meta_stamp()
+            if self._stamp is not None:
+                self.meta = loads(self.meta_file.read_bytes())
+            if self.meta.get("format") != FORMAT:
+                # Written by an older version; the next extend rebuilds from the start of the source
+                self.reset()
+            self._load()
+
+    def _meta_stamp(self) -> Optional[Tuple[int, int, int]]:
+        try:
+            stat = self.meta_file.stat()
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    @contextmanager
+    def _flock(self) -> Iterator[None]:
+        """Exclusive ``flock`` on the lock file, held until the block exits"""
+        with open(self.lock_file, "a+b") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            yield
+
+    @contextmanager
+    def locked(self) -> Iterator["SurveyColumns"]:
+        """Exclusive access across threads and processes, with ``meta`` brought up to date"""
+        with self.lock, self._flock():
+            stamp = self._meta_stamp()
+            if stamp != self._stamp:
+                # Another process extended or reset the columns
+                self.meta = loads(self.meta_file.read_bytes()) if stamp else _new_meta()
+                self._stamp = stamp
+                self._maps = {}
+                self._load()
+            yield self
+
+    def _load(self) -> None:
+        """Rebuild the dictionary lookups from ``meta`` and drop bytes it does not cover"""
+        self._codes = {
+            name: {value: code for code, value in enumerate(column.get("dictionary", []))}
+            for name, column in self.meta["columns"].items()
+        }
+        self._truncate_to_rows()
+
+    @property
+    def rows(self) -> int:
+        return self.meta["rows"]
+
+    @property
+    def position(self) -> int:
+        return self.meta["position"]
+
+    def kind(self, name: str) -> Optional[str]:
+        column = self.meta["columns"].get(name)
+        return column["kind"] if column else None
+
+    def dictionary(self, name: str) -> List[str]:
+        return self.meta["columns"][name].get("dictionary", [])
+
+    def question_ids(self) -> List[str]:
+        return [name for name in self.meta["columns"] if name != SUBMITTED_AT]
+
+    def unstored_answers(self, name: str) -> int:
+        """Answers to a question that is not stored as a column, such as free text"""
+        return self.meta["unstored"].get(name, 0)
+
+    def _files(self, name: str) -> Dict[str, Path]:
+        """Files holding one column, by part"""
+        column = self.meta["columns"][name]
+        stem = self.directory / column["file"]
+        return {part: stem.with_suffix(f".{part}") for part in TYPECODES[column["kind"]]}
+
+    def _truncate_to_rows(self) -> None:
+        """Cut column files back to ``meta``; the caller holds the ``flock``"""
+        for name, column in self.meta["columns"].items():
+            for part, path in self._files(name).items():
+                length = column["codes"] if part == "codes" and column["kind"] == MULTI else self.rows
+                size = length * array(TYPECODES[column["kind"]][part]).itemsize
+                if path.exists() and path.stat().st_size > size:
+                    with open(path, "r+b") as f:
+                        f.truncate(size)
+
+    def reset(self) -> None:
+        """Drop every column so the next extend rebuilds from the start of the source; the caller holds ``locked()``"""
+        self._maps = {}
+        shutil.rmtree(self.directory, ignore_errors=True)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.meta = _new_meta()
+        self._stamp = None
+        self._codes = {}
+
+    def _add_column(self, name: str, kind: str, options: Sequence[str] = ()) -> None:
+        column: Dict[str, Any] = {"kind": kind, "file": f"c{len(self.meta['columns'])}"}
+        if options:
+            column["options"] = list(options)
+        if kind in (CATEGORY, MULTI):
+            # A question's options take the first codes, in order, whether or not anyone picks them
+            column["dictionary"] = list(dict.fromkeys(options))
+            self._codes[name] = {label: code for code, label in enumerate(column["dictionary"])}
+        if kind == MULTI:
+            column["codes"] = 0
+        self.meta["columns"][name] = column
+
+    def encoded_with(self, decoders: Dict[str, Any]) -> bool:
+        """Whether every stored column was encoded with the options its question has in ``decoders``"""
+        for name, column in self.meta["columns"].items():
+            decoder = decoders.get(name)
+            if column.get("options", []) != (list(decoder.options) if decoder is not None else []):
+                return False
+        return True
+
+    def _code(self, name: str, value: Any, decoder: Any = None) -> int:
+        codes = self._codes[name]
+        if decoder is not None:
+            key = decoder.label(value)
+        else:
+            key = value if isinstance(value, str) else str(value)
+        code = codes.get(key)
+        if code is None:
+            code = codes[key] = len(codes)
+            self.meta["columns"][name]["dictionary"].append(key)
+        return code
+
+    def extend(
+        self,
+        records: Iterable[Dict[str, Any]],
+        question_types: Dict[str, str],
+        position: int,
+        decoders: Optional[Dict[str, Any]] = None,
+    ) -> int:
+        """
+        Append responses to the columns and advance the source position;
+        returns rows added. ``decoders`` (AnswerDecoder by question ID) map
+        answers to their question's options as they are encoded.
+        """
+        committed = dumps(self.meta)
+        try:
+            return self._extend(records, question_types, position, decoders or {})
+        except BaseException:
+            # Forget dictionary codes and columns the failed batch added in memory
+            self.meta = loads(committed)
+            self._load()
+            raise
+
+    def _extend(
+        self, records: Iterable[Dict[str, Any]], question_types: Dict[str, str], position: int, decoders: Dict[str, Any]
+    ) -> int:
+        start = row = self.rows
+        if SUBMITTED_AT not in self.meta["columns"]:
+            self._add_column(SUBMITTED_AT, TIMESTAMP)
+        existing = set(self.meta["columns"])
+        # Values to append to each column's primary file, and the length already on disk
+        pending: Dict[str, array] = {}
+        pending_codes: Dict[str, array] = {}
+        on_disk: Dict[str, int] = {}
+        answered: Dict[str, int] = {}
+        unstored: Dict[str, int] = {}
+
+        def buffer(name: str) -> array:
+            values = pending.get(name)
+            if values is None:
+                kind = self.kind(name)
+                values = pending[name] = array(TYPECODES[kind][PRIMARY[kind]])
+                on_disk[name] = start if name in existing else 0
+                if kind == MULTI:
+                    pending_codes[name] = array("i")
+            return values
+
+        def pad(name: str, upto: int) -> None:
+            """Fill rows before ``upto`` that had no answer; new columns are backfilled from row 0"""
+            values = buffer(name)
+            gap = upto - on_disk[name] - len(values)
+            if gap > 0:
+                kind = self.kind(name)
+                if kind == MULTI:
+                    fill = values[-1] if values else self.meta["columns"][name]["codes"]
+                else:
+                    fill = MISSING[kind]
+                values.extend([fill] * gap)
+
+        timestamps = buffer(SUBMITTED_AT)
+        for record in records:
+            timestamps.append(to_epoch_micros(as_datetime(record["submitted_at"])))
+            for name, value in (record.get("responses") or {}).items():
+                if value is None or value == "" or value == [] or name == SUBMITTED_AT:
+                    continue
+                kind = self.kind(name)
+                if kind is None:
+                    response_type = question_types.get(name)
+                    kind = COLUMN_KINDS[response_type] if response_type in COLUMN_KINDS else infer_kind(value)
+                    if kind is None:
+                        unstored[name] = unstored.get(name, 0) + 1
+                        continue
+                    decoder = decoders.get(name)
+                    self._add_column(name, kind, decoder.options if decoder is not None else ())
+
+                pad(name, row)
+                values = pending[name]
+                decoder = decoders.get(name)
+                if kind == NUMERIC:
+                    number = decoder.value(value) if decoder is not None else parse_number(value)
+                    values.append(number)
+                    if number == number:
+                        answered[name] = answered.get(name, 0) + 1
+                elif kind == CATEGORY:
+                    values.append(self._code(name, value, decoder))
+                else:
+                    codes = pending_codes[name]
+                    codes.extend(self._code(name, v, decoder) for v in (value if isinstance(value, list) else [value]))
+                    values.append(self.meta["columns"][name]["codes"] + len(codes))
+            row += 1
+
+        if row == start:
+            return 0
+
+        for name in self.meta["columns"]:
+            pad(name, row)
+            files = self._files(name)
+            with open(files[PRIMARY[self.kind(name)]], "ab") as f:
+                pending[name].tofile(f)
+            if name in pending_codes:
+                with open(files["codes"], "ab") as f:
+                    pending_codes[name].tofile(f)
+                self.meta["columns"][name]["codes"] += len(pending_codes[name])
+
+        for name, count in answered.items():
+            column = self.meta["columns"][name]
+            column["answered"] = column.get("answered", 0) + count
+        for name, count in unstored.items():
+            self.meta["unstored"][name] = self.meta["unstored"].get(name, 0) + count
+        self.meta["rows"] = row
+        self.meta["position"] = position
+        atomic_write(self.meta_file, dumps(self.meta))
+        self._stamp = self._meta_stamp()
+        self._maps = {}
+        return row - start
+
+    def _view(self, name: str, part: str, length: int):
+        """Read-only view of a column file: a numpy array or a typed memoryview"""
+        key = f"{name}/{part}"
+        view = self._maps.get(key)
+        if view is None:
+            typecode = TYPECODES[self.kind(name)][part]
+            if length == 0:
+                view = _empty(typecode)
+            else:
+                with open(self._files(name)[part], "rb") as f:
+                    mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                if np is not None:
+                    view = np.frombuffer(mapped, dtype=typecode, count=length)
+                else:
+                    view = memoryview(mapped)[:length * array(typecode).itemsize].cast(typecode)
+            self._maps[key] = view
+        return view
+
+    def numeric(self, name: str):
+        """float64 answers, NaN where missing"""
+        return self._view(name, "values", self.rows)
+
+    def codes(self, name: str):
+        """int32 dictionary codes; -1 where missing for single-choice columns"""
+        length = self.meta["columns"][name]["codes"] if self.kind(name) == MULTI else self.rows
+        return self._view(name, "codes", length)
+
+    def offsets(self, name: str):
+        """int64 end offset into ``codes`` for each row of a multi-select column"""
+        return self._view(name, "offsets", self.rows)
+
+    def timestamps(self):
+        """int64 epoch microseconds of each row's submission"""
+        if SUBMITTED_AT not in self.meta["columns"]:
+            return _empty("q")
+        return self._view(SUBMITTED_AT, "values", self.rows)
+
+    def aggregate(self, name: str) -> Dict[str, Any]:
+        """Summary of one question's answers"""
+        kind = self.kind(name)
+        if kind == NUMERIC:
+            column = self.meta["columns"][name]
+            return {"kind": kind, **summarize_numeric(self.numeric(name), complete=column.get("answered") == self.rows)}
+        if kind == CATEGORY:
+            counts = count_codes(self.codes(name), len(self.dictionary(name)))
+            return {
+                "kind": kind,
+                "count": sum(counts),
+                "counts": dict(zip(self.dictionary(name), counts)),
+            }
+        if kind == MULTI:
+            counts = count_codes(self.codes(name), len(self.dictionary(name)))
+            return {
+                "kind": kind,
+                "count": count_nonempty_rows(self.offsets(name)),
+                "counts": dict(zip(self.dictionary(name), counts)),
+            }
+        return {}
+
+    def aggregate_all(self) -> Dict[str, Dict[str, Any]]:
+        return {name: self.aggregate(name) for name in self.question_ids()}
+
+
+def summarize_numeric(values, complete: bool = False) -> Dict[str, Any]:
+    """count, sum, mean, min and max of a float column, ignoring NaN; ``complete`` says there is none"""
+    if np is not None:
+        present = values[~np.isnan(values)]
+        count = int(present.size)
+        if not count:
+            return {"count": 0, "sum": 0.0, "mean": None, "min": None, "max": None}
+        total = float(present.sum())
+        return {"count": count, "sum": total, "mean": total / count, "min": float(present.min()), "max": float(present.max())}
+
+    present = values if complete else [v for v in values if v == v]
+    if not len(present):
+        return {"count": 0, "sum": 0.0, "mean": None, "min": None, "max": None}
+    total = math.fsum(present)
+    return {"count": len(present), "sum": total, "mean": total / len(present), "min": min(present), "max": max(present)}
+
+
+def count_codes(codes, size: int) -> List[int]:
+    """Occurrences of each dictionary code, ignoring missing"""
+    if np is not None:
+        present = codes[codes >= 0]
+        return np.bincount(present, minlength=size)[:size].tolist()
+    counted = Counter(codes)
+    return [counted.get(code, 0) for code in range(size)]
+
+
+def count_nonempty_rows(offsets: Sequence[int]) -> int:
+    """Rows of a multi-select column with at least one answer"""
+    if np is not None:
+        return int(np.count_nonzero(np.diff(offsets, prepend=0)))
+    previous = 0
+    count = 0
+    for end in offsets:
+        count += end != previous
+        previous = end
+    return count
+
+
+class ResponseColumnStore:
+    """Column sets for every survey, one directory each, opened on demand"""
+
+    def __init__(self, directory: Path):
+        self.directory = directory
+        self._surveys: Dict[str, SurveyColumns] = {}
+        self._lock = threading.Lock()
+
+    def survey(self, survey_id: str) -> SurveyColumns:
+        with self._lock:
+            columns = self._surveys.get(survey_id)
+            if columns is None:
+                columns = self._surveys[survey_id] = SurveyColumns(self.directory / storage_key(survey_id))
+            return columns
@@ -0,0 +1,171 @@
+"""
+Streaming export of survey responses as CSV, NDJSON or Parquet
+"""
+
+import csv
+import io
+import math
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+
+from app.core.pagination import as_datetime
+from app.core.serialization import dumps, dumps_str
+from app.models.survey import Survey
+from app.services.response_columns import COLUMN_KINDS, MULTI, NUMERIC, parse_number
+from app.services.response_import import MULTI_SEPARATOR
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - depends on the environment
+    pa = None
+    pq = None
+
+EXPORT_FORMATS = ("csv", "ndjson", "parquet")
+EXPORT_MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+# Leading columns of every CSV and Parquet export; the CSV round-trips through the importer
+RECORD_COLUMNS = ("id", "user_id", "submitted_at")
+
+Chunks = Iterable[List[Dict[str, Any]]]
+
+
+def parquet_available() -> bool:
+    return pa is not None
+
+
+def export_columns(survey: Survey) -> List[Tuple[str, str]]:
+    """(column, kind) for each exported answer column: survey classifiers, then question IDs"""
+    columns: Dict[str, str] = {}
+    for classifier in survey.classifiers:
+        name = classifier.get("name") or classifier.get("id")
+        if name and name not in RECORD_COLUMNS:
+            columns.setdefault(str(name), "classifier")
+    for question in survey.questions:
+        columns[question.id] = COLUMN_KINDS.get(question.response_type) or "text"
+    return list(columns.items())
+
+
+def _cell(value: Any) -> Any:
+    """CSV cell text for an answer"""
+    if value is None:
+        return ""
+    if isinstance(value, list):
+        return MULTI_SEPARATOR.join(str(v) for v in value)
+    if isinstance(value, dict):
+        return dumps_str(value)
+    return value
+
+
+def _timestamp_text(value: Any) -> str:
+    # SQLite stores fixed-width microseconds; normalize so both backends export the same text
+    return as_datetime(value).isoformat()
+
+
+def export_csv(survey: Survey, chunks: Chunks) -> Iterator[bytes]:
+    """A header row, then one encoded block of rows per chunk"""
+    columns = [name for name, _ in export_columns(survey)]
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([*RECORD_COLUMNS, *columns])
+    for chunk in chunks:
+        for record in chunk:
+            answers = record["responses"]
+            writer.writerow([
+                record["id"], record["user_id"], _timestamp_text(record["submitted_at"]),
+                *(_cell(answers.get(name)) for name in columns)
+            ])
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def export_ndjson(survey: Survey, chunks: Chunks) -> Iterator[bytes]:
+    """Each stored response as one JSON line, answers included as submitted"""
+    for chunk in chunks:
+        yield b"".join(
+            dumps({
+                "id": record["id"],
+                "user_id": record["user_id"],
+                "submitted_at": _timestamp_text(record["submitted_at"]),
+                "responses": record["responses"],
+            }) + b"\n"
+            for record in chunk
+        )
+
+
+class _Drain(io.RawIOBase):
+    """Write-only sink whose bytes are handed off as they are produced"""
+
+    def __init__(self):
+        self.parts: List[bytes] = []
+        self.size = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self.parts.append(bytes(data))
+        self.size += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.size
+
+    def take(self) -> bytes:
+        data = b"".join(self.parts)
+        self.parts.clear()
+        return data
+
+
+def _parquet_value(kind: str, value: Any) -> Any:
+    if value is None:
+        return None
+    if kind == NUMERIC:
+        number = value if isinstance(value, (int, float)) else parse_number(value)
+        return None if math.isnan(number) else float(number)
+    if kind == MULTI:
+        return [str(v) for v in value] if isinstance(value, list) else [str(value)]
+    return str(_cell(value))
+
+
+def export_parquet(survey: Survey, chunks: Chunks) -> Iterator[bytes]:
+    """One Parquet row group per chunk, typed by question kind, yielded as it is written"""
+    columns = export_columns(survey)
+    types = {NUMERIC: pa.float64(), MULTI: pa.list_(pa.string())}
+    schema = pa.schema(
+        [("id", pa.string()), ("user_id", pa.string()), ("submitted_at", pa.timestamp("us"))]
+        + [(name, types.get(kind, pa.string())) for name, kind in columns]
+    )
+    drain = _Drain()
+    writer = pq.ParquetWriter(pa.PythonFile(drain, mode="w"), schema)
+    try:
+        for chunk in chunks:
+            arrays = {
+                "id": [r["id"] for r in chunk],
+                "user_id": [r["user_id"] for r in chunk],
+                "submitted_at": [as_datetime(r["submitted_at"]) for r in chunk],
+            }
+            for name, kind in columns:
+                arrays[name] = [_parquet_value(kind, r["responses"].get(name)) for r in chunk]
+            writer.write_table(pa.table(arrays, schema=schema))
+            yield drain.take()
+    finally:
+        writer.close()
+    yield drain.take()
+
+
+EXPORTERS = {"csv": export_csv, "ndjson": export_ndjson, "parquet": export_parquet}
+
+
+def export_responses(survey: Survey, chunks: Chunks, fmt: str) -> Iterator[bytes]:
+    """Encoded export of a survey's responses, produced one chunk of responses at a time"""
+    if fmt not in EXPORTERS:
+        raise ValueError(f"Unsupported format {fmt!r}; expected one of {', '.join(EXPORT_FORMATS)}")
+    if fmt == "parquet" and not parquet_available():
+        raise ValueError("Parquet export requires pyarrow (pip install pyarrow)")
+    return EXPORTERS[fmt](survey, chunks)
@@ -0,0 +1,227 @@
+"""
+Bulk import of survey responses from CSV or NDJSON uploads
+"""
+
+import csv
+import io
+import math
+from datetime import datetime
+from typing import Any, BinaryIO, Callable, Dict, Iterator, List, Optional, Tuple
+
+from app.core.ids import keyed_id, new_id
+from app.core.serialization import loads
+from app.models.survey import ResponseImportReport, Survey, SurveyQuestion
+from app.services.response_columns import COLUMN_KINDS, CATEGORY, MULTI, NUMERIC, parse_number
+
+FORMATS = ("csv", "ndjson")
+FORMAT_SUFFIXES = {".csv": "csv", ".ndjson": "ndjson", ".jsonl": "ndjson"}
+FORMAT_CONTENT_TYPES = {"text/csv": "csv", "application/x-ndjson": "ndjson", "application/jsonl": "ndjson"}
+
+# CSV cells of multiple_select questions list their choices separated by this
+MULTI_SEPARATOR = ";"
+# CSV columns that describe the response rather than answer a question
+RESERVED_COLUMNS = ("id", "user_id", "submitted_at")
+MAX_REPORTED_ERRORS = 100
+
+RawRow = Dict[str, Any]
+
+
+class RowError(ValueError):
+    """Raised for an upload row that cannot be imported"""
+
+
+def detect_format(filename: Optional[str], content_type: Optional[str]) -> Optional[str]:
+    """Upload format from the file extension, then the content type"""
+    if filename:
+        for suffix, fmt in FORMAT_SUFFIXES.items():
+            if filename.lower().endswith(suffix):
+                return fmt
+    if content_type:
+        return FORMAT_CONTENT_TYPES.get(content_type.split(";")[0].strip().lower())
+    return None
+
+
+def iter_csv_rows(file: BinaryIO) -> Iterator[Tuple[int, Any]]:
+    """(row number, raw row or RowError) for each data row of a CSV upload with a header"""
+    text = io.TextIOWrapper(file, encoding="utf-8-sig", newline="")
+    reader = csv.DictReader(text)
+    for number, row in enumerate(reader, start=2):
+        if None in row:
+            yield number, RowError("Row has more cells than the header")
+            continue
+        yield number, {
+            "id": row.get("id") or None,
+            "user_id": row.get("user_id"),
+            "submitted_at": row.get("submitted_at") or None,
+            "responses": {k: v for k, v in row.items() if k not in RESERVED_COLUMNS and v not in ("", None)},
+        }
+
+
+def iter_ndjson_rows(file: BinaryIO) -> Iterator[Tuple[int, Any]]:
+    """(line number, raw row or RowError) for each non-blank line of an NDJSON upload"""
+    for number, line in enumerate(file, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = loads(line)
+        except ValueError as e:
+            yield number, RowError(f"Invalid JSON: {e}")
+            continue
+        if not isinstance(row, dict) or not isinstance(row.get("responses", {}), dict):
+            yield number, RowError("Expected an object with a responses object")
+            continue
+        yield number, row
+
+
+def _answer_check(question: SurveyQuestion) -> Callable[[Any], Any]:
+    """Function that validates and normalizes answers to one question, raising RowError"""
+    question_id = question.id
+    kind = COLUMN_KINDS.get(question.response_type, "other")
+    options = frozenset(question.options or ())
+
+    if kind == NUMERIC:
+        def check(value: Any) -> Any:
+            if type(value) in (int, float) or (isinstance(value, str) and value in options):
+                return value
+            try:
+                return int(value)
+            except (TypeError, ValueError):
+                number = parse_number(value)
+            if math.isnan(number):
+                raise RowError(f"{question_id}: {value!r} is not a number")
+            return int(number) if number.is_integer() else number
+        return check
+
+    if kind == CATEGORY and question.response_type == "yes_no" and not options:
+        def check(value: Any) -> Any:
+            normalized = value.strip().lower() if isinstance(value, str) else value
+            if normalized not in ("yes", "no"):
+                raise RowError(f"{question_id}: expected yes or no, got {value!r}")
+            return normalized
+        return check
+
+    if kind == CATEGORY and options:
+        def check(value: Any) -> Any:
+            if not isinstance(value, str) or value not in options:
+                raise RowError(f"{question_id}: {value!r} is not one of the options")
+            return value
+        return check
+
+    if kind == MULTI:
+        def check(value: Any) -> Any:
+            if isinstance(value, str):
+                value = [v.strip() for v in value.split(MULTI_SEPARATOR) if v.strip()]
+            if not isinstance(value, list):
+                raise RowError(f"{question_id}: expected a list of choices")
+            for choice in value:
+                if options and (not isinstance(choice, str) or choice not in options):
+                    raise RowError(f"{question_id}: {choice!r} is not one of the options")
+            return value
+        return check
+
+    return _passthrough
+
+
+def _passthrough(value: Any) -> Any:
+    return value
+
+
+class ResponseValidator:
+    """Checks raw upload rows against a survey's questions and builds stored response records"""
+
+    def __init__(self, survey: Survey):
+        self.survey = survey
+        # Classifier values (department, tenure, ...) ride along with the answers unchecked
+        self.checks = {str(c["name"]): _passthrough for c in survey.classifiers if c.get("name")}
+        self.checks.update({q.id: _answer_check(q) for q in survey.questions})
+        self.mandatory = [q.id for q in survey.questions if q.mandatory]
+
+    def _timestamp(self, submitted_at: Any) -> datetime:
+        if submitted_at is None:
+            return datetime.now()
+        try:
+            timestamp = datetime.fromisoformat(submitted_at) if isinstance(submitted_at, str) else None
+        except ValueError:
+            timestamp = None
+        if timestamp is None:
+            raise RowError(f"Invalid submitted_at {submitted_at!r}")
+        if timestamp.tzinfo is not None:
+            # Stored timestamps are naive local time, like datetime.now()
+            timestamp = timestamp.astimezone().replace(tzinfo=None)
+        return timestamp
+
+    def validate(self, row: RawRow) -> Dict[str, Any]:
+        """The record to store for a raw row, shaped like SurveyResponse.model_dump()"""
+        user_id = row.get("user_id")
+        if not user_id or not isinstance(user_id, str):
+            raise RowError("Missing user_id")
+        submitted_at = row.get("submitted_at")
+        timestamp = self._timestamp(submitted_at)
+
+        answers = {}
+        for question_id, value in (row.get("responses") or {}).items():
+            if value is None or value == "" or value == []:
+                continue
+            check = self.checks.get(question_id)
+            if check is None:
+                raise RowError(f"Unknown question {question_id!r}")
+            answers[question_id] = check(value)
+        for question_id in self.mandatory:
+            if question_id not in answers:
+                raise RowError(f"Missing mandatory answer to {question_id!r}")
+
+        response_id = row.get("id")
+        if not response_id:
+            # Re-importing the same export maps each row to the same ID, so it counts as a duplicate
+            if submitted_at:
+                response_id = keyed_id("response", self.survey.id, user_id, str(submitted_at))
+            else:
+                response_id = new_id("response")
+
+        return {
+            "id": str(response_id),
+            "survey_id": self.survey.id,
+            "user_id": user_id,
+            "responses": answers,
+            "submitted_at": timestamp,
+        }
+
+
+class ResponseImporter:
+    """
+    Reads an upload in fixed-size batches of validated responses.
+
+    Only one batch is held at a time, so memory stays bounded by the batch
+    size however large the upload is. ``next_batch`` does blocking reads and
+    is meant to run in a worker thread; rejected rows are counted in
+    ``report`` as they are read.
+    """
+
+    def __init__(self, survey: Survey, file: BinaryIO, fmt: str):
+        if fmt not in FORMATS:
+            raise ValueError(f"Unsupported format {fmt!r}; expected one of {', '.join(FORMATS)}")
+        self.validator = ResponseValidator(survey)
+        self.rows = iter_csv_rows(file) if fmt == "csv" else iter_ndjson_rows(file)
+        self.report = ResponseImportReport(survey_id=survey.id, format=fmt)
+
+    def reject(self, number: int, error: Exception) -> None:
+        self.report.rejected += 1
+        if len(self.report.errors) < MAX_REPORTED_ERRORS:
+            self.report.errors.append({"row": number, "error": str(error)})
+
+    def next_batch(self, size: int) -> List[Dict[str, Any]]:
+        """Up to ``size`` valid response records; an empty list once the upload is exhausted"""
+        batch: List[Dict[str, Any]] = []
+        for number, row in self.rows:
+            self.report.rows += 1
+            if isinstance(row, RowError):
+                self.reject(number, row)
+                continue
+            try:
+                batch.append(self.validator.validate(row))
+            except RowError as e:
+                self.reject(number, e)
+                continue
+            if len(batch) >= size:
+                break
+        return batch
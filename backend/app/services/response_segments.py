@@ -0,0 +1,248 @@
+"""
+Append-only per-survey response segments for the JSON file backend
+"""
+
+import hashlib
+import logging
+import re
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from app.core.serialization import dumps, loads
+from app.services.write_behind import atomic_write
+
+logger = logging.getLogger(__name__)
+
+SEGMENT_SUFFIX = ".ndjson"
+ID_PREFIX = b'{"id":"'
+
+
+class SegmentOffsetError(ValueError):
+    """Raised when a read starts at an offset that is not the start of a stored response"""
+
+
+def storage_key(survey_id: str) -> str:
+    """Filesystem-safe, collision-free name for a survey's files"""
+    safe = re.sub(r"[^A-Za-z0-9_.-]", "_", survey_id)[:64]
+    digest = hashlib.sha1(survey_id.encode()).hexdigest()[:8]
+    return f"{safe}-{digest}"
+
+
+def segment_name(survey_id: str) -> str:
+    return f"{storage_key(survey_id)}{SEGMENT_SUFFIX}"
+
+
+class ResponseSegmentStore:
+    """
+    Survey responses stored as one NDJSON segment per survey.
+
+    Submitting a response appends one line to that survey's segment, so the
+    cost no longer grows with the number of responses already stored.
+    ``manifest.json`` records each survey's segment, response count and
+    committed byte length. The store only writes to the OS; the caller
+    registers appended segments with the write-behind flusher, which
+    fsyncs them once per batch before rewriting the manifest.
+
+    On open, lines past a segment's committed length are recovered if they
+    are complete and a torn trailing line is truncated, so a crash between
+    an append and the next manifest flush loses nothing that reached disk.
+    """
+
+    def __init__(self, directory: Path):
+        self.directory = directory
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.manifest_file = directory / "manifest.json"
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        if self.manifest_file.exists():
+            self._entries = loads(self.manifest_file.read_bytes())
+        self.recovered = self._recover()
+
+    def __contains__(self, survey_id: str) -> bool:
+        return survey_id in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def survey_ids(self) -> List[str]:
+        return list(self._entries)
+
+    def count(self, survey_id: str) -> int:
+        """Number of responses stored for a survey"""
+        entry = self._entries.get(survey_id)
+        return entry["count"] if entry else 0
+
+    def end(self, survey_id: str) -> int:
+        """Byte offset after a survey's last stored response, the position ``read_since`` continues from"""
+        entry = self._entries.get(survey_id)
+        return entry["bytes"] if entry else 0
+
+    def append(self, survey_id: str, record: Dict[str, Any]) -> Path:
+        """Append one response to its survey's segment; returns the segment to fsync"""
+        return self.append_many(survey_id, [record])
+
+    def append_many(self, survey_id: str, records: List[Dict[str, Any]]) -> Path:
+        """Append a batch of responses with a single write; returns the segment to fsync"""
+        data = b"".join(dumps(record) + b"\n" for record in records)
+        entry = self._entries.get(survey_id)
+        if entry is None:
+            entry = self._entries[survey_id] = {"file": segment_name(survey_id), "count": 0, "bytes": 0}
+        path = self.directory / entry["file"]
+        with open(path, "ab") as f:
+            f.write(data)
+        entry["count"] += len(records)
+        entry["bytes"] += len(data)
+        return path
+
+    def response_ids(self, survey_id: str, offset: int = 0) -> Tuple[Set[str], int]:
+        """IDs of responses stored after byte ``offset`` of a survey's segment, and the offset they end at"""
+        entry = self._entries.get(survey_id)
+        if entry is None:
+            return set(), 0
+        ids = set()
+        end = entry["bytes"]
+        with open(self.directory / entry["file"], "rb") as f:
+            f.seek(offset)
+            data = f.read(end - offset)
+        for line in data.splitlines():
+            # Records are written with "id" first; anything else is parsed in full
+            if line.startswith(ID_PREFIX):
+                close = line.find(b'"', len(ID_PREFIX))
+                if close > 0 and b"\\" not in line[len(ID_PREFIX):close]:
+                    ids.add(line[len(ID_PREFIX):close].decode())
+                    continue
+            ids.add(loads(line)["id"])
+        return ids, end
+
+    def read(self, survey_id: str) -> List[Dict[str, Any]]:
+        """All responses for one survey, in submission order"""
+        return self.read_since(survey_id, 0)[0]
+
+    def read_since(self, survey_id: str, offset: int) -> Tuple[List[Dict[str, Any]], int]:
+        """Responses appended after byte ``offset`` of a survey's segment, and the offset they end at"""
+        entry = self._entries.get(survey_id)
+        if entry is None:
+            return [], 0
+        end = entry["bytes"]
+        with open(self.directory / entry["file"], "rb") as f:
+            f.seek(offset)
+            data = f.read(end - offset)
+        return [loads(line) for line in data.splitlines()], end
+
+    def read_page(self, survey_id: str, offset: int, limit: int) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        Up to ``limit`` responses starting at byte ``offset`` of a survey's
+        segment, and the offset after them. Only the lines returned are read
+        and parsed, however deep into the segment ``offset`` is.
+        """
+        entry = self._entries.get(survey_id)
+        end = entry["bytes"] if entry else 0
+        if offset == end:
+            return [], end
+        if offset > end:
+            raise SegmentOffsetError(f"Offset {offset} is past the end of the segment")
+        records = []
+        with open(self.directory / entry["file"], "rb") as f:
+            if offset:
+                f.seek(offset - 1)
+                if f.read(1) != b"\n":
+                    raise SegmentOffsetError(f"Offset {offset} is not at the start of a response")
+            while len(records) < limit and offset < end:
+                line = f.readline()
+                if not line:
+                    break
+                offset += len(line)
+                records.append(loads(line))
+        return records, offset
+
+    def iter_chunks(self, survey_id: str, chunk_size: int) -> Iterator[List[Dict[str, Any]]]:
+        """Responses for one survey in submission order, ``chunk_size`` at a time, read incrementally"""
+        entry = self._entries.get(survey_id)
+        if entry is None:
+            return
+        # Stop at the length committed when iteration started, even if responses arrive meanwhile
+        remaining = entry["bytes"]
+        with open(self.directory / entry["file"], "rb") as f:
+            chunk = []
+            while remaining > 0:
+                line = f.readline()
+                if not line:
+                    break
+                remaining -= len(line)
+                chunk.append(loads(line))
+                if len(chunk) >= chunk_size:
+                    yield chunk
+                    chunk = []
+            if chunk:
+                yield chunk
+
+    def write_all(self, responses: Dict[str, Iterable[Dict[str, Any]]]) -> None:
+        """Replace the segments of the given surveys wholesale and persist the manifest"""
+        for survey_id, records in responses.items():
+            data = b"".join(dumps(record) + b"\n" for record in records)
+            name = segment_name(survey_id)
+            atomic_write(self.directory / name, data)
+            self._entries[survey_id] = {"file": name, "count": data.count(b"\n"), "bytes": len(data)}
+        self.save_manifest()
+
+    def manifest_bytes(self) -> bytes:
+        return dumps(self._entries)
+
+    def save_manifest(self) -> None:
+        atomic_write(self.manifest_file, self.manifest_bytes())
+
+    def _recover(self) -> int:
+        """Reconcile the manifest with the segments on disk; returns responses recovered"""
+        recovered = 0
+        changed = False
+        for survey_id in [s for s, entry in self._entries.items() if not (self.directory / entry["file"]).exists()]:
+            logger.warning(f"Segment for survey {survey_id} is missing; dropping it from the manifest")
+            del self._entries[survey_id]
+            changed = True
+
+        known = {entry["file"]: survey_id for survey_id, entry in self._entries.items()}
+        for path in sorted(self.directory.glob(f"*{SEGMENT_SUFFIX}")):
+            survey_id = known.get(path.name)
+            entry = self._entries.get(survey_id) if survey_id else None
+            size = path.stat().st_size
+            if entry is not None and size == entry["bytes"]:
+                continue
+
+            start, count = (entry["bytes"], entry["count"]) if entry and size > entry["bytes"] else (0, 0)
+            first, added, good_bytes = self._scan(path, start)
+            if good_bytes < size:
+                logger.warning(f"Truncating torn tail of {path.name} at {good_bytes} bytes")
+                with open(path, "r+b") as f:
+                    f.truncate(good_bytes)
+            survey_id = survey_id or (first or {}).get("survey_id")
+            if survey_id is None:
+                continue
+            recovered += max(count + added - (entry["count"] if entry else 0), 0)
+            self._entries[survey_id] = {"file": path.name, "count": count + added, "bytes": good_bytes}
+            changed = True
+
+        if recovered:
+            logger.warning(f"Recovered {recovered} survey responses past the manifest")
+        if changed:
+            self.save_manifest()
+        return recovered
+
+    @staticmethod
+    def _scan(path: Path, start: int) -> Tuple[Optional[Dict[str, Any]], int, int]:
+        """First record, number of complete lines and end of the last good line from ``start``"""
+        with open(path, "rb") as f:
+            f.seek(start)
+            data = f.read()
+        first = None
+        count = 0
+        end = start
+        for line in data.splitlines(keepends=True):
+            if not line.endswith(b"\n"):
+                break
+            try:
+                record = loads(line)
+            except ValueError:
+                break
+            first = first or record
+            count += 1
+            end += len(line)
+        return first, count, end
@@ -0,0 +1,238 @@
+"""
+Incremental inverted index for chat thread search
+"""
+
+import heapq
+import html
+import math
+import re
+from bisect import bisect_left, insort
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+TOKEN_RE = re.compile(r"\w+")
+
+# A prefix term such as "eng" can expand to many words; only the most common are scored
+MAX_PREFIX_EXPANSIONS = 64
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into lower-cased word tokens"""
+    return TOKEN_RE.findall(text.lower())
+
+
+class _Scope:
+    """Postings and BM25 statistics for the threads of one user"""
+
+    def __init__(self):
+        self.postings: Dict[str, Dict[str, int]] = {}
+        self.vocabulary: List[str] = []  # sorted, for prefix lookups
+        self.doc_terms: Dict[str, Counter] = {}
+        self.title_terms: Dict[str, Counter] = {}
+        self.doc_lengths: Dict[str, int] = {}
+        self.total_length = 0
+
+    def add_terms(self, doc_id: str, terms: Counter) -> None:
+        doc = self.doc_terms.setdefault(doc_id, Counter())
+        for term, count in terms.items():
+            docs = self.postings.get(term)
+            if docs is None:
+                docs = self.postings[term] = {}
+                insort(self.vocabulary, term)
+            docs[doc_id] = docs.get(doc_id, 0) + count
+            doc[term] += count
+        added = sum(terms.values())
+        self.doc_lengths[doc_id] = self.doc_lengths.get(doc_id, 0) + added
+        self.total_length += added
+
+    def remove_terms(self, doc_id: str, terms: Counter) -> None:
+        doc = self.doc_terms.get(doc_id)
+        if doc is None:
+            return
+        for term, count in terms.items():
+            docs = self.postings.get(term)
+            if docs is None or doc_id not in docs:
+                continue
+            removed = min(count, docs[doc_id])
+            remaining = docs[doc_id] - removed
+            if remaining:
+                docs[doc_id] = remaining
+                doc[term] = remaining
+            else:
+                del docs[doc_id]
+                del doc[term]
+                if not docs:
+                    del self.postings[term]
+                    del self.vocabulary[bisect_left(self.vocabulary, term)]
+            self.doc_lengths[doc_id] -= removed
+            self.total_length -= removed
+
+    def remove_doc(self, doc_id: str) -> None:
+        doc = self.doc_terms.get(doc_id)
+        if doc is not None:
+            self.remove_terms(doc_id, Counter(doc))
+            del self.doc_terms[doc_id]
+        self.doc_lengths.pop(doc_id, None)
+        self.title_terms.pop(doc_id, None)
+
+    def expand_prefix(self, prefix: str) -> List[str]:
+        start = bisect_left(self.vocabulary, prefix)
+        matches = []
+        for term in self.vocabulary[start:]:
+            if not term.startswith(prefix):
+                break
+            matches.append(term)
+        if len(matches) > MAX_PREFIX_EXPANSIONS:
+            matches = heapq.nlargest(MAX_PREFIX_EXPANSIONS, matches, key=lambda t: len(self.postings[t]))
+        return matches
+
+
+class SearchIndex:
+    """
+    Inverted index over thread titles and message content, one scope per user.
+
+    Documents are threads. Titles and messages are added incrementally as
+    they change, so a query only touches the postings of its own terms.
+    The last query term is treated as a prefix for search-as-you-type, and
+    matches are ranked with BM25.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._scopes: Dict[Optional[str], _Scope] = {}
+        self._doc_scope: Dict[str, Optional[str]] = {}
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._doc_scope
+
+    def add_document(self, doc_id: str, user_id: Optional[str], title: Optional[str], texts: Iterable[str] = ()) -> None:
+        """Index a whole thread, replacing any previous copy"""
+        self.remove_document(doc_id)
+        self._doc_scope[doc_id] = user_id
+        scope = self._scopes.setdefault(user_id, _Scope())
+        scope.doc_terms[doc_id] = Counter()
+        scope.doc_lengths[doc_id] = 0
+        self.set_title(doc_id, title)
+        for text in texts:
+            self.add_text(doc_id, text)
+
+    def add_text(self, doc_id: str, text: str) -> None:
+        """Append message content to an indexed thread"""
+        if doc_id not in self._doc_scope:
+            return
+        scope = self._scopes[self._doc_scope[doc_id]]
+        scope.add_terms(doc_id, Counter(tokenize(text)))
+
+    def set_title(self, doc_id: str, title: Optional[str]) -> None:
+        """Replace the indexed title of a thread"""
+        if doc_id not in self._doc_scope:
+            return
+        scope = self._scopes[self._doc_scope[doc_id]]
+        old_terms = scope.title_terms.pop(doc_id, None)
+        if old_terms:
+            scope.remove_terms(doc_id, old_terms)
+        new_terms = Counter(tokenize(title or ""))
+        scope.title_terms[doc_id] = new_terms
+        scope.add_terms(doc_id, new_terms)
+
+    def remove_document(self, doc_id: str) -> None:
+        """Drop a thread from the index"""
+        if doc_id not in self._doc_scope:
+            return
+        user_id = self._doc_scope.pop(doc_id)
+        scope = self._scopes[user_id]
+        scope.remove_doc(doc_id)
+        if not scope.doc_terms:
+            del self._scopes[user_id]
+
+    def clear(self) -> None:
+        self._scopes.clear()
+        self._doc_scope.clear()
+
+    def search(self, query: str, user_id: Optional[str] = None, limit: int = 20) -> List[Tuple[str, float]]:
+        """Return (thread_id, score) pairs for threads matching every query term, best first"""
+        terms = tokenize(query)
+        if not terms:
+            return []
+
+        if user_id:
+            scopes = [self._scopes[user_id]] if user_id in self._scopes else []
+        else:
+            scopes = list(self._scopes.values())
+
+        scored: List[Tuple[float, str]] = []
+        for scope in scopes:
+            scored.extend(self._search_scope(scope, terms))
+        return [(doc_id, score) for score, doc_id in heapq.nlargest(limit, scored)]
+
+    def _search_scope(self, scope: _Scope, terms: List[str]) -> List[Tuple[float, str]]:
+        # Each query term becomes a group of index terms; a document must match every group
+        groups = [[term] if term in scope.postings else [] for term in terms[:-1]]
+        groups.append(scope.expand_prefix(terms[-1]))
+        if not all(groups):
+            return []
+
+        candidates: Optional[Set[str]] = None
+        for group in sorted(groups, key=lambda g: sum(len(scope.postings[t]) for t in g)):
+            matched = set()
+            for term in group:
+                matched.update(scope.postings[term])
+            candidates = matched if candidates is None else candidates & matched
+            if not candidates:
+                return []
+
+        doc_count = len(scope.doc_terms)
+        avg_length = scope.total_length / doc_count if doc_count else 0.0
+        results = []
+        for doc_id in candidates:
+            doc_length = scope.doc_lengths.get(doc_id, 0)
+            norm = self.k1 * (1 - self.b + self.b * doc_length / avg_length) if avg_length else self.k1
+            score = 0.0
+            for group in groups:
+                for term in group:
+                    tf = scope.postings[term].get(doc_id)
+                    if not tf:
+                        continue
+                    df = len(scope.postings[term])
+                    idf = math.log(1 + (doc_count - df + 0.5) / (df + 0.5))
+                    score += idf * tf * (self.k1 + 1) / (tf + norm)
+            results.append((score, doc_id))
+        return results
+
+
+def make_snippet(text: str, query: str, width: int = 160, mark: Tuple[str, str] = ("<mark>", "</mark>")) -> Optional[str]:
+    """
+    Build an HTML-escaped excerpt of ``text`` around the first query match,
+    with matching words wrapped in ``mark``. Returns None if nothing matches.
+    """
+    terms = tokenize(query)
+    if not terms:
+        return None
+    exact = set(terms[:-1])
+    prefix = terms[-1]
+
+    def matches(word: str) -> bool:
+        word = word.lower()
+        return word in exact or word.startswith(prefix)
+
+    hits = [m for m in TOKEN_RE.finditer(text) if matches(m.group())]
+    if not hits:
+        return None
+
+    start = max(hits[0].start() - width // 4, 0)
+    end = min(start + width, len(text))
+    pieces = ["…" if start > 0 else ""]
+    cursor = start
+    for m in hits:
+        if m.start() < start:
+            continue
+        if m.end() > end:
+            break
+        pieces.append(html.escape(text[cursor:m.start()]))
+        pieces.append(f"{mark[0]}{html.escape(m.group())}{mark[1]}")
+        cursor = m.end()
+    pieces.append(html.escape(text[cursor:end]))
+    if end < len(text):
+        pieces.append("…")
+    return "".join(pieces)
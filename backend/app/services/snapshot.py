@@ -0,0 +1,65 @@
+"""
+Binary startup snapshots of state derived from a JSON source file
+"""
+
+import logging
+import marshal
+import struct
+import sys
+from pathlib import Path
+from typing import Any, List, Optional
+
+from app.core.serialization import dumps, loads
+from app.services.write_behind import atomic_write
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"ENCSNAP1"
+HEADER_LENGTH = struct.Struct("<I")
+
+SourceStamp = List[int]
+
+
+def source_stamp(path: Path) -> Optional[SourceStamp]:
+    """[mtime_ns, size] of the source file, or None if it does not exist"""
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    return [st.st_mtime_ns, st.st_size]
+
+
+def write_snapshot(path: Path, stamp: SourceStamp, payload: Any) -> None:
+    """
+    Write ``payload`` as a snapshot of the source file version ``stamp``.
+
+    The payload is marshalled: lists, tuples, strings, numbers and bools
+    load back at C speed without validation, which is only appropriate for
+    data this process wrote itself.
+    """
+    header = dumps({"python": list(sys.version_info[:2]), "marshal": marshal.version, "source": stamp})
+    atomic_write(path, MAGIC + HEADER_LENGTH.pack(len(header)) + header + marshal.dumps(payload))
+
+
+def read_snapshot(path: Path, source: Path) -> Optional[Any]:
+    """The payload of a snapshot of ``source`` as it is now, or None if missing, stale or unreadable"""
+    try:
+        data = path.read_bytes()
+    except FileNotFoundError:
+        return None
+    try:
+        if not data.startswith(MAGIC):
+            raise ValueError("not a snapshot file")
+        start = len(MAGIC) + HEADER_LENGTH.size
+        (length,) = HEADER_LENGTH.unpack_from(data, len(MAGIC))
+        header = loads(data[start:start + length])
+        if header["python"] != list(sys.version_info[:2]) or header["marshal"] != marshal.version:
+            logger.info(f"Ignoring {path.name}: written by another Python version")
+            return None
+        if header["source"] != source_stamp(source):
+            logger.info(f"Ignoring {path.name}: {source.name} changed since it was written")
+            return None
+        return marshal.loads(memoryview(data)[start + length:])
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable snapshot {path.name}: {e}")
+        return None
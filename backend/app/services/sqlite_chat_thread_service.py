@@ -0,0 +1,602 @@
+"""
+SQLite-backed chat thread storage
+"""
+
+import logging
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+from app.core.database import SQLiteDatabase, sqlite_path_from_url
+from app.core.ids import new_ulid
+from app.core.pagination import decode_cursor, encode_cursor
+from app.models.chat_thread import (
+    ChatThread,
+    ChatMessage,
+    ChatMessagesPage,
+    MessageRole,
+    ChatThreadResponse,
+    ChatThreadSearchResult,
+    ChatThreadsListResponse
+)
+from app.services.chat_thread_service import BaseChatThreadService, ChatThreadService
+from app.services.search_index import make_snippet, tokenize
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS chat_threads (
+    id TEXT PRIMARY KEY,
+    title TEXT,
+    user_id TEXT,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    is_active INTEGER NOT NULL DEFAULT 1,
+    message_count INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_chat_threads_user_active_updated
+    ON chat_threads (user_id, is_active, updated_at);
+CREATE INDEX IF NOT EXISTS idx_chat_threads_active_updated
+    ON chat_threads (is_active, updated_at);
+
+CREATE TABLE IF NOT EXISTS chat_messages (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    id TEXT NOT NULL,
+    thread_id TEXT NOT NULL REFERENCES chat_threads (id) ON DELETE CASCADE,
+    role TEXT NOT NULL,
+    content TEXT NOT NULL,
+    timestamp TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_chat_messages_thread_timestamp
+    ON chat_messages (thread_id, timestamp);
+"""
+
+# Active thread counts for listing totals, kept by triggers so no page has to count rows.
+# scope is 'all', or 'user:' followed by the user ID.
+COUNT_SCHEMA = """
+CREATE TABLE IF NOT EXISTS chat_thread_counts (
+    scope TEXT PRIMARY KEY,
+    active_threads INTEGER NOT NULL
+);
+CREATE TRIGGER IF NOT EXISTS trg_chat_threads_count_insert AFTER INSERT ON chat_threads
+    WHEN NEW.is_active
+BEGIN
+    INSERT INTO chat_thread_counts (scope, active_threads) VALUES ('all', 1)
+        ON CONFLICT (scope) DO UPDATE SET active_threads = active_threads + 1;
+    INSERT INTO chat_thread_counts (scope, active_threads)
+        SELECT 'user:' || NEW.user_id, 1 WHERE NEW.user_id IS NOT NULL
+        ON CONFLICT (scope) DO UPDATE SET active_threads = active_threads + 1;
+END;
+CREATE TRIGGER IF NOT EXISTS trg_chat_threads_count_delete AFTER DELETE ON chat_threads
+    WHEN OLD.is_active
+BEGIN
+    UPDATE chat_thread_counts SET active_threads = active_threads - 1
+        WHERE scope IN ('all', 'user:' || OLD.user_id);
+END;
+CREATE TRIGGER IF NOT EXISTS trg_chat_threads_count_update AFTER UPDATE OF is_active, user_id ON chat_threads
+    WHEN OLD.is_active IS NOT NEW.is_active OR OLD.user_id IS NOT NEW.user_id
+BEGIN
+    UPDATE chat_thread_counts SET active_threads = active_threads - 1
+        WHERE OLD.is_active AND scope IN ('all', 'user:' || OLD.user_id);
+    INSERT INTO chat_thread_counts (scope, active_threads) SELECT 'all', 1 WHERE NEW.is_active
+        ON CONFLICT (scope) DO UPDATE SET active_threads = active_threads + 1;
+    INSERT INTO chat_thread_counts (scope, active_threads)
+        SELECT 'user:' || NEW.user_id, 1 WHERE NEW.is_active AND NEW.user_id IS NOT NULL
+        ON CONFLICT (scope) DO UPDATE SET active_threads = active_threads + 1;
+END;
+"""
+
+
+def _backfill_counts(conn: sqlite3.Connection) -> None:
+    """Count the threads stored before chat_thread_counts existed; recounting is safe if another worker already did"""
+    conn.execute("DELETE FROM chat_thread_counts")
+    conn.execute("INSERT INTO chat_thread_counts SELECT 'all', COUNT(*) FROM chat_threads WHERE is_active = 1")
+    conn.execute(
+        "INSERT INTO chat_thread_counts SELECT 'user:' || user_id, COUNT(*) FROM chat_threads "
+        "WHERE is_active = 1 AND user_id IS NOT NULL GROUP BY user_id"
+    )
+
+# Full-text search over message content and thread titles, kept current by triggers.
+# The tokenizer splits on the same \w+ words as SearchIndex.tokenize.
+SEARCH_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS chat_message_search USING fts5(
+    content, content='chat_messages', content_rowid='seq',
+    tokenize="unicode61 remove_diacritics 0 tokenchars '_'"
+);
+CREATE TRIGGER IF NOT EXISTS chat_messages_search_insert AFTER INSERT ON chat_messages BEGIN
+    INSERT INTO chat_message_search (rowid, content) VALUES (new.seq, new.content);
+END;
+CREATE TRIGGER IF NOT EXISTS chat_messages_search_delete AFTER DELETE ON chat_messages BEGIN
+    INSERT INTO chat_message_search (chat_message_search, rowid, content) VALUES ('delete', old.seq, old.content);
+END;
+CREATE TRIGGER IF NOT EXISTS chat_messages_search_update AFTER UPDATE OF content ON chat_messages BEGIN
+    INSERT INTO chat_message_search (chat_message_search, rowid, content) VALUES ('delete', old.seq, old.content);
+    INSERT INTO chat_message_search (rowid, content) VALUES (new.seq, new.content);
+END;
+
+-- Thread IDs are text, so titles are indexed under a stable integer key
+CREATE TABLE IF NOT EXISTS chat_thread_search_keys (
+    key INTEGER PRIMARY KEY,
+    thread_id TEXT NOT NULL UNIQUE
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS chat_title_search USING fts5(
+    title, content='',
+    tokenize="unicode61 remove_diacritics 0 tokenchars '_'"
+);
+CREATE TRIGGER IF NOT EXISTS chat_threads_search_insert AFTER INSERT ON chat_threads BEGIN
+    INSERT INTO chat_thread_search_keys (thread_id) VALUES (new.id);
+    INSERT INTO chat_title_search (rowid, title)
+        SELECT key, new.title FROM chat_thread_search_keys WHERE thread_id = new.id;
+END;
+CREATE TRIGGER IF NOT EXISTS chat_threads_search_update AFTER UPDATE OF title ON chat_threads BEGIN
+    INSERT INTO chat_title_search (chat_title_search, rowid, title)
+        SELECT 'delete', key, old.title FROM chat_thread_search_keys WHERE thread_id = old.id;
+    INSERT INTO chat_title_search (rowid, title)
+        SELECT key, new.title FROM chat_thread_search_keys WHERE thread_id = new.id;
+END;
+CREATE TRIGGER IF NOT EXISTS chat_threads_search_delete AFTER DELETE ON chat_threads BEGIN
+    INSERT INTO chat_title_search (chat_title_search, rowid, title)
+        SELECT 'delete', key, old.title FROM chat_thread_search_keys WHERE thread_id = old.id;
+    DELETE FROM chat_thread_search_keys WHERE thread_id = old.id;
+END;
+"""
+
+THREAD_COLUMNS = "id, title, user_id, created_at, updated_at, is_active, message_count"
+MESSAGE_COLUMNS = "id, role, content, timestamp"
+# Threads read per query by export_threads
+EXPORT_BATCH = 100
+
+
+def _ts(value: datetime) -> str:
+    # Fixed-width ISO strings so that text ordering matches time ordering
+    return value.isoformat(timespec="microseconds")
+
+
+def _match_phrases(terms: List[str]) -> List[str]:
+    """FTS5 phrases for tokenized query terms, the last one matched as a prefix"""
+    phrases = [f'"{term}"' for term in terms]
+    phrases[-1] += "*"
+    return phrases
+
+
+def _build_search_index(conn: sqlite3.Connection) -> None:
+    """Index the messages and titles stored before the search tables existed; a no-op once they are indexed"""
+    unindexed = "SELECT id FROM chat_threads WHERE id NOT IN (SELECT thread_id FROM chat_thread_search_keys)"
+    if conn.execute(f"{unindexed} LIMIT 1").fetchone() is None:
+        return
+    conn.execute("INSERT INTO chat_message_search (chat_message_search) VALUES ('rebuild')")
+    start = conn.execute("SELECT COALESCE(MAX(key), 0) FROM chat_thread_search_keys").fetchone()[0]
+    conn.execute(f"INSERT INTO chat_thread_search_keys (thread_id) {unindexed}")
+    conn.execute(
+        "INSERT INTO chat_title_search (rowid, title) "
+        "SELECT k.key, t.title FROM chat_thread_search_keys k JOIN chat_threads t ON t.id = k.thread_id "
+        "WHERE k.key > ?",
+        (start,)
+    )
+
+
+def _row_to_thread(row: sqlite3.Row, message_rows: List[sqlite3.Row]) -> ChatThread:
+    return ChatThread(
+        id=row["id"],
+        title=row["title"],
+        user_id=row["user_id"],
+        created_at=datetime.fromisoformat(row["created_at"]),
+        updated_at=datetime.fromisoformat(row["updated_at"]),
+        is_active=bool(row["is_active"]),
+        messages=[
+            ChatMessage(
+                id=m["id"],
+                role=MessageRole(m["role"]),
+                content=m["content"],
+                timestamp=datetime.fromisoformat(m["timestamp"])
+            )
+            for m in message_rows
+        ]
+    )
+
+
+def _row_to_response(row: sqlite3.Row) -> ChatThreadResponse:
+    return ChatThreadResponse(
+        id=row["id"],
+        title=row["title"],
+        created_at=datetime.fromisoformat(row["created_at"]),
+        updated_at=datetime.fromisoformat(row["updated_at"]),
+        message_count=row["message_count"],
+        is_active=bool(row["is_active"])
+    )
+
+
+class SQLiteChatThreadService(BaseChatThreadService):
+    """
+    Chat thread backend on SQLite instead of ``data/chat_threads.json``.
+
+    Threads and messages live in separate tables. Listing uses the
+    (user_id, is_active, updated_at) index and thread loading uses the
+    (thread_id, timestamp) index, so neither scans or sorts every thread.
+    """
+
+    def __init__(self, database: Optional[SQLiteDatabase] = None):
+        super().__init__()
+        self.db = database or SQLiteDatabase(sqlite_path_from_url(self.settings.database_url))
+        has_counts = self.db.read_sync(
+            lambda conn: conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'chat_thread_counts'"
+            ).fetchone()
+        )
+        self.db.executescript(SCHEMA)
+        self.db.executescript(COUNT_SCHEMA)
+        if not has_counts:
+            self.db.write_sync(_backfill_counts)
+        self.db.executescript(SEARCH_SCHEMA)
+        self.db.write_sync(_build_search_index)
+
+    def load(self):
+        """Threads are queried from SQLite per request, so there is nothing to load"""
+
+    def rebuild_search_index(self):
+        """Backfill the FTS tables if they are missing rows; triggers keep them current after that"""
+        self.db.write_sync(_build_search_index)
+
+    def export_threads(self) -> Iterator[ChatThread]:
+        """Every thread with its messages, active or not, read a batch of threads at a time"""
+        after = ""
+        while True:
+            def query(conn: sqlite3.Connection):
+                rows = conn.execute(
+                    f"SELECT {THREAD_COLUMNS} FROM chat_threads WHERE id > ? ORDER BY id LIMIT ?",
+                    (after, EXPORT_BATCH)
+                ).fetchall()
+                return [
+                    (row, conn.execute(
+                        f"SELECT {MESSAGE_COLUMNS} FROM chat_messages WHERE thread_id = ? ORDER BY timestamp, seq",
+                        (row["id"],)
+                    ).fetchall())
+                    for row in rows
+                ]
+
+            batch = self.db.read_sync(query)
+            if not batch:
+                return
+            for row, message_rows in batch:
+                yield _row_to_thread(row, message_rows)
+            after = batch[-1][0]["id"]
+
+    def write_snapshot(self) -> bool:
+        """SQLite opens without parsing anything, so no startup snapshot is kept"""
+        return False
+
+    async def compact(self) -> bool:
+        return False
+
+    def get_residency_stats(self) -> Dict[str, int]:
+        """Messages stay in SQLite and are read per request, so nothing is resident"""
+        return {}
+
+    async def archive_cold_threads(self, now: Optional[datetime] = None) -> int:
+        """Inactive rows are already off the hot path behind the is_active indexes, so there is nothing to move"""
+        return 0
+
+    async def create_thread(self, title: Optional[str] = None, user_id: Optional[str] = None) -> ChatThread:
+        """Create a new chat thread for a specific user"""
+        now = datetime.utcnow()
+        thread = ChatThread(
+            id=new_ulid(),
+            title=title or "New Chat",
+            user_id=user_id,
+            created_at=now,
+            updated_at=now,
+            messages=[],
+            is_active=True
+        )
+
+        def insert(conn: sqlite3.Connection):
+            conn.execute(
+                f"INSERT INTO chat_threads ({THREAD_COLUMNS}) VALUES (?, ?, ?, ?, ?, 1, 0)",
+                (thread.id, thread.title, thread.user_id, _ts(now), _ts(now))
+            )
+
+        await self.db.write(insert)
+        return thread
+
+    async def get_thread(self, thread_id: str) -> Optional[ChatThread]:
+        """Get a specific chat thread with its messages"""
+        def query(conn: sqlite3.Connection):
+            row = conn.execute(
+                f"SELECT {THREAD_COLUMNS} FROM chat_threads WHERE id = ?", (thread_id,)
+            ).fetchone()
+            if row is None:
+                return None, []
+            messages = conn.execute(
+                f"SELECT {MESSAGE_COLUMNS} FROM chat_messages WHERE thread_id = ? ORDER BY timestamp, seq",
+                (thread_id,)
+            ).fetchall()
+            return row, messages
+
+        row, message_rows = await self.db.read(query)
+        if row is None:
+            return None
+        return _row_to_thread(row, message_rows)
+
+    async def get_thread_metadata(self, thread_id: str) -> Optional[ChatThreadResponse]:
+        """Get a chat thread's metadata without loading its messages"""
+        row = await self.db.read(
+            lambda conn: conn.execute(
+                f"SELECT {THREAD_COLUMNS} FROM chat_threads WHERE id = ?", (thread_id,)
+            ).fetchone()
+        )
+        return _row_to_response(row) if row else None
+
+    async def get_messages_page(
+        self,
+        thread_id: str,
+        before: Optional[str] = None,
+        after: Optional[str] = None,
+        limit: int = 50
+    ) -> Optional[ChatMessagesPage]:
+        """
+        Get up to ``limit`` messages of a thread, oldest first: the newest
+        messages by default, or those just before/after a message cursor
+        """
+        cursor = decode_cursor(after or before) if (after or before) else None
+        # Messages are ordered by (timestamp, seq); newest-first pages are reversed below
+        descending = not after
+
+        def query(conn: sqlite3.Connection):
+            count = conn.execute(
+                "SELECT message_count FROM chat_threads WHERE id = ?", (thread_id,)
+            ).fetchone()
+            if count is None:
+                return None, []
+
+            where, params = "thread_id = ?", [thread_id]
+            if cursor:
+                timestamp, message_id = cursor
+                seq = conn.execute(
+                    "SELECT seq FROM chat_messages WHERE thread_id = ? AND id = ?", (thread_id, message_id)
+                ).fetchone()
+                op = ">" if after else "<"
+                if seq is not None:
+                    where += f" AND (timestamp, seq) {op} (?, ?)"
+                    params += [_ts(timestamp), seq[0]]
+                else:
+                    where += f" AND timestamp {op} ?"
+                    params.append(_ts(timestamp))
+
+            order = "DESC" if descending else "ASC"
+            rows = conn.execute(
+                f"SELECT id, role, content, timestamp FROM chat_messages WHERE {where} "
+                f"ORDER BY timestamp {order}, seq {order} LIMIT ?",
+                (*params, limit + 1)
+            ).fetchall()
+            return count[0], rows
+
+        message_count, rows = await self.db.read(query)
+        if message_count is None:
+            return None
+
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        if descending:
+            rows.reverse()
+        messages = [
+            ChatMessage(
+                id=m["id"],
+                role=MessageRole(m["role"]),
+                content=m["content"],
+                timestamp=datetime.fromisoformat(m["timestamp"])
+            )
+            for m in rows
+        ]
+        # Older messages exist if this page was cut short going backwards, or if it started after a cursor
+        has_older = has_more if descending else cursor is not None
+        has_newer = has_more if not descending else before is not None
+        return ChatMessagesPage(
+            thread_id=thread_id,
+            message_count=message_count,
+            messages=messages,
+            prev_cursor=encode_cursor(messages[0].timestamp, messages[0].id) if messages and has_older else None,
+            next_cursor=encode_cursor(messages[-1].timestamp, messages[-1].id) if messages and has_newer else None
+        )
+
+    async def get_all_threads(
+        self,
+        user_id: Optional[str] = None,
+        limit: int = 50,
+        offset: int = 0,
+        cursor: Optional[str] = None
+    ) -> ChatThreadsListResponse:
+        """Get all chat threads for a specific user, sorted by most recent"""
+        where, params = self._active_filter(user_id)
+        if cursor:
+            updated_at, thread_id = decode_cursor(cursor)
+            where += " AND (updated_at, id) < (?, ?)"
+            params += (_ts(updated_at), thread_id)
+            offset = 0
+
+        def query(conn: sqlite3.Connection):
+            count = conn.execute(
+                "SELECT active_threads FROM chat_thread_counts WHERE scope = ?",
+                (f"user:{user_id}" if user_id else "all",)
+            ).fetchone()
+            rows = conn.execute(
+                f"SELECT {THREAD_COLUMNS} FROM chat_threads WHERE {where} "
+                "ORDER BY updated_at DESC, id DESC LIMIT ? OFFSET ?",
+                (*params, limit + 1, offset)
+            ).fetchall()
+            return count[0] if count else 0, rows
+
+        total, rows = await self.db.read(query)
+        page = rows[:limit]
+        return ChatThreadsListResponse(
+            threads=[_row_to_response(row) for row in page],
+            total=total,
+            next_cursor=(
+                encode_cursor(datetime.fromisoformat(page[-1]["updated_at"]), page[-1]["id"])
+                if page and len(rows) > limit else None
+            )
+        )
+
+    async def get_recent_threads(self, user_id: Optional[str] = None, limit: int = 10) -> List[ChatThreadResponse]:
+        """Get the most recent chat threads for a specific user"""
+        where, params = self._active_filter(user_id)
+
+        def query(conn: sqlite3.Connection):
+            return conn.execute(
+                f"SELECT {THREAD_COLUMNS} FROM chat_threads WHERE {where} "
+                "ORDER BY updated_at DESC, id DESC LIMIT ?",
+                (*params, limit)
+            ).fetchall()
+
+        rows = await self.db.read(query)
+        return [_row_to_response(row) for row in rows]
+
+    async def add_message(self, thread_id: str, role: MessageRole, content: str) -> Optional[ChatMessage]:
+        """Add a message to a chat thread"""
+        message = ChatMessage(
+            id=new_ulid(),
+            role=role,
+            content=content,
+            timestamp=datetime.utcnow()
+        )
+
+        def insert(conn: sqlite3.Connection) -> bool:
+            updated = conn.execute(
+                "UPDATE chat_threads SET updated_at = ?, message_count = message_count + 1 WHERE id = ?",
+                (_ts(message.timestamp), thread_id)
+            ).rowcount
+            if not updated:
+                return False
+            conn.execute(
+                "INSERT INTO chat_messages (id, thread_id, role, content, timestamp) VALUES (?, ?, ?, ?, ?)",
+                (message.id, thread_id, message.role.value, message.content, _ts(message.timestamp))
+            )
+            return True
+
+        if not await self.db.write(insert):
+            return None
+        return message
+
+    async def delete_thread(self, thread_id: str) -> bool:
+        """Soft delete a chat thread"""
+        return await self._update_thread(thread_id, "is_active = 0")
+
+    async def update_thread_title(self, thread_id: str, title: str) -> bool:
+        """Update thread title"""
+        return await self._update_thread(thread_id, "title = ?", (title,))
+
+    async def search_threads(self, query: str, user_id: Optional[str] = None, limit: int = 20) -> List[ChatThreadSearchResult]:
+        """
+        Search chat threads by content for a specific user, best matches first.
+
+        Matches the JSON backend's search: every query term must appear in
+        the thread's title or messages, the last term as a prefix. A thread
+        scores the sum of the FTS5 BM25 scores of its matching title and
+        messages.
+        """
+        terms = tokenize(query)
+        if not terms:
+            return []
+
+        where, params = self._active_filter(user_id)
+        phrases = _match_phrases(terms)
+        any_term = " OR ".join(phrases)
+        # Threads whose title or messages contain each term, intersected over the terms
+        per_term = " INTERSECT ".join(
+            "SELECT m.thread_id FROM chat_message_search s JOIN chat_messages m ON m.seq = s.rowid "
+            "WHERE chat_message_search MATCH ? "
+            "UNION SELECT k.thread_id FROM chat_title_search s JOIN chat_thread_search_keys k ON k.key = s.rowid "
+            "WHERE chat_title_search MATCH ?"
+            for _ in phrases
+        )
+        term_params = [phrase for phrase in phrases for _ in range(2)]
+
+        def search(conn: sqlite3.Connection):
+            rows = conn.execute(
+                f"WITH matched (thread_id) AS ({per_term}), "
+                "hits (thread_id, score) AS ("
+                "SELECT m.thread_id, -bm25(chat_message_search) FROM chat_message_search "
+                "JOIN chat_messages m ON m.seq = chat_message_search.rowid "
+                "WHERE chat_message_search MATCH ? AND m.thread_id IN matched "
+                "UNION ALL SELECT k.thread_id, -bm25(chat_title_search) FROM chat_title_search "
+                "JOIN chat_thread_search_keys k ON k.key = chat_title_search.rowid "
+                "WHERE chat_title_search MATCH ? AND k.thread_id IN matched) "
+                f"SELECT {', '.join(f't.{c}' for c in THREAD_COLUMNS.split(', '))}, SUM(h.score) AS score "
+                f"FROM hits h JOIN chat_threads t ON t.id = h.thread_id WHERE {where} "
+                "GROUP BY t.id ORDER BY score DESC, t.id DESC LIMIT ?",
+                (*term_params, any_term, any_term, *params, limit)
+            ).fetchall()
+            snippets = []
+            for row in rows:
+                snippet = make_snippet(row["title"] or "", query)
+                if snippet is None:
+                    # The first matching message, as the JSON backend picks it
+                    for message in conn.execute(
+                        "SELECT m.content FROM chat_message_search s JOIN chat_messages m ON m.seq = s.rowid "
+                        "WHERE chat_message_search MATCH ? AND m.thread_id = ? ORDER BY m.timestamp, m.seq",
+                        (any_term, row["id"])
+                    ):
+                        snippet = make_snippet(message["content"], query)
+                        if snippet is not None:
+                            break
+                snippets.append(snippet)
+            return rows, snippets
+
+        rows, snippets = await self.db.read(search)
+        return [
+            ChatThreadSearchResult(**_row_to_response(row).model_dump(), score=row["score"], snippet=snippet)
+            for row, snippet in zip(rows, snippets)
+        ]
+
+    async def _update_thread(self, thread_id: str, assignment: str, params: tuple = ()) -> bool:
+        def update(conn: sqlite3.Connection) -> bool:
+            return conn.execute(
+                f"UPDATE chat_threads SET {assignment}, updated_at = ? WHERE id = ?",
+                (*params, _ts(datetime.utcnow()), thread_id)
+            ).rowcount > 0
+
+        return await self.db.write(update)
+
+    @staticmethod
+    def _active_filter(user_id: Optional[str]):
+        if user_id:
+            return "user_id = ? AND is_active = 1", (user_id,)
+        return "is_active = 1", ()
+
+    def import_json(self, threads_file: Path) -> int:
+        """
+        Import the JSON backend's threads, replacing existing copies. Messages
+        are read through ChatThreadService from the per-thread files next to
+        ``threads_file`` and from its cold tier, and legacy files that embed
+        messages are split first.
+        """
+        source = ChatThreadService(data_dir=threads_file.parent, load=False)
+        source.threads_file = threads_file
+        source.load()
+
+        def import_threads(conn: sqlite3.Connection) -> int:
+            count = 0
+            for thread in source.export_threads():
+                # A plain delete, unlike INSERT OR REPLACE, fires the search triggers and cascades to messages
+                conn.execute("DELETE FROM chat_threads WHERE id = ?", (thread.id,))
+                conn.execute(
+                    f"INSERT INTO chat_threads ({THREAD_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        thread.id, thread.title, thread.user_id,
+                        _ts(thread.created_at), _ts(thread.updated_at),
+                        int(thread.is_active), len(thread.messages)
+                    )
+                )
+                conn.executemany(
+                    "INSERT INTO chat_messages (id, thread_id, role, content, timestamp) VALUES (?, ?, ?, ?, ?)",
+                    [
+                        (m.id, thread.id, m.role.value, m.content, _ts(m.timestamp))
+                        for m in thread.messages
+                    ]
+                )
+                count += 1
+            return count
+
+        count = self.db.write_sync(import_threads)
+        logger.info(f"Imported {count} chat threads from {threads_file}")
+        return count
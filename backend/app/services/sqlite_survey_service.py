@@ -0,0 +1,571 @@
+"""
+SQLite-backed survey and survey response storage
+"""
+
+import json
+import logging
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+from typing import Iterator, List, Optional, Dict, Any, Set, Tuple
+
+from app.core.config import get_settings
+from app.core.database import SQLiteDatabase, sqlite_path_from_url
+from app.core.ids import new_id
+from app.core.pagination import Page, decode_cursor, decode_position_cursor, encode_cursor, encode_position_cursor
+from app.core.serialization import dumps_str, loads
+from app.models.survey import Survey, CreateSurveyRequest, SurveyResponse, SurveyQuestion
+from app.services.answer_decoders import Decoders
+from app.services.metric_formulas import MetricAggregates
+from app.services.response_columns import ResponseColumnStore
+from app.services.response_segments import ResponseSegmentStore
+from app.services.survey_service import SurveyService
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS surveys (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    status TEXT NOT NULL,
+    created_by TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    published_at TEXT,
+    data TEXT NOT NULL
+);
+DROP INDEX IF EXISTS idx_surveys_created_by;
+CREATE INDEX IF NOT EXISTS idx_surveys_created_by_created_at ON surveys (created_by, created_at, id);
+CREATE INDEX IF NOT EXISTS idx_surveys_created_at ON surveys (created_at, id);
+CREATE INDEX IF NOT EXISTS idx_surveys_status ON surveys (status);
+
+CREATE TABLE IF NOT EXISTS survey_questions (
+    survey_id TEXT NOT NULL REFERENCES surveys (id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    id TEXT NOT NULL,
+    question TEXT NOT NULL,
+    response_type TEXT NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (survey_id, position)
+);
+
+CREATE TABLE IF NOT EXISTS survey_responses (
+    id TEXT PRIMARY KEY,
+    survey_id TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    submitted_at TEXT NOT NULL,
+    responses TEXT NOT NULL
+);
+DROP INDEX IF EXISTS idx_survey_responses_survey_id;
+CREATE INDEX IF NOT EXISTS idx_survey_responses_survey_submitted_at
+    ON survey_responses (survey_id, submitted_at, id);
+CREATE INDEX IF NOT EXISTS idx_survey_responses_survey_user
+    ON survey_responses (survey_id, user_id);
+-- Entries end in the implicit rowid, so this walks one survey's responses in insertion order
+CREATE INDEX IF NOT EXISTS idx_survey_responses_survey_rowid ON survey_responses (survey_id);
+
+-- Response counts kept current by triggers so listing surveys never counts rows
+CREATE TABLE IF NOT EXISTS survey_response_counts (
+    survey_id TEXT PRIMARY KEY,
+    response_count INTEGER NOT NULL
+);
+CREATE TRIGGER IF NOT EXISTS trg_survey_responses_count_insert AFTER INSERT ON survey_responses
+BEGIN
+    INSERT INTO survey_response_counts (survey_id, response_count) VALUES (NEW.survey_id, 1)
+        ON CONFLICT (survey_id) DO UPDATE SET response_count = response_count + 1;
+END;
+CREATE TRIGGER IF NOT EXISTS trg_survey_responses_count_delete AFTER DELETE ON survey_responses
+BEGIN
+    UPDATE survey_response_counts SET response_count = response_count - 1 WHERE survey_id = OLD.survey_id;
+END;
+CREATE TRIGGER IF NOT EXISTS trg_survey_responses_count_move AFTER UPDATE OF survey_id ON survey_responses
+    WHEN OLD.survey_id IS NOT NEW.survey_id
+BEGIN
+    UPDATE survey_response_counts SET response_count = response_count - 1 WHERE survey_id = OLD.survey_id;
+    INSERT INTO survey_response_counts (survey_id, response_count) VALUES (NEW.survey_id, 1)
+        ON CONFLICT (survey_id) DO UPDATE SET response_count = response_count + 1;
+END;
+"""
+
+# Backfills counts for databases created before survey_response_counts existed
+BACKFILL_COUNTS = """
+INSERT INTO survey_response_counts (survey_id, response_count)
+    SELECT survey_id, COUNT(*) FROM survey_responses GROUP BY survey_id
+"""
+
+SUMMARY_COLUMNS = """
+    s.id, s.name, s.status, s.created_by, s.created_at,
+    (SELECT COUNT(*) FROM survey_questions q WHERE q.survey_id = s.id) AS question_count,
+    COALESCE(c.response_count, 0) AS response_count,
+    json_extract(s.data, '$.configuration.target_audience') AS target_audience
+"""
+
+
+def _ts(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat(timespec="microseconds") if value else None
+
+
+def _write_survey(conn: sqlite3.Connection, survey: Survey) -> None:
+    """Insert or replace a survey together with its questions"""
+    data = survey.model_dump(mode="json", exclude={"questions"})
+    conn.execute(
+        "INSERT OR REPLACE INTO surveys (id, name, status, created_by, created_at, published_at, data) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+        (
+            survey.id, survey.name, survey.status, survey.created_by,
+            _ts(survey.created_at), _ts(survey.published_at), dumps_str(data)
+        )
+    )
+    conn.execute("DELETE FROM survey_questions WHERE survey_id = ?", (survey.id,))
+    conn.executemany(
+        "INSERT INTO survey_questions (survey_id, position, id, question, response_type, data) "
+        "VALUES (?, ?, ?, ?, ?, ?)",
+        [
+            (survey.id, position, q.id, q.question, q.response_type, dumps_str(q.model_dump(mode="json")))
+            for position, q in enumerate(survey.questions)
+        ]
+    )
+
+
+# An upsert rather than INSERT OR REPLACE, whose implicit delete skips the count triggers
+UPSERT_RESPONSE = (
+    "INSERT INTO survey_responses (id, survey_id, user_id, submitted_at, responses) "
+    "VALUES (?, ?, ?, ?, ?) "
+    "ON CONFLICT (id) DO UPDATE SET survey_id = excluded.survey_id, user_id = excluded.user_id, "
+    "submitted_at = excluded.submitted_at, responses = excluded.responses"
+)
+
+
+def _write_response(conn: sqlite3.Connection, response: SurveyResponse) -> None:
+    conn.execute(
+        UPSERT_RESPONSE,
+        (
+            response.id, response.survey_id, response.user_id,
+            _ts(response.submitted_at), dumps_str(response.responses)
+        )
+    )
+
+
+def _read_surveys(conn: sqlite3.Connection, rows: List[sqlite3.Row]) -> List[Survey]:
+    """Build Survey models for survey rows, loading all their questions in one query"""
+    if not rows:
+        return []
+    ids = [row["id"] for row in rows]
+    placeholders = ", ".join("?" for _ in ids)
+    questions: Dict[str, List[SurveyQuestion]] = {survey_id: [] for survey_id in ids}
+    for q in conn.execute(
+        f"SELECT survey_id, data FROM survey_questions WHERE survey_id IN ({placeholders}) "
+        "ORDER BY survey_id, position",
+        ids
+    ):
+        questions[q["survey_id"]].append(SurveyQuestion(**loads(q["data"])))
+
+    return [
+        Survey(**loads(row["data"]), questions=questions[row["id"]])
+        for row in rows
+    ]
+
+
+def _read_summary(row: sqlite3.Row) -> Dict[str, Any]:
+    return {
+        "id": row["id"],
+        "name": row["name"],
+        "status": row["status"],
+        "created_by": row["created_by"],
+        "created_at": datetime.fromisoformat(row["created_at"]).isoformat(),
+        "question_count": row["question_count"],
+        "response_count": row["response_count"],
+        "target_audience": loads(row["target_audience"]) if row["target_audience"] else [],
+    }
+
+
+def _read_response(row: sqlite3.Row) -> SurveyResponse:
+    return SurveyResponse(
+        id=row["id"],
+        survey_id=row["survey_id"],
+        user_id=row["user_id"],
+        responses=loads(row["responses"]),
+        submitted_at=datetime.fromisoformat(row["submitted_at"])
+    )
+
+
+class SQLiteSurveyService(SurveyService):
+    """
+    SurveyService backed by SQLite instead of ``surveys.json`` and the
+    per-survey response segments.
+
+    Each write is a single transaction, so concurrent submissions can no
+    longer overwrite each other, and submitting a response is one INSERT
+    rather than a rewrite of every response ever received.
+    """
+
+    def __init__(self, database: Optional[SQLiteDatabase] = None):
+        settings = get_settings()
+        self.db = database or SQLiteDatabase(sqlite_path_from_url(settings.database_url))
+        has_counts = self.db.read_sync(
+            lambda conn: conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'survey_response_counts'"
+            ).fetchone()
+        )
+        self.db.executescript(SCHEMA)
+        if not has_counts:
+            self.db.write_sync(lambda conn: conn.execute(BACKFILL_COUNTS))
+        self._columns = ResponseColumnStore(self.db.path.with_name(f"{self.db.path.stem}_columns"))
+        # Running metric totals; other workers' submissions are caught up by rowid on read
+        self._metric_aggregates: Dict[str, MetricAggregates] = {}
+        self._question_stats: Dict[str, Tuple[Any, Dict[str, Dict[str, Any]]]] = {}
+        self._decoders: Dict[str, Decoders] = {}
+
+    def load(self):
+        """Surveys are queried from SQLite per request, so there is nothing to warm"""
+
+    def get_cache_stats(self) -> Dict[str, int]:
+        """Surveys are read from SQLite per request, so nothing is cached"""
+        return {}
+
+    async def create_survey(self, request: CreateSurveyRequest) -> Survey:
+        """Create a new survey"""
+        try:
+            survey_id = new_id("survey")
+            survey = Survey(
+                id=survey_id,
+                name=request.name,
+                context=request.context,
+                desired_outcomes=request.desired_outcomes,
+                classifiers=request.classifiers,
+                metrics=request.metrics,
+                questions=request.questions,
+                configuration=request.configuration,
+                branding=request.branding,
+                created_by=request.created_by,
+                created_at=datetime.now(),
+                status="draft"
+            )
+
+            await self.db.write(lambda conn: _write_survey(conn, survey))
+            self._save_decoders(survey)
+
+            logger.info(f"Created survey: {survey_id}")
+            return survey
+
+        except Exception as e:
+            logger.error(f"Error creating survey: {e}")
+            raise
+
+    async def get_survey(self, survey_id: str) -> Optional[Survey]:
+        """Get a survey by ID"""
+        def query(conn: sqlite3.Connection) -> List[Survey]:
+            rows = conn.execute("SELECT id, data FROM surveys WHERE id = ?", (survey_id,)).fetchall()
+            return _read_surveys(conn, rows)
+
+        try:
+            surveys = await self.db.read(query)
+            return surveys[0] if surveys else None
+        except Exception as e:
+            logger.error(f"Error getting survey {survey_id}: {e}")
+            return None
+
+    async def update_survey(self, survey_id: str, survey: Survey) -> Survey:
+        """Update an existing survey"""
+        try:
+            await self.db.write(lambda conn: _write_survey(conn, survey))
+            self._save_decoders(survey)
+
+            logger.info(f"Updated survey: {survey_id}")
+            return survey
+
+        except Exception as e:
+            logger.error(f"Error updating survey {survey_id}: {e}")
+            raise
+
+    async def list_surveys(self, created_by: Optional[str] = None) -> List[Survey]:
+        """List all surveys, optionally filtered by creator"""
+        def query(conn: sqlite3.Connection) -> List[Survey]:
+            if created_by is None:
+                rows = conn.execute("SELECT id, data FROM surveys ORDER BY created_at").fetchall()
+            else:
+                rows = conn.execute(
+                    "SELECT id, data FROM surveys WHERE created_by = ? ORDER BY created_at",
+                    (created_by,)
+                ).fetchall()
+            return _read_surveys(conn, rows)
+
+        try:
+            return await self.db.read(query)
+        except Exception as e:
+            logger.error(f"Error listing surveys: {e}")
+            return []
+
+    async def list_surveys_page(
+        self,
+        created_by: Optional[str] = None,
+        cursor: Optional[str] = None,
+        limit: int = 50
+    ) -> Page[Survey]:
+        """List surveys newest first, one keyset page at a time"""
+        clauses, params = [], []
+        if created_by is not None:
+            clauses.append("created_by = ?")
+            params.append(created_by)
+        if cursor:
+            created_at, survey_id = decode_cursor(cursor)
+            clauses.append("(created_at, id) < (?, ?)")
+            params.extend((_ts(created_at), survey_id))
+        where = f"WHERE {' AND '.join(clauses)} " if clauses else ""
+
+        def query(conn: sqlite3.Connection) -> List[Survey]:
+            rows = conn.execute(
+                f"SELECT id, data FROM surveys {where}ORDER BY created_at DESC, id DESC LIMIT ?",
+                (*params, limit + 1)
+            ).fetchall()
+            return _read_surveys(conn, rows)
+
+        try:
+            surveys = await self.db.read(query)
+            page = surveys[:limit]
+            next_cursor = encode_cursor(page[-1].created_at, page[-1].id) if page and len(surveys) > limit else None
+            return Page(page, next_cursor)
+        except Exception as e:
+            logger.error(f"Error listing surveys: {e}")
+            return Page([], None)
+
+    async def list_survey_summaries(
+        self,
+        created_by: Optional[str] = None,
+        cursor: Optional[str] = None,
+        limit: int = 50
+    ) -> Page[Dict[str, Any]]:
+        """Survey list rows with response counts, newest first, without reading any responses"""
+        clauses, params = [], []
+        if created_by is not None:
+            clauses.append("s.created_by = ?")
+            params.append(created_by)
+        if cursor:
+            created_at, survey_id = decode_cursor(cursor)
+            clauses.append("(s.created_at, s.id) < (?, ?)")
+            params.extend((_ts(created_at), survey_id))
+        where = f"WHERE {' AND '.join(clauses)} " if clauses else ""
+
+        def query(conn: sqlite3.Connection) -> List[sqlite3.Row]:
+            return conn.execute(
+                f"SELECT {SUMMARY_COLUMNS} FROM surveys s "
+                "LEFT JOIN survey_response_counts c ON c.survey_id = s.id "
+                f"{where}ORDER BY s.created_at DESC, s.id DESC LIMIT ?",
+                (*params, limit + 1)
+            ).fetchall()
+
+        try:
+            rows = await self.db.read(query)
+            page = [_read_summary(row) for row in rows[:limit]]
+            next_cursor = None
+            if page and len(rows) > limit:
+                next_cursor = encode_cursor(datetime.fromisoformat(page[-1]["created_at"]), page[-1]["id"])
+            return Page(page, next_cursor)
+        except Exception as e:
+            logger.error(f"Error listing surveys: {e}")
+            return Page([], None)
+
+    async def add_survey_response(self, response: SurveyResponse) -> SurveyResponse:
+        """Add a survey response"""
+        try:
+            await self.db.write(lambda conn: _write_response(conn, response))
+
+            logger.info(f"Added response for survey: {response.survey_id}")
+            return response
+
+        except Exception as e:
+            logger.error(f"Error adding survey response: {e}")
+            raise
+
+    async def submit_response(self, response: SurveyResponse, one_per_user: bool = False) -> Tuple[str, bool]:
+        """
+        Store a response unless it repeats one already stored, returning
+        (response_id, created). The checks and the insert share one write
+        transaction, so concurrent submissions from any worker cannot both pass.
+        """
+        def insert(conn: sqlite3.Connection) -> Tuple[str, bool]:
+            if conn.execute("SELECT 1 FROM survey_responses WHERE id = ?", (response.id,)).fetchone():
+                return response.id, False
+            if one_per_user:
+                row = conn.execute(
+                    "SELECT id FROM survey_responses WHERE survey_id = ? AND user_id = ? ORDER BY rowid LIMIT 1",
+                    (response.survey_id, response.user_id)
+                ).fetchone()
+                if row:
+                    return row["id"], False
+            _write_response(conn, response)
+            return response.id, True
+
+        response_id, created = await self.db.write(insert)
+        if created:
+            logger.info(f"Added response for survey: {response.survey_id}")
+        return response_id, created
+
+    async def _add_response_records(self, survey_id: str, records: List[Dict[str, Any]]) -> int:
+        """Store already-validated response records in a single transaction"""
+        if not records:
+            return 0
+        rows = [
+            (r["id"], r["survey_id"], r["user_id"], _ts(r["submitted_at"]), dumps_str(r["responses"]))
+            for r in records
+        ]
+
+        try:
+            await self.db.write(lambda conn: conn.executemany(UPSERT_RESPONSE, rows))
+            logger.info(f"Added {len(records)} responses for survey: {survey_id}")
+            return len(records)
+        except Exception as e:
+            logger.error(f"Error adding survey responses: {e}")
+            raise
+
+    async def existing_response_ids(self, survey_id: str, response_ids: List[str]) -> Set[str]:
+        """Which of ``response_ids`` are already stored; IDs are unique across surveys here"""
+        def query(conn: sqlite3.Connection) -> Set[str]:
+            found: Set[str] = set()
+            # Stay well under SQLite's bound-parameter limit
+            for i in range(0, len(response_ids), 500):
+                chunk = response_ids[i:i + 500]
+                placeholders = ", ".join("?" for _ in chunk)
+                found.update(
+                    row[0] for row in conn.execute(
+                        f"SELECT id FROM survey_responses WHERE id IN ({placeholders})", chunk
+                    )
+                )
+            return found
+
+        return await self.db.read(query)
+
+    async def get_responses_for_survey(self, survey_id: str) -> List[SurveyResponse]:
+        """Get all responses for a specific survey"""
+        def query(conn: sqlite3.Connection) -> List[sqlite3.Row]:
+            return conn.execute(
+                "SELECT id, survey_id, user_id, submitted_at, responses FROM survey_responses "
+                "WHERE survey_id = ? ORDER BY submitted_at, id",
+                (survey_id,)
+            ).fetchall()
+
+        try:
+            return [_read_response(row) for row in await self.db.read(query)]
+        except Exception as e:
+            logger.error(f"Error getting responses for survey {survey_id}: {e}")
+            return []
+
+    async def get_responses_page(
+        self,
+        survey_id: str,
+        cursor: Optional[str] = None,
+        limit: int = 100
+    ) -> Page[SurveyResponse]:
+        """
+        Get responses for a survey in the order they were stored, one page at
+        a time, as the JSON backend pages them; the cursor is the rowid the
+        next page continues after
+        """
+        after = decode_position_cursor(cursor) if cursor else 0
+
+        def query(conn: sqlite3.Connection) -> List[sqlite3.Row]:
+            return conn.execute(
+                "SELECT rowid, id, survey_id, user_id, submitted_at, responses FROM survey_responses "
+                "WHERE survey_id = ? AND rowid > ? ORDER BY rowid LIMIT ?",
+                (survey_id, after, limit + 1)
+            ).fetchall()
+
+        try:
+            rows = await self.db.read(query)
+            page = [_read_response(row) for row in rows[:limit]]
+            next_cursor = encode_position_cursor(rows[limit - 1]["rowid"]) if len(rows) > limit else None
+            return Page(page, next_cursor)
+        except Exception as e:
+            logger.error(f"Error getting responses for survey {survey_id}: {e}")
+            return Page([], None)
+
+    def iter_response_chunks(self, survey_id: str, chunk_size: int = 1000) -> Iterator[List[Dict[str, Any]]]:
+        """Stored responses for a survey in insertion order, one short read per chunk"""
+        last = self.db.read_sync(
+            lambda conn: conn.execute(
+                "SELECT COALESCE(MAX(rowid), 0) FROM survey_responses WHERE survey_id = ?", (survey_id,)
+            ).fetchone()[0]
+        )
+        position = 0
+        while position < last:
+            rows = self.db.read_sync(
+                lambda conn: conn.execute(
+                    "SELECT rowid, id, user_id, submitted_at, responses FROM survey_responses "
+                    "WHERE survey_id = ? AND rowid > ? AND rowid <= ? ORDER BY rowid LIMIT ?",
+                    (survey_id, position, last, chunk_size)
+                ).fetchall()
+            )
+            if not rows:
+                return
+            position = rows[-1]["rowid"]
+            yield [
+                {
+                    "id": row["id"],
+                    "user_id": row["user_id"],
+                    "submitted_at": row["submitted_at"],
+                    "responses": loads(row["responses"]),
+                }
+                for row in rows
+            ]
+
+    async def count_responses(self, survey_id: str) -> int:
+        """Number of responses submitted for a survey"""
+        try:
+            return await self.db.read(
+                lambda conn: conn.execute(
+                    "SELECT COALESCE(SUM(response_count), 0) FROM survey_response_counts WHERE survey_id = ?",
+                    (survey_id,)
+                ).fetchone()[0]
+            )
+        except Exception as e:
+            logger.error(f"Error counting responses for survey {survey_id}: {e}")
+            return 0
+
+    def _stored_response_count(self, survey_id: str) -> int:
+        row = self.db.read_sync(
+            lambda conn: conn.execute(
+                "SELECT response_count FROM survey_response_counts WHERE survey_id = ?", (survey_id,)
+            ).fetchone()
+        )
+        return row[0] if row else 0
+
+    def _responses_since(self, survey_id: str, position: int) -> Tuple[List[Dict[str, Any]], int]:
+        """Responses with a rowid above ``position``, in insertion order, and the last rowid read"""
+        rows = self.db.read_sync(
+            lambda conn: conn.execute(
+                "SELECT rowid, submitted_at, responses FROM survey_responses "
+                "WHERE survey_id = ? AND rowid > ? ORDER BY rowid",
+                (survey_id, position)
+            ).fetchall()
+        )
+        records = [{"submitted_at": row["submitted_at"], "responses": loads(row["responses"])} for row in rows]
+        return records, rows[-1]["rowid"] if rows else position
+
+    def import_json(self, surveys_file: Path, responses_file: Optional[Path] = None) -> Dict[str, int]:
+        """
+        Import surveys.json and the JSON backend's responses, replacing existing copies.
+
+        ``responses_file`` is either the per-survey segment directory or a
+        legacy survey_responses.json.
+        """
+        with open(surveys_file, 'r') as f:
+            surveys = [Survey(**data) for data in json.load(f).values()]
+
+        responses: List[SurveyResponse] = []
+        if responses_file is not None and responses_file.is_dir():
+            store = ResponseSegmentStore(responses_file)
+            for survey_id in store.survey_ids():
+                responses.extend(SurveyResponse(**data) for data in store.read(survey_id))
+        elif responses_file is not None and responses_file.exists():
+            with open(responses_file, 'r') as f:
+                for survey_responses in json.load(f).values():
+                    responses.extend(SurveyResponse(**data) for data in survey_responses)
+
+        def import_all(conn: sqlite3.Connection) -> None:
+            for survey in surveys:
+                _write_survey(conn, survey)
+            for response in responses:
+                _write_response(conn, response)
+
+        self.db.write_sync(import_all)
+        logger.info(f"Imported {len(surveys)} surveys and {len(responses)} responses")
+        return {"surveys": len(surveys), "responses": len(responses)}
@@ -2,68 +2,235 @@
 Survey Service - Handles survey creation, storage, and response management
 """
 
-import json
+import asyncio
+import heapq
 import logging
+import time
+from contextlib import contextmanager
 from pathlib import Path
-from typing import List, Optional, Dict, Any
+from typing import BinaryIO, Iterable, Iterator, List, Optional, Dict, Any, Set, Tuple, TypeVar
 from datetime import datetime
 
-from app.models.survey import Survey, CreateSurveyRequest, SurveyResponse
+from app.core.config import get_settings
+from app.core.ids import new_id
+from app.core.pagination import (
+    CursorKey, InvalidCursorError, Page, as_datetime, decode_cursor, decode_position_cursor, encode_cursor,
+    encode_position_cursor
+)
+from app.core.serialization import dumps, loads
+from app.models.survey import Survey, CreateSurveyRequest, ResponseImportReport, SurveyResponse
+from app.services.response_columns import ResponseColumnStore, SurveyColumns
+from app.services.response_export import export_responses
+from app.services.answer_decoders import Decoders, compiled_for, question_decoders
+from app.services.metric_formulas import MetricAggregates, evaluate_metrics, metric_drift, metric_signature
+from app.services.question_stats import question_signature, question_stats
+from app.services.response_import import ResponseImporter
+from app.services.response_segments import ResponseSegmentStore, SegmentOffsetError
+from app.services.write_behind import write_behind_flusher
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
+
+def _newest_page(keyed: Iterable[Tuple[CursorKey, T]], before: Optional[CursorKey], limit: int) -> Page[T]:
+    """Keyset page of ``(key, item)`` pairs, newest key first"""
+    if before is not None:
+        keyed = (item for item in keyed if item[0] < before)
+    # One extra item tells whether another page follows
+    newest = heapq.nlargest(limit + 1, keyed, key=lambda item: item[0])
+    page = newest[:limit]
+    next_cursor = encode_cursor(*page[-1][0]) if page and len(newest) > limit else None
+    return Page([item for _, item in page], next_cursor)
+
+
+def _summarize(data: Dict[str, Any], response_count: int) -> Dict[str, Any]:
+    """The fields GET /surveys/list shows for a survey, from its stored dict"""
+    configuration = data.get('configuration') or {}
+    return {
+        "id": data['id'],
+        "name": data['name'],
+        "status": data.get('status', "draft"),
+        "created_by": data['created_by'],
+        "created_at": as_datetime(data['created_at']).isoformat(),
+        "question_count": len(data.get('questions') or []),
+        "response_count": response_count,
+        "target_audience": configuration.get('target_audience') or [],
+    }
+
+
+def _file_stamp(path: Path) -> Optional[Tuple[int, int]]:
+    """(mtime_ns, size) of a file, or None if it does not exist"""
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
 class SurveyService:
-    def __init__(self):
-        self.data_dir = Path("data")
-        self.data_dir.mkdir(exist_ok=True)
+    def __init__(self, data_dir: Optional[Path] = None):
+        self.data_dir = data_dir or Path(get_settings().data_dir)
+        self.data_dir.mkdir(parents=True, exist_ok=True)
         self.surveys_file = self.data_dir / "surveys.json"
-        self.responses_file = self.data_dir / "survey_responses.json"
+        # Responses used to live in one survey_responses.json; it is migrated once
+        self.legacy_responses_file = self.data_dir / "survey_responses.json"
+        self._responses = ResponseSegmentStore(self.data_dir / "survey_responses")
+        # Typed columns derived from the segments, for aggregates
+        self._columns = ResponseColumnStore(self.data_dir / "survey_columns")
+        # Stored response IDs per survey, loaded on first duplicate check
+        self._response_ids: Dict[str, Set[str]] = {}
+        # user_id -> first response ID per survey, loaded on first one-per-user submission
+        self._responders: Dict[str, Dict[str, str]] = {}
+        # Running metric totals per survey, built on the first metrics read and then folded forward
+        self._metric_aggregates: Dict[str, MetricAggregates] = {}
+        # Per-question statistics per survey, with the column position and questions they were computed for
+        self._question_stats: Dict[str, Tuple[Any, Dict[str, Dict[str, Any]]]] = {}
+        # Answer decoders per survey, compiled when it is saved
+        self._decoders: Dict[str, Decoders] = {}
+        
+        # Latest saved state, authoritative while the write-behind flush is pending
+        self._pending_surveys: Dict[str, Any] = {}
+        
+        # Parsed surveys.json, re-read only when the file changes behind our back.
+        # _surveys_stamp is None after our own writes until the flushed file is seen.
+        self._survey_data: Optional[Dict[str, Any]] = None
+        self._survey_models: Dict[str, Survey] = {}
+        self._surveys_stamp: Optional[Tuple[int, int]] = None
+        # List projection with live response counts, rebuilt only when the cache reloads
+        self._summaries: Optional[Dict[str, Dict[str, Any]]] = None
+        self.survey_cache_hits = 0
+        self.survey_cache_reloads = 0
         
         # Initialize files if they don't exist
         if not self.surveys_file.exists():
             self._save_surveys({})
-        if not self.responses_file.exists():
-            self._save_responses({})
+        if self.legacy_responses_file.exists():
+            self._migrate_legacy_responses()
 
     def _load_surveys(self) -> Dict[str, Any]:
-        """Load surveys from JSON file"""
+        """Load surveys from JSON file, reusing the cached parse while the file is unchanged"""
+        if write_behind_flusher.is_pending(self.surveys_file):
+            self.survey_cache_hits += 1
+            return self._pending_surveys
+        
+        stamp = _file_stamp(self.surveys_file)
+        if self._survey_data is not None:
+            if self._surveys_stamp is None:
+                # Our own write has just been flushed; the file holds what we cached
+                self._surveys_stamp = stamp
+            if stamp == self._surveys_stamp:
+                self.survey_cache_hits += 1
+                return self._survey_data
+        
         try:
-            with open(self.surveys_file, 'r') as f:
-                return json.load(f)
+            data = loads(self.surveys_file.read_bytes())
         except Exception as e:
             logger.error(f"Error loading surveys: {e}")
-            return {}
+            data = {}
+        self._survey_data = data
+        self._survey_models = {}
+        self._summaries = None
+        self._surveys_stamp = stamp
+        self.survey_cache_reloads += 1
+        return data
+
+    def load(self):
+        """Parse surveys.json and build the list summaries ahead of the first request"""
+        self._survey_summaries()
+
+    def _survey_model(self, surveys: Dict[str, Any], survey_id: str) -> Survey:
+        """Parsed Survey for an entry of ``surveys``, built once per load"""
+        survey = self._survey_models.get(survey_id)
+        if survey is None:
+            survey = self._survey_models[survey_id] = Survey(**surveys[survey_id])
+        # Deep copy so callers can mutate nested models without touching the cache
+        return survey.model_copy(deep=True)
+
+    def _survey_summaries(self) -> Dict[str, Dict[str, Any]]:
+        """List projection of every survey, built once per load and then kept current"""
+        surveys = self._load_surveys()
+        if self._summaries is None:
+            self._summaries = {
+                survey_id: _summarize(data, self._responses.count(survey_id))
+                for survey_id, data in surveys.items()
+            }
+        return self._summaries
+
+    def _update_summary(self, surveys: Dict[str, Any], survey_id: str):
+        if self._summaries is not None:
+            self._summaries[survey_id] = _summarize(surveys[survey_id], self._responses.count(survey_id))
 
     def _save_surveys(self, surveys: Dict[str, Any]):
-        """Save surveys to JSON file"""
+        """Mark surveys dirty; the write-behind flusher persists them"""
+        self._pending_surveys = surveys
+        self._survey_data = surveys
+        self._surveys_stamp = None
+        write_behind_flusher.mark_dirty(
+            self.surveys_file,
+            lambda: dumps(self._pending_surveys)
+        )
+
+    def _migrate_legacy_responses(self):
+        """Split survey_responses.json into per-survey segments and set it aside"""
         try:
-            with open(self.surveys_file, 'w') as f:
-                json.dump(surveys, f, indent=2, default=str)
+            legacy = loads(self.legacy_responses_file.read_bytes())
+            self._responses.write_all({
+                survey_id: records for survey_id, records in legacy.items()
+                if survey_id not in self._responses
+            })
+            self.legacy_responses_file.rename(self.legacy_responses_file.with_name("survey_responses.json.migrated"))
+            logger.info(f"Migrated responses for {len(legacy)} surveys to {self._responses.directory}")
         except Exception as e:
-            logger.error(f"Error saving surveys: {e}")
+            logger.error(f"Error migrating {self.legacy_responses_file}: {e}")
+
+    def _append_responses(self, survey_id: str, records: List[Dict[str, Any]]):
+        """Append responses to one survey; the write-behind flusher fsyncs the segment, then the manifest"""
+        start = self._responses.end(survey_id)
+        segment = self._responses.append_many(survey_id, records)
+        write_behind_flusher.mark_appended(segment)
+        write_behind_flusher.mark_dirty(self._responses.manifest_file, self._responses.manifest_bytes)
+        
+        summary = self._summaries.get(survey_id) if self._summaries is not None else None
+        if summary is not None:
+            summary["response_count"] = self._responses.count(survey_id)
+        ids = self._response_ids.get(survey_id)
+        if ids is not None:
+            ids.update(record['id'] for record in records)
+        responders = self._responders.get(survey_id)
+        if responders is not None:
+            for record in records:
+                responders.setdefault(record['user_id'], record['id'])
+        self._fold_metric_aggregates(survey_id, records, start)
 
-    def _load_responses(self) -> Dict[str, Any]:
-        """Load survey responses from JSON file"""
+    def _fold_metric_aggregates(self, survey_id: str, records: List[Dict[str, Any]], start: int):
+        """Add just-appended responses to the survey's running metric totals, if those cover everything before them"""
+        state = self._metric_aggregates.get(survey_id)
+        if state is None or not state.lock.acquire(blocking=False):
+            # Not tracked yet, or being read or rebuilt: the next read catches up from storage
+            return
         try:
-            with open(self.responses_file, 'r') as f:
-                return json.load(f)
+            if state.position == start and not state.stale:
+                state.fold(records, self._responses.end(survey_id))
         except Exception as e:
-            logger.error(f"Error loading responses: {e}")
-            return {}
+            logger.error(f"Error updating metric totals for survey {survey_id}: {e}")
+            self._metric_aggregates.pop(survey_id, None)
+        finally:
+            state.lock.release()
 
-    def _save_responses(self, responses: Dict[str, Any]):
-        """Save survey responses to JSON file"""
+    def _load_survey_responses(self, survey_id: str) -> List[Dict[str, Any]]:
+        """Load one survey's responses from its segment"""
         try:
-            with open(self.responses_file, 'w') as f:
-                json.dump(responses, f, indent=2, default=str)
+            return self._responses.read(survey_id)
         except Exception as e:
-            logger.error(f"Error saving responses: {e}")
+            logger.error(f"Error loading responses for survey {survey_id}: {e}")
+            return []
 
     async def create_survey(self, request: CreateSurveyRequest) -> Survey:
         """Create a new survey"""
         try:
             # Generate survey ID
-            survey_id = f"survey_{datetime.now().timestamp()}"
+            survey_id = new_id("survey")
             
             # Create survey object
             survey = Survey(
@@ -85,6 +252,9 @@ class SurveyService:
             surveys = self._load_surveys()
             surveys[survey_id] = survey.model_dump()
             self._save_surveys(surveys)
+            self._survey_models[survey_id] = survey.model_copy(deep=True)
+            self._update_summary(surveys, survey_id)
+            self._save_decoders(survey)
             
             logger.info(f"Created survey: {survey_id}")
             return survey
@@ -98,8 +268,7 @@ class SurveyService:
         try:
             surveys = self._load_surveys()
             if survey_id in surveys:
-                survey_data = surveys[survey_id]
-                return Survey(**survey_data)
+                return self._survey_model(surveys, survey_id)
             return None
         except Exception as e:
             logger.error(f"Error getting survey {survey_id}: {e}")
@@ -111,6 +280,10 @@ class SurveyService:
             surveys = self._load_surveys()
             surveys[survey_id] = survey.model_dump()
             self._save_surveys(surveys)
+            self._survey_models[survey_id] = survey.model_copy(deep=True)
+            self._update_summary(surveys, survey_id)
+            self._save_decoders(survey)
+            self._metric_aggregates.pop(survey_id, None)
             
             logger.info(f"Updated survey: {survey_id}")
             return survey
@@ -125,9 +298,9 @@ class SurveyService:
             surveys = self._load_surveys()
             survey_list = []
             
-            for survey_data in surveys.values():
+            for survey_id, survey_data in surveys.items():
                 if created_by is None or survey_data.get('created_by') == created_by:
-                    survey_list.append(Survey(**survey_data))
+                    survey_list.append(self._survey_model(surveys, survey_id))
             
             return survey_list
             
@@ -135,17 +308,53 @@ class SurveyService:
             logger.error(f"Error listing surveys: {e}")
             return []
 
-    async def add_survey_response(self, response: SurveyResponse) -> SurveyResponse:
-        """Add a survey response"""
+    async def list_surveys_page(
+        self,
+        created_by: Optional[str] = None,
+        cursor: Optional[str] = None,
+        limit: int = 50
+    ) -> Page[Survey]:
+        """List surveys newest first, one keyset page at a time"""
+        before = decode_cursor(cursor) if cursor else None
         try:
-            responses = self._load_responses()
+            surveys = self._load_surveys()
+            keyed = (
+                ((as_datetime(data['created_at']), survey_id), survey_id)
+                for survey_id, data in surveys.items()
+                if created_by is None or data.get('created_by') == created_by
+            )
+            page = _newest_page(keyed, before, limit)
+            return Page([self._survey_model(surveys, survey_id) for survey_id in page.items], page.next_cursor)
             
-            # Group responses by survey_id
-            if response.survey_id not in responses:
-                responses[response.survey_id] = []
+        except Exception as e:
+            logger.error(f"Error listing surveys: {e}")
+            return Page([], None)
+
+    async def list_survey_summaries(
+        self,
+        created_by: Optional[str] = None,
+        cursor: Optional[str] = None,
+        limit: int = 50
+    ) -> Page[Dict[str, Any]]:
+        """Survey list rows with response counts, newest first, without reading any responses"""
+        before = decode_cursor(cursor) if cursor else None
+        try:
+            keyed = (
+                ((as_datetime(summary['created_at']), survey_id), summary)
+                for survey_id, summary in self._survey_summaries().items()
+                if created_by is None or summary['created_by'] == created_by
+            )
+            page = _newest_page(keyed, before, limit)
+            return Page([dict(summary) for summary in page.items], page.next_cursor)
             
-            responses[response.survey_id].append(response.model_dump())
-            self._save_responses(responses)
+        except Exception as e:
+            logger.error(f"Error listing surveys: {e}")
+            return Page([], None)
+
+    async def add_survey_response(self, response: SurveyResponse) -> SurveyResponse:
+        """Add a survey response"""
+        try:
+            self._append_responses(response.survey_id, [response.model_dump()])
             
             logger.info(f"Added response for survey: {response.survey_id}")
             return response
@@ -154,23 +363,324 @@ class SurveyService:
             logger.error(f"Error adding survey response: {e}")
             raise
 
+    async def add_survey_responses(self, survey_id: str, responses: List[SurveyResponse]) -> int:
+        """Add a batch of responses to one survey"""
+        return await self._add_response_records(survey_id, [response.model_dump() for response in responses])
+
+    async def _add_response_records(self, survey_id: str, records: List[Dict[str, Any]]) -> int:
+        """Store already-validated response records, shaped like SurveyResponse.model_dump(), in one append"""
+        if not records:
+            return 0
+        try:
+            self._append_responses(survey_id, records)
+            logger.info(f"Added {len(records)} responses for survey: {survey_id}")
+            return len(records)
+        except Exception as e:
+            logger.error(f"Error adding survey responses: {e}")
+            raise
+
+    async def submit_response(self, response: SurveyResponse, one_per_user: bool = False) -> Tuple[str, bool]:
+        """
+        Store a response unless it repeats one already stored, returning
+        (response_id, created). A response whose ID is already stored, as
+        for a retried submission with the same idempotency key, returns that
+        ID; with ``one_per_user`` so does any later submission by the same user.
+        """
+        ids = await self._stored_response_ids(response.survey_id)
+        responders = await self._survey_responders(response.survey_id) if one_per_user else None
+        # No awaits from here to the append, so concurrent submissions cannot both pass the checks
+        if response.id in ids:
+            return response.id, False
+        if responders is not None and response.user_id in responders:
+            return responders[response.user_id], False
+        await self.add_survey_response(response)
+        return response.id, True
+
+    async def _stored_response_ids(self, survey_id: str) -> Set[str]:
+        """Stored response IDs of a survey, read from its segment once and then kept current"""
+        if survey_id not in self._response_ids:
+            ids, offset = await asyncio.to_thread(self._responses.response_ids, survey_id)
+            if survey_id not in self._response_ids:
+                # Responses appended while the segment was read lie past ``offset``
+                ids |= self._responses.response_ids(survey_id, offset)[0]
+                self._response_ids[survey_id] = ids
+        return self._response_ids[survey_id]
+
+    async def _survey_responders(self, survey_id: str) -> Dict[str, str]:
+        """First response ID per user of a survey, read from its segment once and then kept current"""
+        if survey_id not in self._responders:
+            records, offset = await asyncio.to_thread(self._responses.read_since, survey_id, 0)
+            if survey_id not in self._responders:
+                responders: Dict[str, str] = {}
+                for record in records + self._responses.read_since(survey_id, offset)[0]:
+                    responders.setdefault(record['user_id'], record['id'])
+                self._responders[survey_id] = responders
+        return self._responders[survey_id]
+
+    async def existing_response_ids(self, survey_id: str, response_ids: List[str]) -> Set[str]:
+        """Which of ``response_ids`` are already stored for a survey"""
+        ids = await self._stored_response_ids(survey_id)
+        return {response_id for response_id in response_ids if response_id in ids}
+
+    async def import_responses(
+        self,
+        survey_id: str,
+        file: BinaryIO,
+        fmt: str,
+        batch_size: int = 5000
+    ) -> Optional[ResponseImportReport]:
+        """Validate and store responses from a CSV or NDJSON upload, one batch at a time"""
+        survey = await self.get_survey(survey_id)
+        if survey is None:
+            return None
+
+        started = time.perf_counter()
+        importer = ResponseImporter(survey, file, fmt)
+        report = importer.report
+        while True:
+            batch = await asyncio.to_thread(importer.next_batch, batch_size)
+            if not batch:
+                break
+            # Earlier batches are already stored, so this also catches repeats across batches
+            existing = await self.existing_response_ids(survey_id, [record['id'] for record in batch])
+            fresh = []
+            for record in batch:
+                if record['id'] in existing:
+                    report.duplicates += 1
+                    continue
+                existing.add(record['id'])
+                fresh.append(record)
+            report.accepted += await self._add_response_records(survey_id, fresh)
+            report.batches += 1
+
+        report.elapsed_seconds = round(time.perf_counter() - started, 3)
+        report.rows_per_second = round(report.rows / report.elapsed_seconds, 1) if report.elapsed_seconds else 0.0
+        logger.info(
+            f"Imported responses for survey {survey_id}: {report.accepted} accepted, "
+            f"{report.rejected} rejected, {report.duplicates} duplicates"
+        )
+        return report
+
     async def get_responses_for_survey(self, survey_id: str) -> List[SurveyResponse]:
         """Get all responses for a specific survey"""
         try:
-            responses = self._load_responses()
+            return [SurveyResponse(**resp) for resp in self._load_survey_responses(survey_id)]
             
-            if survey_id in responses:
-                return [SurveyResponse(**resp) for resp in responses[survey_id]]
+        except Exception as e:
+            logger.error(f"Error getting responses for survey {survey_id}: {e}")
             return []
+
+    async def get_responses_page(
+        self,
+        survey_id: str,
+        cursor: Optional[str] = None,
+        limit: int = 100
+    ) -> Page[SurveyResponse]:
+        """
+        Get responses for a survey in the order they were stored, one page at
+        a time. The cursor is the segment offset the next page starts at, so
+        a page only reads its own lines, and imported responses with older
+        timestamps, which are appended at the end, cannot be skipped.
+        """
+        start = decode_position_cursor(cursor) if cursor else 0
+        try:
+            page, end = self._responses.read_page(survey_id, start, limit)
+            next_cursor = encode_position_cursor(end) if end < self._responses.end(survey_id) else None
+            return Page([SurveyResponse(**resp) for resp in page], next_cursor)
             
+        except SegmentOffsetError as e:
+            raise InvalidCursorError(f"Invalid cursor: {cursor!r}") from e
         except Exception as e:
             logger.error(f"Error getting responses for survey {survey_id}: {e}")
-            return []
+            return Page([], None)
+
+    def iter_response_chunks(self, survey_id: str, chunk_size: int = 1000) -> Iterator[List[Dict[str, Any]]]:
+        """Stored responses for a survey in submission order, ``chunk_size`` at a time; blocking reads"""
+        return self._responses.iter_chunks(survey_id, chunk_size)
+
+    async def export_responses(self, survey_id: str, fmt: str, chunk_size: int = 1000) -> Optional[Iterator[bytes]]:
+        """Streaming CSV, NDJSON or Parquet export of a survey's responses, or None if the survey is missing"""
+        survey = await self.get_survey(survey_id)
+        if survey is None:
+            return None
+        return export_responses(survey, self.iter_response_chunks(survey_id, chunk_size), fmt)
+
+    async def count_responses(self, survey_id: str) -> int:
+        """Number of responses submitted for a survey"""
+        try:
+            return self._responses.count(survey_id)
+        except Exception as e:
+            logger.error(f"Error counting responses for survey {survey_id}: {e}")
+            return 0
+
+    def _save_decoders(self, survey: Survey):
+        """Compile a survey's answer decoders as it is saved, rather than on its first response"""
+        self._decoders[survey.id] = question_decoders(survey.questions)
+
+    def _survey_decoders(self, survey: Survey) -> Decoders:
+        """Decoders stored when the survey was saved, recompiled if it was saved elsewhere with other options"""
+        decoders = self._decoders.get(survey.id)
+        if decoders is None or not compiled_for(decoders, survey.questions):
+            decoders = self._decoders[survey.id] = question_decoders(survey.questions)
+        return decoders
+
+    def _stored_response_count(self, survey_id: str) -> int:
+        return self._responses.count(survey_id)
+
+    def _responses_since(self, survey_id: str, position: int) -> Tuple[List[Dict[str, Any]], int]:
+        """Stored responses after source ``position``, and the position after them"""
+        return self._responses.read_since(survey_id, position)
+
+    @contextmanager
+    def _current_columns(self, survey: Survey) -> Iterator[SurveyColumns]:
+        """
+        A survey's columns brought up to date with its stored responses and
+        held under ``locked()``, so no thread or process extends, truncates
+        or resets them while the block reads; runs in a worker thread
+        """
+        survey_id = survey.id
+        columns = self._columns.survey(survey_id)
+        decoders = self._survey_decoders(survey)
+        with columns.locked():
+            if not columns.encoded_with(decoders):
+                # The options changed since these answers were encoded
+                columns.reset()
+            stored = self._stored_response_count(survey_id)
+            if columns.rows > stored:
+                # The source was rewritten underneath the columns
+                columns.reset()
+            if columns.rows < stored:
+                records, position = self._responses_since(survey_id, columns.position)
+                question_types = {q.id: q.response_type for q in survey.questions}
+                columns.extend(records, question_types, position, decoders)
+            yield columns
+
+    def _refresh_columns(self, survey: Survey) -> SurveyColumns:
+        """Bring a survey's columns up to date with its stored responses; runs in a worker thread"""
+        with self._current_columns(survey) as columns:
+            return columns
+
+    async def get_response_columns(self, survey_id: str) -> Optional[SurveyColumns]:
+        """Columnar view of a survey's responses, extended with anything submitted since the last call"""
+        survey = await self.get_survey(survey_id)
+        if survey is None:
+            return None
+        return await asyncio.to_thread(self._refresh_columns, survey)
+
+    async def aggregate_responses(self, survey_id: str) -> Dict[str, Any]:
+        """Per-question counts and numeric summaries, computed from the response columns"""
+        try:
+            survey = await self.get_survey(survey_id)
+            if survey is None:
+                return {}
+
+            def aggregate() -> Dict[str, Any]:
+                with self._current_columns(survey) as columns:
+                    return {"survey_id": survey_id, "total_responses": columns.rows, "questions": columns.aggregate_all()}
+
+            return await asyncio.to_thread(aggregate)
+        except Exception as e:
+            logger.error(f"Error aggregating responses for survey {survey_id}: {e}")
+            return {}
+
+    async def evaluate_metrics(
+        self, survey_id: str, formulas: Optional[List[Dict[str, Any]]] = None
+    ) -> Optional[List[Dict[str, Any]]]:
+        """Values of the survey's metric formulas, or of ``formulas``, overall and per segment"""
+        survey = await self.get_survey(survey_id)
+        if survey is None:
+            return None
+
+        def evaluate() -> List[Dict[str, Any]]:
+            # Hold off extends so every column is read at the same row count
+            with self._current_columns(survey) as columns:
+                return evaluate_metrics(survey, columns, formulas)
+
+        return await asyncio.to_thread(evaluate)
+
+    def _rebuild_metric_aggregates(self, survey: Survey) -> MetricAggregates:
+        """Running metric totals computed from all of a survey's responses; runs in a worker thread"""
+        with self._current_columns(survey) as columns:
+            state = MetricAggregates.from_columns(survey, columns, self._survey_decoders(survey))
+        self._metric_aggregates[survey.id] = state
+        return state
+
+    def _catch_up_metric_aggregates(self, state: MetricAggregates):
+        """Fold in responses stored after the ones the totals cover; the caller holds ``state.lock``"""
+        records, position = self._responses_since(state.survey.id, state.position)
+        if records:
+            state.fold(records, position)
+
+    def _current_metric_values(self, survey: Survey) -> List[Dict[str, Any]]:
+        """Metric values from the survey's running totals, caught up or rebuilt as needed; runs in a worker thread"""
+        state = self._metric_aggregates.get(survey.id)
+        if state is not None and state.signature == metric_signature(survey) and not state.stale:
+            with state.lock:
+                stored = self._stored_response_count(survey.id)
+                if state.rows < stored:
+                    # Responses appended by another worker, or while a fold was skipped
+                    self._catch_up_metric_aggregates(state)
+                if state.rows >= stored and not state.stale:
+                    return state.values()
+            # More rows than stored means the responses were rewritten
+        state = self._rebuild_metric_aggregates(survey)
+        with state.lock:
+            self._catch_up_metric_aggregates(state)
+            return state.values()
+
+    async def get_metric_values(self, survey_id: str) -> Optional[List[Dict[str, Any]]]:
+        """
+        Current values of the survey's metrics, overall and per segment, read
+        from running totals that submissions keep up to date. The totals are
+        built from the stored responses on first use.
+        """
+        survey = await self.get_survey(survey_id)
+        if survey is None:
+            return None
+        return await asyncio.to_thread(self._current_metric_values, survey)
+
+    async def recompute_metrics(self, survey_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Rebuild a survey's running metric totals from its stored responses.
+        Returns the recomputed values and ``drift``, the metrics whose running
+        values disagreed with them; ``drift`` is None when there were no
+        running totals to check, or responses arrived during the check.
+        """
+        survey = await self.get_survey(survey_id)
+        if survey is None:
+            return None
+
+        def recompute() -> Dict[str, Any]:
+            previous = self._metric_aggregates.get(survey_id)
+            state = self._rebuild_metric_aggregates(survey)
+            with state.lock:
+                self._catch_up_metric_aggregates(state)
+                values = state.values()
+                rows = state.rows
+            drift = None
+            if previous is not None and previous.signature == state.signature and not previous.stale:
+                with previous.lock:
+                    self._catch_up_metric_aggregates(previous)
+                    if previous.rows == rows:
+                        drift = metric_drift(previous.values(), values)
+            return {"metrics": values, "drift": drift}
+
+        return await asyncio.to_thread(recompute)
+
+    def _current_question_stats(self, survey: Survey) -> Dict[str, Dict[str, Any]]:
+        """Per-question statistics, recomputed only when responses arrive or the questions change; runs in a worker thread"""
+        with self._current_columns(survey) as columns:
+            version = (columns.position, columns.rows, question_signature(survey))
+            cached = self._question_stats.get(survey.id)
+            if cached is not None and cached[0] == version:
+                return cached[1]
+            stats = question_stats(survey, columns)
+        self._question_stats[survey.id] = (version, stats)
+        return stats
 
     async def get_survey_stats(self, survey_id: str) -> Dict[str, Any]:
-        """Get statistics for a survey"""
+        """Get statistics for a survey, with answer distributions and completion rates per question"""
         try:
-            responses = await self.get_responses_for_survey(survey_id)
             survey = await self.get_survey(survey_id)
             
             if not survey:
@@ -179,11 +689,12 @@ class SurveyService:
             stats = {
                 "survey_id": survey_id,
                 "survey_name": survey.name,
-                "total_responses": len(responses),
+                "total_responses": await self.count_responses(survey_id),
                 "created_by": survey.created_by,
                 "created_at": survey.created_at,
                 "status": survey.status,
-                "question_count": len(survey.questions)
+                "question_count": len(survey.questions),
+                "questions": await asyncio.to_thread(self._current_question_stats, survey)
             }
             
             return stats
@@ -192,5 +703,23 @@ class SurveyService:
             logger.error(f"Error getting survey stats {survey_id}: {e}")
             return {}
 
+    def get_cache_stats(self) -> Dict[str, int]:
+        """Parsed-survey cache counters"""
+        return {
+            "cached_surveys": len(self._survey_data or {}),
+            "parsed_surveys": len(self._survey_models),
+            "survey_cache_hits": self.survey_cache_hits,
+            "survey_cache_reloads": self.survey_cache_reloads,
+        }
+
+
+def create_survey_service() -> SurveyService:
+    """Create the survey service for the configured storage backend"""
+    if get_settings().storage_backend == "sqlite":
+        from app.services.sqlite_survey_service import SQLiteSurveyService
+        return SQLiteSurveyService()
+    return SurveyService()
+
+
 # Create global instance
-survey_service = SurveyService()
+survey_service = create_survey_service()
@@ -2,21 +2,33 @@
 WebSocket connection manager for real-time notifications
 """
 
-import json
 import logging
-from typing import Dict, Set
+from typing import Dict, List, Optional, Set
 from fastapi import WebSocket, WebSocketDisconnect
 from datetime import datetime
 
+from app.core.serialization import dumps_str
+
 logger = logging.getLogger(__name__)
 
 
 class WebSocketManager:
-    """Manages WebSocket connections for real-time notifications"""
+    """
+    Manages WebSocket connections for real-time notifications.
+    
+    Connections live in this process. When several workers serve the app a
+    NotificationBus is attached, and notifications are relayed through it to
+    users connected to the other workers.
+    """
     
     def __init__(self):
         # Store active connections by user_id
         self.active_connections: Dict[str, Set[WebSocket]] = {}
+        self.bus = None
+    
+    def attach_bus(self, bus) -> None:
+        """Relay notifications to other worker processes through ``bus``"""
+        self.bus = bus
         
     async def connect(self, websocket: WebSocket, user_id: str):
         """Accept a new WebSocket connection"""
@@ -55,7 +67,7 @@ class WebSocketManager:
             logger.warning(f"No active connections for user {user_id}")
             return False
             
-        message_json = json.dumps(message)
+        message_json = dumps_str(message)
         disconnected_connections = set()
         
         # Send to all of the user's active connections
@@ -74,6 +86,23 @@ class WebSocketManager:
             
         return len(self.active_connections[user_id]) > 0
     
+    async def notify(self, message: dict, user_ids: Optional[List[str]] = None) -> int:
+        """Deliver to users connected here and relay to the other workers; returns local deliveries"""
+        sent = await self.deliver_local(message, user_ids)
+        if self.bus is not None:
+            await self.bus.publish(message, user_ids)
+        return sent
+    
+    async def deliver_local(self, message: dict, user_ids: Optional[List[str]] = None) -> int:
+        """Send to the listed users (everyone if None) connected to this process"""
+        if user_ids is None:
+            return await self._broadcast_local(message)
+        sent_count = 0
+        for user_id in user_ids:
+            if user_id in self.active_connections and await self.send_personal_message(message, user_id):
+                sent_count += 1
+        return sent_count
+    
     async def send_survey_notification(self, survey_data: dict, target_user_ids: list):
         """Send survey notification to specific users"""
         notification = {
@@ -83,17 +112,17 @@ class WebSocketManager:
             "message": f"New survey available: {survey_data.get('name', 'Untitled Survey')}"
         }
         
-        sent_count = 0
-        for user_id in target_user_ids:
-            if await self.send_personal_message(notification, user_id):
-                sent_count += 1
+        sent_count = await self.notify(notification, list(target_user_ids))
                 
-        logger.info(f"Survey notification sent to {sent_count}/{len(target_user_ids)} users")
+        logger.info(f"Survey notification sent to {sent_count}/{len(target_user_ids)} users on this worker")
         return sent_count
     
     async def broadcast_message(self, message: dict):
         """Broadcast a message to all connected users"""
-        message_json = json.dumps(message)
+        return await self.notify(message)
+    
+    async def _broadcast_local(self, message: dict) -> int:
+        message_json = dumps_str(message)
         total_sent = 0
         
         for user_id, connections in self.active_connections.items():
@@ -0,0 +1,204 @@
+"""
+Debounced write-behind persistence for the JSON file services
+"""
+
+import asyncio
+import logging
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import Callable, Dict, Optional, Set, Tuple
+
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+
+def atomic_write(path: Path, data: bytes) -> None:
+    """Write ``data`` to ``path`` via a temp file and rename, so readers never see a partial file."""
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_name, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_name)
+        except OSError:
+            pass
+        raise
+
+
+class WriteBehindFlusher:
+    """
+    Coalesces full-file rewrites into one batched write per time window.
+
+    Services call ``mark_dirty(path, snapshot)`` instead of writing. The
+    ``snapshot`` callable is invoked once at flush time, on the event loop
+    thread, and must return the complete file contents as bytes; taking the
+    snapshot there means the worker thread never sees state that is being
+    mutated. The encoded batch is then written in a worker thread, each file
+    atomically. Outside a running event loop (scripts, import time) writes go
+    straight through.
+
+    Append-only files are written by the service directly and registered with
+    ``mark_appended``; each batch fsyncs them once, before any rewrite, so a
+    rewritten index never points past data that is not yet durable.
+
+    A file that fails to write or sync is marked again with the bytes it
+    failed with, unless a newer state has been marked or written since, so
+    the next flush retries it instead of the write being lost.
+    """
+
+    def __init__(self, delay: Optional[float] = None):
+        self.delay = get_settings().persistence_flush_delay if delay is None else delay
+        self._dirty: Dict[Path, Callable[[], bytes]] = {}
+        self._unsynced: Set[Path] = set()
+        self._in_flight: Set[Path] = set()
+        self._task: Optional[asyncio.Task] = None
+        # Serializes writers and drops batches older than what is already on disk
+        self._write_lock = threading.Lock()
+        self._generation = 0
+        self._written: Dict[Path, int] = {}
+
+        self.marks = 0
+        self.flushes = 0
+        self.files_written = 0
+        self.fsyncs = 0
+
+    def mark_dirty(self, path: Path, snapshot: Callable[[], bytes]) -> None:
+        """Record that ``path`` must be rewritten from ``snapshot()``"""
+        self._dirty[path] = snapshot
+        self.marks += 1
+        self._schedule()
+
+    def mark_appended(self, path: Path) -> None:
+        """Record that ``path`` was appended to and must be fsynced with the next batch"""
+        self._unsynced.add(path)
+        self.marks += 1
+        self._schedule()
+
+    def _schedule(self) -> None:
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.flush()
+            return
+
+        if self._task is None or self._task.done() or self._task.get_loop() is not loop:
+            self._task = loop.create_task(self._run())
+
+    def is_pending(self, path: Path) -> bool:
+        """Whether the file on disk is behind the in-memory state for ``path``"""
+        return path in self._dirty or path in self._in_flight
+
+    async def _run(self) -> None:
+        while self._dirty or self._unsynced:
+            await asyncio.sleep(self.delay)
+            await self.flush_async()
+
+    def _collect(self):
+        self._generation += 1
+        batch: Dict[Path, bytes] = {}
+        for path, snapshot in self._dirty.items():
+            try:
+                batch[path] = snapshot()
+            except Exception as e:
+                logger.error(f"Error serializing {path}: {e}")
+        self._dirty.clear()
+        self._in_flight.update(batch)
+        unsynced, self._unsynced = self._unsynced, set()
+        return self._generation, batch, unsynced
+
+    def _write_batch(
+        self, generation: int, batch: Dict[Path, bytes], unsynced: Set[Path]
+    ) -> Tuple[Dict[Path, bytes], Set[Path]]:
+        """Write a collected batch; returns the files and syncs that failed"""
+        failed: Dict[Path, bytes] = {}
+        failed_syncs: Set[Path] = set()
+        with self._write_lock:
+            for path in unsynced:
+                try:
+                    fd = os.open(path, os.O_RDONLY)
+                    try:
+                        os.fsync(fd)
+                    finally:
+                        os.close(fd)
+                    self.fsyncs += 1
+                except Exception as e:
+                    logger.error(f"Error syncing {path}: {e}")
+                    failed_syncs.add(path)
+            for path, data in batch.items():
+                if self._written.get(path, 0) > generation:
+                    continue
+                try:
+                    atomic_write(path, data)
+                    self._written[path] = generation
+                    self.files_written += 1
+                except Exception as e:
+                    logger.error(f"Error writing {path}, will retry: {e}")
+                    failed[path] = data
+            self.flushes += 1
+        return failed, failed_syncs
+
+    def _retry(self, generation: int, failed: Dict[Path, bytes], failed_syncs: Set[Path]) -> bool:
+        """Mark what a batch failed to write as dirty again; returns whether anything was"""
+        for path, data in failed.items():
+            # A newer mark, or a newer batch already on disk, supersedes these bytes
+            if path not in self._dirty and self._written.get(path, 0) <= generation:
+                self._dirty[path] = lambda data=data: data
+        self._unsynced.update(failed_syncs)
+        return bool(failed or failed_syncs)
+
+    async def flush_async(self) -> None:
+        """Write all dirty files in a worker thread"""
+        generation, batch, unsynced = self._collect()
+        if not batch and not unsynced:
+            return
+        failed, failed_syncs = batch, unsynced
+        try:
+            failed, failed_syncs = await asyncio.to_thread(self._write_batch, generation, batch, unsynced)
+        finally:
+            retrying = self._retry(generation, failed, failed_syncs)
+            self._in_flight.difference_update(batch)
+        if retrying:
+            self._schedule()
+
+    def flush(self) -> None:
+        """Write all dirty files on the calling thread; failures stay dirty for the next flush"""
+        generation, batch, unsynced = self._collect()
+        if not batch and not unsynced:
+            return
+        failed, failed_syncs = batch, unsynced
+        try:
+            failed, failed_syncs = self._write_batch(generation, batch, unsynced)
+        finally:
+            self._retry(generation, failed, failed_syncs)
+            self._in_flight.difference_update(batch)
+
+    async def close(self) -> None:
+        """Stop the background flusher and write everything still pending"""
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+        self.flush()
+
+    def get_stats(self) -> Dict[str, int]:
+        return {
+            "marks": self.marks,
+            "flushes": self.flushes,
+            "files_written": self.files_written,
+            "fsyncs": self.fsyncs,
+            "pending": len(self._dirty) + len(self._in_flight) + len(self._unsynced),
+        }
+
+
+# Shared by all JSON file services so one flush commits all of them together
+write_behind_flusher = WriteBehindFlusher()
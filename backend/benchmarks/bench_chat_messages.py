@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Benchmark in-memory chat message storage: Pydantic ChatMessage lists vs MessageLog
+
+Reports bytes per message and throughput for building, listing (dumping pages
+of API models, as a response would) and serializing to the file storage format.
+
+    python benchmarks/bench_chat_messages.py --messages 1000000
+"""
+
+import argparse
+import gc
+import json
+import sys
+import time
+import tracemalloc
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Add the app directory to Python path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.models.chat_thread import ChatMessage, MessageRole
+from app.services.chat_storage import MessageLog
+
+ROLES = [MessageRole.user, MessageRole.assistant]
+PAGE_SIZE = 50
+
+
+def make_rows(count: int):
+    start = datetime(2025, 1, 1)
+    return [
+        (str(uuid.uuid4()), ROLES[i % 2], f"message {i} about team engagement", start + timedelta(seconds=i))
+        for i in range(count)
+    ]
+
+
+def build_models(rows):
+    return [ChatMessage(id=i, role=r, content=c, timestamp=t) for i, r, c, t in rows]
+
+
+def build_log(rows):
+    log = MessageLog()
+    for i, r, c, t in rows:
+        log.append(i, r, c, t)
+    return log
+
+
+def measure_bytes(build, rows) -> float:
+    """Bytes allocated per message, excluding the shared content strings"""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    store = build(rows)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del store
+    return (after - before) / len(rows)
+
+
+def timed(fn) -> float:
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def serialize_models(messages):
+    return json.dumps([
+        {"id": m.id, "role": m.role.value, "content": m.content, "timestamp": m.timestamp.isoformat()}
+        for m in messages
+    ]).encode()
+
+
+def list_model_pages(messages):
+    for start in range(0, len(messages), PAGE_SIZE):
+        [m.model_dump() for m in messages[start:start + PAGE_SIZE]]
+
+
+def list_log_pages(log):
+    for start in range(0, len(log), PAGE_SIZE):
+        [m.model_dump() for m in log.to_messages(start, start + PAGE_SIZE)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--messages", type=int, default=1_000_000, help="number of messages")
+    args = parser.parse_args()
+
+    rows = make_rows(args.messages)
+    n = len(rows)
+
+    results = {}
+    for name, build, list_pages, serialize in (
+        ("pydantic", build_models, list_model_pages, serialize_models),
+        ("message_log", build_log, list_log_pages, lambda log: json.dumps(log.to_dicts()).encode()),
+    ):
+        bytes_per_message = measure_bytes(build, rows)
+        store = None
+
+        def do_build():
+            nonlocal store
+            store = build(rows)
+
+        build_s = timed(do_build)
+        list_s = timed(lambda: list_pages(store))
+        serialize_s = timed(lambda: serialize(store))
+        results[name] = (bytes_per_message, build_s, list_s, serialize_s)
+        del store
+
+    print(f"{n:,} messages, pages of {PAGE_SIZE}")
+    print(f"{'store':<12} {'bytes/msg':>10} {'build msg/s':>14} {'list msg/s':>14} {'serialize msg/s':>16}")
+    for name, (bytes_per_message, build_s, list_s, serialize_s) in results.items():
+        print(
+            f"{name:<12} {bytes_per_message:>10.0f} {n / build_s:>14,.0f} "
+            f"{n / list_s:>14,.0f} {n / serialize_s:>16,.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Benchmark loading chat thread metadata at startup, from JSON and from the snapshot
+
+Generates chat_threads.json with N threads, then times a fresh service
+loading it from the JSON file (parse, validate, build the recency index)
+and from the binary snapshot written at shutdown.
+
+    python benchmarks/bench_cold_start.py --threads 200000
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Add the app directory to Python path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+
+from app.core.serialization import dumps
+from app.services.chat_thread_service import ChatThreadService
+
+
+def generate(directory: Path, count: int):
+    rng = random.Random(1)
+    start = datetime(2024, 1, 1)
+    threads = {}
+    for i in range(count):
+        thread_id = str(uuid.UUID(int=rng.getrandbits(128)))
+        created_at = start + timedelta(seconds=rng.randrange(30_000_000), microseconds=rng.randrange(1_000_000))
+        threads[thread_id] = {
+            "id": thread_id,
+            "title": f"Thread {i} about culture",
+            "user_id": f"user{rng.randrange(2000)}",
+            "created_at": created_at.isoformat(),
+            "updated_at": (created_at + timedelta(seconds=rng.randrange(100_000))).isoformat(),
+            "is_active": rng.random() > 0.05,
+            "message_count": rng.randrange(40)
+        }
+    (directory / "chat_threads.json").write_bytes(dumps(threads))
+
+
+def timed_load(directory: Path):
+    start = time.perf_counter()
+    service = ChatThreadService(data_dir=directory)
+    return time.perf_counter() - start, service
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--threads", type=int, default=200_000, help="threads in chat_threads.json")
+    args = parser.parse_args()
+
+    directory = Path(tempfile.mkdtemp(prefix="bench-cold-start-"))
+    generate(directory, args.threads)
+    size = (directory / "chat_threads.json").stat().st_size
+
+    json_seconds, service = timed_load(directory)
+    assert not service.loaded_from_snapshot
+    start = time.perf_counter()
+    service.write_snapshot()
+    write_seconds = time.perf_counter() - start
+    snapshot_seconds, reloaded = timed_load(directory)
+    assert reloaded.loaded_from_snapshot and len(reloaded._threads) == args.threads
+
+    print(f"{args.threads:,} threads, chat_threads.json {size / 1e6:.1f} MB, "
+          f"snapshot {service.snapshot_file.stat().st_size / 1e6:.1f} MB")
+    print(f"load from JSON      {json_seconds * 1000:>8.0f} ms")
+    print(f"load from snapshot  {snapshot_seconds * 1000:>8.0f} ms  ({json_seconds / snapshot_seconds:.1f}x)")
+    print(f"write snapshot      {write_seconds * 1000:>8.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Benchmark metric formula evaluation over response columns
+
+Stores scale responses with a department classifier, then times a grouped
+average and a grouped percentage with numpy and with the standard-library
+fallback. Plans are compiled once and cached, so the timings are evaluation
+only.
+
+    python benchmarks/bench_metric_formulas.py --responses 200000
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+# Add the app directory to Python path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+
+from app.models.survey import CreateSurveyRequest, SurveyQuestion
+from app.services import metric_formulas, response_columns
+from app.services.survey_service import SurveyService
+
+DEPARTMENTS = ["Engineering", "Sales", "Support", "Finance"]
+METRICS = [
+    {"name": "Engagement", "formula": "AVG(q1, q2, q3) BY Department"},
+    {"name": "Favorable", "formula": "COUNT(q4 >= 4) / COUNT(total_responses) * 100 BY Department"},
+]
+
+
+async def build(count: int):
+    service = SurveyService(data_dir=Path(tempfile.mkdtemp(prefix="bench-metrics-")))
+    survey = await service.create_survey(CreateSurveyRequest(
+        name="Pulse", context="c", created_by="hr",
+        questions=[SurveyQuestion(id=f"q{i}", question="Rate", response_type="scale") for i in range(1, 6)],
+        classifiers=[{"name": "Department", "values": DEPARTMENTS}]
+    ))
+    records = [
+        {
+            "id": f"r{n}", "survey_id": survey.id, "user_id": f"u{n}", "submitted_at": datetime(2025, 1, 1),
+            "responses": {**{f"q{i}": (n * i) % 5 + 1 for i in range(1, 6)}, "Department": DEPARTMENTS[n % 4]},
+        }
+        for n in range(count)
+    ]
+    await service._add_response_records(survey.id, records)
+    return service, survey.id
+
+
+async def timed(service, survey_id, repeat: int):
+    await service.evaluate_metrics(survey_id, METRICS)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        await service.evaluate_metrics(survey_id, METRICS)
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--responses", type=int, default=200_000, help="responses in the survey")
+    parser.add_argument("--repeat", type=int, default=5, help="timed evaluations per mode")
+    args = parser.parse_args()
+
+    service, survey_id = asyncio.run(build(args.responses))
+    if metric_formulas.np is not None:
+        print(f"numpy    {asyncio.run(timed(service, survey_id, args.repeat)) * 1000:>8.1f} ms")
+    metric_formulas.np = response_columns.np = None
+    print(f"stdlib   {asyncio.run(timed(service, survey_id, args.repeat)) * 1000:>8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Benchmark survey traffic served by 1..N forked workers sharing one SQLite database
+
+Each worker is forked from a parent that built the services, as a preloading
+gunicorn master does, and runs a mix of response submissions and survey
+reads. Reports requests/s per worker count and checks that no submission
+was lost.
+
+    python benchmarks/bench_multi_worker.py --workers 1 2 4 --requests 2000
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+# Add the app directory to Python path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+
+from app.core.database import SQLiteDatabase
+from app.models.survey import CreateSurveyRequest, SurveyQuestion, SurveyResponse
+from app.services.sqlite_survey_service import SQLiteSurveyService
+
+QUESTIONS = [SurveyQuestion(id=f"q{i}", question="Rate", response_type="scale") for i in range(10)]
+# Reads per submission, roughly a respondent loading the survey first
+READS_PER_WRITE = 3
+
+
+def worker(service, survey_id, worker_id, requests):
+    async def work():
+        for n in range(requests // (READS_PER_WRITE + 1)):
+            for _ in range(READS_PER_WRITE):
+                await service.get_survey(survey_id)
+            await service.add_survey_response(SurveyResponse(
+                id=f"w{worker_id}-{n}", survey_id=survey_id, user_id=f"u{n}",
+                responses={q.id: n % 5 + 1 for q in QUESTIONS}, submitted_at=datetime.now()
+            ))
+    asyncio.run(work())
+
+
+async def run(workers: int, requests: int):
+    directory = Path(tempfile.mkdtemp(prefix="bench-workers-"))
+    service = SQLiteSurveyService(database=SQLiteDatabase(directory / "app.db"))
+    survey = await service.create_survey(
+        CreateSurveyRequest(name="Pulse", context="c", created_by="hr", questions=QUESTIONS)
+    )
+    per_worker = requests // workers
+    context = multiprocessing.get_context("fork")
+    processes = [context.Process(target=worker, args=(service, survey.id, w, per_worker)) for w in range(workers)]
+
+    start = time.perf_counter()
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    elapsed = time.perf_counter() - start
+
+    expected = workers * (per_worker // (READS_PER_WRITE + 1))
+    stored = await service.count_responses(survey.id)
+    return workers * per_worker / elapsed, stored, expected
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4], help="worker counts to compare")
+    parser.add_argument("--requests", type=int, default=2000, help="requests per run, split across workers")
+    args = parser.parse_args()
+
+    print(f"cpus: {os.cpu_count()}")
+    baseline = None
+    for workers in args.workers:
+        rate, stored, expected = asyncio.run(run(workers, args.requests))
+        baseline = baseline or rate
+        lost = expected - stored
+        print(f"{workers:>2} workers {rate:>10,.0f} req/s  ({rate / baseline:.1f}x)  lost submissions: {lost}")
+
+
+if __name__ == "__main__":
+    main()
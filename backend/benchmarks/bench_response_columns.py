@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Benchmark survey aggregates: parsing response dicts vs memory-mapped response columns
+
+Builds a survey with scale, choice and multi-select questions, then times
+per-question aggregation the old way (load every response record) and from
+SurveyColumns, after a cold reopen so the columns come from the mapped files.
+
+    python benchmarks/bench_response_columns.py --responses 1000000
+"""
+
+import argparse
+import random
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Add the app directory to Python path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.core.serialization import dumps, loads
+from app.services.response_columns import SurveyColumns, np, parse_number
+
+OPTIONS = ["1 - Strongly Disagree", "2 - Disagree", "3 - Neutral", "4 - Agree", "5 - Strongly Agree"]
+DEPARTMENTS = ["Engineering", "Sales", "Support", "Finance", "People"]
+BENEFITS = ["Remote work", "Learning budget", "Health", "Equity", "Gym"]
+QUESTION_TYPES = {"q1": "scale", "q2": "multiple_choice", "q3": "multiple_select", "q4": "text"}
+
+
+def make_records(count: int):
+    rng = random.Random(42)
+    start = datetime(2025, 1, 1)
+    return [
+        {
+            "submitted_at": start + timedelta(seconds=i),
+            "responses": {
+                "q1": rng.choice(OPTIONS),
+                "q2": rng.choice(DEPARTMENTS),
+                "q3": rng.sample(BENEFITS, rng.randint(0, 3)),
+                "q4": "Free text answer",
+            },
+        }
+        for i in range(count)
+    ]
+
+
+def aggregate_dicts(records):
+    numbers = [parse_number(r["responses"]["q1"]) for r in records]
+    departments = Counter(r["responses"]["q2"] for r in records)
+    benefits = Counter(b for r in records for b in r["responses"]["q3"])
+    return sum(numbers) / len(numbers), departments, benefits
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--responses", type=int, default=1_000_000, help="responses to the survey")
+    args = parser.parse_args()
+
+    records = make_records(args.responses)
+    encoded = dumps(records)
+
+    start = time.perf_counter()
+    aggregate_dicts(loads(encoded))
+    legacy_s = time.perf_counter() - start
+
+    directory = Path(tempfile.mkdtemp(prefix="bench-columns-"))
+    start = time.perf_counter()
+    SurveyColumns(directory).extend(records, QUESTION_TYPES, position=len(encoded))
+    build_s = time.perf_counter() - start
+
+    columns = SurveyColumns(directory)
+    start = time.perf_counter()
+    columns.aggregate_all()
+    columns_s = time.perf_counter() - start
+
+    print(f"numpy: {'yes' if np is not None else 'no (stdlib arrays)'}")
+    print(f"{'responses':<28} {args.responses:>10,}")
+    print(f"{'parse + aggregate dicts':<28} {legacy_s * 1000:>10.1f} ms")
+    print(f"{'build columns (one-off)':<28} {build_s * 1000:>10.1f} ms")
+    print(f"{'aggregate columns':<28} {columns_s * 1000:>10.1f} ms  ({legacy_s / columns_s:.0f}x)")
+
+
+if __name__ == "__main__":
+    main()
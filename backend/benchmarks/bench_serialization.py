@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Benchmark JSON encode cost: pretty-printed stdlib json vs app.core.serialization
+
+Encodes a large survey store (surveys.json / survey_responses.json shape), a
+large chat thread (per-thread message file) and a stream of SSE chunks.
+
+    python benchmarks/bench_serialization.py --responses 50000 --messages 100000
+"""
+
+import argparse
+import json
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Add the app directory to Python path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.core.serialization import BACKEND, dumps, sse_event
+from app.models.chat_thread import MessageRole
+from app.models.survey import Survey, SurveyQuestion, SurveyResponse
+from app.services.chat_storage import MessageLog
+
+OPTIONS = ["1 - Strongly Disagree", "2 - Disagree", "3 - Neutral", "4 - Agree", "5 - Strongly Agree"]
+
+
+def make_survey_store(question_count: int, response_count: int):
+    questions = [
+        SurveyQuestion(id=f"q{i}", question=f"Question {i}?", response_type="multiple_choice", options=OPTIONS)
+        for i in range(question_count)
+    ]
+    survey = Survey(
+        id="survey_1", name="Engagement", context="Quarterly pulse", questions=questions,
+        created_by="admin", created_at=datetime(2025, 1, 1)
+    )
+    start = datetime(2025, 1, 2)
+    responses = [
+        SurveyResponse(
+            id=str(uuid.uuid4()), survey_id=survey.id, user_id=f"user{i}",
+            responses={q.id: OPTIONS[(i + n) % 5] for n, q in enumerate(questions)},
+            submitted_at=start + timedelta(seconds=i)
+        ).model_dump()
+        for i in range(response_count)
+    ]
+    return {survey.id: survey.model_dump()}, {survey.id: responses}
+
+
+def make_thread(message_count: int) -> MessageLog:
+    log = MessageLog()
+    start = datetime(2025, 1, 1)
+    for i in range(message_count):
+        role = MessageRole.user if i % 2 else MessageRole.assistant
+        log.append(str(uuid.uuid4()), role, f"message {i} about team engagement and retention", start + timedelta(seconds=i))
+    return log
+
+
+def best_of(fn, repeat: int = 3) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def legacy_dumps(obj) -> bytes:
+    return json.dumps(obj, indent=2, default=str).encode()
+
+
+def legacy_sse_event(payload) -> str:
+    return f"data: {json.dumps(payload)}\n\n"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--questions", type=int, default=20, help="questions per survey")
+    parser.add_argument("--responses", type=int, default=50_000, help="responses to the survey")
+    parser.add_argument("--messages", type=int, default=100_000, help="messages in the thread")
+    parser.add_argument("--chunks", type=int, default=100_000, help="SSE chunks")
+    args = parser.parse_args()
+
+    surveys, responses = make_survey_store(args.questions, args.responses)
+    messages = make_thread(args.messages).to_dicts()
+    chunks = [{"content": f"token {i} "} for i in range(args.chunks)]
+
+    cases = [
+        ("surveys + responses", lambda enc: (enc(surveys), enc(responses))),
+        ("thread messages", lambda enc: (enc(messages),)),
+    ]
+
+    print(f"serialization backend: {BACKEND}")
+    print(f"{'payload':<22} {'legacy ms':>10} {'legacy MB':>10} {'new ms':>10} {'new MB':>10} {'speedup':>8}")
+    for name, encode in cases:
+        legacy_size = sum(len(b) for b in encode(legacy_dumps))
+        new_size = sum(len(b) for b in encode(dumps))
+        legacy_s = best_of(lambda: encode(legacy_dumps))
+        new_s = best_of(lambda: encode(dumps))
+        print(
+            f"{name:<22} {legacy_s * 1000:>10.1f} {legacy_size / 1e6:>10.1f} "
+            f"{new_s * 1000:>10.1f} {new_size / 1e6:>10.1f} {legacy_s / new_s:>7.1f}x"
+        )
+
+    legacy_s = best_of(lambda: [legacy_sse_event(c) for c in chunks])
+    new_s = best_of(lambda: [sse_event(c) for c in chunks])
+    print(
+        f"{'SSE frames':<22} {legacy_s * 1000:>10.1f} {'':>10} "
+        f"{new_s * 1000:>10.1f} {'':>10} {legacy_s / new_s:>7.1f}x"
+    )
+
+
+if __name__ == "__main__":
+    main()
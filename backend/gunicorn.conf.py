@@ -0,0 +1,35 @@
+"""
+Production launcher settings: gunicorn managing uvicorn workers
+
+    WEB_CONCURRENCY=4 STORAGE_BACKEND=sqlite gunicorn main:app
+
+Every worker shares the SQLite database, and notifications are relayed
+between workers through it; see "Running Multiple Workers" in README.md.
+"""
+
+import os
+
+bind = f"{os.getenv('HOST', '0.0.0.0')}:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", "1"))
+worker_class = "uvicorn_worker.UvicornWorker"
+
+# Import the app once in the master so workers fork with it loaded; SQLite
+# connections opened during the import are reopened by each worker
+preload_app = True
+
+# Long enough for streaming exports and bulk imports
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+graceful_timeout = 30
+keepalive = 5
+
+
+
+def post_fork(server, worker):
+    """Tell each worker how many workers gunicorn actually runs, even when set with -w rather than WEB_CONCURRENCY"""
+    from app.core.config import settings
+    settings.web_concurrency = server.cfg.workers
+
+
+accesslog = "-"
+errorlog = "-"
+loglevel = os.getenv("LOG_LEVEL", "info")
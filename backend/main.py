@@ -3,18 +3,29 @@ Enculture Platform Backend API
 AI-native culture intelligence platform with OpenAI gpt-5-mini integration
 """
 
+import asyncio
+import contextlib
 import os
+import time
 from contextlib import asynccontextmanager
+from pathlib import Path
 from typing import AsyncGenerator
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from dotenv import load_dotenv
 
+from app.api.v1.endpoints.chat_threads import chat_thread_service
 from app.api.v1.router import api_router
 from app.core.config import settings
+from app.core.database import SQLiteDatabase, sqlite_path_from_url
 from app.core.logging_config import setup_logging
+from app.core.process_lock import acquire_process_lock
+from app.services.notification_bus import NotificationBus
+from app.services.survey_service import survey_service
+from app.services.websocket_manager import websocket_manager
+from app.services.write_behind import write_behind_flusher
 
 # Load environment variables
 load_dotenv()
@@ -22,6 +33,26 @@ load_dotenv()
 # Setup logging
 setup_logging()
 
+# Answered while services are still loading, so orchestrators can probe a starting worker
+PROBE_PATHS = {"/health", "/ready"}
+
+
+async def warm_up(ready: asyncio.Event):
+    """Load service state off the event loop, then mark the worker ready"""
+    try:
+        started = time.perf_counter()
+        await asyncio.to_thread(chat_thread_service.load)
+        # Reads every message file, so searches never have to wait for it on the event loop
+        await asyncio.to_thread(chat_thread_service.rebuild_search_index)
+        await asyncio.to_thread(survey_service.load)
+        source = "snapshot" if getattr(chat_thread_service, "loaded_from_snapshot", False) else "storage"
+        print(f"Services loaded from {source} in {time.perf_counter() - started:.2f}s")
+    except Exception as e:
+        # Requests still load what they need on demand
+        print(f"Error warming up services: {e}")
+    finally:
+        ready.set()
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
@@ -30,9 +61,45 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
     print("🚀 Starting Enculture Backend API...")
     print(f"Environment: {settings.environment}")
     print(f"Debug Mode: {settings.debug}")
+    writer_lock = None
+    if settings.storage_backend != "sqlite":
+        # The json backend keeps authoritative state in each process and would lose updates
+        if settings.multi_worker:
+            raise RuntimeError("WEB_CONCURRENCY > 1 requires STORAGE_BACKEND=sqlite")
+        # Catches workers started without WEB_CONCURRENCY, e.g. uvicorn --workers
+        writer_lock = acquire_process_lock(Path(settings.data_dir) / ".writer.lock")
+        if writer_lock is None:
+            raise RuntimeError(
+                f"Another process is serving {settings.data_dir}; multiple workers require STORAGE_BACKEND=sqlite"
+            )
+    background = []
+    app.state.ready = asyncio.Event()
+    background.append(asyncio.create_task(warm_up(app.state.ready)))
+    # Move soft-deleted and dormant chat threads to the cold tier periodically
+    background.append(asyncio.create_task(chat_thread_service.run_archive_sweeper()))
+    if settings.multi_worker:
+        # Created here, after the fork, so each worker has its own origin and connection
+        bus = NotificationBus(SQLiteDatabase(sqlite_path_from_url(settings.database_url)))
+        websocket_manager.attach_bus(bus)
+        background.append(asyncio.create_task(
+            bus.run(websocket_manager.deliver_local, settings.notification_poll_interval)
+        ))
+        print(f"Worker {os.getpid()} relaying notifications through {settings.database_url}")
     yield
     # Shutdown
     print("🛑 Shutting down Enculture Backend API...")
+    for task in background:
+        task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await task
+    # Persist any writes still waiting in the write-behind window
+    await write_behind_flusher.close()
+    # Snapshot the flushed thread metadata so the next start skips parsing it
+    if chat_thread_service.write_snapshot():
+        print("Wrote chat thread snapshot")
+    if writer_lock is not None:
+        writer_lock.close()
+    app.state.ready.set()
 
 
 def create_application() -> FastAPI:
@@ -56,6 +123,14 @@ def create_application() -> FastAPI:
         allow_headers=["*"],
     )
 
+    # Hold requests until startup loading finishes; probes are answered right away
+    @app.middleware("http")
+    async def wait_until_ready(request: Request, call_next):
+        ready = getattr(request.app.state, "ready", None)
+        if ready is not None and not ready.is_set() and request.url.path not in PROBE_PATHS:
+            await ready.wait()
+        return await call_next(request)
+
     # Include API router
     app.include_router(api_router, prefix="/api/v1")
 
@@ -71,6 +146,15 @@ def create_application() -> FastAPI:
             }
         )
 
+    # Readiness endpoint
+    @app.get("/ready")
+    async def readiness_check(request: Request):
+        """Readiness endpoint: 503 until startup loading has finished."""
+        ready = getattr(request.app.state, "ready", None)
+        if ready is not None and not ready.is_set():
+            return JSONResponse(status_code=503, content={"status": "loading"})
+        return JSONResponse(content={"status": "ready"})
+
     return app
 
 
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Import the JSON data files into the SQLite database configured by DATABASE_URL.
+
+Usage:
+    python migrate_to_sqlite.py chat-threads [--file data/chat_threads.json]
+    python migrate_to_sqlite.py surveys [--surveys-file data/surveys.json]
+                                        [--responses-file data/survey_responses]
+
+Run it once before switching STORAGE_BACKEND to "sqlite". Re-running is safe:
+existing rows with the same IDs are replaced.
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+# Add the app directory to Python path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.core.config import settings
+from app.core.database import SQLiteDatabase, sqlite_path_from_url
+
+
+def migrate_chat_threads(database: SQLiteDatabase, threads_file: Path) -> int:
+    from app.services.sqlite_chat_thread_service import SQLiteChatThreadService
+
+    service = SQLiteChatThreadService(database=database)
+    return service.import_json(threads_file)
+
+
+def migrate_surveys(database: SQLiteDatabase, surveys_file: Path, responses_file: Path) -> dict:
+    from app.services.sqlite_survey_service import SQLiteSurveyService
+
+    service = SQLiteSurveyService(database=database)
+    return service.import_json(surveys_file, responses_file)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=settings.database_url, help="Target SQLite database URL")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    chat_parser = subparsers.add_parser("chat-threads", help="Import chat_threads.json")
+    chat_parser.add_argument(
+        "--file", type=Path, default=Path("data") / "chat_threads.json",
+        help="Thread metadata file; messages are read from chat_messages/ and chat_archive/ beside it"
+    )
+
+    surveys_parser = subparsers.add_parser("surveys", help="Import surveys.json and the survey responses")
+    surveys_parser.add_argument("--surveys-file", type=Path, default=Path("data") / "surveys.json")
+    surveys_parser.add_argument(
+        "--responses-file", type=Path, default=Path("data") / "survey_responses",
+        help="Response segment directory, or a legacy survey_responses.json"
+    )
+
+    args = parser.parse_args()
+    database = SQLiteDatabase(sqlite_path_from_url(args.database_url))
+
+    if args.command == "chat-threads":
+        if not args.file.exists():
+            print(f"❌ {args.file} not found")
+            return 1
+        count = migrate_chat_threads(database, args.file)
+        print(f"✅ Imported {count} chat threads into {database.path}")
+
+    elif args.command == "surveys":
+        if not args.surveys_file.exists():
+            print(f"❌ {args.surveys_file} not found")
+            return 1
+        counts = migrate_surveys(database, args.surveys_file, args.responses_file)
+        print(f"✅ Imported {counts['surveys']} surveys and {counts['responses']} responses into {database.path}")
+
+    database.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,9 @@
+"""
+Shared test configuration
+"""
+
+import os
+import tempfile
+
+# Keep the JSON backend's files out of the repository's data/ directory
+os.environ.setdefault("DATA_DIR", tempfile.mkdtemp(prefix="enculture-test-data-"))
@@ -0,0 +1,419 @@
+"""
+Tests for the JSON-file chat thread service
+"""
+
+import asyncio
+import json
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.core.ids import new_ulid, ulid_datetime
+from app.models.chat_thread import MessageRole
+from app.services import chat_thread_service as chat_thread_service_module
+from app.services.chat_storage import TEXT_ID_OVERHEAD_BYTES, MessageLog
+from app.services.chat_thread_service import ChatThreadService
+from app.services.recency_index import RecencyIndex
+from app.services.search_index import SearchIndex, make_snippet
+from app.services.write_behind import WriteBehindFlusher
+
+
+@pytest.fixture
+def flusher(monkeypatch):
+    """Give each test its own write-behind flusher."""
+    flusher = WriteBehindFlusher(delay=0.01)
+    monkeypatch.setattr(chat_thread_service_module, "write_behind_flusher", flusher)
+    return flusher
+
+
+@pytest.fixture
+def service(tmp_path, flusher):
+    """Create a chat thread service on a temporary data directory."""
+    return ChatThreadService(data_dir=tmp_path)
+
+
+class TestRecencyIndex:
+    """Test cases for RecencyIndex."""
+
+    def test_pages_newest_first(self):
+        """Test paging per user and across users after moves and removals."""
+        index = RecencyIndex()
+        start = datetime(2025, 1, 1)
+        for i in range(10):
+            index.upsert(f"t{i}", "u1" if i % 2 else "u2", start + timedelta(minutes=i))
+
+        assert index.page(limit=3) == ["t9", "t8", "t7"]
+        assert index.page("u1", offset=1, limit=2) == ["t7", "t5"]
+        assert index.count("u2") == 5
+
+        index.upsert("t0", "u2", start + timedelta(hours=1))
+        assert index.page("u2", limit=1) == ["t0"]
+        index.remove("t0")
+        assert "t0" not in index
+        assert index.count() == 9
+        assert index.page("u2", offset=10) == []
+
+
+class TestMessageLog:
+    """Test cases for MessageLog."""
+
+    def test_round_trips_ids_roles_and_timestamps(self):
+        """Test that UUID and free-form IDs, roles and timestamps survive the compact columns."""
+        items = [
+            {"id": "3f0b1c9e-8a4f-4a57-9d43-0c1c2b7e6a11", "role": "user", "content": "Hi", "timestamp": "2025-09-07T08:30:00.123456"},
+            {"id": "msg-001-1", "role": "assistant", "content": "Hello", "timestamp": "2025-09-07T08:30:05"},
+            {"id": "3F0B1C9E-8A4F-4A57-9D43-0C1C2B7E6A11", "role": "system", "content": "", "timestamp": "1969-12-31T23:59:59"},
+        ]
+        log = MessageLog.from_dicts(items)
+
+        assert len(log) == 3
+        # The pre-epoch message sorts first
+        in_time_order = [items[2], items[0], items[1]]
+        assert log.to_dicts() == [{**item, "timestamp": datetime.fromisoformat(item["timestamp"]).isoformat()} for item in in_time_order]
+        messages = log.to_messages(start=1)
+        assert [m.id for m in messages] == ["3f0b1c9e-8a4f-4a57-9d43-0c1c2b7e6a11", "msg-001-1"]
+        assert messages[1].role == MessageRole.assistant
+        assert messages[1].timestamp == datetime(2025, 9, 7, 8, 30, 5)
+
+    def test_locate_with_out_of_order_timestamps(self):
+        """Test that imported messages out of time order are sorted on load, so cursors find them."""
+        start = datetime(2025, 9, 7)
+        items = [
+            {"id": f"msg-{i}", "role": "user", "content": str(i), "timestamp": (start + timedelta(seconds=seconds)).isoformat()}
+            for i, seconds in enumerate([5, 1, 3, 3, 0])
+        ]
+        log = MessageLog.from_dicts(items)
+
+        assert [m.id for m in log.to_messages()] == ["msg-4", "msg-1", "msg-2", "msg-3", "msg-0"]
+        assert log.locate(start + timedelta(seconds=3), "msg-3") == (3, 4)
+        assert log.locate(start + timedelta(seconds=1), "msg-1") == (1, 2)
+        assert log.locate(start + timedelta(seconds=3), "gone") == (2, 4)
+
+        with pytest.raises(ValueError):
+            log.append("late", MessageRole.user, "late", start + timedelta(seconds=4))
+        assert log.next_timestamp(start) == start + timedelta(seconds=5)
+        assert log.next_timestamp(start + timedelta(seconds=9)) == start + timedelta(seconds=9)
+
+    def test_ulid_ids_are_stored_compactly(self):
+        """Test that ULID IDs round-trip through the binary column, alongside UUID ones."""
+        ulid = new_ulid()
+        log = MessageLog()
+        size = log.append(ulid, MessageRole.user, "Hi", datetime(2025, 9, 7))
+        log.append("3f0b1c9e-8a4f-4a57-9d43-0c1c2b7e6a11", MessageRole.assistant, "Hello", datetime(2025, 9, 7))
+        log.append(ulid.lower(), MessageRole.user, "again", datetime(2025, 9, 7))
+
+        assert [m.id for m in log.to_messages()] == [ulid, "3f0b1c9e-8a4f-4a57-9d43-0c1c2b7e6a11", ulid.lower()]
+        assert size < TEXT_ID_OVERHEAD_BYTES
+
+
+class TestChatThreadService:
+    """Test cases for ChatThreadService."""
+
+    @pytest.mark.asyncio
+    async def test_listing_tracks_updates(self, service):
+        """Test that listing order follows messages, renames and deletes."""
+        first = await service.create_thread(title="First", user_id="u1")
+        second = await service.create_thread(title="Second", user_id="u1")
+        other = await service.create_thread(title="Other", user_id="u2")
+
+        listing = await service.get_all_threads(user_id="u1")
+        assert [t.id for t in listing.threads] == [second.id, first.id]
+
+        await service.add_message(first.id, MessageRole.user, "bump")
+        recent = await service.get_recent_threads(user_id="u1")
+        assert [t.id for t in recent] == [first.id, second.id]
+
+        await service.update_thread_title(second.id, "Renamed")
+        await service.delete_thread(first.id)
+        listing = await service.get_all_threads(user_id="u1")
+        assert [t.title for t in listing.threads] == ["Renamed"]
+        assert listing.total == 1
+
+        everyone = await service.get_all_threads(limit=1, offset=1)
+        assert everyone.total == 2
+        assert [t.id for t in everyone.threads] == [other.id]
+
+    @pytest.mark.asyncio
+    async def test_reload_from_disk(self, tmp_path, service, flusher):
+        """Test that a new service instance sees flushed threads."""
+        thread = await service.create_thread(title="Persisted", user_id="u1")
+        await service.add_message(thread.id, MessageRole.user, "Hello")
+        await service.add_message(thread.id, MessageRole.assistant, "Hi there")
+        await flusher.close()
+
+        reloaded = ChatThreadService(data_dir=tmp_path)
+        loaded = await reloaded.get_thread(thread.id)
+        assert [m.content for m in loaded.messages] == ["Hello", "Hi there"]
+        message_ids = [m.id for m in loaded.messages]
+        assert message_ids == sorted(message_ids)
+        assert all(ulid_datetime(message_id) for message_id in message_ids)
+        assert [t.id for t in await reloaded.get_recent_threads(user_id="u1")] == [thread.id]
+
+    @pytest.mark.asyncio
+    async def test_messages_stay_in_order_when_the_clock_steps_back(self, service, monkeypatch):
+        """Test that a message added after the clock steps back still pages after the previous one."""
+        thread = await service.create_thread(title="Clock", user_id="u1")
+        first = await service.add_message(thread.id, MessageRole.user, "first")
+
+        class SteppedBack(datetime):
+            @classmethod
+            def utcnow(cls):
+                return first.timestamp - timedelta(seconds=30)
+
+        monkeypatch.setattr(chat_thread_service_module, "datetime", SteppedBack)
+        second = await service.add_message(thread.id, MessageRole.assistant, "second")
+
+        assert second.timestamp == first.timestamp
+        page = await service.get_messages_page(thread.id, limit=1)
+        assert [m.content for m in page.messages] == ["second"]
+        earlier = await service.get_messages_page(thread.id, before=page.prev_cursor, limit=1)
+        assert [m.content for m in earlier.messages] == ["first"]
+
+
+class TestSearchIndex:
+    """Test cases for SearchIndex."""
+
+    def test_prefix_matching_and_ranking(self):
+        """Test that the last term matches as a prefix and BM25 favours denser matches."""
+        index = SearchIndex()
+        index.add_document("a", "u1", "Engagement survey", ["engagement is low", "engagement engagement"])
+        index.add_document("b", "u1", "Onboarding", ["some engagement notes", "and a lot of other unrelated words here"])
+        index.add_document("c", "u2", "Engagement", [])
+
+        assert [doc for doc, _ in index.search("engag", user_id="u1")] == ["a", "b"]
+        assert [doc for doc, _ in index.search("onboarding eng", user_id="u1")] == ["b"]
+        assert {doc for doc, _ in index.search("engagement")} == {"a", "b", "c"}
+        assert index.search("engagement survey", user_id="u2") == []
+
+    def test_title_updates_and_removal(self):
+        """Test that replacing a title drops its old terms."""
+        index = SearchIndex()
+        index.add_document("a", None, "New Chat")
+        index.set_title("a", "Retention plan")
+
+        assert index.search("chat") == []
+        assert [doc for doc, _ in index.search("retention")] == ["a"]
+
+        index.remove_document("a")
+        assert index.search("retention") == []
+
+    def test_snippet_highlights_matches(self):
+        """Test snippet highlighting and escaping."""
+        snippet = make_snippet("Team <b>engagement</b> dropped", "engage")
+        assert snippet == "Team &lt;b&gt;<mark>engagement</mark>&lt;/b&gt; dropped"
+        assert make_snippet("nothing here", "engage") is None
+
+
+class TestChatThreadSearch:
+    """Test searching through ChatThreadService."""
+
+    @pytest.mark.asyncio
+    async def test_search_follows_mutations(self, service):
+        thread = await service.create_thread(title="New Chat", user_id="u1")
+        await service.add_message(thread.id, MessageRole.user, "How do we improve onboarding?")
+
+        results = await service.search_threads("onboard", user_id="u1")
+        assert [r.id for r in results] == [thread.id]
+        assert "<mark>onboarding</mark>" in results[0].snippet
+        assert results[0].score > 0
+
+        await service.update_thread_title(thread.id, "Onboarding Plan")
+        results = await service.search_threads("plan", user_id="u1")
+        assert results[0].snippet == "Onboarding <mark>Plan</mark>"
+
+        assert await service.search_threads("onboarding", user_id="u2") == []
+        await service.delete_thread(thread.id)
+        assert await service.search_threads("onboarding", user_id="u1") == []
+
+    @pytest.mark.asyncio
+    async def test_index_is_rebuilt_from_storage_at_startup(self, tmp_path, service, flusher):
+        """Test that stored threads are searchable once the startup rebuild has run, not on first search."""
+        thread = await service.create_thread(title="Retro", user_id="u1")
+        await service.add_message(thread.id, MessageRole.user, "Quarterly retention review")
+        await flusher.close()
+
+        reopened = ChatThreadService(data_dir=tmp_path)
+        assert await reopened.search_threads("retention", user_id="u1") == []
+        await asyncio.to_thread(reopened.rebuild_search_index)
+        assert [r.id for r in await reopened.search_threads("retention", user_id="u1")] == [thread.id]
+
+
+class TestMessageResidency:
+    """Test lazy message loading and LRU eviction."""
+
+    def test_legacy_file_is_split_into_per_thread_files(self, tmp_path, flusher):
+        """Test that messages embedded in chat_threads.json move to chat_messages/."""
+        (tmp_path / "chat_threads.json").write_text(json.dumps({
+            "t1": {
+                "id": "t1",
+                "title": "Legacy",
+                "user_id": "u1",
+                "created_at": "2025-09-07T08:30:00",
+                "updated_at": "2025-09-07T09:00:00",
+                "messages": [
+                    {"id": "m1", "role": "user", "content": "Hi", "timestamp": "2025-09-07T08:30:00"}
+                ],
+                "is_active": True
+            }
+        }))
+
+        service = ChatThreadService(data_dir=tmp_path)
+        metadata = json.loads((tmp_path / "chat_threads.json").read_text())
+        assert "messages" not in metadata["t1"]
+        assert metadata["t1"]["message_count"] == 1
+        assert service.get_residency_stats()["resident_threads"] == 0
+
+    @pytest.mark.asyncio
+    async def test_cold_threads_are_evicted_and_reloaded(self, tmp_path, service, flusher):
+        """Test that the LRU stays within budget and reloads evicted threads from disk."""
+        service._messages.budget_bytes = 1500
+        threads = [await service.create_thread(title=f"T{i}", user_id="u1") for i in range(5)]
+        for thread in threads:
+            await service.add_message(thread.id, MessageRole.user, "x" * 500)
+        await flusher.close()
+
+        # Touching each thread again now that nothing is pending forces evictions
+        for thread in threads:
+            loaded = await service.get_thread(thread.id)
+            assert [m.content for m in loaded.messages] == ["x" * 500]
+
+        stats = service.get_residency_stats()
+        assert stats["evictions"] > 0
+        assert stats["loads"] > 0
+        assert stats["resident_bytes"] <= 1500
+        assert (await service.get_all_threads(user_id="u1")).threads[0].message_count == 1
+
+
+class TestColdStorage:
+    """Test archiving threads to the cold tier and restoring them on access."""
+
+    @pytest.mark.asyncio
+    async def test_deleted_and_dormant_threads_are_archived_and_restored(self, tmp_path, service, flusher):
+        """Test that sweeps shrink the hot set and every access path restores transparently."""
+        deleted = await service.create_thread(title="Deleted", user_id="u1")
+        dormant = await service.create_thread(title="Dormant", user_id="u1")
+        fresh = await service.create_thread(title="Fresh", user_id="u1")
+        for thread in (deleted, dormant, fresh):
+            await service.add_message(thread.id, MessageRole.user, f"hello from {thread.title}")
+        await service.delete_thread(deleted.id)
+        await flusher.close()
+
+        # Pretend the sweep runs long after the dormant thread was last touched
+        service._threads[fresh.id].updated_at += timedelta(days=60)
+        archived = await service.archive_cold_threads(now=datetime.utcnow() + timedelta(days=45))
+        await flusher.close()
+
+        assert archived == 2
+        stats = service.get_residency_stats()
+        assert stats["threads"] == 2 and stats["cold_threads"] == 2
+        assert stats["hot_message_files"] == 1
+        assert deleted.id not in json.loads((tmp_path / "chat_threads.json").read_text())
+
+        # Dormant threads still list and search normally
+        listing = await service.get_all_threads(user_id="u1")
+        assert {t.id for t in listing.threads} == {dormant.id, fresh.id}
+        assert [r.id for r in await service.search_threads("dormant", user_id="u1")] == [dormant.id]
+
+        # A fresh instance restores from the manifest on access
+        reloaded = ChatThreadService(data_dir=tmp_path)
+        restored = await reloaded.get_thread(deleted.id)
+        assert not restored.is_active
+        assert [m.content for m in restored.messages] == ["hello from Deleted"]
+        await reloaded.add_message(dormant.id, MessageRole.user, "back again")
+        page = await reloaded.get_messages_page(dormant.id)
+        assert [m.content for m in page.messages] == ["hello from Dormant", "back again"]
+        assert reloaded.get_residency_stats()["cold_threads"] == 0
+        assert reloaded.restored == 2
+
+    @pytest.mark.asyncio
+    async def test_restore_runs_off_the_event_loop_once(self, tmp_path, service, flusher):
+        """Test that concurrent requests for an archived thread share one restore in a worker thread."""
+        thread = await service.create_thread(title="Archived", user_id="u1")
+        await service.add_message(thread.id, MessageRole.user, "hello")
+        await service.delete_thread(thread.id)
+        await flusher.close()
+        assert await service.archive_cold_threads() == 1
+        await flusher.close()
+
+        reloaded = ChatThreadService(data_dir=tmp_path)
+        cold_read = reloaded._cold.read
+        readers = []
+
+        def read(thread_id):
+            readers.append(threading.current_thread())
+            return cold_read(thread_id)
+
+        reloaded._cold.read = read
+        loaded, page, metadata = await asyncio.gather(
+            reloaded.get_thread(thread.id),
+            reloaded.get_messages_page(thread.id),
+            reloaded.get_thread_metadata(thread.id),
+        )
+
+        assert [m.content for m in loaded.messages] == ["hello"]
+        assert [m.content for m in page.messages] == ["hello"]
+        assert metadata.title == "Archived"
+        assert len(readers) == 1 and readers[0] is not threading.main_thread()
+        assert reloaded.restored == 1 and reloaded.get_residency_stats()["cold_threads"] == 0
+
+
+class TestStartupSnapshot:
+    """Test cases for the chat thread startup snapshot."""
+
+    @pytest.mark.asyncio
+    async def test_snapshot_round_trip(self, tmp_path, service, flusher):
+        """Test that a deferred instance loads the same threads from a current snapshot."""
+        first = await service.create_thread(title="First", user_id="u1")
+        second = await service.create_thread(title="Second", user_id="u1")
+        await service.add_message(first.id, MessageRole.user, "Hello")
+        await service.delete_thread(second.id)
+        await flusher.close()
+        assert service.write_snapshot()
+
+        reloaded = ChatThreadService(data_dir=tmp_path, load=False)
+        assert not reloaded._loaded
+        assert [t.id for t in await reloaded.get_recent_threads(user_id="u1")] == [first.id]
+        assert reloaded.loaded_from_snapshot
+        metadata = await reloaded.get_thread_metadata(first.id)
+        assert metadata == await service.get_thread_metadata(first.id)
+        assert metadata.message_count == 1
+        assert not (await reloaded.get_thread_metadata(second.id)).is_active
+
+    @pytest.mark.asyncio
+    async def test_stale_snapshot_falls_back_to_json(self, tmp_path, service, flusher):
+        """Test that a snapshot is ignored once chat_threads.json changes, and skipped while writes are pending."""
+        await service.create_thread(title="Old", user_id="u1")
+        await flusher.close()
+        assert service.write_snapshot()
+        newer = await service.create_thread(title="New", user_id="u1")
+        assert not service.write_snapshot()
+        await flusher.close()
+
+        reloaded = ChatThreadService(data_dir=tmp_path)
+        assert not reloaded.loaded_from_snapshot
+        assert (await reloaded.get_recent_threads(user_id="u1"))[0].id == newer.id
+
+        # A corrupt snapshot is ignored rather than failing startup
+        (tmp_path / "chat_threads.snapshot").write_bytes(b"garbage")
+        assert len(ChatThreadService(data_dir=tmp_path)._threads) == 2
+        assert await service.compact()
+        assert ChatThreadService(data_dir=tmp_path).loaded_from_snapshot
+
+
+class TestReadiness:
+    """Test the readiness endpoint."""
+
+    def test_ready_after_startup(self):
+        """Test that /ready reports loading until the warm-up finishes, while /health always answers."""
+        import asyncio
+
+        from fastapi.testclient import TestClient
+        from main import app
+
+        with TestClient(app) as client:
+            app.state.ready = asyncio.Event()
+            assert client.get("/ready").status_code == 503
+            assert client.get("/health").status_code == 200
+            app.state.ready.set()
+            assert client.get("/ready").json() == {"status": "ready"}
@@ -0,0 +1,49 @@
+"""
+Tests for time-sortable IDs
+"""
+
+import multiprocessing
+from datetime import datetime, timedelta
+
+from app.core import ids
+from app.core.ids import ULID_LENGTH, new_id, new_ulid, ulid_datetime
+
+fork = multiprocessing.get_context("fork")
+
+
+def generate_in_child(queue):
+    queue.put([new_ulid() for _ in range(1000)])
+
+
+class TestULID:
+    """Test cases for the ULID generator."""
+
+    def test_strictly_increasing_within_a_millisecond(self, monkeypatch):
+        """Test that IDs from a frozen clock keep increasing and sort as strings."""
+        monkeypatch.setattr(ids.time, "time_ns", lambda: 1_700_000_000_000_000_000)
+        generated = [new_ulid() for _ in range(1000)]
+        assert generated == sorted(generated)
+        assert len(set(generated)) == 1000
+        assert all(len(value) == ULID_LENGTH for value in generated)
+
+    def test_time_ordering_and_decoding(self):
+        """Test that prefixed IDs carry their creation time."""
+        before = datetime.utcnow() - timedelta(milliseconds=1)
+        first = new_id("survey")
+        second = new_id("survey")
+        assert first.startswith("survey_") and first < second
+        assert before <= ulid_datetime(first) <= datetime.utcnow()
+        assert ulid_datetime("survey_1718000000.123_abcd1234") is None
+        assert ulid_datetime("9b2f6f0e-4d8e-4a53-8a55-43c1c3b7e0a1") is None
+
+    def test_forked_workers_do_not_share_a_sequence(self):
+        """Test that a forked child draws fresh randomness instead of continuing the parent's counter."""
+        new_ulid()
+        queue = fork.Queue()
+        children = [fork.Process(target=generate_in_child, args=(queue,)) for _ in range(2)]
+        for child in children:
+            child.start()
+        generated = queue.get(timeout=30) + queue.get(timeout=30)
+        for child in children:
+            child.join()
+        assert len(set(generated)) == len(generated)
@@ -0,0 +1,262 @@
+"""
+Tests for metric formula compilation and evaluation
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api.v1.endpoints import surveys as surveys_endpoints
+from app.core.database import SQLiteDatabase
+from app.models.survey import CreateSurveyRequest, SurveyQuestion, SurveyResponse
+from app.services import metric_formulas, response_columns
+from app.services import survey_service as survey_service_module
+from app.services.metric_formulas import (
+    Binary, Call, MetricFormulaError, Name, Number, String, compile_formula, parse_formula
+)
+from app.services.sqlite_survey_service import SQLiteSurveyService
+from app.services.survey_service import SurveyService
+from app.services.write_behind import WriteBehindFlusher
+
+QUESTIONS = [
+    SurveyQuestion(id="q1", question="Rate", response_type="scale"),
+    SurveyQuestion(id="q2", question="Satisfied?", response_type="multiple_choice", options=["Very Satisfied", "Neutral"]),
+    SurveyQuestion(id="q3", question="Perks", response_type="multiple_select", options=["Gym", "Remote"]),
+]
+CLASSIFIERS = [
+    {"name": "Department", "values": ["Sales", "HR"]},
+    {"name": "Work Arrangement", "values": ["Remote", "Office"]},
+]
+
+
+@pytest.fixture
+def flusher(monkeypatch):
+    """Give each test its own write-behind flusher."""
+    flusher = WriteBehindFlusher(delay=0.01)
+    monkeypatch.setattr(survey_service_module, "write_behind_flusher", flusher)
+    return flusher
+
+
+@pytest.fixture(params=["json", "sqlite"])
+def survey_service(request, tmp_path, flusher):
+    """Survey service for each storage backend."""
+    if request.param == "sqlite":
+        return SQLiteSurveyService(database=SQLiteDatabase(tmp_path / "test.db"))
+    return SurveyService(data_dir=tmp_path)
+
+
+@pytest.fixture(params=["numpy", "stdlib"])
+def vectors(request, monkeypatch):
+    """Evaluate with numpy when it is installed, and with the standard-library fallback."""
+    if request.param == "numpy" and metric_formulas.np is None:
+        pytest.skip("numpy is not installed")
+    if request.param == "stdlib":
+        monkeypatch.setattr(metric_formulas, "np", None)
+        monkeypatch.setattr(response_columns, "np", None)
+    return request.param
+
+
+async def create_survey_with_responses(service, count=10, metrics=()):
+    survey = await service.create_survey(CreateSurveyRequest(
+        name="Pulse", context="c", created_by="hr", questions=QUESTIONS,
+        classifiers=CLASSIFIERS, metrics=list(metrics)
+    ))
+    responses = []
+    for n in range(count):
+        answers = {"q1": n % 5 + 1, "Department": "HR" if n % 3 == 0 else "Sales", "Work Arrangement": ["Remote", "Office"][n % 2]}
+        if n % 4:
+            answers["q2"] = ["Very Satisfied", "Neutral"][n % 2]
+        if n % 3:
+            answers["q3"] = ["Gym", "Remote"][: n % 2 + 1]
+        responses.append(SurveyResponse(
+            id=f"r{n}", survey_id=survey.id, user_id=f"u{n}", responses=answers,
+            submitted_at=datetime(2025, 1, 1) + timedelta(minutes=n)
+        ))
+    await service.add_survey_responses(survey.id, responses)
+    return survey
+
+
+async def evaluate(service, survey_id, *formulas):
+    results = await service.evaluate_metrics(survey_id, [{"name": f, "formula": f} for f in formulas])
+    return results[0] if len(results) == 1 else results
+
+
+class TestFormulaParser:
+    """Test cases for parse_formula and compile_formula."""
+
+    def test_precedence_segments_and_filters(self):
+        """Test operator precedence, BY names with spaces and WHERE."""
+        formula = parse_formula("COUNT(q1 >= 4) / COUNT(total_responses) * 100 WHERE q2 = 'Neutral' BY Department, Work Arrangement")
+        assert formula.expression == Binary(
+            "*",
+            Binary("/", Call("COUNT", (Binary(">=", Name("q1"), Number(4.0)),)), Call("COUNT", (Name("total_responses"),))),
+            Number(100.0)
+        )
+        assert formula.where == Binary("==", Name("q2"), String("Neutral"))
+        assert formula.by == ("Department", "Work Arrangement")
+
+    def test_rejects_invalid_formulas_and_caches_plans(self):
+        """Test syntax errors, bare names outside aggregates and plan caching."""
+        for text in ("AVG(q1", "q1 + 1", "AVG(AVG(q1))", "PERCENT(q1, q2)", "AVG(q1) BY", "AVG(q1) ; 1", ""):
+            with pytest.raises(MetricFormulaError):
+                compile_formula(text)
+        assert compile_formula("AVG(q1)") is compile_formula(" AVG(q1) ")
+
+
+class TestMetricEvaluation:
+    """Test cases for SurveyService.evaluate_metrics."""
+
+    @pytest.mark.asyncio
+    async def test_aggregates_and_segments(self, survey_service, vectors):
+        """Test AVG, COUNT and PERCENT overall and per segment."""
+        survey = await create_survey_with_responses(survey_service)
+
+        result = await evaluate(survey_service, survey.id, "COUNT(q1 >= 4) / COUNT(total_responses) * 100 BY Department")
+        assert (result["value"], result["responses"]) == (40.0, 10)
+        assert result["segments"] == [
+            {"segment": {"Department": "HR"}, "value": 50.0, "responses": 4},
+            {"segment": {"Department": "Sales"}, "value": pytest.approx(100 / 3), "responses": 6},
+        ]
+
+        result = await evaluate(survey_service, survey.id, "PERCENT(q2 == 'Very Satisfied') BY Work Arrangement")
+        assert result["value"] == pytest.approx(200 / 7)
+        assert [s["value"] for s in result["segments"]] == [100.0, 0.0]
+
+        results = await evaluate(
+            survey_service, survey.id,
+            "AVG(q1, q1) BY Work Arrangement, Department", "COUNT(q2)", "SUM(q3)",
+            "PERCENT(q3 = 'Remote')", "COUNT(*) WHERE q1 > 2 AND NOT Department = 'HR'"
+        )
+        assert results[0]["value"] == 3.0
+        assert results[0]["segments"][0] == {
+            "segment": {"Work Arrangement": "Remote", "Department": "HR"}, "value": 1.5, "responses": 2
+        }
+        assert [r["value"] for r in results[1:]] == [7.0, 9.0, 50.0, 4.0]
+
+        # Numeric BY columns segment by value, skipping unanswered rows
+        result = await evaluate(survey_service, survey.id, "COUNT(q2) BY q1")
+        assert result["segments"] == [
+            {"segment": {"q1": score}, "value": float(count), "responses": 2}
+            for score, count in [(1, 1), (2, 2), (3, 2), (4, 1), (5, 1)]
+        ]
+
+    @pytest.mark.asyncio
+    async def test_survey_metrics_report_errors_per_formula(self, survey_service, vectors):
+        """Test that stored metrics are evaluated and an unknown name only fails its own metric."""
+        survey = await create_survey_with_responses(survey_service, metrics=[
+            {"name": "Engagement", "formula": "AVG(q1) BY Department"},
+            {"name": "Broken", "formula": "AVG(engagement_score)"},
+            {"name": "Untracked"},
+        ])
+
+        engagement, broken = await survey_service.evaluate_metrics(survey.id)
+        assert engagement["name"] == "Engagement" and engagement["value"] == 3.0
+        assert broken["error"] == "Unknown question or classifier 'engagement_score'"
+        assert await survey_service.evaluate_metrics("missing") is None
+
+
+class TestRunningTotals:
+    """Test cases for running metric totals kept current by submissions."""
+
+    METRICS = [
+        {"name": "Engagement", "formula": "AVG(q1) BY Department, Work Arrangement"},
+        {"name": "Satisfied", "formula": "PERCENT(q2 = 'Very Satisfied') WHERE q1 > 1 BY Department"},
+        {"name": "Perks", "formula": "SUM(q3) + COUNT(Location)"},
+    ]
+
+    @pytest.mark.asyncio
+    async def test_submissions_match_full_evaluation(self, survey_service, vectors):
+        """Test that totals folded one response at a time match evaluating every response."""
+        survey = await create_survey_with_responses(survey_service, count=6, metrics=self.METRICS)
+        engagement, satisfied, perks = await survey_service.get_metric_values(survey.id)
+        assert (engagement["responses"], satisfied["responses"]) == (6, 4)
+        # Location is neither a question nor a classifier, and nobody has answered it yet
+        assert perks["error"] == "Unknown question or classifier 'Location'"
+
+        for n in range(6, 20):
+            answers = {"q1": n % 5 + 1, "Department": ["HR", "Sales", "Ops"][n % 3], "Work Arrangement": "Remote"}
+            if n % 2:
+                answers.update(q2="Very Satisfied", q3=["Gym"], Location="Berlin")
+            await survey_service.add_survey_response(SurveyResponse(
+                id=f"r{n}", survey_id=survey.id, user_id=f"u{n}", responses=answers, submitted_at=datetime(2025, 1, 2)
+            ))
+
+        running = await survey_service.get_metric_values(survey.id)
+        assert running == await survey_service.evaluate_metrics(survey.id)
+        assert running[0]["segments"][-1]["segment"] == {"Department": "Ops", "Work Arrangement": "Remote"}
+        assert running[2]["value"] == 20.0
+
+        recomputed = await survey_service.recompute_metrics(survey.id)
+        assert recomputed == {"metrics": running, "drift": []}
+
+    @pytest.mark.asyncio
+    async def test_rebuilds_when_metrics_change(self, survey_service):
+        """Test that editing a survey's metrics replaces the totals and a fresh survey starts empty."""
+        survey = await create_survey_with_responses(survey_service, count=4, metrics=self.METRICS[:1])
+        await survey_service.get_metric_values(survey.id)
+
+        survey.metrics = [{"name": "Responses", "formula": "COUNT(*)"}]
+        await survey_service.update_survey(survey.id, survey)
+        assert [m["value"] for m in await survey_service.get_metric_values(survey.id)] == [4.0]
+        assert await survey_service.get_metric_values("missing") is None
+
+        empty = await create_survey_with_responses(survey_service, count=0, metrics=self.METRICS[:1])
+        assert await survey_service.get_metric_values(empty.id) == [
+            {"name": "Engagement", "formula": self.METRICS[0]["formula"], "value": None, "responses": 0, "segments": []}
+        ]
+
+    @pytest.mark.asyncio
+    async def test_catches_up_with_other_workers(self, tmp_path, vectors):
+        """Test that responses stored by another worker are folded in on the next read."""
+        first = SQLiteSurveyService(database=SQLiteDatabase(tmp_path / "app.db"))
+        second = SQLiteSurveyService(database=SQLiteDatabase(tmp_path / "app.db"))
+        survey = await create_survey_with_responses(first, count=5, metrics=self.METRICS)
+        await first.get_metric_values(survey.id)
+
+        await second.add_survey_responses(survey.id, [
+            SurveyResponse(id=f"w{n}", survey_id=survey.id, user_id="w", responses={"q1": 5, "Department": "HR"},
+                           submitted_at=datetime(2025, 1, 2))
+            for n in range(3)
+        ])
+
+        running = await first.get_metric_values(survey.id)
+        assert running[0]["responses"] == 8
+        assert running == await first.evaluate_metrics(survey.id)
+
+
+class TestMetricsEndpoint:
+    """Test the metrics endpoint."""
+
+    @pytest.mark.asyncio
+    async def test_evaluates_ad_hoc_formulas(self, tmp_path, flusher, monkeypatch):
+        """Test ad-hoc formulas, syntax errors and a missing survey."""
+        service = SurveyService(data_dir=tmp_path)
+        monkeypatch.setattr(surveys_endpoints, "survey_service", service)
+        survey = await create_survey_with_responses(service)
+
+        from main import app
+        client = TestClient(app)
+        response = client.get(f"/api/v1/surveys/{survey.id}/metrics", params={"formula": ["AVG(q1)", "COUNT(q2)"]})
+        assert response.status_code == 200
+        assert [m["value"] for m in response.json()["metrics"]] == [3.0, 7.0]
+
+        assert client.get(f"/api/v1/surveys/{survey.id}/metrics", params={"formula": "AVG(q1"}).status_code == 400
+        assert client.get("/api/v1/surveys/missing/metrics").status_code == 404
+
+    @pytest.mark.asyncio
+    async def test_reads_and_recomputes_running_totals(self, tmp_path, flusher, monkeypatch):
+        """Test the survey's own metrics and the recompute endpoint."""
+        service = SurveyService(data_dir=tmp_path)
+        monkeypatch.setattr(surveys_endpoints, "survey_service", service)
+        survey = await create_survey_with_responses(service, metrics=[{"name": "Rating", "formula": "AVG(q1)"}])
+
+        from main import app
+        client = TestClient(app)
+        response = client.post(f"/api/v1/surveys/{survey.id}/metrics/recompute")
+        assert response.status_code == 200
+        assert response.json()["drift"] is None
+
+        assert client.get(f"/api/v1/surveys/{survey.id}/metrics").json()["metrics"][0]["value"] == 3.0
+        assert client.post(f"/api/v1/surveys/{survey.id}/metrics/recompute").json()["drift"] == []
+        assert client.post("/api/v1/surveys/missing/metrics/recompute").status_code == 404
@@ -0,0 +1,141 @@
+"""
+Tests for running the backend in several worker processes
+"""
+
+import asyncio
+import multiprocessing
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.core.database import SQLiteDatabase
+from app.core.process_lock import acquire_process_lock
+from app.models.chat_thread import MessageRole
+from app.models.survey import CreateSurveyRequest, SurveyQuestion, SurveyResponse
+from app.services.notification_bus import NotificationBus
+from app.services.sqlite_chat_thread_service import SQLiteChatThreadService
+from app.services.sqlite_survey_service import SQLiteSurveyService
+
+WORKERS = 4
+WRITES_PER_WORKER = 50
+
+# fork() is what a preloading server does; each child inherits services built in the parent
+fork = multiprocessing.get_context("fork")
+
+
+def submit_from_worker(surveys, threads, survey_id, thread_id, worker):
+    async def work():
+        for n in range(WRITES_PER_WORKER):
+            await surveys.add_survey_response(SurveyResponse(
+                id=f"w{worker}-r{n}", survey_id=survey_id, user_id=f"w{worker}",
+                responses={"q1": worker + 1}, submitted_at=datetime(2025, 1, 1) + timedelta(seconds=n)
+            ))
+            await threads.add_message(thread_id, MessageRole.user, f"w{worker}-m{n}")
+            if n % 10 == 0:
+                # Interleave column refreshes with other workers' submissions
+                await surveys.aggregate_responses(survey_id)
+    asyncio.run(work())
+
+
+def hold_writer_lock(path, held, done):
+    lock = acquire_process_lock(path)
+    held.set()
+    done.wait(10)
+    lock.close()
+
+
+def run_workers(target, *args):
+    processes = [fork.Process(target=target, args=(*args, worker)) for worker in range(WORKERS)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(timeout=60)
+    assert [p.exitcode for p in processes] == [0] * WORKERS
+
+
+class TestForkedWorkers:
+    """Test concurrent writers in separate processes sharing one SQLite database."""
+
+    @pytest.mark.asyncio
+    async def test_no_lost_updates(self, tmp_path):
+        """Test that every worker's responses and messages are kept and aggregates see them all."""
+        db_path = tmp_path / "app.db"
+        surveys = SQLiteSurveyService(database=SQLiteDatabase(db_path))
+        threads = SQLiteChatThreadService(database=SQLiteDatabase(db_path))
+        survey = await surveys.create_survey(CreateSurveyRequest(
+            name="Pulse", context="c", created_by="hr",
+            questions=[SurveyQuestion(id="q1", question="Rate", response_type="scale")]
+        ))
+        thread = await threads.create_thread(title="Shared", user_id="u1")
+        await surveys.aggregate_responses(survey.id)
+
+        run_workers(submit_from_worker, surveys, threads, survey.id, thread.id)
+
+        total = WORKERS * WRITES_PER_WORKER
+        assert await surveys.count_responses(survey.id) == total
+        assert len((await threads.get_thread(thread.id)).messages) == total
+        # The parent's columns catch up with what the workers appended
+        aggregates = await surveys.aggregate_responses(survey.id)
+        assert aggregates["questions"]["q1"]["count"] == total
+        assert aggregates["questions"]["q1"]["sum"] == sum(w + 1 for w in range(WORKERS)) * WRITES_PER_WORKER
+
+
+class TestNotificationBus:
+    """Test cases for NotificationBus."""
+
+    @pytest.mark.asyncio
+    async def test_relays_to_other_workers_only(self, tmp_path):
+        """Test that a notification reaches every other worker once and not its publisher."""
+        first = NotificationBus(SQLiteDatabase(tmp_path / "app.db"))
+        second = NotificationBus(SQLiteDatabase(tmp_path / "app.db"))
+
+        await first.publish({"type": "survey_completed"}, ["u1"])
+        await second.publish({"type": "broadcast"})
+
+        assert await second.poll() == [({"type": "survey_completed"}, ["u1"])]
+        assert await second.poll() == []
+        assert await first.poll() == [({"type": "broadcast"}, None)]
+
+        # A worker started later does not replay what was published before it
+        assert await NotificationBus(SQLiteDatabase(tmp_path / "app.db")).poll() == []
+
+
+class TestDeploymentChecks:
+    """Test startup checks for multi-worker mode."""
+
+    def test_multi_worker_requires_sqlite(self, monkeypatch):
+        """Test that the JSON backend refuses to start with more than one worker."""
+        monkeypatch.setattr(settings, "web_concurrency", 2)
+        monkeypatch.setattr(settings, "storage_backend", "json")
+
+        from main import app
+        with pytest.raises(RuntimeError, match="STORAGE_BACKEND=sqlite"):
+            with TestClient(app):
+                pass
+
+    def test_json_backend_refuses_a_second_process(self, tmp_path, monkeypatch):
+        """Test that a JSON-backend worker started without WEB_CONCURRENCY fails while another serves the files."""
+        monkeypatch.setattr(settings, "storage_backend", "json")
+        monkeypatch.setattr(settings, "data_dir", str(tmp_path))
+
+        from main import app
+        held, done = fork.Event(), fork.Event()
+        other = fork.Process(target=hold_writer_lock, args=(tmp_path / ".writer.lock", held, done))
+        other.start()
+        try:
+            assert held.wait(10)
+            with pytest.raises(RuntimeError, match="Another process is serving"):
+                with TestClient(app):
+                    pass
+        finally:
+            done.set()
+            other.join(timeout=10)
+
+        # Once the other process has exited, this one can start and releases the lock on shutdown
+        with TestClient(app):
+            pass
+        lock = acquire_process_lock(tmp_path / ".writer.lock")
+        assert lock is not None
+        lock.close()
@@ -0,0 +1,218 @@
+"""
+Tests for keyset cursor pagination across the JSON and SQLite backends
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.core.database import SQLiteDatabase
+from app.core.pagination import (
+    InvalidCursorError, decode_cursor, decode_position_cursor, encode_cursor, encode_position_cursor
+)
+from app.models.chat_thread import MessageRole
+from app.models.survey import CreateSurveyRequest, SurveyResponse
+from app.services import chat_thread_service as chat_thread_service_module, response_segments
+from app.services import survey_service as survey_service_module
+from app.services.chat_thread_service import ChatThreadService
+from app.services.sqlite_chat_thread_service import SQLiteChatThreadService
+from app.services.sqlite_survey_service import SQLiteSurveyService
+from app.services.survey_service import SurveyService
+from app.services.write_behind import WriteBehindFlusher
+
+
+@pytest.fixture
+def flusher(monkeypatch):
+    """Give each test its own write-behind flusher."""
+    flusher = WriteBehindFlusher(delay=0.01)
+    monkeypatch.setattr(chat_thread_service_module, "write_behind_flusher", flusher)
+    monkeypatch.setattr(survey_service_module, "write_behind_flusher", flusher)
+    return flusher
+
+
+@pytest.fixture(params=["json", "sqlite"])
+def thread_service(request, tmp_path, flusher):
+    """Chat thread service for each storage backend."""
+    if request.param == "sqlite":
+        return SQLiteChatThreadService(database=SQLiteDatabase(tmp_path / "test.db"))
+    return ChatThreadService(data_dir=tmp_path)
+
+
+@pytest.fixture(params=["json", "sqlite"])
+def survey_service(request, tmp_path, flusher):
+    """Survey service for each storage backend."""
+    if request.param == "sqlite":
+        return SQLiteSurveyService(database=SQLiteDatabase(tmp_path / "test.db"))
+    return SurveyService(data_dir=tmp_path)
+
+
+def make_response(survey_id, n, submitted_at):
+    return SurveyResponse(
+        id=f"response_{n:03d}",
+        survey_id=survey_id,
+        user_id=f"user{n}",
+        responses={"q1": str(n)},
+        submitted_at=submitted_at
+    )
+
+
+class TestCursor:
+    """Test cases for cursor encoding."""
+
+    def test_round_trip_and_rejects_garbage(self):
+        """Test that cursors round-trip and foreign strings are rejected."""
+        key = (datetime(2025, 9, 7, 8, 30, 0, 123), "thread/1")
+        assert decode_cursor(encode_cursor(*key)) == key
+
+        for bad in ["not a cursor", "W10", encode_cursor(datetime(2025, 1, 1), "x")[:-3]]:
+            with pytest.raises(InvalidCursorError):
+                decode_cursor(bad)
+
+    def test_position_cursors(self):
+        """Test that position cursors round-trip and keyset cursors are not mistaken for them."""
+        assert decode_position_cursor(encode_position_cursor(12345)) == 12345
+        for bad in ["W10", encode_cursor(datetime(2025, 1, 1), "x"), encode_position_cursor(-1)]:
+            with pytest.raises(InvalidCursorError):
+                decode_position_cursor(bad)
+
+
+class TestThreadPagination:
+    """Test cursor pagination of chat threads."""
+
+    @pytest.mark.asyncio
+    async def test_pages_are_stable_under_updates(self, thread_service):
+        """Test that bumping or adding threads between pages neither skips nor repeats older ones."""
+        threads = [await thread_service.create_thread(title=f"T{i}", user_id="u1") for i in range(5)]
+
+        first = await thread_service.get_all_threads(user_id="u1", limit=2)
+        assert [t.id for t in first.threads] == [threads[4].id, threads[3].id]
+
+        # A new thread and a bumped one both move above the cursor
+        await thread_service.create_thread(title="New", user_id="u1")
+        await thread_service.add_message(threads[4].id, MessageRole.user, "bump")
+
+        second = await thread_service.get_all_threads(user_id="u1", limit=2, cursor=first.next_cursor)
+        third = await thread_service.get_all_threads(user_id="u1", limit=2, cursor=second.next_cursor)
+        assert [t.id for t in second.threads + third.threads] == [threads[2].id, threads[1].id, threads[0].id]
+        assert third.next_cursor is None
+        assert third.total == 6
+
+
+class TestSurveyPagination:
+    """Test cursor pagination of surveys and responses."""
+
+    @pytest.mark.asyncio
+    async def test_lists_surveys_newest_first(self, survey_service):
+        """Test survey pages, the creator filter and the end of the list."""
+        ids = []
+        for i in range(3):
+            survey = await survey_service.create_survey(
+                CreateSurveyRequest(name=f"S{i}", context="c", created_by="a" if i != 1 else "b")
+            )
+            ids.append(survey.id)
+
+        first = await survey_service.list_surveys_page(limit=2)
+        assert [s.id for s in first.items] == [ids[2], ids[1]]
+        second = await survey_service.list_surveys_page(limit=2, cursor=first.next_cursor)
+        assert [s.id for s in second.items] == [ids[0]]
+        assert second.next_cursor is None
+
+        by_a = await survey_service.list_surveys_page(created_by="a", limit=10)
+        assert [s.id for s in by_a.items] == [ids[2], ids[0]]
+
+    @pytest.mark.asyncio
+    async def test_summaries_track_responses_and_updates(self, survey_service):
+        """Test that list rows carry live response counts and edited fields."""
+        first = await survey_service.create_survey(CreateSurveyRequest(name="A", context="c", created_by="hr"))
+        second = await survey_service.create_survey(CreateSurveyRequest(name="B", context="c", created_by="hr"))
+        for n in range(3):
+            await survey_service.add_survey_response(make_response(first.id, n, datetime(2025, 1, 1)))
+
+        page = await survey_service.list_survey_summaries(limit=1)
+        assert [(s["id"], s["response_count"]) for s in page.items] == [(second.id, 0)]
+        page = await survey_service.list_survey_summaries(limit=1, cursor=page.next_cursor)
+        assert [(s["id"], s["response_count"]) for s in page.items] == [(first.id, 3)]
+        assert page.next_cursor is None
+
+        first.status = "published"
+        first.configuration.target_audience = ["u1", "u2"]
+        await survey_service.update_survey(first.id, first)
+        await survey_service.add_survey_response(make_response(first.id, 3, datetime(2025, 1, 2)))
+        summary = (await survey_service.list_survey_summaries(created_by="hr")).items[1]
+        assert summary["status"] == "published"
+        assert summary["target_audience"] == ["u1", "u2"]
+        assert summary["response_count"] == 4
+        assert summary["created_at"] == first.created_at.isoformat()
+
+    @pytest.mark.asyncio
+    async def test_response_pages_survive_new_submissions(self, survey_service):
+        """Test that responses submitted mid-scan appear once, at the end."""
+        start = datetime(2025, 1, 1)
+        # Two responses share a timestamp, so the cursor has to break the tie
+        times = [start, start + timedelta(seconds=1), start + timedelta(seconds=1), start + timedelta(seconds=2)]
+        for n, submitted_at in enumerate(times):
+            await survey_service.add_survey_response(make_response("s1", n, submitted_at))
+        await survey_service.add_survey_response(make_response("s2", 99, start))
+
+        seen = []
+        page = await survey_service.get_responses_page("s1", limit=2)
+        seen += [r.id for r in page.items]
+        await survey_service.add_survey_response(make_response("s1", 4, start + timedelta(seconds=3)))
+        while page.next_cursor:
+            page = await survey_service.get_responses_page("s1", cursor=page.next_cursor, limit=2)
+            seen += [r.id for r in page.items]
+
+        assert seen == [f"response_{n:03d}" for n in range(5)]
+        assert await survey_service.count_responses("s1") == 5
+
+        with pytest.raises(InvalidCursorError):
+            await survey_service.get_responses_page("s1", cursor="bogus")
+
+    @pytest.mark.asyncio
+    async def test_late_pages_only_read_their_own_responses(self, tmp_path, flusher, monkeypatch):
+        """Test that a page deep into a segment parses its own lines, not everything before them."""
+        service = SurveyService(data_dir=tmp_path)
+        start = datetime(2025, 1, 1)
+        await service.add_survey_responses("s1", [make_response("s1", n, start + timedelta(seconds=n)) for n in range(200)])
+        page = await service.get_responses_page("s1", limit=190)
+
+        parsed = []
+        loads = response_segments.loads
+        monkeypatch.setattr(response_segments, "loads", lambda data: parsed.append(data) or loads(data))
+        page = await service.get_responses_page("s1", cursor=page.next_cursor, limit=5)
+        assert [r.id for r in page.items] == [f"response_{n:03d}" for n in range(190, 195)]
+        assert len(parsed) == 5
+
+        with pytest.raises(InvalidCursorError):
+            await service.get_responses_page("s1", cursor=encode_position_cursor(7))
+
+
+class TestMessagePagination:
+    """Test paging through the messages of one thread."""
+
+    @pytest.mark.asyncio
+    async def test_scrolls_back_from_newest_and_forward_again(self, thread_service):
+        """Test newest-first loading, before/after cursors and the metadata view."""
+        thread = await thread_service.create_thread(title="Long", user_id="u1")
+        for i in range(7):
+            await thread_service.add_message(thread.id, MessageRole.user, f"m{i}")
+
+        newest = await thread_service.get_messages_page(thread.id, limit=3)
+        assert [m.content for m in newest.messages] == ["m4", "m5", "m6"]
+        assert newest.next_cursor is None
+        assert newest.message_count == 7
+
+        older = await thread_service.get_messages_page(thread.id, before=newest.prev_cursor, limit=3)
+        oldest = await thread_service.get_messages_page(thread.id, before=older.prev_cursor, limit=3)
+        assert [m.content for m in older.messages] == ["m1", "m2", "m3"]
+        assert [m.content for m in oldest.messages] == ["m0"]
+        assert oldest.prev_cursor is None
+
+        newer = await thread_service.get_messages_page(thread.id, after=oldest.next_cursor, limit=2)
+        assert [m.content for m in newer.messages] == ["m1", "m2"]
+        assert newer.next_cursor is not None
+
+        metadata = await thread_service.get_thread_metadata(thread.id)
+        assert metadata.message_count == 7 and metadata.title == "Long"
+        assert await thread_service.get_messages_page("missing") is None
+        assert await thread_service.get_thread_metadata("missing") is None
@@ -0,0 +1,278 @@
+"""
+Tests for the columnar survey response store
+"""
+
+import math
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.core.database import SQLiteDatabase
+from app.models.survey import CreateSurveyRequest, SurveyQuestion, SurveyResponse
+from app.core.serialization import dumps, loads
+from app.services import question_stats as question_stats_module, response_columns
+from app.services import survey_service as survey_service_module
+from app.services.answer_decoders import question_decoders
+from app.services.response_columns import SurveyColumns
+from app.services.sqlite_survey_service import SQLiteSurveyService
+from app.services.survey_service import SurveyService
+from app.services.write_behind import WriteBehindFlusher
+
+QUESTION_TYPES = {"q1": "scale", "q2": "yes_no", "q3": "multiple_select", "q4": "text"}
+QUESTIONS = [
+    SurveyQuestion(id="q1", question="Agree?", response_type="scale", options=["1 - Disagree", "4 - Agree"]),
+    SurveyQuestion(id="q2", question="Pick", response_type="multiple_choice", options=["A", "B"]),
+    SurveyQuestion(id="q3", question="Why?", response_type="text"),
+]
+
+
+@pytest.fixture
+def flusher(monkeypatch):
+    """Give each test its own write-behind flusher."""
+    flusher = WriteBehindFlusher(delay=0.01)
+    monkeypatch.setattr(survey_service_module, "write_behind_flusher", flusher)
+    return flusher
+
+
+@pytest.fixture(params=["json", "sqlite"])
+def survey_service(request, tmp_path, flusher):
+    """Survey service for each storage backend."""
+    if request.param == "sqlite":
+        return SQLiteSurveyService(database=SQLiteDatabase(tmp_path / "test.db"))
+    return SurveyService(data_dir=tmp_path)
+
+
+@pytest.fixture(params=["numpy", "stdlib"])
+def vectors(request, monkeypatch):
+    """Compute with numpy when it is installed, and with the standard-library fallback."""
+    if request.param == "numpy" and response_columns.np is None:
+        pytest.skip("numpy is not installed")
+    if request.param == "stdlib":
+        monkeypatch.setattr(response_columns, "np", None)
+        monkeypatch.setattr(question_stats_module, "np", None)
+    return request.param
+
+
+def record(n, answers):
+    return {"submitted_at": datetime(2025, 1, 1) + timedelta(minutes=n), "responses": answers}
+
+
+class TestSurveyColumns:
+    """Test cases for SurveyColumns."""
+
+    def test_encodes_answers_by_kind_and_reopens(self, tmp_path):
+        """Test typed columns, missing values, late columns and reopening from disk."""
+        columns = SurveyColumns(tmp_path / "s1")
+        columns.extend([
+            record(0, {"q1": "4 - Agree", "q2": "yes", "q3": ["a", "b"], "q4": "free text"}),
+            record(1, {"q1": 2, "q2": "no"}),
+        ], QUESTION_TYPES, position=100)
+        # q5 is first answered in the second batch and is backfilled as missing
+        columns.extend([record(2, {"q2": "yes", "q3": "c", "q5": 7})], QUESTION_TYPES, position=150)
+
+        reopened = SurveyColumns(tmp_path / "s1")
+        assert (reopened.rows, reopened.position) == (3, 150)
+        assert reopened.question_ids() == ["q1", "q2", "q3", "q5"]
+        assert list(reopened.numeric("q1"))[:2] == [4.0, 2.0] and math.isnan(reopened.numeric("q1")[2])
+        assert reopened.aggregate("q2") == {"kind": "category", "count": 3, "counts": {"yes": 2, "no": 1}}
+        assert reopened.aggregate("q3") == {"kind": "multi", "count": 2, "counts": {"a": 1, "b": 1, "c": 1}}
+        assert reopened.aggregate("q5")["count"] == 1
+        assert reopened.aggregate("q1") == {"kind": "numeric", "count": 2, "sum": 6.0, "mean": 3.0, "min": 2.0, "max": 4.0}
+
+    def test_drops_bytes_past_the_committed_rows(self, tmp_path):
+        """Test that a crash between appending columns and writing the metadata is undone on open."""
+        columns = SurveyColumns(tmp_path / "s1")
+        columns.extend([record(0, {"q1": 1})], QUESTION_TYPES, position=1)
+        with open(tmp_path / "s1" / "c1.values", "ab") as f:
+            f.write(b"\x00" * 16)
+
+        reopened = SurveyColumns(tmp_path / "s1")
+        assert list(reopened.numeric("q1")) == [1.0]
+
+    def test_counts_unstored_answers_and_rebuilds_older_columns(self, tmp_path):
+        """Test that free-text answers are counted and columns from an older format start over."""
+        columns = SurveyColumns(tmp_path / "s1")
+        columns.extend([record(0, {"q1": 1, "q4": "text"}), record(1, {"q4": "more"})], QUESTION_TYPES, position=2)
+        assert (columns.unstored_answers("q4"), columns.unstored_answers("q1")) == (2, 0)
+
+        meta = loads((tmp_path / "s1" / "columns.json").read_bytes())
+        del meta["format"], meta["unstored"]
+        (tmp_path / "s1" / "columns.json").write_bytes(dumps(meta))
+        reopened = SurveyColumns(tmp_path / "s1")
+        assert (reopened.rows, reopened.position, reopened.question_ids()) == (0, 0, [])
+
+    @pytest.mark.skipif(response_columns.fcntl is None, reason="flock is not available")
+    def test_open_and_reads_wait_for_other_processes(self, tmp_path):
+        """Test that opening truncates only under the flock and readers see another process's reset."""
+        columns = SurveyColumns(tmp_path / "s1")
+        with columns.locked():
+            columns.extend([record(0, {"q1": 1})], QUESTION_TYPES, position=1)
+        values = tmp_path / "s1" / "c1.values"
+        with open(values, "ab") as f:
+            f.write(b"\x00" * 16)
+
+        # A writer in another process holds the flock mid-extend
+        opened = []
+        with open(columns.lock_file, "a+b") as lock_file:
+            response_columns.fcntl.flock(lock_file, response_columns.fcntl.LOCK_EX)
+            opener = threading.Thread(target=lambda: opened.append(SurveyColumns(tmp_path / "s1")))
+            opener.start()
+            opener.join(timeout=0.2)
+            assert opener.is_alive() and values.stat().st_size == 24
+        opener.join(timeout=5)
+        assert values.stat().st_size == 8 and list(opened[0].numeric("q1")) == [1.0]
+
+        # A reset by one process is seen by another's next read
+        with opened[0].locked() as other:
+            other.reset()
+        with columns.locked():
+            assert (columns.rows, columns.question_ids()) == (0, [])
+
+
+class TestAnswerDecoders:
+    """Test cases for answer decoders compiled from question options."""
+
+    def test_decodes_answers_to_options(self):
+        """Test that labels, case and spacing variants and bare scale points decode to the option."""
+        decoders = question_decoders(QUESTIONS)
+        assert set(decoders) == {"q1", "q2"}
+        scale, choice = decoders["q1"], decoders["q2"]
+        assert [scale.label(a) for a in ("4 - Agree", " 4 -  agree", 4, "4", "3")] == ["4 - Agree"] * 4 + ["3"]
+        assert (scale.value("1 - disagree"), scale.value(4), scale.value("3")) == (1.0, 4.0, 3.0)
+        # Choice options are only matched by label, never by a number they happen to start with
+        assert (choice.code("b"), choice.code(1), choice.label("Other")) == (1, -1, "Other")
+        # Saving the same questions again reuses the compiled table
+        assert question_decoders([q.model_copy() for q in QUESTIONS]) is decoders
+
+    def test_encodes_with_decoders(self, tmp_path):
+        """Test that options are coded first, in order, and variant answers count towards them."""
+        decoders = question_decoders([
+            SurveyQuestion(id="q1", question="Agree?", response_type="scale", options=["1 - No", "5 - Yes"]),
+            SurveyQuestion(id="q2", question="Ok?", response_type="yes_no", options=["Yes", "No"]),
+        ])
+        columns = SurveyColumns(tmp_path / "s1")
+        columns.extend([
+            record(0, {"q1": "5 - yes", "q2": "no"}),
+            record(1, {"q1": "1", "q2": "NO"}),
+            record(2, {"q1": "5 - Yes", "q2": "maybe"}),
+        ], {"q1": "scale", "q2": "yes_no"}, position=3, decoders=decoders)
+
+        assert list(columns.numeric("q1")) == [5.0, 1.0, 5.0]
+        assert columns.dictionary("q2") == ["Yes", "No", "maybe"]
+        assert columns.aggregate("q2")["counts"] == {"Yes": 0, "No": 2, "maybe": 1}
+        assert columns.encoded_with(decoders)
+        assert not columns.encoded_with(question_decoders([
+            SurveyQuestion(id="q2", question="Ok?", response_type="yes_no", options=["Yes", "No", "Maybe"]),
+        ]))
+
+
+class TestServiceColumns:
+    """Test that the services keep columns in step with submissions."""
+
+    @pytest.mark.asyncio
+    async def test_aggregates_are_extended_incrementally(self, survey_service):
+        """Test that only responses submitted since the last refresh are consumed."""
+        survey = await survey_service.create_survey(CreateSurveyRequest(
+            name="Pulse", context="c", created_by="hr",
+            questions=[
+                SurveyQuestion(id="q1", question="Rate", response_type="scale"),
+                SurveyQuestion(id="q2", question="Recommend?", response_type="yes_no"),
+            ]
+        ))
+
+        async def submit(n, answers):
+            await survey_service.add_survey_response(SurveyResponse(
+                id=f"r{n}", survey_id=survey.id, user_id=f"u{n}", responses=answers,
+                submitted_at=datetime(2025, 1, 1) + timedelta(minutes=n)
+            ))
+
+        for n in range(4):
+            await submit(n, {"q1": n + 1, "q2": "yes" if n % 2 else "no"})
+        first = await survey_service.aggregate_responses(survey.id)
+        assert first["total_responses"] == 4
+        assert first["questions"]["q1"]["mean"] == 2.5
+
+        columns = await survey_service.get_response_columns(survey.id)
+        position = columns.position
+        await submit(4, {"q1": 10, "q2": "yes"})
+        second = await survey_service.aggregate_responses(survey.id)
+        assert columns.position > position
+        assert second["questions"]["q1"]["max"] == 10.0
+        assert second["questions"]["q2"]["counts"] == {"no": 2, "yes": 3}
+
+        assert await survey_service.aggregate_responses("missing") == {}
+
+    @pytest.mark.asyncio
+    async def test_answers_are_encoded_by_option(self, survey_service, monkeypatch):
+        """Test that answers count towards the option they match and are re-encoded when options change."""
+        survey = await survey_service.create_survey(CreateSurveyRequest(
+            name="Pulse", context="c", created_by="hr",
+            questions=[SurveyQuestion(id="q1", question="Team?", response_type="dropdown", options=["Sales", "Ops"])]
+        ))
+        for n, answer in enumerate(["sales", " Sales", "OPS", "Eng"]):
+            await survey_service.add_survey_response(SurveyResponse(
+                id=f"r{n}", survey_id=survey.id, user_id=f"u{n}", responses={"q1": answer},
+                submitted_at=datetime(2025, 1, 1) + timedelta(minutes=n)
+            ))
+        # The decoders compiled on save are the ones responses are encoded with
+        with monkeypatch.context() as patched:
+            patched.setattr(survey_service_module, "question_decoders", None)
+            aggregates = await survey_service.aggregate_responses(survey.id)
+        assert aggregates["questions"]["q1"]["counts"] == {"Sales": 2, "Ops": 1, "Eng": 1}
+
+        survey.questions[0].options = ["Engineering", "ENG"]
+        await survey_service.update_survey(survey.id, survey)
+        assert survey_service._decoders[survey.id]["q1"].options == ("Engineering", "ENG")
+        aggregates = await survey_service.aggregate_responses(survey.id)
+        assert aggregates["questions"]["q1"]["counts"] == {"Engineering": 0, "ENG": 1, "sales": 1, " Sales": 1, "OPS": 1}
+
+
+class TestQuestionStats:
+    """Test cases for per-question statistics in get_survey_stats."""
+
+    @pytest.mark.asyncio
+    async def test_distributions_nps_and_completion(self, survey_service, vectors):
+        """Test scale, 0-10, choice, multi-select and text questions, and caching until responses change."""
+        survey = await survey_service.create_survey(CreateSurveyRequest(
+            name="Pulse", context="c", created_by="hr",
+            questions=[
+                SurveyQuestion(id="q1", question="Rate", response_type="scale", options=["1 - Bad", "2", "3 - Good"]),
+                SurveyQuestion(id="q2", question="Recommend?", response_type="nps"),
+                SurveyQuestion(id="q3", question="Pick", response_type="multiple_choice", options=["A", "B"]),
+                SurveyQuestion(id="q4", question="Perks", response_type="multiple_select", options=["Gym", "Food"]),
+                SurveyQuestion(id="q5", question="Why?", response_type="text"),
+            ]
+        ))
+        answers = [
+            {"q1": "1 - Bad", "q2": 10, "q3": "A", "q4": ["Gym", "Food"], "q5": "because"},
+            {"q1": "3 - Good", "q2": 9, "q3": "Other"},
+            {"q1": 3, "q2": 2, "q4": ["Gym"]},
+            {"q2": 7},
+        ]
+        await survey_service.add_survey_responses(survey.id, [
+            SurveyResponse(id=f"r{n}", survey_id=survey.id, user_id=f"u{n}", responses=a, submitted_at=datetime(2025, 1, 1))
+            for n, a in enumerate(answers)
+        ])
+
+        stats = await survey_service.get_survey_stats(survey.id)
+        questions = stats["questions"]
+        assert stats["total_responses"] == 4
+        assert questions["q1"] == {
+            "question": "Rate", "response_type": "scale", "answered": 3, "completion_rate": 0.75,
+            "mean": pytest.approx(7 / 3), "median": 3.0, "stddev": pytest.approx(0.9428090415820634),
+            "min": 1.0, "max": 3.0, "counts": {"1 - Bad": 1, "2": 0, "3 - Good": 2},
+        }
+        assert questions["q2"]["nps"] == {"score": 25.0, "promoters": 2, "passives": 1, "detractors": 1}
+        assert questions["q2"]["median"] == 8.0
+        assert questions["q3"]["counts"] == {"A": 1, "B": 0, "Other": 1}
+        assert (questions["q4"]["answered"], questions["q4"]["selections"]) == (2, 3)
+        assert (questions["q5"]["answered"], questions["q5"]["completion_rate"]) == (1, 0.25)
+
+        # Unchanged responses reuse the computed statistics; a new response recomputes them
+        assert (await survey_service.get_survey_stats(survey.id))["questions"] is questions
+        await survey_service.add_survey_response(SurveyResponse(
+            id="r4", survey_id=survey.id, user_id="u4", responses={"q2": 0}, submitted_at=datetime(2025, 1, 2)
+        ))
+        assert (await survey_service.get_survey_stats(survey.id))["questions"]["q2"]["nps"]["score"] == 0.0
+        assert await survey_service.get_survey_stats("missing") == {}
@@ -0,0 +1,136 @@
+"""
+Tests for streaming survey response export
+"""
+
+import csv
+import io
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api.v1.endpoints import surveys as surveys_endpoints
+from app.core.database import SQLiteDatabase
+from app.core.serialization import loads
+from app.models.survey import CreateSurveyRequest, SurveyQuestion, SurveyResponse
+from app.services import survey_service as survey_service_module
+from app.services.response_export import parquet_available
+from app.services.sqlite_survey_service import SQLiteSurveyService
+from app.services.survey_service import SurveyService
+from app.services.write_behind import WriteBehindFlusher
+
+QUESTIONS = [
+    SurveyQuestion(id="q1", question="Rate", response_type="scale"),
+    SurveyQuestion(id="q2", question="Perks", response_type="multiple_select", options=["Gym", "Remote"]),
+    SurveyQuestion(id="q3", question="Why?", response_type="text", mandatory=False),
+]
+
+
+@pytest.fixture
+def flusher(monkeypatch):
+    """Give each test its own write-behind flusher."""
+    flusher = WriteBehindFlusher(delay=0.01)
+    monkeypatch.setattr(survey_service_module, "write_behind_flusher", flusher)
+    return flusher
+
+
+@pytest.fixture(params=["json", "sqlite"])
+def survey_service(request, tmp_path, flusher):
+    """Survey service for each storage backend."""
+    if request.param == "sqlite":
+        return SQLiteSurveyService(database=SQLiteDatabase(tmp_path / "test.db"))
+    return SurveyService(data_dir=tmp_path)
+
+
+async def create_survey_with_responses(service, count):
+    survey = await service.create_survey(CreateSurveyRequest(
+        name="Pulse", context="c", created_by="hr", questions=QUESTIONS,
+        classifiers=[{"name": "Department", "values": ["Sales", "Support"]}]
+    ))
+    await service.add_survey_responses(survey.id, [
+        SurveyResponse(
+            id=f"r{n}", survey_id=survey.id, user_id=f"u{n}",
+            responses={"q1": n % 5 + 1, "q2": ["Gym", "Remote"][: n % 2 + 1], "Department": "Sales"},
+            submitted_at=datetime(2025, 1, 1) + timedelta(minutes=n)
+        )
+        for n in range(count)
+    ])
+    return survey
+
+
+async def export(service, survey_id, fmt, chunk_size=2):
+    return list(await service.export_responses(survey_id, fmt, chunk_size=chunk_size))
+
+
+class TestResponseExport:
+    """Test cases for SurveyService.export_responses."""
+
+    @pytest.mark.asyncio
+    async def test_csv_streams_a_block_per_chunk_and_reimports(self, survey_service):
+        """Test CSV columns, chunking and that the export is a valid import."""
+        survey = await create_survey_with_responses(survey_service, 5)
+
+        blocks = await export(survey_service, survey.id, "csv")
+        assert len(blocks) == 3
+        rows = list(csv.reader(io.StringIO(b"".join(blocks).decode())))
+        assert rows[0] == ["id", "user_id", "submitted_at", "Department", "q1", "q2", "q3"]
+        assert rows[2] == ["r1", "u1", "2025-01-01T00:01:00", "Sales", "2", "Gym;Remote", ""]
+
+        report = await survey_service.import_responses(survey.id, io.BytesIO(b"".join(blocks)), "csv")
+        assert (report.rejected, report.duplicates) == (0, 5)
+
+    @pytest.mark.asyncio
+    async def test_ndjson_keeps_answers_as_submitted(self, survey_service):
+        """Test NDJSON lines and an export of a survey without responses."""
+        survey = await create_survey_with_responses(survey_service, 3)
+
+        lines = b"".join(await export(survey_service, survey.id, "ndjson")).splitlines()
+        assert [loads(line)["id"] for line in lines] == ["r0", "r1", "r2"]
+        assert loads(lines[1])["responses"]["q2"] == ["Gym", "Remote"]
+
+        empty = await survey_service.create_survey(CreateSurveyRequest(name="e", context="c", created_by="hr"))
+        assert await export(survey_service, empty.id, "ndjson") == []
+        assert await survey_service.export_responses("missing", "csv") is None
+
+    @pytest.mark.asyncio
+    @pytest.mark.skipif(not parquet_available(), reason="pyarrow is not installed")
+    async def test_parquet_columns_are_typed(self, survey_service):
+        """Test Parquet row groups and column types."""
+        import pyarrow.parquet as pq
+
+        survey = await create_survey_with_responses(survey_service, 5)
+
+        table = pq.read_table(io.BytesIO(b"".join(await export(survey_service, survey.id, "parquet"))))
+        assert table.num_rows == 5
+        assert table.column("q1").to_pylist() == [1.0, 2.0, 3.0, 4.0, 5.0]
+        assert table.column("q2").to_pylist()[:2] == [["Gym"], ["Gym", "Remote"]]
+        assert table.column("submitted_at").to_pylist()[1] == datetime(2025, 1, 1, 0, 1)
+
+
+class TestResponseExportEndpoint:
+    """Test the export endpoint."""
+
+    @pytest.mark.asyncio
+    async def test_streams_attachment(self, tmp_path, flusher, monkeypatch):
+        """Test the streamed download and format errors."""
+        service = SurveyService(data_dir=tmp_path)
+        monkeypatch.setattr(surveys_endpoints, "survey_service", service)
+        survey = await create_survey_with_responses(service, 3)
+
+        from main import app
+        client = TestClient(app)
+        response = client.get(f"/api/v1/surveys/{survey.id}/responses/export", params={"format": "ndjson"})
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/x-ndjson"
+        assert "attachment" in response.headers["content-disposition"]
+        assert len(response.content.splitlines()) == 3
+
+        response = client.get(f"/api/v1/surveys/{survey.id}/responses/export", params={"format": "xlsx"})
+        assert response.status_code == 400
+        response = client.get("/api/v1/surveys/missing/responses/export")
+        assert response.status_code == 404
+
+        # A server installed without pyarrow says so rather than rejecting the request
+        monkeypatch.setattr(surveys_endpoints, "parquet_available", lambda: False)
+        response = client.get(f"/api/v1/surveys/{survey.id}/responses/export", params={"format": "parquet"})
+        assert response.status_code == 501
@@ -0,0 +1,152 @@
+"""
+Tests for bulk survey response import
+"""
+
+import io
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api.v1.endpoints import surveys as surveys_endpoints
+from app.core.database import SQLiteDatabase
+from app.models.survey import CreateSurveyRequest, SurveyQuestion
+from app.services import survey_service as survey_service_module
+from app.services.response_import import detect_format
+from app.services.sqlite_survey_service import SQLiteSurveyService
+from app.services.survey_service import SurveyService
+from app.services.write_behind import WriteBehindFlusher
+
+QUESTIONS = [
+    SurveyQuestion(id="q1", question="Rate", response_type="scale"),
+    SurveyQuestion(id="q2", question="Team", response_type="multiple_choice", options=["Sales", "Support"]),
+    SurveyQuestion(id="q3", question="Perks", response_type="multiple_select", options=["Gym", "Remote"], mandatory=False),
+]
+
+CSV_UPLOAD = (
+    "user_id,submitted_at,q1,q2,q3\n"
+    "u1,2025-01-01T09:00:00,4,Sales,Gym;Remote\n"
+    "u2,2025-01-01T09:05:00,5 - Very Satisfied,Support,\n"
+    "u3,2025-01-01T09:10:00,high,Sales,\n"          # q1 is not a number
+    "u4,2025-01-01T09:15:00,3,Marketing,\n"         # not an option
+    ",2025-01-01T09:20:00,3,Sales,\n"               # no user
+    "u1,2025-01-01T09:00:00,4,Sales,Gym;Remote\n"   # same row again
+    "u5,2025-01-01T09:25:00,2,Support,Gym\n"
+)
+
+
+@pytest.fixture
+def flusher(monkeypatch):
+    """Give each test its own write-behind flusher."""
+    flusher = WriteBehindFlusher(delay=0.01)
+    monkeypatch.setattr(survey_service_module, "write_behind_flusher", flusher)
+    return flusher
+
+
+@pytest.fixture(params=["json", "sqlite"])
+def survey_service(request, tmp_path, flusher):
+    """Survey service for each storage backend."""
+    if request.param == "sqlite":
+        return SQLiteSurveyService(database=SQLiteDatabase(tmp_path / "test.db"))
+    return SurveyService(data_dir=tmp_path)
+
+
+async def create_survey(service):
+    return await service.create_survey(
+        CreateSurveyRequest(name="Pulse", context="c", created_by="hr", questions=QUESTIONS)
+    )
+
+
+class TestResponseImport:
+    """Test cases for SurveyService.import_responses."""
+
+    @pytest.mark.asyncio
+    async def test_csv_rows_are_validated_batched_and_deduplicated(self, survey_service):
+        """Test the job report for a CSV upload committed in small batches."""
+        survey = await create_survey(survey_service)
+
+        report = await survey_service.import_responses(
+            survey.id, io.BytesIO(CSV_UPLOAD.encode()), "csv", batch_size=2
+        )
+        assert (report.rows, report.accepted, report.rejected, report.duplicates) == (7, 3, 3, 1)
+        assert report.batches == 2
+        assert [e["row"] for e in report.errors] == [4, 5, 6]
+        assert "not one of the options" in report.errors[1]["error"]
+
+        stored = {r.user_id: r.responses for r in await survey_service.get_responses_for_survey(survey.id)}
+        assert stored["u1"] == {"q1": 4, "q2": "Sales", "q3": ["Gym", "Remote"]}
+        assert stored["u2"]["q1"] == 5
+        assert await survey_service.count_responses(survey.id) == 3
+
+        # Importing the same export again adds nothing
+        again = await survey_service.import_responses(survey.id, io.BytesIO(CSV_UPLOAD.encode()), "csv")
+        assert (again.accepted, again.duplicates) == (0, 4)
+
+    @pytest.mark.asyncio
+    async def test_ndjson_upload(self, survey_service):
+        """Test NDJSON rows, explicit IDs and malformed lines."""
+        survey = await create_survey(survey_service)
+        upload = (
+            b'{"id": "r1", "user_id": "u1", "responses": {"q1": 3, "q2": "Sales", "q3": ["Gym"]}}\n'
+            b'\n'
+            b'{"id": "r2", "user_id": "u2", "responses": {"q1": 4, "q9": "x"}}\n'
+            b'not json\n'
+            b'{"id": "r1", "user_id": "u1", "responses": {"q1": 3, "q2": "Sales"}}\n'
+        )
+        report = await survey_service.import_responses(survey.id, io.BytesIO(upload), "ndjson")
+        assert (report.rows, report.accepted, report.rejected, report.duplicates) == (4, 1, 2, 1)
+        assert "Unknown question" in report.errors[0]["error"]
+
+        assert await survey_service.import_responses("missing", io.BytesIO(upload), "ndjson") is None
+
+    @pytest.mark.asyncio
+    async def test_imported_history_is_paged_after_live_responses(self, survey_service):
+        """Test that rows imported with older timestamps are neither skipped nor repeated when paging."""
+        survey = await create_survey(survey_service)
+        live = (
+            "user_id,submitted_at,q1,q2\n"
+            + "".join(f"live{n},2025-06-01T09:0{n}:00,4,Sales\n" for n in range(4))
+        )
+        history = "user_id,submitted_at,q1,q2\nold1,2024-01-01T09:00:00,3,Sales\nold2,2024-01-02T09:00:00,2,Support\n"
+        await survey_service.import_responses(survey.id, io.BytesIO(live.encode()), "csv")
+        await survey_service.import_responses(survey.id, io.BytesIO(history.encode()), "csv")
+
+        users = []
+        page = await survey_service.get_responses_page(survey.id, limit=2)
+        users += [r.user_id for r in page.items]
+        while page.next_cursor:
+            page = await survey_service.get_responses_page(survey.id, cursor=page.next_cursor, limit=2)
+            users += [r.user_id for r in page.items]
+        assert users == ["live0", "live1", "live2", "live3", "old1", "old2"]
+
+    def test_detects_format(self):
+        """Test format detection from file names and content types."""
+        assert detect_format("export.CSV", None) == "csv"
+        assert detect_format("export.jsonl", "text/plain") == "ndjson"
+        assert detect_format(None, "application/x-ndjson; charset=utf-8") == "ndjson"
+        assert detect_format("export.xlsx", None) is None
+
+
+class TestResponseImportEndpoint:
+    """Test the upload endpoint."""
+
+    @pytest.mark.asyncio
+    async def test_upload_returns_report(self, tmp_path, flusher, monkeypatch):
+        """Test a multipart CSV upload and an unsupported file type."""
+        service = SurveyService(data_dir=tmp_path)
+        monkeypatch.setattr(surveys_endpoints, "survey_service", service)
+        survey = await create_survey(service)
+
+        from main import app
+        client = TestClient(app)
+        response = client.post(
+            f"/api/v1/surveys/{survey.id}/responses/import",
+            files={"file": ("pulse.csv", CSV_UPLOAD, "text/csv")}
+        )
+        assert response.status_code == 200
+        assert response.json()["accepted"] == 3
+
+        response = client.post(
+            f"/api/v1/surveys/{survey.id}/responses/import",
+            files={"file": ("pulse.xlsx", b"binary", "application/octet-stream")}
+        )
+        assert response.status_code == 400
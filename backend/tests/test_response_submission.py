@@ -0,0 +1,100 @@
+"""
+Tests for idempotent, deduplicated response submission
+"""
+
+from datetime import datetime
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api.v1.endpoints import surveys as surveys_endpoints
+from app.core.database import SQLiteDatabase
+from app.models.survey import CreateSurveyRequest, SurveyConfiguration, SurveyQuestion, SurveyResponse
+from app.services import survey_service as survey_service_module
+from app.services.sqlite_survey_service import SQLiteSurveyService
+from app.services.survey_service import SurveyService
+from app.services.write_behind import WriteBehindFlusher
+
+QUESTIONS = [SurveyQuestion(id="q1", question="Rate", response_type="scale")]
+
+
+@pytest.fixture
+def flusher(monkeypatch):
+    """Give each test its own write-behind flusher."""
+    flusher = WriteBehindFlusher(delay=0.01)
+    monkeypatch.setattr(survey_service_module, "write_behind_flusher", flusher)
+    return flusher
+
+
+@pytest.fixture(params=["json", "sqlite"])
+def survey_service(request, tmp_path, flusher):
+    """Survey service for each storage backend."""
+    if request.param == "sqlite":
+        return SQLiteSurveyService(database=SQLiteDatabase(tmp_path / "test.db"))
+    return SurveyService(data_dir=tmp_path)
+
+
+def make_response(survey_id, response_id, user_id):
+    return SurveyResponse(
+        id=response_id, survey_id=survey_id, user_id=user_id,
+        responses={"q1": 4}, submitted_at=datetime(2025, 1, 1)
+    )
+
+
+class TestSubmitResponse:
+    """Test cases for SurveyService.submit_response."""
+
+    @pytest.mark.asyncio
+    async def test_repeated_id_returns_the_stored_response(self, survey_service):
+        """Test that resubmitting a stored ID adds nothing."""
+        survey = await survey_service.create_survey(
+            CreateSurveyRequest(name="Pulse", context="c", created_by="hr", questions=QUESTIONS)
+        )
+        assert await survey_service.submit_response(make_response(survey.id, "r1", "u1")) == ("r1", True)
+        assert await survey_service.submit_response(make_response(survey.id, "r1", "u1")) == ("r1", False)
+        # Without the policy the same user may answer again
+        assert await survey_service.submit_response(make_response(survey.id, "r2", "u1")) == ("r2", True)
+        assert await survey_service.count_responses(survey.id) == 2
+
+    @pytest.mark.asyncio
+    async def test_one_response_per_user(self, survey_service, flusher):
+        """Test that the policy returns each user's first response, including ones stored before the index loaded."""
+        survey = await survey_service.create_survey(
+            CreateSurveyRequest(name="Pulse", context="c", created_by="hr", questions=QUESTIONS)
+        )
+        await survey_service.add_survey_response(make_response(survey.id, "r1", "u1"))
+        await flusher.flush_async()
+
+        submit = survey_service.submit_response
+        assert await submit(make_response(survey.id, "r2", "u1"), one_per_user=True) == ("r1", False)
+        assert await submit(make_response(survey.id, "r3", "u2"), one_per_user=True) == ("r3", True)
+        assert await submit(make_response(survey.id, "r4", "u2"), one_per_user=True) == ("r3", False)
+        assert await survey_service.count_responses(survey.id) == 2
+
+
+class TestSubmitResponseEndpoint:
+    """Test the submit-response endpoint."""
+
+    def test_idempotency_key_and_policy(self, tmp_path, flusher, monkeypatch):
+        """Test that retries with one Idempotency-Key are stored once and the survey policy applies."""
+        import asyncio
+
+        service = SurveyService(data_dir=tmp_path)
+        monkeypatch.setattr(surveys_endpoints, "survey_service", service)
+        survey = asyncio.run(service.create_survey(CreateSurveyRequest(
+            name="Pulse", context="c", created_by="hr", questions=QUESTIONS,
+            configuration=SurveyConfiguration(one_response_per_user=True)
+        )))
+
+        from main import app
+        client = TestClient(app)
+        body = {"survey_id": survey.id, "user_id": "u1", "responses": {"q1": 5}}
+        first = client.post("/api/v1/surveys/submit-response", json=body, headers={"Idempotency-Key": "k1"}).json()
+        retry = client.post("/api/v1/surveys/submit-response", json=body, headers={"Idempotency-Key": "k1"}).json()
+        again = client.post("/api/v1/surveys/submit-response", json=body).json()
+        assert not first["duplicate"] and retry["duplicate"] and again["duplicate"]
+        assert first["response_id"] == retry["response_id"] == again["response_id"]
+
+        other = client.post("/api/v1/surveys/submit-response", json={**body, "user_id": "u2"}).json()
+        assert not other["duplicate"] and other["response_id"].startswith("response_")
+        assert asyncio.run(service.count_responses(survey.id)) == 2
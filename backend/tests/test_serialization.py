@@ -0,0 +1,33 @@
+"""
+Tests for the shared JSON serialization helpers
+"""
+
+import json
+from datetime import datetime
+
+from app.core.serialization import dumps, dumps_str, loads, sse_event
+from app.models.chat_thread import ChatMessage, MessageRole
+
+
+class TestSerialization:
+    """Test cases for dumps/loads and SSE framing."""
+
+    def test_encodes_models_datetimes_and_enums_compactly(self):
+        """Test that Pydantic models, datetimes and enums encode without extra whitespace."""
+        message = ChatMessage(id="m1", role=MessageRole.user, content="héllo", timestamp=datetime(2025, 9, 7, 8, 30))
+        data = dumps({"message": message, "at": datetime(2025, 9, 7, 8, 30, 0, 5), 1: {"a", "a"}})
+
+        assert isinstance(data, bytes)
+        assert b" " not in data.replace("héllo".encode(), b"")
+        assert loads(data) == {
+            "message": {"id": "m1", "role": "user", "content": "héllo", "timestamp": "2025-09-07T08:30:00"},
+            "at": "2025-09-07T08:30:00.000005",
+            "1": ["a"],
+        }
+
+    def test_sse_event_frames_payload(self):
+        """Test that SSE frames carry one compact JSON document."""
+        frame = sse_event({"content": "a\nb", "done": False})
+        assert frame.startswith("data: ") and frame.endswith("\n\n")
+        assert json.loads(frame[len("data: "):]) == {"content": "a\nb", "done": False}
+        assert dumps_str([1, 2]) == "[1,2]"
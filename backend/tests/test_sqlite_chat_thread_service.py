@@ -0,0 +1,224 @@
+"""
+Tests for the SQLite chat thread backend
+"""
+
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.core.database import SQLiteDatabase
+from app.core.ids import ulid_datetime
+from app.models.chat_thread import MessageRole
+from app.services import chat_thread_service as chat_thread_service_module
+from app.services.chat_thread_service import ChatThreadService
+from app.services.sqlite_chat_thread_service import SQLiteChatThreadService
+from app.services.write_behind import WriteBehindFlusher
+from migrate_to_sqlite import migrate_chat_threads
+
+
+@pytest.fixture
+def service(tmp_path):
+    """Create a SQLite chat thread service on a temporary database."""
+    return SQLiteChatThreadService(database=SQLiteDatabase(tmp_path / "test.db"))
+
+
+class TestSQLiteChatThreadService:
+    """Test cases for SQLiteChatThreadService."""
+
+    @pytest.mark.asyncio
+    async def test_create_and_get_thread(self, service):
+        """Test that threads and their messages round-trip in order."""
+        thread = await service.create_thread(title="Engagement", user_id="u1")
+        await service.add_message(thread.id, MessageRole.user, "Hello")
+        await service.add_message(thread.id, MessageRole.assistant, "Hi there")
+
+        loaded = await service.get_thread(thread.id)
+        assert loaded.title == "Engagement"
+        assert loaded.user_id == "u1"
+        assert [m.content for m in loaded.messages] == ["Hello", "Hi there"]
+        assert loaded.messages[1].role == MessageRole.assistant
+        message_ids = [m.id for m in loaded.messages]
+        assert message_ids == sorted(message_ids)
+        assert all(ulid_datetime(message_id) for message_id in message_ids)
+
+    @pytest.mark.asyncio
+    async def test_listing_is_per_user_and_most_recent_first(self, service):
+        """Test listing filters by user and active flag and orders by updated_at."""
+        first = await service.create_thread(title="First", user_id="u1")
+        second = await service.create_thread(title="Second", user_id="u1")
+        deleted = await service.create_thread(title="Deleted", user_id="u1")
+        await service.create_thread(title="Other user", user_id="u2")
+
+        await service.add_message(first.id, MessageRole.user, "bump")
+        await service.delete_thread(deleted.id)
+
+        listing = await service.get_all_threads(user_id="u1")
+        assert listing.total == 2
+        assert [t.id for t in listing.threads] == [first.id, second.id]
+        assert listing.threads[0].message_count == 1
+
+        recent = await service.get_recent_threads(user_id="u1", limit=1)
+        assert [t.id for t in recent] == [first.id]
+
+    @pytest.mark.asyncio
+    async def test_backend_operations_need_no_json_state(self, service):
+        """Test the operations shared with the JSON backend, which this one does not inherit from."""
+        assert not isinstance(service, ChatThreadService)
+        thread = await service.create_thread(title="Export", user_id="u1")
+        await service.add_message(thread.id, MessageRole.user, "Hello")
+        deleted = await service.create_thread(title="Gone", user_id="u1")
+        await service.delete_thread(deleted.id)
+
+        service.load()
+        service.rebuild_search_index()
+        assert [t.id for t in await service.search_threads("hello", user_id="u1")] == [thread.id]
+        exported = {t.id: t for t in service.export_threads()}
+        assert [m.content for m in exported[thread.id].messages] == ["Hello"]
+        assert not exported[deleted.id].is_active
+        assert not service.write_snapshot() and not await service.compact()
+        assert await service.archive_cold_threads() == 0
+        assert service.get_residency_stats() == {}
+
+    @pytest.mark.asyncio
+    async def test_listing_totals_come_from_counters(self, service, tmp_path):
+        """Test that trigger-kept counters follow creates, deletes and imports, and are backfilled for older databases."""
+        threads = [await service.create_thread(title=f"T{n}", user_id="u1" if n < 3 else "u2") for n in range(4)]
+        await service.create_thread(title="Anonymous")
+        await service.delete_thread(threads[0].id)
+        assert [(await service.get_all_threads(user_id=u)).total for u in ("u1", "u2", None)] == [2, 1, 4]
+        assert (await service.get_all_threads(user_id="nobody")).total == 0
+
+        service.db.executescript(
+            "DROP TABLE chat_thread_counts; DROP TRIGGER trg_chat_threads_count_insert; "
+            "DROP TRIGGER trg_chat_threads_count_delete; DROP TRIGGER trg_chat_threads_count_update;"
+        )
+        reopened = SQLiteChatThreadService(database=SQLiteDatabase(tmp_path / "test.db"))
+        assert [(await reopened.get_all_threads(user_id=u)).total for u in ("u1", "u2", None)] == [2, 1, 4]
+        await reopened.delete_thread(threads[3].id)
+        assert (await reopened.get_all_threads(user_id="u2")).total == 0
+
+    @pytest.mark.asyncio
+    async def test_recent_threads_break_ties_by_id(self, service):
+        """Test that threads updated at the same time come back in the JSON backend's order."""
+        threads = [await service.create_thread(title=f"T{n}", user_id="u1") for n in range(3)]
+        await service.db.write(lambda conn: conn.execute(
+            "UPDATE chat_threads SET updated_at = '2025-01-01T00:00:00'"
+        ))
+
+        recent = await service.get_recent_threads(user_id="u1")
+        assert [t.id for t in recent] == sorted((t.id for t in threads), reverse=True)
+
+    @pytest.mark.asyncio
+    async def test_missing_thread(self, service):
+        """Test operations on unknown threads."""
+        assert await service.get_thread("missing") is None
+        assert await service.add_message("missing", MessageRole.user, "x") is None
+        assert await service.update_thread_title("missing", "x") is False
+        assert await service.delete_thread("missing") is False
+
+    @pytest.mark.asyncio
+    async def test_search_threads(self, service):
+        """Test searching titles and message content."""
+        thread = await service.create_thread(title="Onboarding", user_id="u1")
+        await service.add_message(thread.id, MessageRole.user, "Retention is at 100% for Q3")
+        await service.create_thread(title="Unrelated", user_id="u1")
+
+        assert [t.id for t in await service.search_threads("onboard", user_id="u1")] == [thread.id]
+        assert [t.id for t in await service.search_threads("100%", user_id="u1")] == [thread.id]
+        assert await service.search_threads("retention", user_id="u2") == []
+
+    @pytest.mark.asyncio
+    async def test_search_ranks_and_follows_mutations(self, service):
+        """Test ranking, prefixes and snippets match the JSON backend and follow renames and deletes."""
+        thread = await service.create_thread(title="New Chat", user_id="u1")
+        await service.add_message(thread.id, MessageRole.user, "How do we improve onboarding?")
+        other = await service.create_thread(title="Onboarding onboarding", user_id="u1")
+
+        results = await service.search_threads("onboard", user_id="u1")
+        assert [r.id for r in results] == [other.id, thread.id]
+        assert results[1].snippet == "How do we improve <mark>onboarding</mark>?"
+        assert results[1].score > 0
+        # Every term has to match somewhere in the thread, not necessarily in one message
+        assert [r.id for r in await service.search_threads("chat improve", user_id="u1")] == [thread.id]
+
+        await service.update_thread_title(thread.id, "Onboarding Plan")
+        results = await service.search_threads("plan", user_id="u1")
+        assert results[0].snippet == "Onboarding <mark>Plan</mark>"
+        assert await service.search_threads("chat", user_id="u1") == []
+
+        await service.delete_thread(thread.id)
+        assert [r.id for r in await service.search_threads("onboarding", user_id="u1")] == [other.id]
+        assert await service.search_threads("!!!", user_id="u1") == []
+
+    @pytest.mark.asyncio
+    async def test_search_indexes_existing_databases(self, tmp_path):
+        """Test that threads stored before the search tables existed are indexed on open."""
+        database = SQLiteDatabase(tmp_path / "old.db")
+        service = SQLiteChatThreadService(database=database)
+        thread = await service.create_thread(title="Culture", user_id="u1")
+        await service.add_message(thread.id, MessageRole.user, "Quarterly pulse results")
+        database.executescript(
+            "DROP TABLE chat_message_search; DROP TABLE chat_title_search; DROP TABLE chat_thread_search_keys;"
+        )
+
+        reopened = SQLiteChatThreadService(database=database)
+        assert [r.id for r in await reopened.search_threads("pulse culture", user_id="u1")] == [thread.id]
+        SQLiteChatThreadService(database=database)
+        assert len(await reopened.search_threads("cult", user_id="u1")) == 1
+
+    @pytest.mark.asyncio
+    async def test_import_json(self, service, tmp_path):
+        """Test importing an existing chat_threads.json file."""
+        threads_file = tmp_path / "chat_threads.json"
+        threads_file.write_text(json.dumps({
+            "t1": {
+                "id": "t1",
+                "title": "Imported",
+                "user_id": None,
+                "created_at": "2025-09-07T08:30:00",
+                "updated_at": "2025-09-07T14:10:33.973084",
+                "messages": [
+                    {"id": "m1", "role": "user", "content": "Hi", "timestamp": "2025-09-07T08:30:00"}
+                ],
+                "is_active": True
+            }
+        }))
+
+        assert service.import_json(threads_file) == 1
+        assert service.import_json(threads_file) == 1  # idempotent
+
+        thread = await service.get_thread("t1")
+        assert [m.id for m in thread.messages] == ["m1"]
+        listing = await service.get_all_threads()
+        assert listing.total == 1
+        assert listing.threads[0].message_count == 1
+        assert [r.id for r in await service.search_threads("imported hi")] == ["t1"]
+
+    @pytest.mark.asyncio
+    async def test_migrates_messages_from_every_tier(self, service, tmp_path, monkeypatch):
+        """Test that migration carries messages from per-thread files and the cold tier, not just metadata."""
+        flusher = WriteBehindFlusher(delay=0.01)
+        monkeypatch.setattr(chat_thread_service_module, "write_behind_flusher", flusher)
+        data_dir = tmp_path / "data"
+        source = ChatThreadService(data_dir=data_dir)
+        hot = await source.create_thread(title="Hot", user_id="u1")
+        dormant = await source.create_thread(title="Dormant", user_id="u1")
+        deleted = await source.create_thread(title="Deleted", user_id="u1")
+        for thread, count in ((hot, 2), (dormant, 3), (deleted, 1)):
+            for n in range(count):
+                await source.add_message(thread.id, MessageRole.user, f"{thread.title} message {n}")
+        await source.delete_thread(deleted.id)
+        await flusher.close()
+        source._threads[hot.id].updated_at = datetime.utcnow() + timedelta(days=60)
+        assert await source.archive_cold_threads(now=datetime.utcnow() + timedelta(days=45)) == 2
+        await flusher.close()
+
+        assert migrate_chat_threads(service.db, data_dir / "chat_threads.json") == 3
+        listing = await service.get_all_threads(user_id="u1")
+        assert {t.id: t.message_count for t in listing.threads} == {hot.id: 2, dormant.id: 3}
+        restored = await service.get_thread(deleted.id)
+        assert not restored.is_active
+        assert [m.content for m in restored.messages] == ["Deleted message 0"]
+        page = await service.get_messages_page(dormant.id)
+        assert [m.content for m in page.messages] == [f"Dormant message {n}" for n in range(3)]
@@ -0,0 +1,125 @@
+"""
+Tests for the SQLite survey backend
+"""
+
+import asyncio
+import json
+from datetime import datetime
+
+import pytest
+
+from app.core.database import SQLiteDatabase
+from app.models.survey import CreateSurveyRequest, SurveyQuestion, SurveyResponse
+from app.services.response_segments import ResponseSegmentStore
+from app.services.sqlite_survey_service import SQLiteSurveyService
+
+
+@pytest.fixture
+def service(tmp_path):
+    """Create a SQLite survey service on a temporary database."""
+    return SQLiteSurveyService(database=SQLiteDatabase(tmp_path / "test.db"))
+
+
+def make_request(created_by="hr_admin"):
+    return CreateSurveyRequest(
+        name="Pulse",
+        context="Quarterly pulse",
+        created_by=created_by,
+        questions=[
+            SurveyQuestion(id="q1", question="How are you?", response_type="scale", options=["1", "2", "3"]),
+            SurveyQuestion(id="q2", question="Anything else?", response_type="text"),
+        ]
+    )
+
+
+def make_response(survey_id, user_id, n=0):
+    return SurveyResponse(
+        id=f"response_{user_id}_{n}",
+        survey_id=survey_id,
+        user_id=user_id,
+        responses={"q1": "2"},
+        submitted_at=datetime.now()
+    )
+
+
+class TestSQLiteSurveyService:
+    """Test cases for SQLiteSurveyService."""
+
+    @pytest.mark.asyncio
+    async def test_survey_round_trip(self, service):
+        """Test creating, reading and updating a survey with its questions."""
+        survey = await service.create_survey(make_request())
+        loaded = await service.get_survey(survey.id)
+        assert loaded == survey
+        assert [q.id for q in loaded.questions] == ["q1", "q2"]
+
+        loaded.status = "published"
+        loaded.questions = loaded.questions[:1]
+        await service.update_survey(survey.id, loaded)
+        updated = await service.get_survey(survey.id)
+        assert updated.status == "published"
+        assert [q.id for q in updated.questions] == ["q1"]
+
+        assert await service.get_survey("missing") is None
+
+    @pytest.mark.asyncio
+    async def test_list_surveys_by_creator(self, service):
+        """Test filtering the survey list by creator."""
+        mine = await service.create_survey(make_request("alice"))
+        await service.create_survey(make_request("bob"))
+
+        assert len(await service.list_surveys()) == 2
+        assert [s.id for s in await service.list_surveys(created_by="alice")] == [mine.id]
+
+    @pytest.mark.asyncio
+    async def test_concurrent_submissions_are_not_lost(self, service):
+        """Test that concurrent submissions all persist."""
+        survey = await service.create_survey(make_request())
+        await asyncio.gather(*[
+            service.add_survey_response(make_response(survey.id, f"user{i}"))
+            for i in range(50)
+        ])
+
+        responses = await service.get_responses_for_survey(survey.id)
+        assert len(responses) == 50
+        stats = await service.get_survey_stats(survey.id)
+        assert stats["total_responses"] == 50
+        assert stats["question_count"] == 2
+
+    @pytest.mark.asyncio
+    async def test_backfills_response_counts(self, service, tmp_path):
+        """Test that a database from before the counts table gets its counts on open."""
+        survey = await service.create_survey(make_request())
+        for n in range(3):
+            await service.add_survey_response(make_response(survey.id, "u1", n))
+        service.db.executescript("DROP TABLE survey_response_counts")
+
+        reopened = SQLiteSurveyService(database=service.db)
+        assert await reopened.count_responses(survey.id) == 3
+        # Re-submitting an existing response ID replaces it without double counting
+        await reopened.add_survey_response(make_response(survey.id, "u1", 0))
+        assert await reopened.count_responses(survey.id) == 3
+
+    @pytest.mark.asyncio
+    async def test_import_json(self, service, tmp_path):
+        """Test importing the existing JSON files."""
+        survey = await SQLiteSurveyService(
+            database=SQLiteDatabase(tmp_path / "source.db")
+        ).create_survey(make_request())
+        surveys_file = tmp_path / "surveys.json"
+        responses_file = tmp_path / "survey_responses.json"
+        surveys_file.write_text(json.dumps({survey.id: survey.model_dump(mode="json")}))
+        responses_file.write_text(json.dumps({
+            survey.id: [make_response(survey.id, "u1").model_dump(mode="json")]
+        }))
+
+        counts = service.import_json(surveys_file, responses_file)
+        assert counts == {"surveys": 1, "responses": 1}
+        assert (await service.get_survey(survey.id)).name == "Pulse"
+        assert [r.user_id for r in await service.get_responses_for_survey(survey.id)] == ["u1"]
+
+        # The JSON backend's per-survey segment directory imports the same way
+        segments = ResponseSegmentStore(tmp_path / "survey_responses")
+        segments.write_all({survey.id: [make_response(survey.id, "u2").model_dump()]})
+        assert service.import_json(surveys_file, segments.directory) == {"surveys": 1, "responses": 1}
+        assert await service.count_responses(survey.id) == 2
@@ -0,0 +1,134 @@
+"""
+Tests for the JSON-file survey service
+"""
+
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.models.survey import CreateSurveyRequest, SurveyResponse
+from app.services import survey_service as survey_service_module
+from app.services.response_segments import ResponseSegmentStore
+from app.services.survey_service import SurveyService
+from app.services.write_behind import WriteBehindFlusher
+
+
+@pytest.fixture
+def flusher(monkeypatch):
+    """Give each test its own write-behind flusher."""
+    flusher = WriteBehindFlusher(delay=0.01)
+    monkeypatch.setattr(survey_service_module, "write_behind_flusher", flusher)
+    return flusher
+
+
+@pytest.fixture
+def service(tmp_path, flusher):
+    """Create a survey service on a temporary data directory."""
+    return SurveyService(data_dir=tmp_path)
+
+
+def make_response(survey_id, n):
+    return SurveyResponse(
+        id=f"response_{n:03d}",
+        survey_id=survey_id,
+        user_id=f"user{n}",
+        responses={"q1": str(n)},
+        submitted_at=datetime(2025, 1, 1) + timedelta(seconds=n)
+    )
+
+
+class TestSurveyCache:
+    """Test cases for the parsed-survey cache."""
+
+    @pytest.mark.asyncio
+    async def test_reads_hit_the_cache_until_the_file_changes(self, tmp_path, service, flusher):
+        """Test that own writes keep the cache warm and outside edits trigger one reload."""
+        survey = await service.create_survey(CreateSurveyRequest(name="Pulse", context="c", created_by="hr"))
+        await flusher.close()
+
+        reloads = service.survey_cache_reloads
+        for _ in range(3):
+            assert (await service.get_survey(survey.id)).name == "Pulse"
+        assert len(await service.list_surveys(created_by="hr")) == 1
+        assert service.survey_cache_reloads == reloads
+
+        # Mutating a returned survey does not leak into the cache
+        fetched = await service.get_survey(survey.id)
+        fetched.status = "published"
+        fetched.configuration.target_audience.append("user1")
+        cached = await service.get_survey(survey.id)
+        assert cached.status == "draft"
+        assert cached.configuration.target_audience == []
+        await service.update_survey(survey.id, fetched)
+        await flusher.close()
+        # Nor does mutating the survey that was saved
+        fetched.configuration.target_audience.append("user2")
+        saved = await service.get_survey(survey.id)
+        assert saved.status == "published"
+        assert saved.configuration.target_audience == ["user1"]
+        assert service.survey_cache_reloads == reloads
+
+        # An edit made outside the service is picked up on the next read
+        surveys_file = tmp_path / "surveys.json"
+        data = json.loads(surveys_file.read_text())
+        data[survey.id]["name"] = "Renamed outside"
+        surveys_file.write_text(json.dumps(data, indent=2))
+        assert (await service.get_survey(survey.id)).name == "Renamed outside"
+        assert service.survey_cache_reloads == reloads + 1
+
+        stats = service.get_cache_stats()
+        assert stats["cached_surveys"] == 1
+        assert stats["survey_cache_hits"] > 0
+
+
+class TestResponseSegments:
+    """Test cases for per-survey response segments."""
+
+    @pytest.mark.asyncio
+    async def test_appends_are_batched_and_survive_reopen(self, tmp_path, service, flusher):
+        """Test that a burst of submissions is one fsync per segment and reads one survey only."""
+        for n in range(50):
+            await service.add_survey_response(make_response("s1" if n % 5 else "s2", n))
+
+        assert await service.count_responses("s1") == 40
+        assert [r.id for r in await service.get_responses_for_survey("s2")][:2] == ["response_000", "response_005"]
+
+        await flusher.close()
+        assert flusher.fsyncs == 2
+        assert not (tmp_path / "survey_responses.json").exists()
+
+        reopened = SurveyService(data_dir=tmp_path)
+        assert await reopened.count_responses("s2") == 10
+        assert len(await reopened.get_responses_for_survey("s1")) == 40
+        assert await reopened.get_responses_for_survey("missing") == []
+
+    def test_recovers_lines_past_the_manifest_and_drops_torn_tail(self, tmp_path):
+        """Test crash recovery when the manifest lags the segment."""
+        store = ResponseSegmentStore(tmp_path)
+        store.append("s1", make_response("s1", 0).model_dump())
+        store.save_manifest()
+        # Appended after the last manifest flush, followed by a torn write
+        segment = store.append("s1", make_response("s1", 1).model_dump())
+        with open(segment, "ab") as f:
+            f.write(b'{"id": "response_0')
+
+        reopened = ResponseSegmentStore(tmp_path)
+        assert reopened.recovered == 1
+        assert [r["id"] for r in reopened.read("s1")] == ["response_000", "response_001"]
+        assert not segment.read_bytes().endswith(b"response_0")
+
+    @pytest.mark.asyncio
+    async def test_migrates_legacy_responses_file(self, tmp_path, flusher):
+        """Test that an existing survey_responses.json is split into segments once."""
+        legacy = tmp_path / "survey_responses.json"
+        legacy.write_text(json.dumps({
+            "s1": [make_response("s1", n).model_dump(mode="json") for n in range(3)]
+        }, indent=2))
+
+        service = SurveyService(data_dir=tmp_path)
+        assert not legacy.exists()
+        assert (tmp_path / "survey_responses.json.migrated").exists()
+        page = await service.get_responses_page("s1", limit=2)
+        assert [r.id for r in page.items] == ["response_000", "response_001"]
+        assert await service.count_responses("s1") == 3
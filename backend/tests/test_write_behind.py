@@ -0,0 +1,119 @@
+"""
+Tests for write-behind persistence
+"""
+
+import asyncio
+import json
+
+import pytest
+
+from app.models.survey import CreateSurveyRequest
+from app.services import survey_service as survey_service_module
+from app.services import write_behind
+from app.services.write_behind import WriteBehindFlusher, atomic_write as real_atomic_write
+
+
+@pytest.fixture
+def flusher(monkeypatch):
+    """Replace the shared flusher with one that has a short window."""
+    flusher = WriteBehindFlusher(delay=0.01)
+    monkeypatch.setattr(survey_service_module, "write_behind_flusher", flusher)
+    return flusher
+
+
+class TestWriteBehindFlusher:
+    """Test cases for WriteBehindFlusher."""
+
+    def test_writes_through_without_event_loop(self, tmp_path):
+        """Test that marks outside an event loop are written immediately."""
+        flusher = WriteBehindFlusher(delay=10)
+        path = tmp_path / "data.json"
+
+        flusher.mark_dirty(path, lambda: b"{}")
+
+        assert path.read_bytes() == b"{}"
+        assert not flusher.is_pending(path)
+
+    @pytest.mark.asyncio
+    async def test_coalesces_marks_into_one_write(self, tmp_path):
+        """Test that many marks inside one window produce a single write."""
+        flusher = WriteBehindFlusher(delay=0.05)
+        path = tmp_path / "data.json"
+        state = {"n": 0}
+
+        for i in range(1000):
+            state["n"] = i
+            flusher.mark_dirty(path, lambda: json.dumps(state).encode())
+
+        assert flusher.is_pending(path)
+        assert not path.exists()
+
+        await flusher.close()
+        assert json.loads(path.read_text()) == {"n": 999}
+        assert flusher.files_written == 1
+        assert not list(tmp_path.glob("*.tmp"))
+
+    @pytest.mark.asyncio
+    async def test_background_flush(self, tmp_path):
+        """Test that the background task flushes after the window."""
+        flusher = WriteBehindFlusher(delay=0.01)
+        path = tmp_path / "data.json"
+        flusher.mark_dirty(path, lambda: b"[1]")
+
+        for _ in range(100):
+            if path.exists():
+                break
+            await asyncio.sleep(0.01)
+        assert path.read_bytes() == b"[1]"
+        assert not flusher.is_pending(path)
+
+    @pytest.mark.asyncio
+    async def test_failed_write_is_retried(self, tmp_path, monkeypatch):
+        """Test that a file whose write fails stays pending and is written by the next flush."""
+        flusher = WriteBehindFlusher(delay=10)
+        path = tmp_path / "data.json"
+        failures = []
+
+        def fail_once(target, data):
+            if not failures:
+                failures.append(target)
+                raise OSError("disk full")
+            real_atomic_write(target, data)
+
+        monkeypatch.setattr(write_behind, "atomic_write", fail_once)
+        flusher.mark_dirty(path, lambda: b"[1]")
+        await flusher.flush_async()
+        assert failures == [path] and not path.exists()
+        assert flusher.is_pending(path)
+
+        await flusher.close()
+        assert path.read_bytes() == b"[1]"
+        assert not flusher.is_pending(path)
+
+        # A newer mark made while the write was failing wins over the retried bytes
+        failures.clear()
+        flusher.mark_dirty(path, lambda: b"[2]")
+        generation, batch, unsynced = flusher._collect()
+        flusher.mark_dirty(path, lambda: b"[3]")
+        flusher._retry(generation, *flusher._write_batch(generation, batch, unsynced))
+        flusher._in_flight.difference_update(batch)
+        await flusher.close()
+        assert path.read_bytes() == b"[3]"
+
+
+class TestSurveyServiceWriteBehind:
+    """Test that SurveyService reads its own unflushed writes."""
+
+    @pytest.mark.asyncio
+    async def test_reads_pending_state_before_flush(self, tmp_path, flusher):
+        service = survey_service_module.SurveyService(data_dir=tmp_path)
+        survey = await service.create_survey(CreateSurveyRequest(
+            name="Pulse", context="Weekly pulse", created_by="hr_admin"
+        ))
+
+        assert (await service.get_survey(survey.id)).name == "Pulse"
+        assert not service.surveys_file.exists()
+
+        await flusher.close()
+        assert survey.id in json.loads(service.surveys_file.read_text())
+        assert (await service.get_survey(survey.id)).name == "Pulse"
@@ -32,6 +32,19 @@ const suggestedActions = [
   { icon: MessageSquare, label: 'Culture Insights', command: '/insights' }
 ]
 
+// Messages are fetched a page at a time; older pages load on demand
+const MESSAGE_PAGE_SIZE = 50
+
+const formatThreadMessage = (msg) => ({
+  id: msg.id,
+  type: msg.role === 'user' ? 'user' : 'ai',
+  content: msg.content,
+  timestamp: new Date(msg.timestamp)
+})
+
+// Search snippets are HTML-escaped with <mark> highlights; show them as plain text
+const snippetText = (snippet) => new DOMParser().parseFromString(snippet, 'text/html').body.textContent
+
 function AIChat() {
   const [messages, setMessages] = useState(initialMessages)
   const [inputValue, setInputValue] = useState('')
@@ -94,6 +107,7 @@ function AIChat() {
   
   // Chat thread management state
   const [currentThreadId, setCurrentThreadId] = useState(null)
+  const [olderMessagesCursor, setOlderMessagesCursor] = useState(null) // prev_cursor of the oldest loaded page
   const [recentThreads, setRecentThreads] = useState([])
   const [threadsLoading, setThreadsLoading] = useState(false)
   const [searchQuery, setSearchQuery] = useState('')
@@ -943,6 +957,7 @@ The user is currently taking this survey and may ask for help with specific ques
       // Load saved state
       setMessages(savedState.messages || initialMessages)
       setCurrentThreadId(savedState.currentThreadId)
+      setOlderMessagesCursor(null)
       setRecentThreads(savedState.recentThreads || [])
       setNotifications(savedState.notifications || [])
       setSurveyTakingMode(savedState.surveyTakingMode || false)
@@ -955,6 +970,7 @@ The user is currently taking this survey and may ask for help with specific ques
       
       setMessages(mockData.messages)
       setCurrentThreadId(mockData.currentThreadId)
+      setOlderMessagesCursor(null)
       setRecentThreads(mockData.recentThreads)
       setNotifications([])
       setSurveyTakingMode(false)
@@ -1218,6 +1234,7 @@ The user is currently taking this survey and may ask for help with specific ques
         const newThread = await chatThreadsApi.createThread(null, currentUserId)
         setCurrentThreadId(newThread.id)
         setMessages([]) // Clear current messages
+        setOlderMessagesCursor(null)
         await loadRecentThreads() // Refresh the list
         console.log(`${currentUser?.name} created backend thread: ${newThread.id}`)
       } catch (error) {
@@ -1226,6 +1243,7 @@ The user is currently taking this survey and may ask for help with specific ques
         const localThreadId = `local_${Date.now()}_${Math.random().toString(36).substr(2, 9)}`
         setCurrentThreadId(localThreadId)
         setMessages([]) // Clear current messages
+        setOlderMessagesCursor(null)
         setRecentThreads([{ id: localThreadId, title: 'New Chat', message_count: 0, updated_at: new Date().toISOString() }])
         console.log(`${currentUser?.name} created fallback local thread: ${localThreadId}`)
       }
@@ -1241,6 +1259,7 @@ The user is currently taking this survey and may ask for help with specific ques
         const surveyThread = recentThreads.find(thread => thread.id === threadId)
         if (surveyThread && surveyThread.isSurveyThread && surveyThread.surveyData) {
           setCurrentThreadId(threadId)
+          setOlderMessagesCursor(null)
           
           // Create survey notification messages
           const surveyMessages = [
@@ -1266,24 +1285,31 @@ The user is currently taking this survey and may ask for help with specific ques
         }
       }
       
-      // Regular thread handling
-      const thread = await chatThreadsApi.getThread(threadId)
+      // Regular thread handling: metadata plus the newest page of messages, not the whole thread
+      const [metadata, page] = await Promise.all([
+        chatThreadsApi.getThreadMetadata(threadId),
+        chatThreadsApi.getMessages(threadId, { limit: MESSAGE_PAGE_SIZE })
+      ])
       setCurrentThreadId(threadId)
-      
-      // Convert thread messages to component format
-      const formattedMessages = thread.messages.map(msg => ({
-        id: msg.id,
-        type: msg.role === 'user' ? 'user' : 'ai',
-        content: msg.content,
-        timestamp: new Date(msg.timestamp)
-      }))
-      
-      setMessages(formattedMessages)
+      setRecentThreads(prev => prev.map(thread => thread.id === threadId ? { ...thread, ...metadata } : thread))
+      setMessages(page.messages.map(formatThreadMessage))
+      setOlderMessagesCursor(page.prev_cursor)
     } catch (error) {
       console.error('Failed to switch to thread:', error)
     }
   }
 
+  const loadOlderMessages = async () => {
+    if (!currentThreadId || !olderMessagesCursor) return
+    try {
+      const page = await chatThreadsApi.getMessages(currentThreadId, { before: olderMessagesCursor, limit: MESSAGE_PAGE_SIZE })
+      setMessages(prev => [...page.messages.map(formatThreadMessage), ...prev])
+      setOlderMessagesCursor(page.prev_cursor)
+    } catch (error) {
+      console.error('Failed to load earlier messages:', error)
+    }
+  }
+
   const handleSearch = async (query) => {
     if (!query.trim()) {
       setSearchResults([])
@@ -1297,32 +1323,11 @@ The user is currently taking this survey and may ask for help with specific ques
       // Use backend search that already searches through all content
       const results = await chatThreadsApi.searchThreads(query, currentUserId, 20)
       
-      // For each result, get the thread details to show relevant snippets
-      const enhancedResults = await Promise.all(
-        results.map(async (thread) => {
-          try {
-            const fullThread = await chatThreadsApi.getThread(thread.id)
-            
-            // Find the first message that contains the search query
-            const matchingMessage = fullThread.messages.find(msg => 
-              msg.content.toLowerCase().includes(query.toLowerCase())
-            )
-            
-            return {
-              ...thread,
-              lastMessage: matchingMessage 
-                ? `${matchingMessage.content.substring(0, 80)}...`
-                : thread.title,
-              isContentMatch: !!matchingMessage
-            }
-          } catch (error) {
-            console.error(`Failed to fetch thread ${thread.id}:`, error)
-            return thread
-          }
-        })
-      )
-      
-      setSearchResults(enhancedResults)
+      // Each result carries a highlighted snippet, so no thread has to be fetched to show it
+      setSearchResults(results.map(thread => ({
+        ...thread,
+        lastMessage: thread.snippet ? snippetText(thread.snippet) : thread.title
+      })))
     } catch (error) {
       console.error('Failed to search threads:', error)
       setSearchResults([])
@@ -3050,6 +3055,11 @@ The user is currently taking this survey and may ask for help with specific ques
           pointerEvents: canvasOpen && canvasMode === 'focus' ? 'none' : 'auto'
         }}
         >
+          {olderMessagesCursor && (
+            <button className="load-older-messages" onClick={loadOlderMessages}>
+              Load earlier messages
+            </button>
+          )}
           {messages.map((message, messageIndex) => {
             // Don't render AI messages that are empty/being prepared
             if (message.type === 'ai' && (!message.content || message.content.trim() === '')) {
@@ -5072,6 +5082,22 @@ The user is currently taking this survey and may ask for help with specific ques
           background: rgba(0, 0, 0, 0.4);
         }
 
+        .load-older-messages {
+          align-self: center;
+          background: transparent;
+          border: 1px solid rgba(0, 0, 0, 0.15);
+          color: inherit;
+          padding: 4px 12px;
+          border-radius: 4px;
+          font-size: 12px;
+          cursor: pointer;
+          transition: all 0.2s ease;
+        }
+
+        .load-older-messages:hover {
+          background: rgba(0, 0, 0, 0.05);
+        }
+
         .message {
           display: flex;
           gap: var(--space-3);
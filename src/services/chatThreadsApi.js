@@ -61,6 +61,34 @@ export const chatThreadsApi = {
     return response.json();
   },
 
+  // Get thread title, timestamps and message count without messages
+  getThreadMetadata: async (threadId) => {
+    const response = await fetch(`${API_BASE_URL}/chat-threads/threads/${threadId}/metadata`);
+    
+    if (!response.ok) {
+      const errorData = await response.json();
+      throw new Error(errorData.detail || 'Failed to fetch chat thread');
+    }
+
+    return response.json();
+  },
+
+  // Get a page of messages: the newest by default, or older/newer than a cursor
+  getMessages: async (threadId, { before = null, after = null, limit = 50 } = {}) => {
+    const params = new URLSearchParams({ limit });
+    if (before) params.append('before', before);
+    if (after) params.append('after', after);
+    
+    const response = await fetch(`${API_BASE_URL}/chat-threads/threads/${threadId}/messages?${params}`);
+    
+    if (!response.ok) {
+      const errorData = await response.json();
+      throw new Error(errorData.detail || 'Failed to fetch chat messages');
+    }
+
+    return response.json();
+  },
+
   // Delete a thread
   deleteThread: async (threadId) => {
     const response = await fetch(`${API_BASE_URL}/chat-threads/threads/${threadId}`, {